@@ -0,0 +1,188 @@
+"""
+Brain Tumor Detection - Exécution des analyses en arrière-plan
+===============================================================
+Un unique thread de travail exécute les analyses (prétraitement + prédiction)
+les unes après les autres, afin que la boucle principale Tkinter ne soit
+jamais bloquée et qu'une seule instance du modèle soit utilisée.
+
+Une fonction d'initialisation optionnelle (par exemple le chargement du
+modèle) s'exécute d'abord sur ce même thread ; les analyses soumises entre-temps
+attendent simplement qu'elle se termine.
+
+L'interface soumet des analyses avec `submit()` puis récupère les événements
+(démarrage, résultat, erreur, annulation) avec `poll()`, typiquement depuis
+un callback `root.after`. Aucun widget Tkinter n'est manipulé depuis le thread
+de travail.
+"""
+
+import itertools
+import queue
+import threading
+import time
+
+from instrumentation import TRACER
+
+# États d'une analyse
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+ERROR = "error"
+CANCELLED = "cancelled"
+
+# États de l'initialisation (job d'identifiant 0)
+READY = "ready"
+INIT_ERROR = "init_error"
+
+
+class AnalysisJob:
+    """Analyse soumise au thread de travail"""
+
+    def __init__(self, job_id, image_path, image=None, trace=None, options=None):
+        self.id = job_id
+        self.image_path = image_path
+        self.image = image
+        self.trace = trace
+        self.options = options or {}
+        self.submitted_at = time.perf_counter()
+        self.status = PENDING
+        self.result = None
+        self.error = None
+        self.cancel_requested = False
+
+
+class AnalysisWorker:
+    """
+    File d'analyses exécutées par un thread unique
+
+    Args:
+        analyze_fn: fonction appelée sur le thread de travail avec le chemin
+            de l'image, l'image déjà décodée (ou None) et les options de
+            l'analyse en arguments nommés ; renvoie le résultat
+        init_fn: fonction optionnelle exécutée une fois sur le thread de
+            travail avant toute analyse; signale READY ou INIT_ERROR
+    """
+
+    def __init__(self, analyze_fn, init_fn=None):
+        self.analyze_fn = analyze_fn
+        self.init_fn = init_fn
+        self._init_error = None
+        self._ids = itertools.count(1)
+        self._jobs = queue.Queue()
+        self._events = queue.Queue()
+        self._lock = threading.Lock()
+        self._active = {}
+        self._thread = threading.Thread(target=self._run, name="analysis-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, image_path, image=None, trace=None, **options):
+        """
+        Ajoute une analyse à la file et renvoie le job correspondant
+
+        Args:
+            image_path: chemin de l'image
+            image: image déjà décodée (optionnel)
+            trace: Trace (instrumentation) recevant l'attente dans la file et
+                les étapes chronométrées pendant l'analyse (optionnel)
+            options: arguments nommés transmis à analyze_fn (fixés à la soumission)
+        """
+        job = AnalysisJob(next(self._ids), image_path, image, trace, options)
+        with self._lock:
+            self._active[job.id] = job
+        self._jobs.put(job)
+        return job
+
+    def cancel(self, job_id=None):
+        """
+        Annule une analyse (ou toutes si job_id est None)
+
+        Une analyse en attente n'est jamais exécutée. Pour une analyse déjà en
+        cours, la prédiction ne peut pas être interrompue: son résultat est
+        simplement ignoré.
+
+        Returns:
+            nombre d'analyses annulées
+        """
+        with self._lock:
+            if job_id is None:
+                jobs = list(self._active.values())
+            else:
+                jobs = [self._active[job_id]] if job_id in self._active else []
+            for job in jobs:
+                job.cancel_requested = True
+        return len(jobs)
+
+    def pending_count(self):
+        """Nombre d'analyses en attente ou en cours"""
+        with self._lock:
+            return len(self._active)
+
+    def poll(self):
+        """Renvoie (sans bloquer) la liste des changements d'état (status, job)"""
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def shutdown(self, wait=False):
+        """Annule les analyses restantes et arrête le thread de travail"""
+        self.cancel()
+        self._jobs.put(None)
+        if wait:
+            self._thread.join()
+
+    def _finish(self, job, status):
+        with self._lock:
+            self._active.pop(job.id, None)
+        job.status = status
+        job.image = None  # libérer l'image décodée
+        self._events.put((status, job))
+
+    def _initialize(self):
+        job = AnalysisJob(0, None)
+        try:
+            job.result = self.init_fn()
+        except Exception as e:
+            job.error = self._init_error = str(e)
+            job.status = INIT_ERROR
+        else:
+            job.status = READY
+        self._events.put((job.status, job))
+
+    def _run(self):
+        if self.init_fn is not None:
+            self._initialize()
+
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+
+            if job.cancel_requested:
+                self._finish(job, CANCELLED)
+                continue
+
+            if self._init_error is not None:
+                job.error = self._init_error
+                self._finish(job, ERROR)
+                continue
+
+            job.status = RUNNING
+            self._events.put((RUNNING, job))
+            if job.trace is not None:
+                job.trace.add('queue_wait', time.perf_counter() - job.submitted_at)
+
+            try:
+                with TRACER.activate(job.trace):
+                    result = self.analyze_fn(job.image_path, job.image, **job.options)
+            except Exception as e:
+                job.error = str(e)
+                self._finish(job, CANCELLED if job.cancel_requested else ERROR)
+                continue
+
+            if job.cancel_requested:
+                self._finish(job, CANCELLED)
+            else:
+                job.result = result
+                self._finish(job, DONE)
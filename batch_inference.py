@@ -0,0 +1,637 @@
+"""
+Brain Tumor Detection - Analyse par lots (sans interface)
+==========================================================
+Analyse des dossiers entiers d'IRM avec le modèle CNN en regroupant les images
+par lots : le modèle traite 32 à 64 images par appel au lieu d'une seule,
+ce qui multiplie le débit sur CPU.
+
+Usage:
+    python brain_tumor_detector_app.py batch dossier_irm/ -o resultats.csv
+    python brain_tumor_detector_app.py batch img1.jpg img2.png --batch-size 64
+    python brain_tumor_detector_app.py batch dossier_irm/ --gradcam cartes/
+    python brain_tumor_detector_app.py batch dossier_irm/ --cascade screening_model.keras
+    python brain_tumor_detector_app.py batch etudes/ --slices --studies etudes.csv
+    python brain_tumor_detector_app.py batch archives/ --near-duplicates 4
+    python brain_tumor_detector_app.py batch dossier_irm/ --registry model_registry.json
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+
+import numpy as np
+
+from detector_core import (
+    MODEL_PATH, IMG_SIZE, THRESHOLD, IMAGE_EXTENSIONS, to_model_input, interpret_prediction, result_status,
+    load_detector_model,
+)
+from inference_engine import load_engine
+from decode_pipeline import DEFAULT_QUEUE_DEPTH, iter_decoded_batches
+from prediction_cache import PredictionCache, DEFAULT_CACHE_PATH, SOURCE_CACHE, SOURCE_MODEL
+from results_store import ResultsStore, DEFAULT_RESULTS_DB, model_version
+from instrumentation import TRACER, stage, print_summary
+from tta_inference import SOURCE_TTA, MAX_TTA_VIEWS, predict_tta
+from gradcam import GradCam, heatmap_to_uint8, write_overlays
+from cascade import CascadeEngine, SOURCE_SCREEN, cascade_policy_error, load_cascade_engine
+from image_ingest import SOURCE_STUDY, iter_slice_batches, aggregate_study, slice_name
+from perceptual_index import SOURCE_DUPLICATE, DEFAULT_MAX_DISTANCE, phash_batch, load_hash_index
+from model_registry import ModelRegistry, load_active, predict_members
+from model_metadata import DecisionPolicy, load_policy
+
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_OUTPUT = "batch_results.csv"
+
+# Colonnes du fichier de résultats (une ligne par image) ; models: probabilité de chaque
+# modèle d'un ensemble (nom=probabilité;...), en dernier pour les CSV déjà commencés
+RESULT_FIELDS = ['image', 'probability', 'result', 'confidence', 'source', 'tta_variance', 'error', 'models']
+
+# Colonnes du fichier des études (--slices: une ligne par fichier multi-coupes)
+STUDY_FIELDS = ['study', 'slices', 'probability', 'result', 'mean_probability', 'positive_slices',
+                'top_slice', 'error']
+DEFAULT_STUDIES_OUTPUT = "batch_studies.csv"
+
+
+def collect_image_paths(inputs, recursive=False):
+    """
+    Construit la liste des images à analyser
+
+    Args:
+        inputs: liste de fichiers et/ou de dossiers
+        recursive: parcourir aussi les sous-dossiers
+
+    Returns:
+        liste triée des chemins d'images (sans doublons)
+    """
+    paths = []
+
+    for entry in inputs:
+        if os.path.isdir(entry):
+            if recursive:
+                for dirpath, _, filenames in os.walk(entry):
+                    paths.extend(
+                        os.path.join(dirpath, name) for name in filenames
+                        if name.lower().endswith(IMAGE_EXTENSIONS)
+                    )
+            else:
+                paths.extend(
+                    os.path.join(entry, name) for name in os.listdir(entry)
+                    if name.lower().endswith(IMAGE_EXTENSIONS)
+                )
+        elif os.path.isfile(entry):
+            paths.append(entry)
+        else:
+            print(f"⚠️  Chemin ignoré (introuvable): {entry}")
+
+    return sorted(set(paths))
+
+
+def predict_batch(model, batch):
+    """
+    Prédit un lot d'images prétraitées en un seul appel au modèle
+
+    Args:
+        model: moteur d'inférence (ou modèle Keras)
+        batch: tableau float32 (N, 224, 224, 1)
+
+    Returns:
+        tableau (N,) des probabilités de tumeur
+    """
+    return np.asarray(model.predict_on_batch(batch)).reshape(-1)
+
+
+def make_result(image_path, prediction=None, error=None, source=SOURCE_MODEL, variance=None, members=None,
+                policy=None):
+    """
+    Construit la ligne de résultat d'une image
+
+    variance: analyse TTA uniquement ; members: {nom: probabilité} des
+    modèles d'un ensemble ; policy: DecisionPolicy (model_metadata)
+    appliquée à la probabilité brute (None = seuil 0,5 sans calibration)
+    """
+    if error is not None:
+        return {'image': image_path, 'probability': '', 'result': 'ERREUR',
+                'confidence': '', 'source': '', 'tta_variance': '', 'error': error, 'models': ''}
+
+    if policy is not None:
+        prediction, has_tumor, confidence = policy.interpret(prediction)
+    else:
+        prediction = float(prediction)
+        has_tumor, confidence = interpret_prediction(prediction)
+    return {
+        'image': image_path,
+        'probability': f"{prediction:.6f}",
+        'result': result_status(has_tumor),
+        'confidence': f"{confidence:.6f}",
+        'source': source,
+        'tta_variance': f"{variance:.6f}" if variance is not None else '',
+        'error': '',
+        'models': ";".join(f"{name}={float(p):.6f}" for name, p in (members or {}).items()),
+    }
+
+
+def run_batch(image_paths, model, batch_size=DEFAULT_BATCH_SIZE, output_path=None,
+              img_size=IMG_SIZE, workers=None, queue_depth=DEFAULT_QUEUE_DEPTH, cache=None,
+              store=None, model_version=None, tta_views=0, gradcam_dir=None, near_index=None, policy=None,
+              append=False):
+    """
+    Analyse une liste d'images par lots
+
+    Le décodage des lots suivants (pool de threads) se fait pendant que le
+    modèle analyse le lot courant. Les résultats sont écrits au fur et à
+    mesure (une ligne par image) afin qu'une interruption ne fasse pas perdre
+    les lots déjà traités.
+
+    Args:
+        image_paths: liste des chemins d'images
+        model: moteur d'inférence (ou modèle Keras) chargé
+        batch_size: nombre d'images par appel au modèle
+        output_path: fichier CSV de sortie (None = pas d'écriture)
+        img_size: taille d'entrée du modèle
+        workers: nombre de threads de décodage (None = automatique)
+        queue_depth: nombre de lots décodés à l'avance
+        cache: PredictionCache optionnel (résultats réutilisés et enregistrés)
+        store: ResultsStore optionnel (historique des analyses, écritures groupées)
+        model_version: version du modèle enregistrée dans l'historique
+        tta_views: nombre de vues par image en mode TTA (0 = une seule prédiction) ;
+            le cache n'est alors pas utilisé (il contient des prédictions simples)
+        gradcam_dir: dossier des superpositions Grad-CAM (PNG) ; model doit alors
+            être un GradCam. Le cache n'est pas consulté (les images doivent
+            être décodées) mais reçoit les probabilités et les cartes, reprises
+            ensuite par l'application
+        near_index: HashIndex optionnel (load_hash_index) ; avec un cache, les
+            quasi-doublons d'images déjà analysées reprennent leur résultat
+            (source SOURCE_DUPLICATE) et les nouvelles empreintes sont enregistrées
+        policy: DecisionPolicy (seuil et calibration du modèle) ; le cache et
+            l'index des quasi-doublons gardent les probabilités brutes, le
+            CSV et l'historique les probabilités calibrées
+        append: compléter output_path s'il existe déjà (reprise d'une analyse
+            interrompue, voir sharded_batch.py) au lieu de le remplacer
+
+    Avec un EnsembleEngine (ou un HotSwapEngine qui en sert un), la colonne
+    models donne la probabilité de chaque modèle.
+
+    Avec un CascadeEngine comme modèle, les images écartées par le modèle de
+    tri ont la source SOURCE_SCREEN et ne sont pas mises en cache (le cache
+    ne contient que des prédictions du modèle complet).
+
+    Returns:
+        liste des résultats (dictionnaires), dans l'ordre de image_paths
+    """
+    results = []
+    out_file = None
+    writer = None
+    policy = policy or DecisionPolicy()
+
+    if tta_views:
+        cache = None
+    if cache is None or gradcam_dir:
+        near_index = None
+
+    if output_path:
+        # Reprise: les lignes déjà écrites sont gardées, l'en-tête n'est écrit qu'une fois
+        resume = append and os.path.exists(output_path) and os.path.getsize(output_path) > 0
+        out_file = open(output_path, 'a' if resume else 'w', newline='', encoding='utf-8')
+        writer = csv.DictWriter(out_file, fieldnames=RESULT_FIELDS)
+        if not resume:
+            writer.writeheader()
+
+    batches = iter_decoded_batches(image_paths, batch_size, workers, queue_depth, img_size, cache,
+                                   lookup=not gradcam_dir)
+    try:
+        while True:
+            # Temps passé à attendre le décodage (0 si le pipeline a de l'avance)
+            start = time.perf_counter()
+            batch = next(batches, None)
+            if batch is None:
+                break
+            batch_trace = TRACER.trace('batch', images=len(batch.paths))
+            batch_trace.add('wait_decode', time.perf_counter() - start)
+
+            with TRACER.activate(batch_trace):
+                batch_results = [None] * len(batch.paths)
+
+                for i, error in batch.errors.items():
+                    batch_results[i] = make_result(batch.paths[i], error=error)
+
+                for i, prediction in batch.cached.items():
+                    batch_results[i] = make_result(batch.paths[i], prediction, source=SOURCE_CACHE, policy=policy)
+
+                valid = batch.valid
+                images = batch.valid_images() if valid else None
+                phashes = None
+                if valid and near_index is not None:
+                    # Quasi-doublons d'images déjà analysées: résultat repris sans prédiction
+                    with stage('phash'):
+                        phashes = phash_batch(images)
+                    with stage('near_duplicates'):
+                        matches = [near_index.nearest(value) for value in phashes]
+                    for i, match in zip(valid, matches):
+                        if match is not None:
+                            batch_results[i] = make_result(batch.paths[i], match[1], source=SOURCE_DUPLICATE,
+                                                           policy=policy)
+                    new = [k for k, match in enumerate(matches) if match is None]
+                    if len(new) < len(valid):
+                        valid, images, phashes = [valid[k] for k in new], images[new], [phashes[k] for k in new]
+
+                if valid and tta_views:
+                    # Toutes les vues du lot, découpées en appels de batch_size images au plus
+                    with stage('predict_tta'):
+                        predictions, variances = predict_tta(model, images, tta_views, batch_size)
+                    for i, prediction, variance in zip(valid, predictions, variances):
+                        batch_results[i] = make_result(batch.paths[i], prediction, source=SOURCE_TTA,
+                                                       variance=variance, policy=policy)
+                elif valid:
+                    with stage('normalize'):
+                        inputs = to_model_input(images)
+                    members = {}
+                    if gradcam_dir:
+                        # Probabilités et cartes dans la même passe, superpositions écrites par lot
+                        with stage('predict_gradcam'):
+                            predictions, heatmaps = model.predict_with_heatmaps(inputs)
+                        with stage('write_overlays'):
+                            write_overlays(gradcam_dir, [batch.paths[i] for i in valid], images, heatmaps)
+                    elif isinstance(model, CascadeEngine):
+                        # Étapes 'screen' et 'predict' mesurées par le moteur
+                        predictions, escalated = model.predict_cascade(inputs)
+                    else:
+                        # Ensemble: tous les modèles reçoivent le même lot normalisé
+                        with stage('predict'):
+                            predictions, members = predict_members(model, inputs)
+                    if not isinstance(model, CascadeEngine):
+                        escalated = np.ones(len(predictions), dtype=bool)
+                    for k, (i, prediction, full) in enumerate(zip(valid, predictions, escalated)):
+                        batch_results[i] = make_result(batch.paths[i], prediction,
+                                                       source=SOURCE_MODEL if full else SOURCE_SCREEN,
+                                                       members={name: p[k] for name, p in members.items()},
+                                                       policy=policy)
+
+                    if cache is not None:
+                        with stage('cache_write'):
+                            cache.put_many([(batch.hashes[i], p) for i, p, full
+                                            in zip(valid, predictions, escalated) if full])
+                            if gradcam_dir:
+                                cache.put_heatmaps([(batch.hashes[i], heatmap_to_uint8(heatmap))
+                                                    for i, heatmap in zip(valid, heatmaps)])
+                            if phashes is not None:
+                                new_hashes = [(batch.hashes[i], value, p) for i, value, p, full
+                                              in zip(valid, phashes, predictions, escalated) if full]
+                                cache.put_phashes([(key, value) for key, value, _ in new_hashes])
+                                for _, value, p in new_hashes:
+                                    near_index.add(value, float(p))
+
+                if store is not None:
+                    with stage('history'):
+                        for result in batch_results:
+                            if not result['error']:
+                                store.add(result['image'], float(result['probability']),
+                                          model_version, result['source'], threshold=policy.threshold)
+
+                results.extend(batch_results)
+                if writer:
+                    with stage('write_csv'):
+                        writer.writerows(batch_results)
+                        out_file.flush()
+
+            batch_trace.finish(predicted=len(batch.valid), cached=len(batch.cached), errors=len(batch.errors))
+    finally:
+        batches.close()
+        if out_file:
+            out_file.close()
+
+    return results
+
+
+def make_study_result(image_path, summary, error=None, threshold=THRESHOLD):
+    """Construit la ligne de synthèse d'une étude (aggregate_study, probabilités calibrées)"""
+    row = {'study': image_path, 'slices': summary['slices'], 'probability': '', 'result': '',
+           'mean_probability': '', 'positive_slices': summary['positive_slices'],
+           'top_slice': summary['top_slice'] or '', 'error': error or ''}
+    if summary['probability'] is not None:
+        row['probability'] = f"{summary['probability']:.6f}"
+        row['mean_probability'] = f"{summary['mean_probability']:.6f}"
+        row['result'] = result_status(interpret_prediction(summary['probability'], threshold)[0])
+    if error is not None and not summary['slices']:
+        row['result'] = 'ERREUR'
+    return row
+
+
+def run_studies(image_paths, model, batch_size=DEFAULT_BATCH_SIZE, output_path=None, studies_path=None,
+                img_size=IMG_SIZE, store=None, model_version=None, policy=None):
+    """
+    Analyse toutes les coupes de fichiers multi-coupes (TIFF multi-pages), par lots
+
+    Les coupes sont lues une à une (image_ingest.iter_slice_batches) et
+    regroupées en lots de batch_size, d'une étude à l'autre : la mémoire
+    reste bornée à un lot et une page décodée, quelle que soit la taille
+    des études. Une image simple est une étude d'une coupe.
+
+    Args:
+        image_paths: liste des fichiers (une étude par fichier)
+        model: moteur d'inférence (ou modèle Keras) chargé
+        batch_size: nombre de coupes par appel au modèle
+        output_path: fichier CSV des coupes (RESULT_FIELDS, image = chemin#numéro)
+        studies_path: fichier CSV des études (STUDY_FIELDS)
+        img_size: taille d'entrée du modèle
+        store: ResultsStore optionnel (une entrée par étude, source SOURCE_STUDY)
+        model_version: version du modèle enregistrée dans l'historique
+        policy: DecisionPolicy appliquée aux coupes (la synthèse porte sur
+            les probabilités calibrées)
+
+    Returns:
+        (résultats des coupes, synthèses des études), dans l'ordre de image_paths
+    """
+    policy = policy or DecisionPolicy()
+    results = []
+    studies = []
+    files = []
+    writers = {}
+    for key, path, fields in (('slices', output_path, RESULT_FIELDS), ('studies', studies_path, STUDY_FIELDS)):
+        if path:
+            files.append(open(path, 'w', newline='', encoding='utf-8'))
+            writers[key] = csv.DictWriter(files[-1], fieldnames=fields)
+            writers[key].writeheader()
+
+    # Étude en cours: (chemin, probabilités de ses coupes, erreur)
+    current = [None, [], None]
+
+    def finish_study():
+        path, probabilities, error = current
+        if path is None:
+            return
+        row = make_study_result(path, aggregate_study(probabilities, policy.threshold), error, policy.threshold)
+        studies.append(row)
+        if store is not None and row['probability']:
+            with stage('history'):
+                store.add(path, float(row['probability']), model_version, SOURCE_STUDY,
+                          threshold=policy.threshold)
+        if 'studies' in writers:
+            writers['studies'].writerow(row)
+        current[:] = [None, [], None]
+
+    batches = iter_slice_batches(image_paths, batch_size, img_size)
+    try:
+        while True:
+            start = time.perf_counter()
+            batch = next(batches, None)
+            if batch is None:
+                break
+            batch_trace = TRACER.trace('batch', images=len(batch.items))
+            batch_trace.add('wait_decode', time.perf_counter() - start)
+
+            with TRACER.activate(batch_trace):
+                predictions, calibrated = {}, {}
+                if batch.valid:
+                    with stage('normalize'):
+                        inputs = to_model_input(batch.valid_images())
+                    with stage('predict'):
+                        raw = predict_batch(model, inputs)
+                    predictions = dict(zip(batch.valid, raw))
+                    calibrated = dict(zip(batch.valid, policy.calibrate(raw)))
+
+                batch_results = []
+                for i, (path, index) in enumerate(batch.items):
+                    if path != current[0]:
+                        finish_study()
+                        current[0] = path
+                    if i in batch.errors:
+                        current[2] = batch.errors[i]
+                        batch_results.append(make_result(path, error=batch.errors[i]))
+                    else:
+                        current[1].append(calibrated[i])
+                        batch_results.append(make_result(slice_name(path, index), predictions[i], policy=policy))
+
+                results.extend(batch_results)
+                if 'slices' in writers:
+                    with stage('write_csv'):
+                        writers['slices'].writerows(batch_results)
+                for f in files:
+                    f.flush()
+
+            batch_trace.finish(predicted=len(batch.valid), errors=len(batch.errors))
+        finish_study()
+    finally:
+        batches.close()
+        for f in files:
+            f.close()
+
+    return results, studies
+
+
+def parse_args(argv=None):
+    """Arguments de la ligne de commande du mode batch"""
+    parser = argparse.ArgumentParser(
+        prog="brain_tumor_detector_app.py batch",
+        description="Analyse par lots d'images IRM (sans interface graphique)"
+    )
+    parser.add_argument('inputs', nargs='+', help="Images et/ou dossiers d'images à analyser")
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT,
+                        help=f"Fichier CSV de résultats (défaut: {DEFAULT_OUTPUT})")
+    parser.add_argument('-b', '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Nombre d'images par lot (défaut: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument('-m', '--model', default=MODEL_PATH,
+                        help=f"Chemin du modèle .keras ou .tflite (défaut: {MODEL_PATH})")
+    parser.add_argument('--registry', default=None, metavar='REGISTRE',
+                        help="Utiliser la sélection active du registre des modèles (model_registry.py) "
+                             "à la place de --model ; plusieurs modèles actifs = ensemble")
+    parser.add_argument('-t', '--threads', type=int, default=None,
+                        help="Threads de l'interpréteur TFLite (défaut: nombre de cœurs)")
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help="Parcourir aussi les sous-dossiers")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="Threads de décodage des images (défaut: nombre de cœurs, max 8)")
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH,
+                        help=f"Cache des prédictions (défaut: {DEFAULT_CACHE_PATH})")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Ne pas utiliser le cache des prédictions")
+    parser.add_argument('--history', default=DEFAULT_RESULTS_DB,
+                        help=f"Historique des analyses (défaut: {DEFAULT_RESULTS_DB})")
+    parser.add_argument('--no-history', action='store_true',
+                        help="Ne pas enregistrer les résultats dans l'historique")
+    parser.add_argument('--tta', type=int, default=0, metavar='N',
+                        help=f"Moyenner N vues augmentées par image, 2 à {MAX_TTA_VIEWS} "
+                             "(probabilité moyenne et variance, sans cache)")
+    parser.add_argument('--gradcam', default=None, metavar='DOSSIER',
+                        help="Écrire la carte Grad-CAM de chaque image dans DOSSIER (PNG, modèle .keras)")
+    parser.add_argument('--cascade', default=None, metavar='MODELE_DE_TRI',
+                        help="Trier d'abord avec un modèle basse résolution (cascade.py), "
+                             "le modèle complet n'analyse que les cas incertains")
+    parser.add_argument('--near-duplicates', type=int, default=None, metavar='BITS',
+                        help="Reprendre le résultat des quasi-doublons d'images déjà analysées: empreintes "
+                             f"perceptuelles à au plus BITS bits sur 64 (valeur conseillée: {DEFAULT_MAX_DISTANCE})")
+    parser.add_argument('--slices', action='store_true',
+                        help="Analyser toutes les coupes des fichiers multi-pages (TIFF): une ligne par "
+                             "coupe, et une synthèse par étude dans --studies")
+    parser.add_argument('--studies', default=DEFAULT_STUDIES_OUTPUT,
+                        help=f"Fichier CSV des études avec --slices (défaut: {DEFAULT_STUDIES_OUTPUT})")
+    parser.add_argument('--trace', default=None,
+                        help="Enregistrer le détail des étapes de chaque lot (fichier JSONL)")
+    parser.add_argument('-q', '--queue-depth', type=int, default=DEFAULT_QUEUE_DEPTH,
+                        help=f"Lots décodés à l'avance (défaut: {DEFAULT_QUEUE_DEPTH})")
+    args = parser.parse_args(argv)
+
+    if args.batch_size < 1:
+        parser.error("--batch-size doit être supérieur ou égal à 1")
+    if args.queue_depth < 1:
+        parser.error("--queue-depth doit être supérieur ou égal à 1")
+    if args.tta and not 2 <= args.tta <= MAX_TTA_VIEWS:
+        parser.error(f"--tta doit être compris entre 2 et {MAX_TTA_VIEWS}")
+    if args.gradcam and args.tta:
+        parser.error("--gradcam et --tta ne peuvent pas être combinés")
+    if args.gradcam and args.model.lower().endswith('.tflite'):
+        parser.error("--gradcam nécessite un modèle .keras (pas de gradients avec TFLite)")
+    if args.cascade and (args.tta or args.gradcam):
+        parser.error("--cascade ne peut pas être combiné avec --tta ou --gradcam")
+    if args.registry and (args.gradcam or args.cascade):
+        parser.error("--registry ne peut pas être combiné avec --gradcam ou --cascade")
+    if args.slices and (args.tta or args.gradcam or args.cascade):
+        parser.error("--slices ne peut pas être combiné avec --tta, --gradcam ou --cascade")
+    if args.near_duplicates is not None:
+        if not 0 <= args.near_duplicates < 64:
+            parser.error("--near-duplicates doit être compris entre 0 et 63")
+        if args.no_cache or args.tta or args.gradcam or args.slices:
+            parser.error("--near-duplicates nécessite le cache des prédictions "
+                         "(incompatible avec --no-cache, --tta, --gradcam et --slices)")
+
+    return args
+
+
+def studies_main(args, image_paths, model, store, version, policy):
+    """Mode batch --slices: analyse de toutes les coupes, synthèse par étude"""
+    print(f"Analyse de {len(image_paths)} études, toutes les coupes (lots de {args.batch_size})...")
+    start = time.perf_counter()
+    try:
+        results, studies = run_studies(image_paths, model, args.batch_size, args.output, args.studies,
+                                       store=store, model_version=version, policy=policy)
+    finally:
+        if store is not None:
+            store.close()
+    elapsed = time.perf_counter() - start
+
+    slices = sum(1 for r in results if not r['error'])
+    positives = sum(1 for s in studies if s['result'] == result_status(True))
+    errors = sum(1 for s in studies if s['error'])
+
+    print(f"\n✓ {slices} coupes de {len(studies)} études analysées en {elapsed:.1f}s "
+          f"({slices / max(elapsed, 1e-9):.1f} coupes/s)")
+    print(f"   - Études avec tumeur détectée: {positives}")
+    print(f"   - Études en erreur: {errors}")
+    print(f"   - Coupes: {args.output}")
+    print(f"   - Études: {args.studies}")
+
+    print_summary(TRACER.summary(), TRACER.runtime_info())
+    if args.trace:
+        TRACER.set_record_file(None)
+        print(f"   - Détail par lot: {args.trace}")
+
+    return 0
+
+
+def batch_main(argv=None):
+    """Point d'entrée du mode batch"""
+    args = parse_args(argv)
+
+    image_paths = collect_image_paths(args.inputs, recursive=args.recursive)
+    if not image_paths:
+        print("❌ Aucune image trouvée")
+        return 1
+
+    if args.cascade:
+        error = cascade_policy_error(args.model)
+        if error:
+            print(f"❌ {error}")
+            return 1
+
+    active = None
+    try:
+        if args.registry:
+            active = load_active(ModelRegistry(args.registry), (args.batch_size,), args.threads)
+            model = active.engine
+        elif args.gradcam:
+            model = GradCam(load_detector_model(args.model), warmup_batch_sizes=(args.batch_size,))
+        elif args.cascade:
+            model = load_cascade_engine(args.model, args.cascade, (args.batch_size,), args.threads)
+        else:
+            model = load_engine(args.model, warmup_batch_sizes=(args.batch_size,), num_threads=args.threads)
+    except Exception as e:
+        print(f"❌ Erreur lors du chargement du modèle: {e}")
+        return 1
+    if active is not None:
+        kind = "Ensemble" if len(active.names) > 1 else "Modèle"
+        print(f"✓ {kind} {' + '.join(active.names)} chargé depuis le registre {args.registry}")
+    else:
+        print(f"✓ Modèle chargé avec succès depuis {args.model}")
+    if args.cascade:
+        print(f"✓ Modèle de tri {args.cascade}: bande d'incertitude ]{model.low:.4f}, {model.high:.4f}[")
+
+    if args.trace:
+        TRACER.set_record_file(args.trace)
+
+    cache = None if args.no_cache or args.tta or args.slices \
+        else PredictionCache(args.model, args.cache, fingerprint=active.fingerprint if active else None)
+    store = None if args.no_history else ResultsStore(args.history)
+    version = None
+    if store is not None:
+        version = active.version if active else model_version(args.model, cache.model_fingerprint if cache else None)
+
+    policy = active.policy if active else load_policy(args.model, cache.model_fingerprint if cache else None)
+    if not policy.is_default:
+        print(f"✓ Politique de décision: {policy.describe()}")
+
+    if args.slices:
+        return studies_main(args, image_paths, model, store, version, policy)
+
+    near_index = None
+    if args.near_duplicates is not None:
+        near_index = load_hash_index(cache, args.near_duplicates)
+        print(f"✓ Index des quasi-doublons: {len(near_index)} images (distance max {args.near_duplicates} bits)")
+
+    tta_text = f", {args.tta} vues par image" if args.tta else ""
+    print(f"Analyse de {len(image_paths)} images (lots de {args.batch_size}{tta_text})...")
+    start = time.perf_counter()
+    try:
+        results = run_batch(image_paths, model, args.batch_size, args.output,
+                            workers=args.workers, queue_depth=args.queue_depth, cache=cache,
+                            store=store, model_version=version, tta_views=args.tta,
+                            gradcam_dir=args.gradcam, near_index=near_index, policy=policy)
+    finally:
+        if cache is not None:
+            cache.close()
+        if store is not None:
+            store.close()
+    elapsed = time.perf_counter() - start
+
+    errors = sum(1 for r in results if r['error'])
+    positives = sum(1 for r in results if r['result'] == result_status(True))
+    cached = sum(1 for r in results if r['source'] == SOURCE_CACHE)
+
+    print(f"\n✓ {len(results) - errors} images analysées en {elapsed:.1f}s "
+          f"({len(results) / max(elapsed, 1e-9):.1f} images/s)")
+    print(f"   - Tumeurs détectées: {positives}")
+    print(f"   - Résultats du cache: {cached}")
+    if near_index is not None:
+        duplicates = sum(1 for r in results if r['source'] == SOURCE_DUPLICATE)
+        print(f"   - Quasi-doublons (résultat repris): {duplicates}")
+    print(f"   - Erreurs de lecture: {errors}")
+    if args.tta and len(results) > errors:
+        variances = [float(r['tta_variance']) for r in results if r['tta_variance']]
+        print(f"   - Variance moyenne des {args.tta} vues (TTA): {np.mean(variances):.6f}")
+    if args.cascade:
+        print(f"   - Envoyées au modèle complet: {model.escalated}/{model.images} "
+              f"(escalade {model.escalation_rate * 100:.1f}%)")
+    if args.gradcam:
+        print(f"   - Cartes Grad-CAM: {args.gradcam}")
+    print(f"   - Résultats: {args.output}")
+
+    # Temps par étape (lecture, décodage, prédiction, écriture...)
+    print_summary(TRACER.summary(), TRACER.runtime_info())
+    if args.trace:
+        TRACER.set_record_file(None)
+        print(f"   - Détail par lot: {args.trace}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(batch_main())
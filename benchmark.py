@@ -0,0 +1,270 @@
+"""
+Brain Tumor Detection - Banc de mesure des performances
+========================================================
+Mesure séparément, sur un corpus synthétique reproductible d'images de
+résolutions variées :
+
+- le temps de chargement du modèle (et de préchauffage) ;
+- le débit de `preprocess_image` (lecture, niveaux de gris, 224×224, /255) ;
+- la latence de prédiction p50/p99 pour des lots de 1, 8, 32 et 64 images ;
+- le surcoût des cartes Grad-CAM par rapport à la prédiction seule
+  (modèle .keras uniquement) ;
+- le débit de bout en bout (images/s) du pipeline d'analyse par lots.
+
+Les mesures sont enregistrées en JSON et comparées à une référence : une
+régression au-delà de la tolérance fait échouer la commande (code 1).
+
+Usage:
+    python benchmark.py --save-baseline                 # créer la référence
+    python benchmark.py                                 # comparer à la référence
+    python benchmark.py --model best_brain_tumor_model_int8.tflite -o bench_int8.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from detector_core import MODEL_PATH, IMG_SIZE, preprocess_image
+from inference_engine import load_engine, measure_latency
+
+DEFAULT_OUTPUT = "benchmark_results.json"
+DEFAULT_BASELINE = "benchmark_baseline.json"
+DEFAULT_TOLERANCE = 0.15
+DEFAULT_BATCH_SIZES = (1, 8, 32, 64)
+
+# Résolutions et formats du corpus synthétique (mélange type exports de scanner)
+CORPUS_SHAPES = [(256, 256), (512, 512), (630, 480), (1024, 1024), (225, 300)]
+CORPUS_FORMATS = ['.jpg', '.png']
+
+
+def make_corpus(directory, count=200, seed=0):
+    """
+    Crée un corpus synthétique reproductible d'IRM factices
+
+    Args:
+        directory: dossier de destination
+        count: nombre d'images
+        seed: graine du générateur aléatoire
+
+    Returns:
+        liste des chemins des images créées
+    """
+    rng = np.random.default_rng(seed)
+    paths = []
+    for i in range(count):
+        height, width = CORPUS_SHAPES[i % len(CORPUS_SHAPES)]
+        ext = CORPUS_FORMATS[i % len(CORPUS_FORMATS)]
+
+        # Disque lumineux bruité sur fond sombre (structure proche d'une coupe IRM)
+        yy, xx = np.mgrid[:height, :width]
+        radius = min(height, width) * 0.4
+        disk = ((yy - height / 2) ** 2 + (xx - width / 2) ** 2 < radius ** 2) * 120
+        img = np.clip(disk + rng.normal(30, 20, (height, width)), 0, 255).astype(np.uint8)
+
+        path = os.path.join(directory, f"irm_{i:04d}{ext}")
+        cv2.imwrite(path, cv2.cvtColor(img, cv2.COLOR_GRAY2BGR))
+        paths.append(path)
+    return paths
+
+
+def metric(value, unit, higher_is_better, gate=True):
+    """Une mesure du banc (gate=False: affichée mais jamais bloquante)"""
+    return {'value': value, 'unit': unit, 'higher_is_better': higher_is_better, 'gate': gate}
+
+
+def run_benchmarks(model_path=MODEL_PATH, corpus_size=200, batch_sizes=DEFAULT_BATCH_SIZES,
+                   runs=50, num_threads=None):
+    """
+    Exécute toutes les mesures
+
+    Returns:
+        dictionnaire {'metadata': ..., 'metrics': {nom: mesure}}
+    """
+    from batch_inference import run_batch
+
+    metrics = {}
+
+    # 1. Chargement du modèle et préchauffage
+    start = time.perf_counter()
+    engine = load_engine(model_path, warmup_batch_sizes=batch_sizes, num_threads=num_threads)
+    total = time.perf_counter() - start
+    metrics['model_load_s'] = metric(total - engine.warmup_time, 's', False)
+    metrics['warmup_s'] = metric(engine.warmup_time, 's', False, gate=False)
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        paths = make_corpus(corpus_dir, corpus_size)
+
+        # 2. Prétraitement seul (un fichier à la fois, comme l'application)
+        preprocess_image(paths[0])
+        start = time.perf_counter()
+        for path in paths:
+            preprocess_image(path)
+        metrics['preprocess_images_per_s'] = metric(len(paths) / (time.perf_counter() - start), 'images/s', True)
+
+        # 3. Latence de prédiction par taille de lot
+        rng = np.random.default_rng(0)
+        predict_p50 = {}
+        for batch_size in batch_sizes:
+            images = rng.random((batch_size, IMG_SIZE, IMG_SIZE, 1), dtype=np.float32)
+            latency = measure_latency(engine.predict_on_batch, images, runs)
+            predict_p50[batch_size] = latency['p50']
+            metrics[f'predict_b{batch_size}_p50_ms'] = metric(latency['p50'], 'ms', False)
+            metrics[f'predict_b{batch_size}_p99_ms'] = metric(latency['p99'], 'ms', False, gate=False)
+            metrics[f'predict_b{batch_size}_images_per_s'] = metric(
+                batch_size * 1000 / latency['p50'], 'images/s', True, gate=False)
+
+        # 4. Grad-CAM (prédiction + cartes dans la même passe), modèle Keras uniquement
+        model = getattr(engine, 'model', None)
+        if model is not None:
+            from gradcam import GradCam
+            gradcam = GradCam(model, warmup_batch_sizes=batch_sizes)
+            for batch_size in batch_sizes:
+                images = rng.random((batch_size, IMG_SIZE, IMG_SIZE, 1), dtype=np.float32)
+                latency = measure_latency(gradcam.predict_with_heatmaps, images, runs)
+                metrics[f'gradcam_b{batch_size}_p50_ms'] = metric(latency['p50'], 'ms', False)
+                metrics[f'gradcam_b{batch_size}_overhead'] = metric(
+                    latency['p50'] / predict_p50[batch_size], 'x', False, gate=False)
+
+        # 5. Bout en bout: décodage parallèle + lots de 32 (sans cache)
+        start = time.perf_counter()
+        run_batch(paths, engine, batch_size=32)
+        metrics['end_to_end_images_per_s'] = metric(len(paths) / (time.perf_counter() - start), 'images/s', True)
+
+    return {'metadata': collect_metadata(model_path, corpus_size, runs), 'metrics': metrics}
+
+
+def collect_metadata(model_path, corpus_size, runs):
+    """Contexte des mesures (pour ne comparer que des résultats comparables)"""
+    try:
+        import tensorflow as tf
+        tf_version = tf.__version__
+    except ImportError:
+        tf_version = None
+
+    return {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'model': os.path.basename(model_path),
+        'corpus_size': corpus_size,
+        'runs': runs,
+        'python': platform.python_version(),
+        'tensorflow': tf_version,
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare_to_baseline(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare des mesures à la référence
+
+    Args:
+        current, baseline: dictionnaires {'metrics': ...} produits par run_benchmarks
+        tolerance: écart relatif toléré (0.15 = 15 %)
+
+    Returns:
+        liste de (nom, référence, valeur, écart relatif, régression)
+    """
+    rows = []
+    for name, measure in current['metrics'].items():
+        reference = baseline.get('metrics', {}).get(name)
+        if reference is None or not reference['value']:
+            continue
+
+        change = (measure['value'] - reference['value']) / reference['value']
+        # Écart défavorable: baisse d'un débit, hausse d'une durée
+        worse = -change if measure['higher_is_better'] else change
+        regression = measure.get('gate', True) and worse > tolerance
+        rows.append((name, reference['value'], measure['value'], change, regression))
+    return rows
+
+
+def print_results(results, comparison=None):
+    """Affiche les mesures (et l'écart à la référence le cas échéant)"""
+    compared = {name: row for name, *row in comparison or []}
+    print(f"\n{'Mesure':32} {'Valeur':>18} {'Référence':>18} {'Écart':>8}")
+    for name, measure in results['metrics'].items():
+        line = f"{name:32} {measure['value']:>9.2f} {measure['unit']:<8}"
+        if name in compared:
+            reference, _, change, regression = compared[name]
+            flag = "❌" if regression else ("" if measure.get('gate', True) else "·")
+            line += f" {reference:>9.2f} {measure['unit']:<8} {change * 100:>+7.1f}% {flag}"
+        print(line)
+    if compared:
+        print("(· = mesure indicative, jamais bloquante)")
+
+
+def main(argv=None):
+    """Point d'entrée du banc de mesure"""
+    parser = argparse.ArgumentParser(description="Banc de mesure: prétraitement, inférence, bout en bout")
+    parser.add_argument('-m', '--model', default=MODEL_PATH, help=f"Chemin du modèle (défaut: {MODEL_PATH})")
+    parser.add_argument('-t', '--threads', type=int, default=None, help="Threads de l'interpréteur TFLite")
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT,
+                        help=f"Fichier JSON des mesures (défaut: {DEFAULT_OUTPUT})")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help=f"Fichier JSON de référence (défaut: {DEFAULT_BASELINE})")
+    parser.add_argument('--save-baseline', action='store_true', help="Enregistrer ces mesures comme référence")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f"Écart défavorable toléré (défaut: {DEFAULT_TOLERANCE:.0%})")
+    parser.add_argument('-n', '--corpus-size', type=int, default=200, help="Images du corpus synthétique (défaut: 200)")
+    parser.add_argument('-r', '--runs', type=int, default=50, help="Mesures par taille de lot (défaut: 50)")
+    parser.add_argument('-b', '--batch-sizes', type=int, nargs='+', default=list(DEFAULT_BATCH_SIZES),
+                        help="Tailles de lot mesurées (défaut: 1 8 32 64)")
+    args = parser.parse_args(argv)
+
+    print(f"Banc de mesure: {args.model}, corpus de {args.corpus_size} images, {args.runs} mesures par lot...")
+    try:
+        results = run_benchmarks(args.model, args.corpus_size, tuple(args.batch_sizes), args.runs, args.threads)
+    except Exception as e:
+        print(f"❌ Erreur lors des mesures: {e}")
+        return 1
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print_results(results)
+        print(f"\n✓ Référence enregistrée dans {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print_results(results)
+        print(f"\n✓ Mesures enregistrées dans {args.output} "
+              f"(pas de référence: lancez avec --save-baseline pour en créer une)")
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    comparison = compare_to_baseline(results, baseline, args.tolerance)
+    print_results(results, comparison)
+
+    reference_meta = baseline.get('metadata', {})
+    if reference_meta.get('platform') != results['metadata']['platform']:
+        print("\n⚠️  Référence mesurée sur une autre machine: comparaison indicative")
+    for key in ('model', 'corpus_size', 'runs'):
+        if reference_meta.get(key) != results['metadata'][key]:
+            print(f"⚠️  Paramètre différent de la référence: {key} = {results['metadata'][key]} "
+                  f"(référence: {reference_meta.get(key)})")
+
+    regressions = [name for name, *_, regression in comparison if regression]
+    if regressions:
+        print(f"\n❌ RÉGRESSION (> {args.tolerance:.0%}): {', '.join(regressions)}")
+        return 1
+
+    print(f"\n✅ Aucune régression au-delà de {args.tolerance:.0%} ({args.output})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,17 +8,44 @@ Auteur: Votre Nom
 Date: 2026
 """
 
+import time
+
+# Référence pour le rapport de temps de démarrage (avant les imports lourds)
+STARTUP_T0 = time.perf_counter()
+
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 from PIL import Image, ImageTk
-import cv2
 import numpy as np
-from tensorflow.keras.models import load_model
+import argparse
 import os
+import sys
 from datetime import datetime
 
+# TensorFlow n'est importé qu'en arrière-plan, au chargement du modèle
+from detector_core import (
+    MODEL_PATH, IMG_SIZE, read_image_bytes, preprocess_image,
+    preprocess_array, resize_for_model, to_model_input,
+)
+from inference_engine import load_engine
+from analysis_worker import AnalysisWorker, RUNNING, DONE, ERROR, CANCELLED, READY, INIT_ERROR
+from prediction_cache import PredictionCache, image_hash, SOURCE_CACHE, SOURCE_MODEL
+from results_store import ResultsStore, LEGACY_LOG_PATH, model_version
+from instrumentation import TRACER, stage, print_summary
+from tta_inference import DEFAULT_TTA_VIEWS, MAX_TTA_VIEWS, SOURCE_TTA, predict_tta
+from gradcam import GradCam, heatmap_to_uint8, overlay_heatmap
+from image_ingest import decode_reduced
+from model_registry import DEFAULT_RELOAD_INTERVAL, HotSwapEngine, ModelRegistry
+from model_metadata import DecisionPolicy, load_policy
+from batch_inference import collect_image_paths, run_batch
+from study_gallery import StudyGallery, STUDY_CHUNK_SIZE, MAX_STUDY_CHUNKS
+
+# Historique des temps de démarrage (suivi des régressions)
+STARTUP_LOG = "startup_timings.csv"
+
 class BrainTumorDetectorApp:
-    def __init__(self, root):
+    def __init__(self, root, model_path=MODEL_PATH, num_threads=None, tta_views=0, gradcam=False,
+                 registry_path=None, study_path=None):
         self.root = root
         self.root.title("Brain Tumor Detector - Détection de Tumeurs Cérébrales")
         self.root.geometry("900x700")
@@ -35,35 +62,195 @@ class BrainTumorDetectorApp:
         
         # Variables
         self.model = None
+        self.engine = None
+        self.model_path = model_path
+        self.num_threads = num_threads
+        # Registre des modèles: la sélection active remplace model_path et est suivie à chaud
+        self.registry_path = registry_path
+        self.reload_interval_ms = int(DEFAULT_RELOAD_INTERVAL * 1000)
         self.current_image_path = None
         self.current_image = None
-        self.img_size = 224
+        self.current_image_hash = None
+        self.current_thumbnail = None
+        self.cache = None
+        self.pending_hashes = {}
+        self.model_version = None
+        # Seuil de décision et calibration du modèle (model_metadata.py, evaluation.py)
+        self.policy = DecisionPolicy()
+        # Galerie d'une étude (dossier entier) et ses lots en cours d'analyse {job: (galerie, indices)}
+        self.gallery = None
+        self.study_jobs = {}
+        self.results_store = None
+        self.img_size = IMG_SIZE
+        self.poll_interval_ms = 100
+        self.model_ready = False
+        self.startup_timings = {}
+        
+        # Analyse renforcée (TTA): moyenne de plusieurs vues augmentées, activable dans l'interface
+        self.tta_views = tta_views or DEFAULT_TTA_VIEWS
+        self.tta_enabled = tk.BooleanVar(master=root, value=bool(tta_views))
+        
+        # Carte Grad-CAM superposée à la miniature (modèle .keras uniquement), créée à la première utilisation
+        self.gradcam = None
+        self.gradcam_enabled = tk.BooleanVar(master=root, value=gradcam)
         
-        # Charger le modèle
-        self.load_model()
+        # Historique des analyses (reprend l'ancien analysis_log.txt au premier lancement)
+        self.open_results_store()
         
-        # Créer l'interface
+        # Créer l'interface (la fenêtre s'affiche sans attendre le modèle)
         self.create_widgets()
+        self.root.bind("<Map>", self.on_window_mapped, add="+")
+        
+        # Thread d'analyse: il importe TensorFlow et charge le modèle en
+        # arrière-plan, puis il est le seul à utiliser le modèle.
+        # La boucle Tkinter récupère les résultats via root.after
+        self.worker = AnalysisWorker(self.run_analysis, init_fn=self.load_model)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after(self.poll_interval_ms, self.poll_analysis_results)
+        
+        if study_path:
+            self.root.after_idle(self.open_study, study_path)
         
     def load_model(self):
-        """Charge le modèle CNN pré-entraîné"""
-        model_path = "best_brain_tumor_model.keras"
+        """Importe TensorFlow et charge le modèle CNN pré-entraîné (thread d'analyse)"""
+        model_path = self.registry_path or self.model_path
+        
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"Le fichier modèle '{model_path}' n'a pas été trouvé.\n\n"
+                f"Veuillez vous assurer que le fichier '{os.path.basename(model_path)}' "
+                "est dans le même dossier que cette application."
+            )
         
         try:
-            if os.path.exists(model_path):
-                self.model = load_model(model_path)
-                print(f"✓ Modèle chargé avec succès depuis {model_path}")
+            start = time.perf_counter()
+            import tensorflow  # noqa: F401 (import différé, le plus long du démarrage)
+            self.startup_timings['tensorflow_import'] = time.perf_counter() - start
+            
+            # Moteur compilé (.keras) ou TFLite (.tflite), préchauffé avant la première analyse
+            start = time.perf_counter()
+            if self.registry_path:
+                # Nouvelles versions chargées en arrière-plan, bascule entre deux analyses
+                self.engine = HotSwapEngine(ModelRegistry(model_path), num_threads=self.num_threads,
+                                            auto_swap=False)
+                self.model = getattr(self.engine.active.engine, 'model', None)
             else:
-                messagebox.showerror(
-                    "Erreur", 
-                    f"Le fichier modèle '{model_path}' n'a pas été trouvé.\n\n"
-                    "Veuillez vous assurer que le fichier 'best_brain_tumor_model.keras' "
-                    "est dans le même dossier que cette application."
-                )
-                self.root.destroy()
+                self.engine = load_engine(model_path, num_threads=self.num_threads)
+                self.model = getattr(self.engine, 'model', None)
+            self.startup_timings['warmup'] = self.engine.warmup_time
+            self.startup_timings['model_load'] = time.perf_counter() - start - self.engine.warmup_time
+        except Exception as e:
+            raise RuntimeError(f"Erreur lors du chargement du modèle:\n{str(e)}")
+        
+        print(f"✓ Modèle chargé avec succès depuis {model_path}")
+    
+    def open_results_store(self):
+        """Ouvre l'historique des analyses et importe l'ancien fichier texte"""
+        try:
+            # Écriture immédiate: une analyse à la fois dans l'interface
+            self.results_store = ResultsStore(flush_size=1)
+            if os.path.exists(LEGACY_LOG_PATH):
+                imported = self.results_store.import_legacy_log(LEGACY_LOG_PATH)
+                if imported:
+                    print(f"✓ {imported} analyses importées depuis {LEGACY_LOG_PATH}")
+        except Exception as e:
+            print(f"Erreur lors de l'ouverture de l'historique: {e}")
+    
+    def on_window_mapped(self, event):
+        """Mémorise l'instant où la fenêtre s'affiche pour la première fois"""
+        if event.widget is self.root and 'window_shown' not in self.startup_timings:
+            self.startup_timings['window_shown'] = time.perf_counter() - STARTUP_T0
+    
+    def on_model_ready(self):
+        """Active l'analyse une fois le modèle chargé"""
+        self.model_ready = True
+        self.startup_timings['model_ready'] = time.perf_counter() - STARTUP_T0
+        
+        # Cache des prédictions (vidé automatiquement si le fichier modèle a changé)
+        active = self.engine.active if self.registry_path else None
+        try:
+            self.cache = PredictionCache(self.model_path, fingerprint=active.fingerprint if active else None)
+        except Exception as e:
+            print(f"Cache des prédictions désactivé: {e}")
+        
+        if active is not None:
+            self.model_version = active.version
+            self.policy = active.policy
+            self.root.after(self.reload_interval_ms, self.check_model_update)
+        else:
+            try:
+                fingerprint = self.cache.model_fingerprint if self.cache is not None else None
+                self.model_version = model_version(self.model_path, fingerprint)
+                self.policy = load_policy(self.model_path, fingerprint)
+            except (OSError, ValueError) as e:
+                print(f"Version du modèle inconnue: {e}")
+        if not self.policy.is_default:
+            print(f"✓ Politique de décision: {self.policy.describe()}")
+        
+        self.update_gradcam_availability()
+        if self.gallery is not None:
+            self.gallery.set_model_ready()
+        
+        if self.current_image_path:
+            self.analyze_btn.config(state=tk.NORMAL)
+        else:
+            self.result_label.config(text="En attente d'analyse...", fg="#6b7280")
+        
+        self.report_startup_timings()
+    
+    def update_gradcam_availability(self):
+        """Pas de gradients avec un modèle TFLite ou un ensemble: case Grad-CAM désactivée"""
+        if self.model is None:
+            self.gradcam_enabled.set(False)
+            self.gradcam_check.config(state=tk.DISABLED)
+        else:
+            self.gradcam_check.config(state=tk.NORMAL)
+    
+    def check_model_update(self):
+        """Suit le registre des modèles (boucle Tkinter, mode --registry)"""
+        self.engine.check_for_update()
+        
+        # Bascule seulement sans analyse en attente de résultat: chaque résultat
+        # (cache, historique) est attribué à la version qui l'a calculé
+        if not self.pending_hashes and not self.study_jobs:
+            active = self.engine.swap_pending()
+            if active is not None:
+                self.model = getattr(active.engine, 'model', None)
+                self.gradcam = None
+                self.model_version = active.version
+                self.policy = active.policy
+                if self.cache is not None:
+                    self.cache.set_model_fingerprint(active.fingerprint)
+                self.update_gradcam_availability()
+        
+        self.root.after(self.reload_interval_ms, self.check_model_update)
+    
+    def report_startup_timings(self):
+        """Affiche les temps de démarrage et les ajoute à l'historique STARTUP_LOG"""
+        fields = ['window_shown', 'tensorflow_import', 'model_load', 'warmup', 'model_ready']
+        labels = {
+            'window_shown': "Fenêtre affichée",
+            'tensorflow_import': "Import TensorFlow",
+            'model_load': "Chargement du modèle",
+            'warmup': "Préchauffage",
+            'model_ready': "Modèle prêt",
+        }
+        
+        print("⏱️  Temps de démarrage:")
+        for field in fields:
+            if field in self.startup_timings:
+                print(f"   - {labels[field]:22}: {self.startup_timings[field]:.2f}s")
+        
+        try:
+            new_file = not os.path.exists(STARTUP_LOG)
+            with open(STARTUP_LOG, 'a', encoding='utf-8') as f:
+                if new_file:
+                    f.write("date," + ",".join(fields) + "\n")
+                values = [f"{self.startup_timings[field]:.3f}" if field in self.startup_timings else ""
+                          for field in fields]
+                f.write(datetime.now().strftime('%Y-%m-%d %H:%M:%S') + "," + ",".join(values) + "\n")
         except Exception as e:
-            messagebox.showerror("Erreur", f"Erreur lors du chargement du modèle:\n{str(e)}")
-            self.root.destroy()
+            print(f"Erreur lors de l'enregistrement des temps de démarrage: {e}")
     
     def create_widgets(self):
         """Crée tous les widgets de l'interface"""
@@ -139,6 +326,23 @@ class BrainTumorDetectorApp:
         )
         self.load_btn.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=(0, 10))
         
+        # Study button (dossier entier, galerie)
+        self.study_btn = tk.Button(
+            buttons_frame,
+            text="📚 Étude",
+            command=self.open_study,
+            font=("Segoe UI", 12, "bold"),
+            bg=self.primary_color,
+            fg="white",
+            activebackground="#1d4ed8",
+            activeforeground="white",
+            cursor="hand2",
+            relief=tk.FLAT,
+            padx=15,
+            pady=12
+        )
+        self.study_btn.pack(side=tk.LEFT, fill=tk.X, padx=(0, 10))
+        
         # Analyze button
         self.analyze_btn = tk.Button(
             buttons_frame,
@@ -155,7 +359,51 @@ class BrainTumorDetectorApp:
             pady=12,
             state=tk.DISABLED
         )
-        self.analyze_btn.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=(10, 0))
+        self.analyze_btn.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=(10, 10))
+        
+        # Cancel button
+        self.cancel_btn = tk.Button(
+            buttons_frame,
+            text="⏹ Annuler",
+            command=self.cancel_analyses,
+            font=("Segoe UI", 12, "bold"),
+            bg="#6b7280",
+            fg="white",
+            activebackground="#4b5563",
+            activeforeground="white",
+            cursor="hand2",
+            relief=tk.FLAT,
+            padx=30,
+            pady=12,
+            state=tk.DISABLED
+        )
+        self.cancel_btn.pack(side=tk.LEFT, fill=tk.X, padx=(10, 0))
+        
+        # Analyse renforcée (TTA)
+        self.tta_check = tk.Checkbutton(
+            buttons_frame,
+            text=f"TTA ({self.tta_views} vues)",
+            variable=self.tta_enabled,
+            font=("Segoe UI", 10),
+            bg=self.bg_color,
+            fg=self.text_color,
+            activebackground=self.bg_color,
+            cursor="hand2"
+        )
+        self.tta_check.pack(side=tk.LEFT, padx=(10, 0))
+        
+        # Carte de saillance (régions qui ont déterminé la prédiction)
+        self.gradcam_check = tk.Checkbutton(
+            buttons_frame,
+            text="Grad-CAM",
+            variable=self.gradcam_enabled,
+            font=("Segoe UI", 10),
+            bg=self.bg_color,
+            fg=self.text_color,
+            activebackground=self.bg_color,
+            cursor="hand2"
+        )
+        self.gradcam_check.pack(side=tk.LEFT, padx=(10, 0))
         
         # Results frame
         self.results_frame = tk.LabelFrame(
@@ -169,9 +417,12 @@ class BrainTumorDetectorApp:
         )
         self.results_frame.pack(fill=tk.BOTH)
         
+        # Barre de progression (affichée pendant les analyses)
+        self.progress_bar = ttk.Progressbar(self.results_frame, mode='indeterminate')
+        
         self.result_label = tk.Label(
             self.results_frame,
-            text="En attente d'analyse...",
+            text="⏳ Chargement du modèle en cours...",
             font=("Segoe UI", 11),
             bg="white",
             fg="#6b7280",
@@ -199,42 +450,89 @@ class BrainTumorDetectorApp:
         file_path = filedialog.askopenfilename(
             title="Sélectionner une image IRM",
             filetypes=[
-                ("Images", "*.png *.jpg *.jpeg *.bmp *.tiff"),
+                ("Images", "*.png *.jpg *.jpeg *.bmp *.tif *.tiff"),
                 ("PNG", "*.png"),
                 ("JPEG", "*.jpg *.jpeg"),
                 ("Tous les fichiers", "*.*")
             ]
         )
         
+        if file_path:
+            self.open_image(file_path)
+    
+    def open_image(self, file_path):
+        """
+        Charge une image IRM et l'affiche (bouton 'Charger une IRM' ou ligne de la galerie)
+        
+        Args:
+            file_path: chemin de l'image
+        """
         if file_path:
             try:
-                # Charger l'image
-                self.current_image_path = file_path
-                img = Image.open(file_path)
+                load_trace = TRACER.trace('load', image=os.path.basename(file_path))
                 
-                # Redimensionner pour l'affichage (garder le ratio)
-                display_size = 400
-                img.thumbnail((display_size, display_size), Image.Resampling.LANCZOS)
+                # Charger l'image: une seule lecture et un seul décodage en niveaux de gris,
+                # réutilisés pour l'affichage et pour l'analyse
+                with TRACER.activate(load_trace):
+                    try:
+                        with stage('read'):
+                            data = read_image_bytes(file_path)
+                    except OSError:
+                        raise ValueError(f"Impossible de lire l'image: {file_path}")
+                    with stage('decode'):
+                        # Grands exports: décodage à résolution réduite (première coupe)
+                        gray = decode_reduced(data, self.img_size, file_path)
+                    # Empreinte du contenu: clé du cache des prédictions
+                    with stage('hash'):
+                        image_key = image_hash(data)
+                    
+                    # Redimensionner pour l'affichage (garder le ratio)
+                    with stage('thumbnail'):
+                        img = Image.fromarray(gray)
+                        display_size = 400
+                        img.thumbnail((display_size, display_size), Image.Resampling.LANCZOS)
                 
-                # Convertir pour Tkinter
-                photo = ImageTk.PhotoImage(img)
+                self.current_image_path = file_path
+                self.current_image = gray
+                self.current_image_hash = image_key
+                self.current_thumbnail = np.asarray(img)
                 
                 # Afficher l'image
-                self.image_label.configure(image=photo, text="")
-                self.image_label.image = photo  # Garder une référence
+                with TRACER.activate(load_trace):
+                    self.show_thumbnail()
+                load_trace.finish()
                 
-                # Activer le bouton d'analyse
-                self.analyze_btn.config(state=tk.NORMAL)
+                # Activer le bouton d'analyse (dès que le modèle est prêt)
+                if self.model_ready:
+                    self.analyze_btn.config(state=tk.NORMAL)
+                    message = "Image chargée avec succès!\nCliquez sur 'Analyser' pour détecter les tumeurs."
+                else:
+                    message = "Image chargée avec succès!\n⏳ L'analyse sera disponible dès que le modèle sera chargé."
                 
                 # Réinitialiser les résultats
-                self.result_label.config(
-                    text="Image chargée avec succès!\nCliquez sur 'Analyser' pour détecter les tumeurs.",
-                    fg="#059669"
-                )
+                self.result_label.config(text=message, fg="#059669")
                 
             except Exception as e:
                 messagebox.showerror("Erreur", f"Impossible de charger l'image:\n{str(e)}")
     
+    def show_thumbnail(self, heatmap=None):
+        """
+        Affiche la miniature de l'image courante
+        
+        Args:
+            heatmap: carte Grad-CAM superposée à la miniature (None = image seule)
+        """
+        with stage('thumbnail'):
+            thumbnail = self.current_thumbnail
+            if heatmap is not None:
+                thumbnail = overlay_heatmap(thumbnail, heatmap)
+            
+            # Convertir pour Tkinter
+            photo = ImageTk.PhotoImage(Image.fromarray(thumbnail))
+        
+        self.image_label.configure(image=photo, text="")
+        self.image_label.image = photo  # Garder une référence
+    
     def preprocess_image(self, image_path):
         """
         Prétraite l'image pour le modèle CNN
@@ -245,66 +543,326 @@ class BrainTumorDetectorApp:
         Returns:
             image prétraitée au format attendu par le modèle
         """
-        # Charger l'image en niveaux de gris
-        img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-        
-        # Redimensionner à 224×224
-        img = cv2.resize(img, (self.img_size, self.img_size))
-        
-        # Normaliser les pixels entre 0 et 1
-        img = img.astype('float32') / 255.0
-        
-        # Reshape pour le modèle (1, 224, 224, 1)
-        img = img.reshape(1, self.img_size, self.img_size, 1)
-        
-        return img
+        # Niveaux de gris, 224×224, normalisation 0-1, shape (1, 224, 224, 1)
+        return preprocess_image(image_path, self.img_size)
     
     def analyze_image(self):
-        """Analyse l'image IRM et affiche les résultats"""
+        """Ajoute l'analyse de l'image courante à la file du thread d'analyse"""
         if not self.current_image_path:
             messagebox.showwarning("Attention", "Veuillez d'abord charger une image.")
             return
         
-        try:
-            # Désactiver le bouton pendant l'analyse
-            self.analyze_btn.config(state=tk.DISABLED, text="⏳ Analyse en cours...")
-            self.root.update()
-            
-            # Prétraiter l'image
-            preprocessed_img = self.preprocess_image(self.current_image_path)
-            
-            # Prédiction
-            prediction = self.model.predict(preprocessed_img, verbose=0)[0][0]
-            
-            # Interpréter les résultats
-            has_tumor = prediction > 0.5
-            confidence = prediction if has_tumor else (1 - prediction)
-            
-            # Préparer l'affichage des résultats
-            result_text = self.format_results(has_tumor, prediction, confidence)
-            
-            # Afficher les résultats avec couleur appropriée
-            result_color = self.danger_color if has_tumor else self.success_color
-            self.result_label.config(text=result_text, fg=result_color, font=("Segoe UI", 11, "bold"))
+        # Temps de chaque étape de l'analyse (file d'attente, prétraitement, prédiction, log)
+        trace = TRACER.trace('gui', image=os.path.basename(self.current_image_path))
+        
+        # Mode TTA: plusieurs vues de l'image analysées en un seul lot
+        tta_views = self.tta_views if self.tta_enabled.get() else 0
+        gradcam = self.gradcam_enabled.get()
+        
+        # Image déjà analysée avec ce modèle: résultat immédiat depuis le cache
+        # (le cache ne contient que des prédictions simples, sans TTA)
+        if self.cache is not None and not tta_views:
+            with trace.stage('cache_lookup'):
+                prediction = self.cache.get(self.current_image_hash)
+                heatmap = self.cache.get_heatmap(self.current_image_hash) if gradcam else None
+            if prediction is not None and (heatmap is not None or not gradcam):
+                self.show_result(self.current_image_path, prediction, SOURCE_CACHE, trace, heatmap=heatmap)
+                return
+        
+        job = self.worker.submit(self.current_image_path, self.current_image, trace,
+                                 tta_views=tta_views, gradcam=gradcam)
+        self.pending_hashes[job.id] = self.current_image_hash
+        self.update_analysis_status()
+    
+    def run_analysis(self, image_path, image=None, tta_views=0, gradcam=False, study_paths=None,
+                     policy=None, model_version=None):
+        """
+        Prétraite l'image et exécute la prédiction (thread d'analyse)
+        
+        Args:
+            image_path: chemin vers l'image
+            image: image déjà décodée en niveaux de gris (évite une relecture du fichier)
+            tta_views: nombre de vues augmentées à moyenner (0 = prédiction simple)
+            gradcam: calculer aussi la carte Grad-CAM (dans la même passe que la prédiction)
+            study_paths: lot d'images d'une étude (galerie), analysé en un seul passage
+                par batch_inference.run_batch
+            policy: DecisionPolicy appliquée au lot d'une étude
+            model_version: version du modèle enregistrée dans l'historique (lot d'une étude)
             
-            # Sauvegarder le résultat dans un fichier log (optionnel)
-            self.log_result(has_tumor, prediction, confidence)
+        Returns:
+            (probabilité de tumeur, variance entre les vues ou None sans TTA,
+             carte Grad-CAM uint8 ou None) ; pour un lot d'une étude, la liste
+            des résultats de run_batch
+        """
+        if study_paths:
+            # Décodage en parallèle, cache des prédictions et historique comme en mode batch
+            return run_batch(study_paths, self.engine, len(study_paths), img_size=self.img_size,
+                             cache=self.cache, store=self.results_store, model_version=model_version,
+                             policy=policy)
+        
+        heatmap = None
+        gradcam = gradcam and self.model is not None
+        
+        if tta_views:
+            with stage('preprocess'):
+                if image is None:
+                    image = decode_reduced(image_path, self.img_size)
+                resized = resize_for_model(image, self.img_size)
+            with stage('predict_tta'):
+                means, variances = predict_tta(self.engine, resized[np.newaxis], tta_views)
+            if gradcam:
+                # Carte de l'image d'origine (une passe de plus que les vues TTA)
+                with stage('predict_gradcam'):
+                    _, heatmaps = self.get_gradcam().predict_with_heatmaps(to_model_input(resized[np.newaxis]))
+                heatmap = heatmap_to_uint8(heatmaps[0])
+            return float(means[0]), float(variances[0]), heatmap
+        
+        with stage('preprocess'):
+            if image is not None:
+                preprocessed_img = preprocess_array(image, self.img_size)
+            else:
+                preprocessed_img = self.preprocess_image(image_path)
+        if gradcam:
+            with stage('predict_gradcam'):
+                predictions, heatmaps = self.get_gradcam().predict_with_heatmaps(preprocessed_img)
+            return float(predictions[0]), None, heatmap_to_uint8(heatmaps[0])
+        with stage('predict'):
+            return float(self.engine.predict(preprocessed_img)[0]), None, None
+    
+    def get_gradcam(self):
+        """Grad-CAM du modèle chargé, créé (et tracé) à la première utilisation (thread d'analyse)"""
+        if self.gradcam is None:
+            self.gradcam = GradCam(self.model, img_size=self.img_size)
+        return self.gradcam
+    
+    def poll_analysis_results(self):
+        """Récupère les résultats du thread d'analyse (boucle Tkinter)"""
+        for status, job in self.worker.poll():
+            if job is not None and job.id in self.study_jobs:
+                self.on_study_chunk_event(status, job)
+            elif status == READY:
+                self.on_model_ready()
+            elif status == INIT_ERROR:
+                messagebox.showerror("Erreur", job.error)
+                self.on_close()
+                return
+            elif status == DONE:
+                key = self.pending_hashes.pop(job.id, None)
+                prediction, variance, heatmap = job.result
+                # Seules les prédictions simples vont dans le cache (les cartes sont toujours celles de l'image d'origine)
+                if self.cache is not None and key is not None:
+                    with job.trace.stage('cache_write'):
+                        if variance is None:
+                            self.cache.put(key, prediction)
+                        if heatmap is not None:
+                            self.cache.put_heatmaps([(key, heatmap)])
+                source = SOURCE_MODEL if variance is None else SOURCE_TTA
+                self.show_result(job.image_path, prediction, source, job.trace, variance, heatmap)
+            elif status == ERROR:
+                self.pending_hashes.pop(job.id, None)
+                job.trace.finish(error=job.error)
+                messagebox.showerror("Erreur", f"Erreur lors de l'analyse:\n{job.error}")
+            elif status == CANCELLED:
+                self.pending_hashes.pop(job.id, None)
+                job.trace.finish(cancelled=True)
+            elif status == RUNNING:
+                self.result_label.config(
+                    text=f"⏳ Analyse de {os.path.basename(job.image_path)} en cours...",
+                    fg="#6b7280",
+                    font=("Segoe UI", 11)
+                )
+        
+        self.update_analysis_status()
+        self.root.after(self.poll_interval_ms, self.poll_analysis_results)
+    
+    def update_analysis_status(self):
+        """Met à jour les boutons et la barre de progression selon la file d'analyses"""
+        pending = self.worker.pending_count()
+        
+        if pending:
+            self.analyze_btn.config(text=f"🔍 Analyser ({pending} en cours)")
+            self.cancel_btn.config(state=tk.NORMAL)
+            if not self.progress_bar.winfo_manager():
+                self.progress_bar.pack(fill=tk.X, padx=20, pady=(10, 0), before=self.result_label)
+                self.progress_bar.start(10)
+        else:
+            self.analyze_btn.config(text="🔍 Analyser")
+            self.cancel_btn.config(state=tk.DISABLED)
+            if self.progress_bar.winfo_manager():
+                self.progress_bar.stop()
+                self.progress_bar.pack_forget()
+    
+    def cancel_analyses(self):
+        """Annule les analyses en attente (le résultat d'une analyse en cours est ignoré)"""
+        if self.gallery is not None:
+            self.gallery.stop_analysis()
+        cancelled = self.worker.cancel()
+        if cancelled:
+            self.result_label.config(
+                text=f"⏹ {cancelled} analyse(s) annulée(s)",
+                fg="#6b7280",
+                font=("Segoe UI", 11)
+            )
+        self.update_analysis_status()
+    
+    def open_study(self, folder=None):
+        """
+        Ouvre la galerie d'une étude (toutes les images d'un dossier)
+        
+        Args:
+            folder: dossier de l'étude (défaut: choisi par l'utilisateur)
+        """
+        folder = folder or filedialog.askdirectory(title="Sélectionner le dossier d'une étude")
+        if not folder:
+            return
+        
+        paths = collect_image_paths([folder])
+        if not paths:
+            messagebox.showwarning("Attention", f"Aucune image trouvée dans {folder}")
+            return
+        
+        if self.gallery is not None:
+            self.gallery.close()
+        self.gallery = StudyGallery(
+            self.root, folder, paths,
+            on_analyze_all=self.analyze_study,
+            on_cancel=self.cancel_study,
+            on_select=self.open_image,
+            on_close=self.on_gallery_closed,
+            colors={'primary': self.primary_color, 'success': self.success_color,
+                    'danger': self.danger_color, 'text': self.text_color, 'bg': self.bg_color}
+        )
+        self.gallery.set_model_ready(self.model_ready)
+    
+    def on_gallery_closed(self):
+        """Fermeture de la galerie: ses lots en attente sont annulés"""
+        self.cancel_study()
+        self.gallery = None
+    
+    def analyze_study(self):
+        """« Tout analyser »: envoie les images de l'étude au thread d'analyse, par lots"""
+        self.gallery.start_analysis()
+        self.submit_study_chunks()
+    
+    def submit_study_chunks(self):
+        """
+        Garde au plus MAX_STUDY_CHUNKS lots de l'étude dans la file d'analyse
+        
+        Les lots suivants sont envoyés à la fin des précédents : les analyses
+        d'images isolées restent servies entre deux lots, et la file ne
+        grossit pas avec la taille de l'étude.
+        """
+        gallery = self.gallery
+        while gallery is not None and len(self.study_jobs) < MAX_STUDY_CHUNKS:
+            indices = gallery.next_chunk(STUDY_CHUNK_SIZE)
+            if not indices:
+                break
+            chunk = [gallery.paths[i] for i in indices]
+            trace = TRACER.trace('gui_study', images=len(chunk))
+            job = self.worker.submit(chunk[0], None, trace, study_paths=chunk, policy=self.policy,
+                                     model_version=self.model_version)
+            self.study_jobs[job.id] = (gallery, indices)
+        self.update_analysis_status()
+    
+    def on_study_chunk_event(self, status, job):
+        """
+        Événement du thread d'analyse pour un lot d'une étude
+        
+        Args:
+            status: DONE, ERROR, CANCELLED ou RUNNING
+            job: lot concerné
+        """
+        if status == RUNNING:
+            return
+        gallery, indices = self.study_jobs.pop(job.id)
+        current = gallery is self.gallery and not gallery.closed
+        
+        if status == DONE:
+            rows = job.result
+            job.trace.finish(images=len(rows), errors=sum(1 for row in rows if row['error']))
+            if current:
+                gallery.set_results(indices, rows)
+        elif status == ERROR:
+            job.trace.finish(error=job.error)
+            if current:
+                gallery.set_error(indices, job.error)
+        else:
+            job.trace.finish(cancelled=True)
+            return
+        
+        if current:
+            self.submit_study_chunks()
+    
+    def cancel_study(self):
+        """Annule les lots de l'étude en attente (« Annuler » de la galerie)"""
+        if self.gallery is not None and not self.gallery.closed:
+            self.gallery.stop_analysis()
+        for job_id in list(self.study_jobs):
+            self.worker.cancel(job_id)
+        self.update_analysis_status()
+    
+    def show_result(self, image_path, prediction, source=SOURCE_MODEL, trace=None, variance=None, heatmap=None):
+        """
+        Affiche et enregistre le résultat d'une analyse
+        
+        Args:
+            image_path: chemin de l'image analysée
+            prediction: probabilité brute du modèle (moyenne des vues en mode TTA)
+            source: origine du résultat (SOURCE_MODEL, SOURCE_CACHE ou SOURCE_TTA)
+            trace: Trace de l'analyse, terminée ici (optionnel)
+            variance: variance des prédictions des vues (mode TTA)
+            heatmap: carte Grad-CAM à superposer à la miniature (optionnel)
+        """
+        # Interpréter les résultats (calibration et seuil du modèle)
+        prediction, has_tumor, confidence = self.policy.interpret(prediction)
+        
+        with TRACER.activate(trace):
+            with stage('display'):
+                # Préparer l'affichage des résultats
+                result_text = self.format_results(has_tumor, prediction, confidence,
+                                                  os.path.basename(image_path), source, variance)
+                
+                # Afficher les résultats avec couleur appropriée
+                result_color = self.danger_color if has_tumor else self.success_color
+                self.result_label.config(text=result_text, fg=result_color, font=("Segoe UI", 11, "bold"))
             
-            # Réactiver le bouton
-            self.analyze_btn.config(state=tk.NORMAL, text="🔍 Analyser")
+            # Miniature avec ou sans carte Grad-CAM (si l'image est toujours affichée)
+            if image_path == self.current_image_path:
+                self.show_thumbnail(heatmap)
             
-        except Exception as e:
-            messagebox.showerror("Erreur", f"Erreur lors de l'analyse:\n{str(e)}")
-            self.analyze_btn.config(state=tk.NORMAL, text="🔍 Analyser")
+            # Sauvegarder le résultat dans l'historique
+            with stage('log'):
+                self.log_result(has_tumor, prediction, confidence, image_path, source)
+        
+        if trace is not None:
+            trace.finish(source=source, probability=float(prediction))
+    
+    def on_close(self):
+        """Arrête le thread d'analyse puis ferme la fenêtre"""
+        if self.gallery is not None:
+            self.gallery.close()
+        self.worker.shutdown()
+        summary = TRACER.summary()
+        if summary:
+            print_summary(summary, TRACER.runtime_info())
+        if self.cache is not None:
+            self.cache.close()
+        if self.results_store is not None:
+            self.results_store.close()
+        self.root.destroy()
     
-    def format_results(self, has_tumor, prediction, confidence):
+    def format_results(self, has_tumor, prediction, confidence, image_name=None, source=SOURCE_MODEL,
+                       variance=None):
         """
         Formate les résultats de l'analyse
         
         Args:
             has_tumor: booléen indiquant la présence de tumeur
-            prediction: probabilité brute du modèle
+            prediction: probabilité de tumeur (calibrée, voir DecisionPolicy)
             confidence: niveau de confiance (0-1)
+            image_name: nom de l'image analysée (optionnel)
+            source: origine du résultat (SOURCE_MODEL, SOURCE_CACHE ou SOURCE_TTA)
+            variance: variance des prédictions des vues (mode TTA, optionnel)
             
         Returns:
             texte formaté des résultats
@@ -326,15 +884,26 @@ class BrainTumorDetectorApp:
                 "un diagnostic médical professionnel."
             )
         
+        image_line = f"\n   • Image: {image_name}" if image_name else ""
+        source_text = {
+            SOURCE_CACHE: "cache (analyse précédente)",
+            SOURCE_TTA: "modèle, moyenne de plusieurs vues (TTA)",
+        }.get(source, "modèle")
+        variance_line = ""
+        if variance is not None:
+            variance_line = (f"\n   • Variance entre les vues: {variance:.6f} "
+                             f"(écart-type ±{np.sqrt(variance) * 100:.2f}%)")
+        
         result_text = f"""
 ╔════════════════════════════════════════════════════════╗
   {status}
 ╚════════════════════════════════════════════════════════╝
 
-📊 DÉTAILS DE L'ANALYSE:
+📊 DÉTAILS DE L'ANALYSE:{image_line}
    • Probabilité de tumeur: {prediction * 100:.2f}%
-   • Niveau de confiance: {confidence * 100:.2f}%
+   • Niveau de confiance: {confidence * 100:.2f}%{variance_line}
    • Date d'analyse: {datetime.now().strftime('%d/%m/%Y à %H:%M:%S')}
+   • Source: {source_text}
 
 {recommendation}
 
@@ -345,37 +914,81 @@ jamais remplacer l'avis d'un professionnel de santé qualifié.
 """
         return result_text
     
-    def log_result(self, has_tumor, prediction, confidence):
+    def log_result(self, has_tumor, prediction, confidence, image_path=None, source=SOURCE_MODEL):
         """
-        Enregistre les résultats dans un fichier log
+        Enregistre les résultats dans l'historique des analyses (results_store.py)
         
         Args:
             has_tumor: présence de tumeur
             prediction: probabilité
             confidence: confiance
+            image_path: image analysée (défaut: image courante)
+            source: origine du résultat (SOURCE_MODEL, SOURCE_CACHE ou SOURCE_TTA)
         """
+        image_path = image_path or self.current_image_path
+        if self.results_store is None:
+            return
+        
         try:
-            log_file = "analysis_log.txt"
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            status = "TUMEUR DÉTECTÉE" if has_tumor else "PAS DE TUMEUR"
-            
-            with open(log_file, 'a', encoding='utf-8') as f:
-                f.write(f"\n{'='*60}\n")
-                f.write(f"Date: {timestamp}\n")
-                f.write(f"Image: {os.path.basename(self.current_image_path)}\n")
-                f.write(f"Résultat: {status}\n")
-                f.write(f"Probabilité: {prediction*100:.2f}%\n")
-                f.write(f"Confiance: {confidence*100:.2f}%\n")
-                f.write(f"{'='*60}\n")
-                
+            # Le résultat et la confiance sont recalculés à partir de la probabilité
+            self.results_store.add(image_path, prediction, self.model_version, source,
+                                   threshold=self.policy.threshold)
         except Exception as e:
             print(f"Erreur lors de l'enregistrement du log: {e}")
 
 
-def main():
+def main(argv=None):
     """Point d'entrée de l'application"""
+    argv = sys.argv[1:] if argv is None else argv
+    
+    # Mode sans interface: python brain_tumor_detector_app.py batch <images/dossiers>
+    if argv and argv[0] == "batch":
+        from batch_inference import batch_main
+        return batch_main(argv[1:])
+    
+    # Serveur d'inférence HTTP local: python brain_tumor_detector_app.py serve --port 8000
+    if argv and argv[0] == "serve":
+        from inference_server import serve_main
+        return serve_main(argv[1:])
+    
+    # Surveillance de dossiers: python brain_tumor_detector_app.py watch /partage/scanner
+    if argv and argv[0] == "watch":
+        from watch_folder import watch_main
+        return watch_main(argv[1:])
+    
+    # Analyse répartie en tranches: python brain_tumor_detector_app.py shard run nuit_2026_10 -w 8
+    if argv and argv[0] == "shard":
+        from sharded_batch import shard_main
+        return shard_main(argv[1:])
+    
+    parser = argparse.ArgumentParser(description="Brain Tumor Detector - interface graphique")
+    parser.add_argument('-m', '--model', default=MODEL_PATH,
+                        help=f"Modèle .keras ou .tflite (défaut: {MODEL_PATH})")
+    parser.add_argument('--registry', default=None, metavar='REGISTRE',
+                        help="Suivre la sélection active du registre des modèles (model_registry.py) "
+                             "à la place de --model : nouvelle version chargée sans redémarrage")
+    parser.add_argument('-t', '--threads', type=int, default=None,
+                        help="Threads de l'interpréteur TFLite (défaut: nombre de cœurs)")
+    parser.add_argument('--tta', type=int, default=0, metavar='N',
+                        help=f"Activer l'analyse renforcée (TTA) avec N vues, 2 à {MAX_TTA_VIEWS} "
+                             f"(défaut de la case à cocher: {DEFAULT_TTA_VIEWS})")
+    parser.add_argument('--gradcam', action='store_true',
+                        help="Superposer la carte Grad-CAM à l'image analysée (modèle .keras)")
+    parser.add_argument('--trace', default=None,
+                        help="Enregistrer le temps de chaque étape des analyses (fichier JSONL)")
+    parser.add_argument('--study', default=None, metavar='DOSSIER',
+                        help="Ouvrir la galerie d'une étude (toutes les images du dossier) au démarrage")
+    args = parser.parse_args(argv)
+    
+    if args.tta and not 2 <= args.tta <= MAX_TTA_VIEWS:
+        parser.error(f"--tta doit être compris entre 2 et {MAX_TTA_VIEWS}")
+    
+    if args.trace:
+        TRACER.set_record_file(args.trace)
+    
     root = tk.Tk()
-    app = BrainTumorDetectorApp(root)
+    app = BrainTumorDetectorApp(root, model_path=args.model, num_threads=args.threads, tta_views=args.tta,
+                                gradcam=args.gradcam, registry_path=args.registry, study_path=args.study)
     
     # Centrer la fenêtre sur l'écran
     root.update_idletasks()
@@ -389,4 +1002,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
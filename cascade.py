@@ -0,0 +1,452 @@
+"""
+Brain Tumor Detection - Analyse en cascade (tri rapide + CNN complet)
+======================================================================
+La plupart des IRM d'un flux sont des négatifs évidents. En mode cascade,
+un petit modèle de tri en basse résolution (96×96) analyse toutes les
+images ; seules celles dont la probabilité tombe dans une bande
+d'incertitude autour de 0,5 sont envoyées au CNN complet (224×224).
+
+- Le modèle de tri est distillé depuis best_brain_tumor_model.keras : il
+  apprend les probabilités du modèle complet (et les étiquettes), sur le
+  dataset pré-décodé (dataset_cache.py) avec l'augmentation du notebook ;
+- la bande [bas, haut] est choisie sur l'ensemble de validation pour que le
+  rappel de la cascade égale celui du modèle complet : aucune tumeur
+  détectée par le modèle complet n'est écartée par le tri ;
+- la bande et le rapport de calibration (taux d'escalade, rappel,
+  accélération de bout en bout) sont enregistrés à côté du modèle de tri
+  (screening_model.json).
+
+Usage:
+    python cascade.py train --data-dir brain_tumor_dataset        # distillation + calibration
+    python cascade.py calibrate --recall-tolerance 0.0             # recalibrer la bande
+    python brain_tumor_detector_app.py batch dossier_irm/ --cascade screening_model.keras
+    python brain_tumor_detector_app.py watch /partage/scanner --cascade screening_model.keras
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from detector_core import MODEL_PATH, THRESHOLD, load_detector_model
+from inference_engine import BaseEngine, InferenceEngine, DEFAULT_WARMUP_BATCH_SIZES, load_engine
+from instrumentation import stage
+from distillation import DEFAULT_DISTILL_ALPHA, downscale, dataset_probabilities, distill
+
+SCREEN_IMG_SIZE = 96
+DEFAULT_SCREEN_MODEL = "screening_model.keras"
+# Bande utilisée tant que le modèle de tri n'a pas été calibré
+DEFAULT_BAND = (0.1, 0.9)
+DEFAULT_EPOCHS = 30
+
+# Origine d'un résultat décidé par le modèle de tri seul (CSV, historique)
+SOURCE_SCREEN = "screen"
+
+
+def band_path(screen_model_path):
+    """Fichier JSON de la bande d'incertitude d'un modèle de tri"""
+    return os.path.splitext(screen_model_path)[0] + ".json"
+
+
+def load_band(screen_model_path):
+    """
+    Bande d'incertitude et rapport de calibration d'un modèle de tri
+
+    Returns:
+        dictionnaire {'low', 'high', 'img_size', ...} (bande par défaut si
+        le modèle n'a pas été calibré)
+    """
+    path = band_path(screen_model_path)
+    if not os.path.exists(path):
+        return {'low': DEFAULT_BAND[0], 'high': DEFAULT_BAND[1], 'img_size': SCREEN_IMG_SIZE}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_band(screen_model_path, low, high, img_size=SCREEN_IMG_SIZE, report=None):
+    """Enregistre la bande d'incertitude (et le rapport de calibration) à côté du modèle de tri"""
+    data = {'low': float(low), 'high': float(high), 'img_size': img_size, 'report': report or {}}
+    path = band_path(screen_model_path)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def build_screening_model(img_size=SCREEN_IMG_SIZE):
+    """
+    Petit CNN de tri en basse résolution
+
+    Architecture:
+    - 3 blocs Conv2D (16 → 32 → 64) + MaxPooling
+    - GlobalAveragePooling (pas de couche Dense volumineuse)
+    - Dense(1, sigmoid)
+    """
+    from tensorflow import keras
+
+    model = keras.Sequential([
+        keras.Input(shape=(img_size, img_size, 1)),
+        keras.layers.Conv2D(16, (3, 3), activation='relu', padding='same'),
+        keras.layers.MaxPooling2D((2, 2)),
+        keras.layers.Conv2D(32, (3, 3), activation='relu', padding='same'),
+        keras.layers.MaxPooling2D((2, 2)),
+        keras.layers.Conv2D(64, (3, 3), activation='relu', padding='same'),
+        keras.layers.GlobalAveragePooling2D(),
+        keras.layers.Dense(1, activation='sigmoid'),
+    ], name='screening_model')
+    model.compile(optimizer=keras.optimizers.Adam(1e-3), loss='binary_crossentropy')
+    return model
+
+
+def distill_screening_model(teacher, cache, train_indices, val_indices=None, img_size=SCREEN_IMG_SIZE,
+                            epochs=DEFAULT_EPOCHS, batch_size=32, alpha=DEFAULT_DISTILL_ALPHA, seed=42):
+    """
+    Entraîne le modèle de tri sur les probabilités du modèle complet
+
+    Args:
+        teacher: moteur du modèle complet (InferenceEngine)
+        cache: DatasetCache à jour
+        train_indices, val_indices: indices d'entraînement et de validation
+        img_size: taille d'entrée du modèle de tri
+        epochs: nombre maximal d'epochs (arrêt anticipé sur la validation)
+        batch_size: images par lot
+        alpha: poids des probabilités du modèle complet dans la cible
+        seed: graine du mélange et de l'augmentation
+
+    Returns:
+        modèle Keras entraîné
+    """
+    model = build_screening_model(img_size)
+    distill(model, teacher, cache, train_indices, val_indices, epochs, batch_size, alpha, seed)
+    return model
+
+
+def cascade_decisions(screen_probs, full_probs, low, high):
+    """
+    Probabilités de la cascade à partir des deux modèles
+
+    Returns:
+        (probabilités (N,), masque des images envoyées au modèle complet)
+    """
+    screen_probs = np.asarray(screen_probs, dtype=np.float64)
+    escalated = (screen_probs > low) & (screen_probs < high)
+    return np.where(escalated, full_probs, screen_probs), escalated
+
+
+def calibrate_band(screen_probs, full_probs, labels, recall_tolerance=0.0, threshold=THRESHOLD):
+    """
+    Choisit la bande d'incertitude la plus étroite qui préserve le modèle complet
+
+    - bas : juste sous la plus faible probabilité de tri des tumeurs que le
+      modèle complet détecte (au plus `recall_tolerance` d'entre elles
+      écartées) : le rappel de la cascade égale celui du modèle complet ;
+    - haut : juste au-dessus de la plus forte probabilité de tri des images
+      saines que le modèle complet reconnaît : pas de faux positif ajouté.
+
+    Args:
+        screen_probs: probabilités du modèle de tri (validation)
+        full_probs: probabilités du modèle complet (validation)
+        labels: étiquettes (1 = tumeur)
+        recall_tolerance: fraction des positifs qui peut être perdue
+        threshold: seuil de décision
+
+    Returns:
+        (bas, haut)
+    """
+    screen_probs = np.asarray(screen_probs, dtype=np.float64)
+    labels = np.asarray(labels)
+    full_positive = np.asarray(full_probs) > threshold
+
+    # Tumeurs détectées par le modèle complet: à ne jamais écarter
+    detected = np.sort(screen_probs[(labels == 1) & full_positive])
+    lost = int(np.floor(recall_tolerance * np.sum(labels == 1)))
+    low = np.nextafter(detected[lost], -np.inf) if lost < len(detected) else threshold
+    low = min(low, threshold)
+
+    # Images saines reconnues par le modèle complet: à ne jamais déclarer positives
+    rejected = np.sort(screen_probs[(labels == 0) & ~full_positive])[::-1]
+    high = np.nextafter(rejected[0], np.inf) if len(rejected) else threshold
+    high = max(high, np.nextafter(threshold, np.inf))
+
+    return float(low), float(high)
+
+
+def cascade_metrics(screen_probs, full_probs, labels, low, high, threshold=THRESHOLD):
+    """
+    Rappel, spécificité et taux d'escalade du modèle complet et de la cascade
+
+    Returns:
+        dictionnaire de métriques (fractions entre 0 et 1)
+    """
+    labels = np.asarray(labels) == 1
+    full_probs = np.asarray(full_probs, dtype=np.float64)
+    cascade_probs, escalated = cascade_decisions(screen_probs, full_probs, low, high)
+
+    def rates(decision):
+        return {
+            'recall': float(decision[labels].mean()) if labels.any() else 0.0,
+            'specificity': float((~decision[~labels]).mean()) if (~labels).any() else 0.0,
+            'accuracy': float((decision == labels).mean()) if len(labels) else 0.0,
+        }
+
+    full_decision = full_probs > threshold
+    cascade_decision = cascade_probs > threshold
+    return {
+        'images': int(len(labels)),
+        'escalation_rate': float(escalated.mean()) if len(labels) else 0.0,
+        'agreement': float((cascade_decision == full_decision).mean()) if len(labels) else 1.0,
+        'full': rates(full_decision),
+        'cascade': rates(cascade_decision),
+    }
+
+
+class CascadeEngine(BaseEngine):
+    """
+    Moteur en cascade : tri en basse résolution, modèle complet pour les cas incertains
+
+    Même interface que les autres moteurs (predict_on_batch) : il peut
+    remplacer le moteur complet dans l'analyse par lots et la surveillance.
+
+    Args:
+        screen: moteur du modèle de tri (img_size = 96)
+        full: moteur du modèle complet (img_size = 224)
+        low, high: bande d'incertitude (bornes exclues)
+    """
+
+    def __init__(self, screen, full, low=DEFAULT_BAND[0], high=DEFAULT_BAND[1]):
+        self.screen = screen
+        self.full = full
+        self.low = low
+        self.high = high
+        self.img_size = full.img_size
+        self.warmup_time = screen.warmup_time + full.warmup_time
+
+        self.images = 0
+        self.escalated = 0
+
+    def predict_cascade(self, images):
+        """
+        Prédit un lot en cascade
+
+        Args:
+            images: tableau float32 (N, 224, 224, 1) au format du modèle complet
+
+        Returns:
+            (probabilités (N,), masque des images analysées par le modèle complet)
+        """
+        images = np.asarray(images, dtype=np.float32)
+        with stage('screen'):
+            screen_probs = self.screen.predict_on_batch(downscale(images, self.screen.img_size)).reshape(-1)
+
+        escalated = (screen_probs > self.low) & (screen_probs < self.high)
+        predictions = screen_probs.astype(np.float64)
+        if escalated.any():
+            with stage('predict'):
+                predictions[escalated] = self.full.predict_on_batch(images[escalated]).reshape(-1)
+
+        self.images += len(images)
+        self.escalated += int(escalated.sum())
+        return predictions, escalated
+
+    def predict_on_batch(self, images):
+        """Probabilités de la cascade, au format (N, 1) des moteurs d'inférence"""
+        return self.predict_cascade(images)[0].reshape(-1, 1)
+
+    @property
+    def escalation_rate(self):
+        """Fraction des images envoyées au modèle complet depuis la création"""
+        return self.escalated / self.images if self.images else 0.0
+
+
+def cascade_policy_error(model_path=MODEL_PATH):
+    """
+    Refuse la cascade pour un modèle doté d'une politique de décision calibrée
+
+    La bande d'incertitude est choisie autour du seuil de 0,5 sur les
+    probabilités brutes, et les résultats du tri seul viennent du modèle de
+    tri, pas du modèle complet : un autre seuil (ou le calibrateur du modèle
+    complet) ferait perdre la garantie de rappel de la cascade.
+
+    Returns:
+        message d'erreur, ou None si la politique est celle d'origine
+    """
+    from model_metadata import load_policy, metadata_path
+    policy = load_policy(model_path)
+    if policy.is_default:
+        return None
+    return (f"--cascade ne peut pas être combiné avec la politique de décision de {metadata_path(model_path)} "
+            f"({policy.describe()}) : la bande du modèle de tri est calibrée pour le seuil {THRESHOLD}")
+
+
+def load_screen_engine(screen_model_path, img_size=SCREEN_IMG_SIZE,
+                       warmup_batch_sizes=DEFAULT_WARMUP_BATCH_SIZES, num_threads=None):
+    """Moteur du modèle de tri (.keras compilé ou .tflite)"""
+    if screen_model_path.lower().endswith('.tflite'):
+        from tflite_backend import TFLiteEngine
+        return TFLiteEngine(screen_model_path, num_threads=num_threads, img_size=img_size,
+                            warmup_batch_sizes=warmup_batch_sizes)
+    return InferenceEngine(load_detector_model(screen_model_path), img_size=img_size,
+                           warmup_batch_sizes=warmup_batch_sizes)
+
+
+def load_cascade_engine(model_path=MODEL_PATH, screen_model_path=DEFAULT_SCREEN_MODEL,
+                        warmup_batch_sizes=DEFAULT_WARMUP_BATCH_SIZES, num_threads=None):
+    """
+    Charge le modèle complet, le modèle de tri et sa bande calibrée
+
+    Returns:
+        CascadeEngine
+    """
+    band = load_band(screen_model_path)
+    screen = load_screen_engine(screen_model_path, band.get('img_size', SCREEN_IMG_SIZE),
+                                warmup_batch_sizes, num_threads)
+    full = load_engine(model_path, warmup_batch_sizes=warmup_batch_sizes, num_threads=num_threads)
+    return CascadeEngine(screen, full, band['low'], band['high'])
+
+
+def measure_speedup(full, cascade, cache, indices, batch_size=32):
+    """
+    Débit du modèle complet seul et de la cascade sur les mêmes lots
+
+    Returns:
+        dictionnaire {'full_images_per_s', 'cascade_images_per_s', 'speedup'}
+    """
+    batches = [images for images, _ in cache.batches(indices, batch_size)]
+
+    start = time.perf_counter()
+    for images in batches:
+        full.predict_on_batch(images)
+    full_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for images in batches:
+        cascade.predict_on_batch(images)
+    cascade_time = time.perf_counter() - start
+
+    count = len(indices)
+    return {
+        'full_images_per_s': count / max(full_time, 1e-9),
+        'cascade_images_per_s': count / max(cascade_time, 1e-9),
+        'speedup': full_time / max(cascade_time, 1e-9),
+    }
+
+
+def calibrate(full, screen, cache, val_indices, test_indices=None, recall_tolerance=0.0, batch_size=32):
+    """
+    Calibre la bande sur la validation et mesure la cascade
+
+    Args:
+        full, screen: moteurs du modèle complet et du modèle de tri
+        cache: DatasetCache à jour
+        val_indices: indices de validation (choix de la bande)
+        test_indices: indices de test (rapport, défaut: validation)
+        recall_tolerance: fraction des positifs qui peut être perdue
+        batch_size: images par lot
+
+    Returns:
+        (bas, haut, rapport)
+    """
+    _, labels = cache.load()
+
+    def probabilities(indices):
+        return (dataset_probabilities(screen, cache, indices, batch_size),
+                dataset_probabilities(full, cache, indices, batch_size))
+
+    screen_probs, full_probs = probabilities(val_indices)
+    low, high = calibrate_band(screen_probs, full_probs, labels[val_indices], recall_tolerance)
+    report = {'recall_tolerance': recall_tolerance,
+              'validation': cascade_metrics(screen_probs, full_probs, labels[val_indices], low, high)}
+
+    eval_indices = val_indices if test_indices is None or not len(test_indices) else test_indices
+    if eval_indices is not val_indices:
+        screen_probs, full_probs = probabilities(eval_indices)
+        report['test'] = cascade_metrics(screen_probs, full_probs, labels[eval_indices], low, high)
+
+    cascade = CascadeEngine(screen, full, low, high)
+    report['speed'] = measure_speedup(full, cascade, cache, eval_indices, batch_size)
+    return low, high, report
+
+
+def print_report(low, high, report):
+    """Affiche la bande choisie, les métriques et l'accélération"""
+    print(f"\n📊 CASCADE: bande d'incertitude ]{low:.4f}, {high:.4f}[")
+    for split in ('validation', 'test'):
+        if split not in report:
+            continue
+        metrics = report[split]
+        full, cascade = metrics['full'], metrics['cascade']
+        print(f"   {split} ({metrics['images']} images): escalade {metrics['escalation_rate'] * 100:.1f}%, "
+              f"accord {metrics['agreement'] * 100:.1f}%")
+        print(f"      rappel      complet {full['recall'] * 100:6.1f}%   cascade {cascade['recall'] * 100:6.1f}%")
+        print(f"      spécificité complet {full['specificity'] * 100:6.1f}%   "
+              f"cascade {cascade['specificity'] * 100:6.1f}%")
+    speed = report['speed']
+    print(f"   Débit: complet {speed['full_images_per_s']:.1f} images/s, "
+          f"cascade {speed['cascade_images_per_s']:.1f} images/s (×{speed['speedup']:.2f})")
+
+
+def main(argv=None):
+    """Point d'entrée: distillation et calibration du modèle de tri"""
+    from dataset_cache import DatasetCache, DEFAULT_DATASET_CACHE
+
+    parser = argparse.ArgumentParser(description="Cascade: modèle de tri basse résolution + CNN complet")
+    parser.add_argument('-m', '--model', default=MODEL_PATH, help=f"Modèle complet (défaut: {MODEL_PATH})")
+    parser.add_argument('-s', '--screen-model', default=DEFAULT_SCREEN_MODEL,
+                        help=f"Modèle de tri (défaut: {DEFAULT_SCREEN_MODEL})")
+    parser.add_argument('-d', '--data-dir', default=None,
+                        help="Dataset étiqueté (yes/ et no/) à ajouter au cache du dataset")
+    parser.add_argument('--dataset-cache', default=DEFAULT_DATASET_CACHE,
+                        help=f"Cache du dataset (défaut: {DEFAULT_DATASET_CACHE})")
+    parser.add_argument('-r', '--recall-tolerance', type=float, default=0.0,
+                        help="Fraction des tumeurs de validation que le tri peut écarter (défaut: 0)")
+    parser.add_argument('-b', '--batch-size', type=int, default=32, help="Images par lot (défaut: 32)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    train_parser = subparsers.add_parser('train', help="Distiller le modèle de tri puis calibrer la bande")
+    train_parser.add_argument('--img-size', type=int, default=SCREEN_IMG_SIZE,
+                              help=f"Résolution du modèle de tri (défaut: {SCREEN_IMG_SIZE})")
+    train_parser.add_argument('-e', '--epochs', type=int, default=DEFAULT_EPOCHS,
+                              help=f"Epochs maximum (défaut: {DEFAULT_EPOCHS})")
+    train_parser.add_argument('--alpha', type=float, default=DEFAULT_DISTILL_ALPHA,
+                              help=f"Poids des probabilités du modèle complet (défaut: {DEFAULT_DISTILL_ALPHA})")
+
+    subparsers.add_parser('calibrate', help="Recalibrer la bande d'un modèle de tri existant")
+    args = parser.parse_args(argv)
+
+    full = InferenceEngine.from_path(args.model, warmup_batch_sizes=(args.batch_size,))
+    cache = DatasetCache(args.dataset_cache, full.img_size)
+    if args.data_dir:
+        stats = cache.update(args.data_dir)
+        print(f"✓ Cache du dataset: {stats['added']} ajoutées, {stats['unchanged']} inchangées")
+    if not len(cache):
+        print("❌ Cache du dataset vide: indiquez --data-dir brain_tumor_dataset")
+        return 1
+    splits = cache.split()
+
+    if args.command == 'train':
+        print(f"Distillation du modèle de tri ({args.img_size}×{args.img_size}) "
+              f"sur {len(splits['train'])} images...")
+        model = distill_screening_model(full, cache, splits['train'], splits['val'], args.img_size,
+                                        args.epochs, args.batch_size, args.alpha)
+        model.save(args.screen_model)
+        print(f"✓ Modèle de tri enregistré: {args.screen_model}")
+        img_size = args.img_size
+        screen = InferenceEngine(model, img_size=img_size, warmup_batch_sizes=(args.batch_size,))
+    else:
+        img_size = load_band(args.screen_model).get('img_size', SCREEN_IMG_SIZE)
+        screen = load_screen_engine(args.screen_model, img_size, (args.batch_size,))
+
+    low, high, report = calibrate(full, screen, cache, splits['val'], splits['test'],
+                                  args.recall_tolerance, args.batch_size)
+    path = save_band(args.screen_model, low, high, img_size, report)
+    print_report(low, high, report)
+    print(f"\n✓ Bande enregistrée dans {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
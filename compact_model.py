@@ -0,0 +1,339 @@
+"""
+Brain Tumor Detection - Modèle compact (distillation + élagage structuré)
+==========================================================================
+Dans `create_cnn_model` du notebook, la carte 28×28×128 est aplatie vers
+Dense(128) : cette seule couche porte ~12,8 millions de poids, l'essentiel
+de la taille du fichier et du temps de chargement.
+
+Le modèle compact (élève) est obtenu en trois étapes :
+
+1. même pile convolutive que le modèle actuel, initialisée avec ses poids,
+   et GlobalAveragePooling2D à la place de Flatten (optionnel) : la couche
+   Dense(128) passe de 12,8 M à 16 k poids ;
+2. distillation : l'élève apprend les probabilités du modèle actuel (et
+   les étiquettes), sur le dataset pré-décodé avec l'augmentation du
+   notebook ;
+3. élagage structuré : les filtres de plus faible norme L1 de chaque
+   Conv2D sont supprimés (le réseau est reconstruit, plus étroit, et non
+   simplement rempli de zéros), puis une courte distillation rattrape la
+   précision.
+
+Un tableau compare le modèle actuel et le modèle compact : paramètres,
+taille du fichier, temps de chargement, latence CPU, accuracy et recall de
+test.
+
+Usage:
+    python compact_model.py train --data-dir brain_tumor_dataset
+    python compact_model.py train --no-gap --prune-ratio 0.25
+    python compact_model.py report best_brain_tumor_model_compact.keras
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from detector_core import MODEL_PATH, IMG_SIZE, THRESHOLD, load_detector_model
+from inference_engine import InferenceEngine, measure_latency
+from distillation import DEFAULT_DISTILL_ALPHA, dataset_probabilities, distill
+
+DEFAULT_COMPACT_MODEL = "best_brain_tumor_model_compact.keras"
+DEFAULT_PRUNE_RATIO = 0.5
+DEFAULT_EPOCHS = 30
+DEFAULT_FINETUNE_EPOCHS = 10
+DEFAULT_LEARNING_RATE = 0.001
+
+
+def create_student_model(input_shape=(IMG_SIZE, IMG_SIZE, 1), global_pooling=True):
+    """
+    Modèle élève : architecture du notebook, GlobalAveragePooling2D optionnel
+
+    Args:
+        input_shape: forme d'entrée (comme create_cnn_model)
+        global_pooling: remplacer Flatten par GlobalAveragePooling2D
+
+    Returns:
+        modèle Keras compilé
+    """
+    from tensorflow import keras
+    from tensorflow.keras import layers
+
+    model = keras.Sequential([
+        keras.Input(shape=input_shape),
+        # Bloc Convolutif 1
+        layers.Conv2D(32, (3, 3), activation='relu', padding='same'),
+        layers.BatchNormalization(),
+        layers.Conv2D(32, (3, 3), activation='relu', padding='same'),
+        layers.BatchNormalization(),
+        layers.MaxPooling2D(pool_size=(2, 2)),
+        layers.Dropout(0.25),
+        # Bloc Convolutif 2
+        layers.Conv2D(64, (3, 3), activation='relu', padding='same'),
+        layers.BatchNormalization(),
+        layers.Conv2D(64, (3, 3), activation='relu', padding='same'),
+        layers.BatchNormalization(),
+        layers.MaxPooling2D(pool_size=(2, 2)),
+        layers.Dropout(0.25),
+        # Bloc Convolutif 3
+        layers.Conv2D(128, (3, 3), activation='relu', padding='same'),
+        layers.BatchNormalization(),
+        layers.Conv2D(128, (3, 3), activation='relu', padding='same'),
+        layers.BatchNormalization(),
+        layers.MaxPooling2D(pool_size=(2, 2)),
+        layers.Dropout(0.25),
+        # Couches fully connected
+        layers.GlobalAveragePooling2D() if global_pooling else layers.Flatten(),
+        layers.Dense(128, activation='relu'),
+        layers.BatchNormalization(),
+        layers.Dropout(0.5),
+        layers.Dense(64, activation='relu'),
+        layers.BatchNormalization(),
+        layers.Dropout(0.5),
+        # Couche de sortie (classification binaire)
+        layers.Dense(1, activation='sigmoid'),
+    ], name='compact_student')
+    compile_student(model)
+    return model
+
+
+def compile_student(model, learning_rate=DEFAULT_LEARNING_RATE):
+    """Compile un élève pour la distillation (cibles continues entre 0 et 1)"""
+    from tensorflow import keras
+    model.compile(optimizer=keras.optimizers.Adam(learning_rate), loss='binary_crossentropy')
+
+
+def transfer_weights(source, target):
+    """
+    Copie les poids des couches de même type et de mêmes formes, dans l'ordre
+
+    Utilisé pour initialiser l'élève avec la pile convolutive du modèle
+    actuel (la première couche Dense, de forme différente avec
+    GlobalAveragePooling2D, reste aléatoire).
+
+    Returns:
+        nombre de couches copiées
+    """
+    copied = 0
+    for source_layer, target_layer in zip(source.layers, target.layers):
+        if type(source_layer) is not type(target_layer):
+            break
+        source_weights = source_layer.get_weights()
+        target_weights = target_layer.get_weights()
+        if source_weights and [w.shape for w in source_weights] == [w.shape for w in target_weights]:
+            target_layer.set_weights(source_weights)
+            copied += 1
+    return copied
+
+
+def prune_filters(model, ratio=DEFAULT_PRUNE_RATIO):
+    """
+    Élagage structuré : supprime les filtres de plus faible norme L1 de chaque Conv2D
+
+    Le modèle (Sequential) est reconstruit avec moins de filtres ; les
+    couches suivantes (BatchNormalization, Conv2D, Dense après Flatten ou
+    GlobalAveragePooling2D) sont découpées en conséquence.
+
+    Args:
+        model: modèle Keras Sequential entraîné
+        ratio: fraction des filtres supprimés dans chaque Conv2D
+
+    Returns:
+        nouveau modèle Keras (non compilé)
+    """
+    from tensorflow import keras
+    from tensorflow.keras import layers
+
+    config = model.get_config()
+    new_weights = []
+    kept = None             # canaux conservés de la carte de caractéristiques courante
+    spatial = None          # (h, w) de la carte au moment du Flatten
+
+    for layer, layer_config in zip(model.layers, config['layers'][-len(model.layers):]):
+        weights = layer.get_weights()
+        # Formes reconstruites à partir des nouveaux nombres de filtres
+        layer_config.pop('build_config', None)
+
+        if isinstance(layer, layers.Conv2D):
+            kernel, *bias = weights
+            if kept is not None:
+                kernel = kernel[:, :, kept, :]
+            # Norme L1 de chaque filtre; au moins un filtre conservé
+            n_keep = max(1, int(round(kernel.shape[-1] * (1 - ratio))))
+            norms = np.abs(kernel).sum(axis=(0, 1, 2))
+            kept = np.sort(np.argsort(norms)[::-1][:n_keep])
+            weights = [kernel[..., kept]] + [b[kept] for b in bias]
+            layer_config['config']['filters'] = int(n_keep)
+            spatial = layer.output.shape[1:3]
+
+        elif isinstance(layer, layers.BatchNormalization) and kept is not None:
+            weights = [w[kept] for w in weights]
+
+        elif isinstance(layer, layers.MaxPooling2D):
+            spatial = layer.output.shape[1:3]
+
+        elif isinstance(layer, layers.Flatten) and kept is not None:
+            # Entrées du Dense suivant: (position, canal) aplatis, canal le plus rapide
+            channels = model.layers[model.layers.index(layer) - 1].output.shape[-1]
+            positions = np.arange(int(np.prod(spatial)))[:, None] * channels
+            kept = (positions + kept[None, :]).reshape(-1)
+            spatial = None
+
+        elif isinstance(layer, layers.Dense) and kept is not None:
+            kernel, *bias = weights
+            weights = [kernel[kept]] + bias
+            kept = None
+
+        new_weights.append(weights)
+
+    pruned = keras.Sequential.from_config(config)
+    for layer, weights in zip(pruned.layers, new_weights):
+        if weights:
+            layer.set_weights(weights)
+    return pruned
+
+
+def train_compact_model(teacher, cache, splits, global_pooling=True, prune_ratio=DEFAULT_PRUNE_RATIO,
+                        epochs=DEFAULT_EPOCHS, finetune_epochs=DEFAULT_FINETUNE_EPOCHS, batch_size=16,
+                        alpha=DEFAULT_DISTILL_ALPHA, seed=42):
+    """
+    Distillation, élagage structuré puis distillation de rattrapage
+
+    Args:
+        teacher: modèle Keras actuel (best_brain_tumor_model.keras)
+        cache: DatasetCache à jour
+        splits: découpage {'train', 'val', 'test'} (DatasetCache.split)
+        global_pooling: GlobalAveragePooling2D à la place de Flatten
+        prune_ratio: fraction des filtres supprimés (0 = pas d'élagage)
+        epochs: epochs maximum de la distillation
+        finetune_epochs: epochs maximum après l'élagage
+        batch_size: images par lot
+        alpha: poids des probabilités du modèle actuel dans la cible
+        seed: graine du mélange et de l'augmentation
+
+    Returns:
+        modèle compact (Keras)
+    """
+    teacher_engine = InferenceEngine(teacher, warmup_batch_sizes=())
+
+    student = create_student_model(teacher.input_shape[1:], global_pooling)
+    copied = transfer_weights(teacher, student)
+    print(f"✓ Élève initialisé avec {copied} couches du modèle actuel")
+
+    print("Distillation...")
+    distill(student, teacher_engine, cache, splits['train'], splits['val'], epochs, batch_size, alpha, seed)
+
+    if prune_ratio > 0:
+        student = prune_filters(student, prune_ratio)
+        compile_student(student, DEFAULT_LEARNING_RATE / 10)
+        print(f"Élagage de {prune_ratio:.0%} des filtres, distillation de rattrapage...")
+        distill(student, teacher_engine, cache, splits['train'], splits['val'], finetune_epochs,
+                batch_size, alpha, seed)
+
+    return student
+
+
+def compare_models(model_paths, cache, indices, batch_size=32, latency_runs=50):
+    """
+    Tableau comparatif de modèles .keras sur un ensemble de test
+
+    Returns:
+        dictionnaire {nom: {'params', 'file_mb', 'load_s', 'latency_p50_ms',
+        'accuracy', 'recall'}}
+    """
+    _, labels = cache.load()
+    y_true = labels[indices] == 1
+    report = {}
+
+    for path in model_paths:
+        start = time.perf_counter()
+        model = load_detector_model(path)
+        load_time = time.perf_counter() - start
+
+        engine = InferenceEngine(model, img_size=model.input_shape[1])
+        sample = np.random.rand(1, engine.img_size, engine.img_size, 1).astype(np.float32)
+        decision = dataset_probabilities(engine, cache, indices, batch_size) > THRESHOLD
+
+        report[os.path.basename(path)] = {
+            'params': int(model.count_params()),
+            'file_mb': os.path.getsize(path) / (1024 * 1024),
+            'load_s': load_time,
+            'latency_p50_ms': measure_latency(engine.predict_on_batch, sample, latency_runs)['p50'],
+            'accuracy': float((decision == y_true).mean()) if len(y_true) else 0.0,
+            'recall': float(decision[y_true].mean()) if y_true.any() else 0.0,
+        }
+    return report
+
+
+def print_comparison(report):
+    """Affiche le tableau comparatif (taille, chargement, latence, précision)"""
+    print("\n📊 COMPARAISON DES MODÈLES")
+    print(f"   {'Modèle':40} {'Paramètres':>12} {'Fichier':>10} {'Chargement':>11} "
+          f"{'p50 (1)':>9} {'Accuracy':>9} {'Recall':>8}")
+    for name, metrics in report.items():
+        print(f"   {name:40} {metrics['params']:>12,} {metrics['file_mb']:>7.1f} MB "
+              f"{metrics['load_s']:>10.2f}s {metrics['latency_p50_ms']:>7.1f}ms "
+              f"{metrics['accuracy'] * 100:>8.1f}% {metrics['recall'] * 100:>7.1f}%")
+
+
+def main(argv=None):
+    """Point d'entrée: entraînement du modèle compact et tableau comparatif"""
+    from dataset_cache import DatasetCache, DEFAULT_DATASET_CACHE
+
+    parser = argparse.ArgumentParser(description="Modèle compact: distillation et élagage structuré")
+    parser.add_argument('-m', '--model', default=MODEL_PATH, help=f"Modèle actuel (défaut: {MODEL_PATH})")
+    parser.add_argument('-d', '--data-dir', default=None,
+                        help="Dataset étiqueté (yes/ et no/) à ajouter au cache du dataset")
+    parser.add_argument('--dataset-cache', default=DEFAULT_DATASET_CACHE,
+                        help=f"Cache du dataset (défaut: {DEFAULT_DATASET_CACHE})")
+    parser.add_argument('-b', '--batch-size', type=int, default=16, help="Images par lot (défaut: 16)")
+    parser.add_argument('-r', '--runs', type=int, default=50, help="Mesures de latence (défaut: 50)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    train_parser = subparsers.add_parser('train', help="Entraîner le modèle compact puis le comparer")
+    train_parser.add_argument('-o', '--output', default=DEFAULT_COMPACT_MODEL,
+                              help=f"Modèle compact (défaut: {DEFAULT_COMPACT_MODEL})")
+    train_parser.add_argument('--no-gap', action='store_true',
+                              help="Garder Flatten (pas de GlobalAveragePooling2D)")
+    train_parser.add_argument('-p', '--prune-ratio', type=float, default=DEFAULT_PRUNE_RATIO,
+                              help=f"Fraction des filtres supprimés (défaut: {DEFAULT_PRUNE_RATIO})")
+    train_parser.add_argument('-e', '--epochs', type=int, default=DEFAULT_EPOCHS,
+                              help=f"Epochs maximum de distillation (défaut: {DEFAULT_EPOCHS})")
+    train_parser.add_argument('--finetune-epochs', type=int, default=DEFAULT_FINETUNE_EPOCHS,
+                              help=f"Epochs maximum après l'élagage (défaut: {DEFAULT_FINETUNE_EPOCHS})")
+    train_parser.add_argument('--alpha', type=float, default=DEFAULT_DISTILL_ALPHA,
+                              help=f"Poids des probabilités du modèle actuel (défaut: {DEFAULT_DISTILL_ALPHA})")
+
+    report_parser = subparsers.add_parser('report', help="Comparer des modèles au modèle actuel")
+    report_parser.add_argument('models', nargs='+', help="Modèles .keras à comparer")
+    args = parser.parse_args(argv)
+
+    if args.command == 'train' and not 0 <= args.prune_ratio < 1:
+        parser.error("--prune-ratio doit être compris entre 0 et 1 (exclu)")
+
+    cache = DatasetCache(args.dataset_cache, IMG_SIZE)
+    if args.data_dir:
+        stats = cache.update(args.data_dir)
+        print(f"✓ Cache du dataset: {stats['added']} ajoutées, {stats['unchanged']} inchangées")
+    if not len(cache):
+        print("❌ Cache du dataset vide: indiquez --data-dir brain_tumor_dataset")
+        return 1
+    splits = cache.split()
+
+    if args.command == 'train':
+        model = train_compact_model(load_detector_model(args.model), cache, splits, not args.no_gap,
+                                    args.prune_ratio, args.epochs, args.finetune_epochs, args.batch_size,
+                                    args.alpha)
+        model.save(args.output)
+        print(f"✓ Modèle compact enregistré: {args.output}")
+        candidates = [args.output]
+    else:
+        candidates = args.models
+
+    print_comparison(compare_models([args.model] + candidates, cache, splits['test'], args.batch_size, args.runs))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,372 @@
+"""
+Brain Tumor Detection - Cache du dataset d'entraînement pré-décodé
+===================================================================
+Décode une seule fois les IRM d'un dataset étiqueté (sous-dossiers yes/ et
+no/, comme brain_tumor_dataset) en niveaux de gris 224×224 et les conserve
+sur disque en uint8, avec les étiquettes et un manifeste des fichiers source.
+
+- Le prétraitement est celui du notebook et de l'application (OpenCV,
+  niveaux de gris, cv2.resize) ;
+- les images sont lues par memory-mapping : le chargement est quasi
+  instantané, sans copie, et la mémoire reste constante quelle que soit la
+  taille du dataset (4× moins qu'un tableau float32 en RAM) ;
+- mise à jour incrémentale : seuls les fichiers ajoutés ou modifiés sont
+  décodés (taille + date de modification, puis empreinte du contenu) ; un
+  fichier renommé ou déplacé n'est pas re-décodé ;
+- la normalisation float32 (0-1) n'est faite que lot par lot (batches).
+
+Fichiers du cache (dossier `dataset_cache/` par défaut):
+    images.u8       images uint8 (N, 224, 224) contiguës
+    manifest.json   chemin relatif, étiquette, empreinte, taille et date de chaque image
+
+Usage:
+    python dataset_cache.py build brain_tumor_dataset
+    python dataset_cache.py info
+
+    from dataset_cache import DatasetCache
+    cache = DatasetCache()
+    cache.update('brain_tumor_dataset')
+    X, y = cache.load()                       # X: uint8 (N, 224, 224), sans copie
+    splits = cache.split(test_split=0.1, validation_split=0.2)
+    for images, labels in cache.batches(splits['test']):
+        ...
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from detector_core import IMG_SIZE, collect_labeled_images, read_image_bytes, decode_grayscale, \
+    resize_for_model, to_model_input
+from prediction_cache import image_hash
+from decode_pipeline import default_workers
+
+DEFAULT_DATASET_CACHE = "dataset_cache"
+IMAGES_FILE = "images.u8"
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Images décodées par étape de mise à jour (mémoire bornée)
+UPDATE_CHUNK = 256
+
+
+def _relative_path(path, data_dir):
+    """Chemin relatif au dataset, avec des '/' (manifeste identique sous Windows)"""
+    return os.path.relpath(path, data_dir).replace(os.sep, '/')
+
+
+class DatasetCache:
+    """
+    Cache uint8 memory-mappé d'un dataset étiqueté
+
+    Args:
+        cache_dir: dossier du cache (créé si nécessaire)
+        img_size: taille des images (un cache d'une autre taille est reconstruit)
+    """
+
+    def __init__(self, cache_dir=DEFAULT_DATASET_CACHE, img_size=IMG_SIZE):
+        self.cache_dir = cache_dir
+        self.img_size = img_size
+        self.images_path = os.path.join(cache_dir, IMAGES_FILE)
+        self.manifest_path = os.path.join(cache_dir, MANIFEST_FILE)
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.entries = []
+        self.data_dir = None
+        self._images = None
+        self._labels = None
+
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('version') == MANIFEST_VERSION and manifest.get('img_size') == img_size:
+                self.entries = manifest['entries']
+                self.data_dir = manifest.get('data_dir')
+
+    @property
+    def slot_bytes(self):
+        return self.img_size * self.img_size
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def images(self):
+        """Images uint8 (N, img_size, img_size), memory-mappées en lecture seule"""
+        if self._images is None:
+            if not self.entries:
+                return np.empty((0, self.img_size, self.img_size), dtype=np.uint8)
+            self._images = np.memmap(self.images_path, dtype=np.uint8, mode='r',
+                                     shape=(len(self.entries), self.img_size, self.img_size))
+        return self._images
+
+    @property
+    def labels(self):
+        """Étiquettes (N,) : 1 = tumeur, 0 = sans tumeur"""
+        if self._labels is None:
+            self._labels = np.array([entry['label'] for entry in self.entries], dtype=np.int64)
+        return self._labels
+
+    @property
+    def paths(self):
+        """Chemins des images, relatifs au dossier du dataset"""
+        return [entry['path'] for entry in self.entries]
+
+    def load(self):
+        """
+        Images et étiquettes du dataset
+
+        Returns:
+            (images uint8 (N, img_size, img_size) sans copie, étiquettes (N,))
+        """
+        return self.images, self.labels
+
+    def _release(self):
+        """Libère le memory-mapping (nécessaire avant de réécrire le fichier sous Windows)"""
+        self._images = None
+        self._labels = None
+
+    def update(self, data_dir, workers=None, verify=False):
+        """
+        Met le cache à jour avec le contenu du dataset
+
+        Seuls les fichiers nouveaux ou modifiés sont décodés ; les images
+        supprimées sont retirées du cache. Les vues renvoyées auparavant par
+        `images`/`load()` doivent être libérées avant l'appel.
+
+        Args:
+            data_dir: dossier contenant les sous-dossiers 'yes' et 'no'
+            workers: threads de décodage (défaut: nombre de cœurs, 8 max)
+            verify: recalculer l'empreinte de tous les fichiers, même inchangés
+
+        Returns:
+            dictionnaire {'added', 'updated', 'removed', 'unchanged', 'errors'}
+            ('errors' est la liste des fichiers illisibles, avec le message d'erreur)
+        """
+        paths, labels = collect_labeled_images(data_dir)
+        old_entries = self.entries
+        old_by_path = {entry['path']: slot for slot, entry in enumerate(old_entries)}
+        stats = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0, 'errors': []}
+
+        # 1. Fichiers inchangés (même taille, même date): rien à lire
+        kept = {}          # emplacement de l'ancien cache -> nouvelle entrée
+        candidates = []
+        for path, label in zip(paths, labels):
+            rel = _relative_path(path, data_dir)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                stats['errors'].append(f"Impossible de lire l'image: {path}")
+                continue
+            entry = {'path': rel, 'label': int(label), 'hash': None,
+                     'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+            slot = old_by_path.get(rel)
+            if (not verify and slot is not None and old_entries[slot]['label'] == entry['label']
+                    and old_entries[slot]['size'] == entry['size']
+                    and old_entries[slot]['mtime_ns'] == entry['mtime_ns']):
+                entry['hash'] = old_entries[slot]['hash']
+                kept[slot] = entry
+            else:
+                candidates.append((path, entry))
+
+        # Images déjà décodées réutilisables pour les autres fichiers (renommés, touchés)
+        reusable = {}
+        for slot, old in enumerate(old_entries):
+            if slot not in kept:
+                reusable.setdefault((old['hash'], old['label']), []).append(slot)
+        known = set(reusable)
+
+        def read_one(item):
+            """(entrée, contenu si déjà décodé ailleurs, image décodée, erreur)"""
+            path, entry = item
+            try:
+                data = read_image_bytes(path)
+                entry['hash'] = image_hash(data)
+                if (entry['hash'], entry['label']) in known:
+                    return entry, data, None, None
+                return entry, None, resize_for_model(decode_grayscale(data, path), self.img_size), None
+            except OSError:
+                return entry, None, None, f"Impossible de lire l'image: {path}"
+            except ValueError as e:
+                return entry, None, None, str(e)
+
+        # 2. Fichiers nouveaux ou modifiés: empreinte, puis décodage si contenu inconnu.
+        #    Les nouvelles images sont écrites à la suite des anciennes, par paquets.
+        self._release()
+        old_count = len(old_entries)
+        added = []
+        mode = 'r+b' if os.path.exists(self.images_path) else 'w+b'
+        with open(self.images_path, mode) as f, \
+                ThreadPoolExecutor(max_workers=workers or default_workers()) as pool:
+            # Images écrites lors d'une mise à jour interrompue (absentes du manifeste)
+            f.truncate(old_count * self.slot_bytes)
+            f.seek(old_count * self.slot_bytes)
+
+            for start in range(0, len(candidates), UPDATE_CHUNK):
+                for entry, data, image, error in pool.map(read_one, candidates[start:start + UPDATE_CHUNK]):
+                    if error:
+                        stats['errors'].append(error)
+                        continue
+
+                    if image is None:
+                        free_slots = reusable[(entry['hash'], entry['label'])]
+                        if free_slots:
+                            kept[free_slots.pop(0)] = entry
+                            continue
+                        # Doublon d'un contenu déjà réutilisé: décodage nécessaire
+                        try:
+                            image = resize_for_model(decode_grayscale(data, entry['path']), self.img_size)
+                        except ValueError as e:
+                            stats['errors'].append(str(e))
+                            continue
+
+                    f.write(np.ascontiguousarray(image, dtype=np.uint8).tobytes())
+                    stats['updated' if entry['path'] in old_by_path else 'added'] += 1
+                    added.append(entry)
+
+        stats['unchanged'] = len(kept)
+        stats['removed'] = max(old_count - len(kept) - stats['updated'], 0)
+
+        # 3. Emplacements libérés (fichiers supprimés ou modifiés): compactage
+        kept_slots = sorted(kept)
+        if kept_slots != list(range(old_count)):
+            self._compact(kept_slots, old_count, len(added))
+
+        self.entries = [kept[slot] for slot in kept_slots] + added
+        self.data_dir = os.path.abspath(data_dir)
+        self._write_manifest()
+        return stats
+
+    def _compact(self, kept_slots, old_count, added_count):
+        """Réécrit le fichier d'images sans les emplacements libérés (mémoire bornée)"""
+        tmp_path = self.images_path + ".tmp"
+        source = np.memmap(self.images_path, dtype=np.uint8, mode='r',
+                           shape=(old_count + added_count, self.img_size, self.img_size))
+        order = np.concatenate([np.asarray(kept_slots, dtype=np.int64),
+                                np.arange(old_count, old_count + added_count)])
+        with open(tmp_path, 'wb') as f:
+            for start in range(0, len(order), UPDATE_CHUNK):
+                f.write(source[order[start:start + UPDATE_CHUNK]].tobytes())
+        del source
+        os.replace(tmp_path, self.images_path)
+
+    def _write_manifest(self):
+        """Écrit le manifeste (remplacement atomique, après les images)"""
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'img_size': self.img_size,
+            'data_dir': self.data_dir,
+            'count': len(self.entries),
+            'updated_at': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'entries': self.entries,
+        }
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def split(self, test_split=0.1, validation_split=0.2, seed=42):
+        """
+        Découpage stratifié en ensembles d'entraînement, validation et test
+
+        Les proportions sont celles du dataset complet (comme dans le notebook).
+
+        Returns:
+            dictionnaire {'train', 'val', 'test'} d'indices triés
+        """
+        rng = np.random.default_rng(seed)
+        splits = {'train': [], 'val': [], 'test': []}
+        for label in np.unique(self.labels):
+            indices = rng.permutation(np.flatnonzero(self.labels == label))
+            n_test = int(round(len(indices) * test_split))
+            n_val = int(round(len(indices) * validation_split))
+            splits['test'].append(indices[:n_test])
+            splits['val'].append(indices[n_test:n_test + n_val])
+            splits['train'].append(indices[n_test + n_val:])
+        return {name: np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+                for name, parts in splits.items()}
+
+    def batches(self, indices=None, batch_size=32):
+        """
+        Parcourt des images par lots, au format attendu par le modèle
+
+        Seul le lot courant est converti en float32.
+
+        Args:
+            indices: indices des images (défaut: toutes, dans l'ordre)
+            batch_size: nombre d'images par lot
+
+        Yields:
+            (images float32 (n, img_size, img_size, 1), étiquettes (n,))
+        """
+        if indices is None:
+            indices = np.arange(len(self))
+        images, labels = self.load()
+        for start in range(0, len(indices), batch_size):
+            chunk = indices[start:start + batch_size]
+            yield to_model_input(images[chunk]), labels[chunk]
+
+    def close(self):
+        self._release()
+
+
+def print_stats(stats, cache, elapsed):
+    """Affiche le résultat d'une mise à jour du cache"""
+    counts = np.bincount(cache.labels, minlength=2)
+    print(f"✓ Cache à jour en {elapsed:.1f}s: {len(cache)} images "
+          f"({counts[1]} avec tumeur, {counts[0]} sans tumeur)")
+    print(f"   - Ajoutées: {stats['added']}, modifiées: {stats['updated']}, "
+          f"supprimées: {stats['removed']}, inchangées: {stats['unchanged']}")
+    for error in stats['errors']:
+        print(f"   - ❌ {error}")
+
+
+def main(argv=None):
+    """Point d'entrée du cache du dataset"""
+    parser = argparse.ArgumentParser(description="Cache uint8 pré-décodé du dataset d'entraînement")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="Créer ou mettre à jour le cache")
+    build.add_argument('data_dir', help="Dossier du dataset (sous-dossiers yes/ et no/)")
+    build.add_argument('-w', '--workers', type=int, default=None, help="Threads de décodage")
+    build.add_argument('--verify', action='store_true',
+                       help="Recalculer l'empreinte de tous les fichiers, même inchangés")
+
+    info = subparsers.add_parser('info', help="Afficher le contenu du cache")
+
+    for subparser in (build, info):
+        subparser.add_argument('-o', '--cache-dir', default=DEFAULT_DATASET_CACHE,
+                               help=f"Dossier du cache (défaut: {DEFAULT_DATASET_CACHE})")
+        subparser.add_argument('--img-size', type=int, default=IMG_SIZE,
+                               help=f"Taille des images (défaut: {IMG_SIZE})")
+    args = parser.parse_args(argv)
+
+    cache = DatasetCache(args.cache_dir, args.img_size)
+
+    if args.command == 'build':
+        if not os.path.isdir(args.data_dir):
+            print(f"❌ Dossier introuvable: {args.data_dir}")
+            return 1
+        start = time.perf_counter()
+        stats = cache.update(args.data_dir, args.workers, args.verify)
+        print_stats(stats, cache, time.perf_counter() - start)
+        return 0 if not stats['errors'] else 1
+
+    if not len(cache):
+        print(f"Cache vide: lancez 'python dataset_cache.py build <dataset>'")
+        return 1
+    counts = np.bincount(cache.labels, minlength=2)
+    size_mb = os.path.getsize(cache.images_path) / (1024 * 1024)
+    print(f"✓ {len(cache)} images {cache.img_size}×{cache.img_size} ({counts[1]} avec tumeur, "
+          f"{counts[0]} sans tumeur), {size_mb:.1f} MB")
+    print(f"   - Dataset: {cache.data_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
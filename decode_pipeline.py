@@ -0,0 +1,203 @@
+"""
+Brain Tumor Detection - Pipeline de décodage parallèle
+=======================================================
+Étape producteur/consommateur qui décode et redimensionne les images
+(JPEG/PNG/...) dans des tampons uint8 préalloués pendant que le modèle
+analyse le lot précédent.
+
+- Un pool de threads décode les images d'un lot en parallèle
+  (cv2.imread et cv2.resize libèrent le GIL).
+- Le nombre de lots préparés à l'avance est borné par `queue_depth` :
+  lorsque tous les tampons sont occupés, le producteur attend (backpressure),
+  ce qui garde la mémoire constante même sur des dossiers de 100 000 images.
+- Avec un cache de prédictions, chaque fichier est haché juste après sa
+  lecture : les images déjà connues ne sont pas décodées (sauf sans
+  consultation du cache, lookup=False : empreintes seules, pour l'écriture).
+- Les très grandes images sont décodées à résolution réduite
+  (image_ingest.py) ; pour un fichier multi-coupes, seule la première
+  coupe est analysée (analyse par étude : option --slices du mode batch).
+"""
+
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from detector_core import IMG_SIZE, read_image_bytes, resize_for_model
+from image_ingest import decode_reduced
+from prediction_cache import image_hash
+from instrumentation import stage
+
+DEFAULT_QUEUE_DEPTH = 2
+
+# Marqueur de fin du flux de lots
+_END = object()
+
+
+class DecodedBatch:
+    """
+    Lot d'images décodées
+
+    Attributes:
+        paths: chemins des images du lot
+        images: vue uint8 (len(paths), img_size, img_size) sur le tampon partagé
+        valid: indices des images décodées avec succès (à analyser)
+        errors: dictionnaire {indice: message d'erreur}
+        cached: dictionnaire {indice: probabilité trouvée dans le cache}
+        hashes: empreintes des images (None si aucun cache n'est utilisé)
+    """
+
+    def __init__(self, paths, images, valid, errors, cached=None, hashes=None):
+        self.paths = paths
+        self.images = images
+        self.valid = valid
+        self.errors = errors
+        self.cached = cached or {}
+        self.hashes = hashes
+
+    def valid_images(self):
+        """Images à analyser uniquement (sans copie si tout le lot est à analyser)"""
+        if len(self.valid) == len(self.paths):
+            return self.images
+        return self.images[self.valid]
+
+
+def default_workers():
+    """Nombre de threads de décodage par défaut"""
+    return min(8, os.cpu_count() or 1)
+
+
+def decode_into(image_path, buffer, slot, img_size=IMG_SIZE, cache=None, lookup=True):
+    """
+    Décode une image directement dans buffer[slot] (uint8, img_size×img_size)
+
+    Returns:
+        (empreinte, probabilité en cache) ; l'image n'est pas décodée si elle
+        est déjà dans le cache. (None, None) sans cache ; (empreinte, None)
+        si lookup est faux (cache non consulté, image toujours décodée).
+    """
+    if cache is None:
+        # Pas d'empreinte à calculer: le fichier est lu par le décodeur (grandes
+        # images: seules les données de la résolution réduite sont décodées)
+        with stage('decode'):
+            img = decode_reduced(image_path, img_size)
+        with stage('resize'):
+            buffer[slot] = resize_for_model(img, img_size)
+        return None, None
+
+    try:
+        with stage('read'):
+            data = read_image_bytes(image_path)
+    except OSError:
+        raise ValueError(f"Impossible de lire l'image: {image_path}")
+
+    with stage('cache_lookup'):
+        key = image_hash(data)
+        probability = cache.get(key) if lookup else None
+    if probability is not None:
+        return key, probability
+
+    with stage('decode'):
+        img = decode_reduced(data, img_size, image_path)
+    with stage('resize'):
+        buffer[slot] = resize_for_model(img, img_size)
+    return key, None
+
+
+def iter_decoded_batches(image_paths, batch_size, workers=None,
+                         queue_depth=DEFAULT_QUEUE_DEPTH, img_size=IMG_SIZE, cache=None, lookup=True):
+    """
+    Génère les lots décodés pendant que l'appelant traite le lot courant
+
+    Le tampon d'un lot n'est rendu au producteur que lorsque l'appelant
+    demande le lot suivant : `DecodedBatch.images` ne doit donc pas être
+    conservé au-delà d'une itération.
+
+    Args:
+        image_paths: liste des chemins d'images
+        batch_size: nombre d'images par lot
+        workers: nombre de threads de décodage (défaut: nombre de cœurs, max 8)
+        queue_depth: nombre de lots décodés à l'avance
+        img_size: taille d'entrée du modèle
+        cache: PredictionCache optionnel (les images en cache ne sont pas décodées)
+        lookup: consulter le cache ; sinon toutes les images sont décodées et
+            DecodedBatch.hashes sert uniquement à enregistrer les résultats
+
+    Yields:
+        DecodedBatch, dans l'ordre de image_paths
+    """
+    workers = workers or default_workers()
+    queue_depth = max(1, queue_depth)
+
+    # Tampons préalloués: queue_depth lots en attente + 1 lot en cours d'analyse
+    free_buffers = queue.Queue()
+    for _ in range(queue_depth + 1):
+        free_buffers.put(np.empty((batch_size, img_size, img_size), dtype=np.uint8))
+
+    ready = queue.Queue(maxsize=queue_depth)
+    stop = threading.Event()
+
+    def put_ready(item):
+        while not stop.is_set():
+            try:
+                ready.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def decode_one(args):
+        path, buffer, slot = args
+        try:
+            return decode_into(path, buffer, slot, img_size, cache, lookup) + (None,)
+        except Exception as e:
+            return None, None, str(e)
+
+    def producer(executor):
+        try:
+            for start in range(0, len(image_paths), batch_size):
+                # Attendre un tampon libre (backpressure)
+                buffer = None
+                while buffer is None:
+                    if stop.is_set():
+                        return
+                    try:
+                        buffer = free_buffers.get(timeout=0.1)
+                    except queue.Empty:
+                        pass
+
+                chunk = image_paths[start:start + batch_size]
+                outcomes = list(executor.map(
+                    decode_one, [(path, buffer, i) for i, path in enumerate(chunk)]
+                ))
+                errors = {i: error for i, (_, _, error) in enumerate(outcomes) if error is not None}
+                cached = {i: probability for i, (_, probability, _) in enumerate(outcomes)
+                          if probability is not None}
+                valid = [i for i in range(len(chunk)) if i not in errors and i not in cached]
+                hashes = [key for key, _, _ in outcomes] if cache is not None else None
+
+                batch = DecodedBatch(chunk, buffer[:len(chunk)], valid, errors, cached, hashes)
+                put_ready((batch, buffer))
+            put_ready(_END)
+        except BaseException as e:
+            put_ready(e)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        thread = threading.Thread(target=producer, args=(executor,), daemon=True)
+        thread.start()
+
+        try:
+            while True:
+                item = ready.get()
+                if item is _END:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+
+                batch, buffer = item
+                yield batch
+                free_buffers.put(buffer)
+        finally:
+            stop.set()
+            thread.join()
@@ -0,0 +1,215 @@
+"""
+Brain Tumor Detection - Noyau d'inférence
+==========================================
+Fonctions partagées entre l'application GUI et les modes sans interface :
+prétraitement des IRM, chargement du modèle et interprétation des prédictions.
+
+Le prétraitement est strictement identique à celui du notebook
+(niveaux de gris, 224×224, normalisation entre 0 et 1).
+"""
+
+import io
+import os
+import cv2
+import numpy as np
+from PIL import Image
+
+# Paramètres du modèle (identiques au notebook d'entraînement)
+MODEL_PATH = "best_brain_tumor_model.keras"
+IMG_SIZE = 224
+THRESHOLD = 0.5
+
+# Extensions acceptées (les mêmes que le dialogue d'ouverture de l'application)
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+
+# Sous-dossiers d'un dataset étiqueté (même organisation que brain_tumor_dataset)
+CLASS_DIRS = {'no': 0, 'yes': 1}
+
+
+def load_detector_model(model_path=MODEL_PATH):
+    """
+    Charge le modèle CNN pré-entraîné
+
+    Args:
+        model_path: chemin vers le fichier .keras
+
+    Returns:
+        modèle Keras prêt pour la prédiction
+    """
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Le fichier modèle '{model_path}' n'a pas été trouvé.")
+
+    from tensorflow.keras.models import load_model
+    return load_model(model_path)
+
+
+def collect_labeled_images(data_dir):
+    """
+    Liste les images d'un dataset étiqueté organisé en sous-dossiers yes/ et no/
+
+    Args:
+        data_dir: dossier contenant les sous-dossiers 'yes' et 'no'
+
+    Returns:
+        (chemins, étiquettes): images de 'no' puis de 'yes', étiquette 1 = tumeur
+    """
+    paths = []
+    labels = []
+
+    for class_dir, label in CLASS_DIRS.items():
+        folder = os.path.join(data_dir, class_dir)
+        if not os.path.isdir(folder):
+            continue
+        for filename in sorted(os.listdir(folder)):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(folder, filename))
+                labels.append(label)
+
+    return paths, np.array(labels, dtype=np.int64)
+
+
+def read_image_bytes(image_path):
+    """Lit le contenu brut d'un fichier image (une seule lecture disque)"""
+    with open(image_path, 'rb') as f:
+        return f.read()
+
+
+def pil_to_grayscale(img):
+    """
+    Convertit une image PIL en niveaux de gris comme cv2.imread(IMREAD_GRAYSCALE)
+
+    PIL (convert('L')) et OpenCV n'arrondissent pas la conversion couleur → gris
+    de la même façon ; on reproduit donc celle d'OpenCV pour que le modèle voie
+    les mêmes pixels quel que soit le décodeur :
+    - JPEG : luminance Y fournie directement par le décodeur (mode brouillon 'L') ;
+    - autres formats : coefficients 0.299/0.587/0.114 en virgule fixe (14 bits).
+
+    Returns:
+        tableau numpy 2D (hauteur, largeur) en uint8
+    """
+    if img.format == 'JPEG' and img.mode != 'L':
+        img.draft('L', img.size)
+
+    if img.mode == 'L':
+        return np.asarray(img, dtype=np.uint8)
+
+    rgb = np.asarray(img.convert('RGB'), dtype=np.uint32)
+    gray = rgb[..., 0] * 4899 + rgb[..., 1] * 9617 + rgb[..., 2] * 1868 + (1 << 13)
+    return (gray >> 14).astype(np.uint8)
+
+
+def decode_grayscale(data, source="image"):
+    """
+    Décode le contenu d'un fichier image en niveaux de gris (uint8)
+
+    Le décodage se fait avec OpenCV (comme à l'entraînement) ; les formats
+    qu'OpenCV ne sait pas lire sont décodés par PIL avec la même conversion.
+
+    Args:
+        data: contenu brut du fichier (bytes)
+        source: nom de l'image pour les messages d'erreur
+
+    Returns:
+        tableau numpy 2D (hauteur, largeur) en uint8
+    """
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if img is not None:
+        return img
+
+    try:
+        with Image.open(io.BytesIO(data)) as pil_img:
+            return pil_to_grayscale(pil_img)
+    except Exception:
+        raise ValueError(f"Impossible de lire l'image: {source}")
+
+
+def load_grayscale(image_path):
+    """
+    Charge une image en niveaux de gris (uint8)
+
+    Args:
+        image_path: chemin vers l'image
+
+    Returns:
+        tableau numpy 2D (hauteur, largeur) en uint8
+    """
+    try:
+        data = read_image_bytes(image_path)
+    except OSError:
+        raise ValueError(f"Impossible de lire l'image: {image_path}")
+
+    return decode_grayscale(data, image_path)
+
+
+def resize_for_model(img, img_size=IMG_SIZE):
+    """Redimensionne une image en niveaux de gris à img_size×img_size (uint8)"""
+    return cv2.resize(img, (img_size, img_size))
+
+
+def to_model_input(images):
+    """
+    Convertit un lot d'images uint8 au format attendu par le modèle
+
+    Args:
+        images: tableau (N, img_size, img_size) ou (img_size, img_size) en uint8
+
+    Returns:
+        tableau float32 (N, img_size, img_size, 1) normalisé entre 0 et 1
+    """
+    images = np.asarray(images)
+    img_size = images.shape[-1]
+    return (images.astype('float32') / 255.0).reshape(-1, img_size, img_size, 1)
+
+
+def preprocess_array(img, img_size=IMG_SIZE):
+    """
+    Prétraite une image déjà décodée en niveaux de gris
+
+    Args:
+        img: tableau numpy 2D en uint8
+        img_size: taille d'entrée du modèle
+
+    Returns:
+        image prétraitée au format (1, img_size, img_size, 1)
+    """
+    return to_model_input(resize_for_model(img, img_size))
+
+
+def preprocess_image(image_path, img_size=IMG_SIZE):
+    """
+    Prétraite l'image pour le modèle CNN
+
+    Args:
+        image_path: chemin vers l'image
+        img_size: taille d'entrée du modèle
+
+    Les très grandes images sont décodées directement à résolution réduite
+    (image_ingest.py) ; pour un fichier multi-coupes, seule la première
+    coupe est analysée.
+
+    Returns:
+        image prétraitée au format (1, img_size, img_size, 1)
+    """
+    from image_ingest import decode_reduced
+    return preprocess_array(decode_reduced(image_path, img_size), img_size)
+
+
+def interpret_prediction(prediction, threshold=THRESHOLD):
+    """
+    Interprète la probabilité brute du modèle
+
+    Args:
+        prediction: probabilité de tumeur (0-1)
+        threshold: seuil de décision
+
+    Returns:
+        (has_tumor, confidence)
+    """
+    has_tumor = prediction > threshold
+    confidence = prediction if has_tumor else (1 - prediction)
+    return has_tumor, confidence
+
+
+def result_status(has_tumor):
+    """Libellé du résultat tel qu'il apparaît dans le fichier log"""
+    return "TUMEUR DÉTECTÉE" if has_tumor else "PAS DE TUMEUR"
@@ -0,0 +1,144 @@
+"""
+Brain Tumor Detection - Distillation depuis le modèle complet
+==============================================================
+Outils communs aux modèles « élèves » entraînés à reproduire les
+probabilités de best_brain_tumor_model.keras (modèle de tri de la cascade,
+modèle compact) :
+
+- probabilités d'un moteur sur le dataset pré-décodé (dataset_cache.py) ;
+- flux tf.data (images, cibles) lu dans le cache, à la résolution de
+  l'élève, avec l'augmentation du notebook pour l'entraînement ;
+- cible de distillation : mélange des probabilités du modèle complet et
+  des étiquettes.
+"""
+
+import cv2
+import numpy as np
+
+from detector_core import to_model_input
+
+# Poids des probabilités du modèle complet dans la cible de distillation (le reste: étiquettes)
+DEFAULT_DISTILL_ALPHA = 0.7
+DEFAULT_PATIENCE = 5
+
+
+def downscale(images, img_size):
+    """
+    Réduit un lot à une résolution inférieure (moyenne par zones, INTER_AREA)
+
+    Args:
+        images: tableau float32 (N, s, s, 1) au format du modèle complet
+        img_size: taille d'entrée du modèle élève
+
+    Returns:
+        tableau float32 (N, img_size, img_size, 1)
+    """
+    images = np.asarray(images, dtype=np.float32)
+    if images.shape[1] == img_size:
+        return images
+    small = np.empty((len(images), img_size, img_size, 1), dtype=np.float32)
+    for i, image in enumerate(images):
+        small[i, :, :, 0] = cv2.resize(image[:, :, 0], (img_size, img_size), interpolation=cv2.INTER_AREA)
+    return small
+
+
+def dataset_probabilities(engine, cache, indices, batch_size=32):
+    """
+    Probabilités d'un moteur pour des images du cache du dataset
+
+    Les images sont réduites à la taille d'entrée du moteur si besoin.
+
+    Returns:
+        tableau (N,) dans l'ordre de indices
+    """
+    predictions = [np.empty(0)]
+    for images, _ in cache.batches(indices, batch_size):
+        predictions.append(engine.predict(downscale(images, engine.img_size)))
+    return np.concatenate(predictions)
+
+
+def distillation_targets(teacher, cache, indices, alpha=DEFAULT_DISTILL_ALPHA, batch_size=32):
+    """Cibles alpha · probabilité du modèle complet + (1 - alpha) · étiquette"""
+    _, labels = cache.load()
+    soft = dataset_probabilities(teacher, cache, indices, batch_size)
+    return alpha * soft + (1 - alpha) * labels[np.asarray(indices, dtype=np.int64)]
+
+
+def distillation_dataset(cache, indices, targets, img_size, batch_size=32, training=False, seed=None):
+    """
+    Flux tf.data (images, cibles) lu dans le cache du dataset
+
+    Args:
+        cache: DatasetCache à jour
+        indices: indices des images
+        targets: cibles (N,) dans l'ordre de indices
+        img_size: taille d'entrée du modèle élève
+        batch_size: images par lot
+        training: mélanger à chaque epoch et appliquer l'augmentation du notebook
+        seed: graine du mélange et de l'augmentation
+
+    Returns:
+        tf.data.Dataset de (float32 (N, img_size, img_size, 1), float32 (N,))
+    """
+    import tensorflow as tf
+    from training_pipeline import NOTEBOOK_AUGMENTATION, random_augmentation
+
+    images, _ = cache.load()
+    indices = np.asarray(indices, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.float32)
+
+    def gather(positions):
+        # Même réduction qu'à l'analyse: image du modèle complet → img_size
+        positions = positions[np.argsort(indices[positions])]
+        return downscale(to_model_input(images[indices[positions]]), img_size), targets[positions]
+
+    def to_batch(positions):
+        batch, batch_targets = tf.numpy_function(gather, [positions], [tf.float32, tf.float32])
+        return tf.reshape(batch, [-1, img_size, img_size, 1]), tf.reshape(batch_targets, [-1])
+
+    dataset = tf.data.Dataset.from_tensor_slices(np.arange(len(indices), dtype=np.int64))
+    if training:
+        dataset = dataset.shuffle(len(indices), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size).map(to_batch, num_parallel_calls=tf.data.AUTOTUNE)
+    if training:
+        dataset = dataset.map(lambda batch, batch_targets: (
+            random_augmentation(batch, NOTEBOOK_AUGMENTATION, seed), batch_targets),
+            num_parallel_calls=tf.data.AUTOTUNE)
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def distill(model, teacher, cache, train_indices, val_indices=None, epochs=30, batch_size=32,
+            alpha=DEFAULT_DISTILL_ALPHA, seed=42, patience=DEFAULT_PATIENCE):
+    """
+    Entraîne un modèle élève (déjà compilé) sur les probabilités du modèle complet
+
+    Args:
+        model: modèle Keras élève compilé (perte binary_crossentropy)
+        teacher: moteur du modèle complet (InferenceEngine)
+        cache: DatasetCache à jour
+        train_indices, val_indices: indices d'entraînement et de validation
+        epochs: nombre maximal d'epochs (arrêt anticipé sur la validation)
+        batch_size: images par lot
+        alpha: poids des probabilités du modèle complet dans la cible
+        seed: graine du mélange et de l'augmentation
+        patience: epochs sans amélioration avant l'arrêt anticipé
+
+    Returns:
+        historique Keras de l'entraînement
+    """
+    from tensorflow import keras
+
+    img_size = model.input_shape[1]
+    train_ds = distillation_dataset(cache, train_indices,
+                                    distillation_targets(teacher, cache, train_indices, alpha, batch_size),
+                                    img_size, batch_size, training=True, seed=seed)
+    val_ds = None
+    callbacks = []
+    if val_indices is not None and len(val_indices):
+        val_ds = distillation_dataset(cache, val_indices,
+                                      distillation_targets(teacher, cache, val_indices, alpha, batch_size),
+                                      img_size, batch_size)
+        callbacks.append(keras.callbacks.EarlyStopping(monitor='val_loss', patience=patience,
+                                                       restore_best_weights=True))
+
+    return model.fit(train_ds, epochs=epochs, validation_data=val_ds, callbacks=callbacks, verbose=2)
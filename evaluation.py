@@ -0,0 +1,599 @@
+"""
+Brain Tumor Detection - Évaluation, calibration et choix du seuil de décision
+==============================================================================
+Un dataset étiqueté (sous-dossiers yes/ et no/) traverse une seule fois le
+pipeline d'inférence par lots ; les probabilités sont enregistrées
+(evaluation_predictions.npz, avec l'empreinte du modèle) et une nouvelle
+évaluation ne prédit que les images ajoutées depuis.
+
+À partir de ces probabilités, tout est calculé en NumPy, sans boucle
+Python par image :
+
+- courbes ROC et précision-rappel, AUC et précision moyenne ;
+- intervalles de confiance bootstrap (poids de ré-échantillonnage par
+  bincount, un seul tri partagé par toutes les répliques) ;
+- calibration des probabilités : Platt (régression logistique sur le
+  logit) ou isotonique (pool-adjacent-violators vectorisé) ;
+- seuil de décision atteignant une sensibilité cible.
+
+Le seuil et la calibration sont enregistrés dans les métadonnées du modèle
+(model_metadata.py), utilisées par l'interface, le mode batch, la
+surveillance de dossiers et le serveur. Avec --holdout, calibration et seuil
+sont choisis sur une partie du dataset et les métriques rapportées sur le
+reste.
+
+Usage:
+    python evaluation.py brain_tumor_dataset/
+    python evaluation.py brain_tumor_dataset/ --calibration isotonic --target-sensitivity 0.98
+    python evaluation.py brain_tumor_dataset/ --holdout 0.3 --curves courbes.csv --dry-run
+"""
+
+import argparse
+import csv
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+from detector_core import MODEL_PATH, collect_labeled_images, to_model_input
+from model_metadata import CALIBRATION_NONE, CALIBRATION_PLATT, CALIBRATION_ISOTONIC, DecisionPolicy, \
+    logit, sigmoid, save_metadata
+
+DEFAULT_PREDICTIONS = "evaluation_predictions.npz"
+DEFAULT_TARGET_SENSITIVITY = 0.95
+DEFAULT_BOOTSTRAP = 1000
+DEFAULT_CALIBRATION_BINS = 10
+
+# Éléments de la matrice des poids bootstrap (répliques × images) traités à la fois
+BOOTSTRAP_CHUNK_ELEMENTS = 1 << 23
+
+
+def dataset_predictions(image_paths, labels, model_path=MODEL_PATH, fingerprint=None,
+                        predictions_path=DEFAULT_PREDICTIONS, batch_size=32, workers=None):
+    """
+    Probabilités du modèle pour un dataset étiqueté (une seule passe d'inférence)
+
+    Les probabilités déjà enregistrées pour ce modèle sont reprises ; seules
+    les images absentes du fichier sont décodées et prédites. Le modèle n'est
+    chargé que s'il reste des images à prédire.
+
+    Args:
+        image_paths: chemins des images
+        labels: étiquettes (1 = tumeur)
+        model_path: fichier modèle
+        fingerprint: empreinte SHA-256 du modèle
+        predictions_path: fichier des probabilités (None = pas d'enregistrement)
+        batch_size: nombre d'images par appel au modèle
+        workers: nombre de threads de décodage (None = automatique)
+
+    Returns:
+        (chemins, étiquettes, probabilités, erreurs {chemin: message}) ; les
+        images illisibles sont exclues
+    """
+    from decode_pipeline import iter_decoded_batches
+    from inference_engine import load_engine
+
+    paths = np.asarray(image_paths, dtype=str)
+    labels = np.asarray(labels, dtype=np.int64)
+    probabilities = np.full(len(paths), np.nan)
+
+    if predictions_path and os.path.exists(predictions_path):
+        with np.load(predictions_path) as stored:
+            if str(stored['fingerprint']) == fingerprint and len(stored['paths']):
+                order = np.argsort(stored['paths'])
+                stored_paths = stored['paths'][order]
+                stored_probabilities = stored['probabilities'][order]
+                position = np.minimum(np.searchsorted(stored_paths, paths), len(stored_paths) - 1)
+                known = stored_paths[position] == paths
+                probabilities[known] = stored_probabilities[position[known]]
+
+    missing = np.flatnonzero(np.isnan(probabilities))
+    errors = {}
+    if len(missing):
+        print(f"Prédiction de {len(missing)} images ({len(paths) - len(missing)} déjà évaluées)...")
+        engine = load_engine(model_path, warmup_batch_sizes=(batch_size,))
+        start = time.perf_counter()
+        position = 0
+        for batch in iter_decoded_batches(list(paths[missing]), batch_size, workers, img_size=engine.img_size):
+            for i, error in batch.errors.items():
+                errors[batch.paths[i]] = error
+            if batch.valid:
+                predictions = np.asarray(engine.predict_on_batch(to_model_input(batch.valid_images()))).reshape(-1)
+                probabilities[missing[position + np.asarray(batch.valid)]] = predictions
+            position += len(batch.paths)
+        elapsed = time.perf_counter() - start
+        print(f"✓ {len(missing) - len(errors)} images en {elapsed:.1f}s "
+              f"({(len(missing) - len(errors)) / max(elapsed, 1e-9):.0f} images/s)")
+
+    valid = ~np.isnan(probabilities)
+    paths, labels, probabilities = paths[valid], labels[valid], probabilities[valid]
+    if predictions_path and len(missing):
+        np.savez(predictions_path, paths=paths, labels=labels, probabilities=probabilities,
+                 fingerprint=np.asarray(fingerprint or ''))
+    return paths, labels, probabilities, errors
+
+
+def stratified_split(labels, holdout, seed=None):
+    """
+    Partage stratifié en (calibration, évaluation)
+
+    Args:
+        labels: étiquettes (1 = tumeur)
+        holdout: fraction de chaque classe réservée à l'évaluation (0 = tout en commun)
+        seed: graine du tirage
+
+    Returns:
+        (indices de calibration, indices d'évaluation), triés
+    """
+    labels = np.asarray(labels)
+    everything = np.arange(len(labels))
+    if not holdout:
+        return everything, everything
+
+    rng = np.random.default_rng(seed)
+    held = []
+    for label in (0, 1):
+        members = rng.permutation(np.flatnonzero(labels == label))
+        held.append(members[:int(round(holdout * len(members)))])
+    held = np.sort(np.concatenate(held))
+    return np.setdiff1d(everything, held), held
+
+
+def _ranked(scores, labels, weights=None):
+    """
+    Vrais et faux positifs cumulés, par score décroissant
+
+    Args:
+        scores: probabilités (N,)
+        labels: étiquettes (N,)
+        weights: poids (N,) ou (R, N) de répliques bootstrap (None = 1)
+
+    Returns:
+        (tps, fps, seuils) : cumuls (..., K) aux K scores distincts, du plus
+        grand au plus petit (une image est positive si son score >= seuil)
+    """
+    order = np.argsort(-np.asarray(scores, dtype=np.float64), kind='stable')
+    ranked_scores = np.asarray(scores, dtype=np.float64)[order]
+    positives = np.asarray(labels, dtype=np.float64)[order]
+    weights = np.ones(len(order)) if weights is None else np.asarray(weights, dtype=np.float64)[..., order]
+
+    # Fin de chaque groupe d'ex aequo
+    ends = np.r_[np.flatnonzero(np.diff(ranked_scores)), len(order) - 1]
+    tps = np.cumsum(weights * positives, axis=-1)[..., ends]
+    fps = np.cumsum(weights * (1 - positives), axis=-1)[..., ends]
+    return tps, fps, ranked_scores[ends]
+
+
+def _divide(numerator, denominator):
+    """Division élément par élément, NaN si le dénominateur est nul"""
+    denominator = np.asarray(denominator, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, numerator / np.where(denominator > 0, denominator, 1), np.nan)
+
+
+def trapezoid_area(x, y):
+    """Aire sous la courbe (méthode des trapèzes, sur le dernier axe)"""
+    return np.sum(np.diff(x, axis=-1) * (y[..., 1:] + y[..., :-1]) / 2, axis=-1)
+
+
+def roc_curve(scores, labels):
+    """
+    Courbe ROC
+
+    Returns:
+        (taux de faux positifs, taux de vrais positifs, seuils), en partant
+        du point (0, 0) (seuil infini)
+    """
+    tps, fps, thresholds = _ranked(scores, labels)
+    fpr = np.r_[0.0, _divide(fps, fps[-1])]
+    tpr = np.r_[0.0, _divide(tps, tps[-1])]
+    return fpr, tpr, np.r_[np.inf, thresholds]
+
+
+def pr_curve(scores, labels):
+    """
+    Courbe précision-rappel
+
+    Returns:
+        (précision, rappel, seuils), par seuil décroissant
+    """
+    tps, fps, thresholds = _ranked(scores, labels)
+    return _divide(tps, tps + fps), _divide(tps, tps[-1]), thresholds
+
+
+def _average_precision(tps, fps):
+    """Précision moyenne: somme des précisions pondérées par les gains de rappel"""
+    recall = _divide(tps, tps[..., -1:])
+    precision = _divide(tps, tps + fps)
+    gains = np.diff(recall, axis=-1, prepend=0.0)
+    return np.sum(gains * np.nan_to_num(precision), axis=-1)
+
+
+def roc_auc(scores, labels):
+    """Aire sous la courbe ROC"""
+    fpr, tpr, _ = roc_curve(scores, labels)
+    return float(trapezoid_area(fpr, tpr))
+
+
+def average_precision(scores, labels):
+    """Précision moyenne (aire sous la courbe précision-rappel, en escalier)"""
+    tps, fps, _ = _ranked(scores, labels)
+    return float(_average_precision(tps, fps))
+
+
+def confusion_at(scores, labels, threshold):
+    """
+    Métriques de décision à un seuil (positif si score > seuil, comme interpret_prediction)
+
+    Returns:
+        dictionnaire {'sensitivity', 'specificity', 'precision', 'accuracy',
+        'tp', 'fp', 'tn', 'fn'}
+    """
+    predicted = np.asarray(scores) > threshold
+    labels = np.asarray(labels).astype(bool)
+    tp = int(np.sum(predicted & labels))
+    fp = int(np.sum(predicted & ~labels))
+    fn = int(np.sum(~predicted & labels))
+    tn = int(np.sum(~predicted & ~labels))
+    return {
+        'sensitivity': float(_divide(tp, tp + fn)),
+        'specificity': float(_divide(tn, tn + fp)),
+        'precision': float(_divide(tp, tp + fp)),
+        'accuracy': (tp + tn) / max(len(labels), 1),
+        'tp': tp, 'fp': fp, 'tn': tn, 'fn': fn,
+    }
+
+
+def threshold_for_sensitivity(scores, labels, target=DEFAULT_TARGET_SENSITIVITY):
+    """
+    Seuil le plus haut dont la sensibilité atteint la cible
+
+    Avec k = ceil(cible × positifs), le seuil est juste sous le k-ième plus
+    grand score des tumeurs : ces k tumeurs (et leurs ex aequo) vérifient
+    score > seuil.
+
+    Args:
+        scores: probabilités (calibrées)
+        labels: étiquettes (1 = tumeur)
+        target: sensibilité visée, entre 0 et 1
+
+    Returns:
+        seuil (float)
+    """
+    positives = np.sort(np.asarray(scores, dtype=np.float64)[np.asarray(labels) == 1])[::-1]
+    if not len(positives):
+        raise ValueError("Aucune image avec tumeur: sensibilité non définie")
+    k = min(max(math.ceil(target * len(positives) - 1e-9), 1), len(positives))
+    return float(np.nextafter(positives[k - 1], -np.inf))
+
+
+def bootstrap_intervals(scores, labels, threshold, replicates=DEFAULT_BOOTSTRAP, confidence=0.95, seed=None):
+    """
+    Intervalles de confiance bootstrap (percentiles), vectorisés
+
+    Chaque réplique est un vecteur de poids (nombre de tirages de chaque
+    image) obtenu par bincount ; les images sont triées une seule fois et
+    les cumuls pondérés de toutes les répliques d'un bloc sont calculés
+    ensemble.
+
+    Args:
+        scores: probabilités (calibrées)
+        labels: étiquettes (1 = tumeur)
+        threshold: seuil de décision
+        replicates: nombre de répliques
+        confidence: niveau de confiance
+        seed: graine du tirage
+
+    Returns:
+        dictionnaire {métrique: (borne basse, borne haute)} pour 'auc_roc',
+        'average_precision', 'sensitivity', 'specificity'
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    labels = np.asarray(labels, dtype=np.float64)
+    n = len(scores)
+    rng = np.random.default_rng(seed)
+    above = scores > threshold
+    chunk = max(1, BOOTSTRAP_CHUNK_ELEMENTS // max(n, 1))
+
+    values = {name: [] for name in ('auc_roc', 'average_precision', 'sensitivity', 'specificity')}
+    for start in range(0, replicates, chunk):
+        rows = min(chunk, replicates - start)
+        draws = rng.integers(0, n, size=(rows, n)) + (np.arange(rows) * n)[:, None]
+        weights = np.bincount(draws.ravel(), minlength=rows * n).reshape(rows, n)
+
+        tps, fps, _ = _ranked(scores, labels, weights)
+        positives, negatives = tps[:, -1], fps[:, -1]
+        fpr = np.hstack([np.zeros((rows, 1)), _divide(fps, negatives[:, None])])
+        tpr = np.hstack([np.zeros((rows, 1)), _divide(tps, positives[:, None])])
+        values['auc_roc'].append(trapezoid_area(fpr, tpr))
+        values['average_precision'].append(np.where(positives > 0, _average_precision(tps, fps), np.nan))
+        values['sensitivity'].append(_divide(weights @ (labels * above), positives))
+        values['specificity'].append(_divide(weights @ ((1 - labels) * ~above), negatives))
+
+    tail = 100 * (1 - confidence) / 2
+    intervals = {}
+    for name, chunks in values.items():
+        samples = np.concatenate(chunks)
+        if np.all(np.isnan(samples)):
+            intervals[name] = (None, None)
+        else:
+            low, high = np.nanpercentile(samples, [tail, 100 - tail])
+            intervals[name] = (float(low), float(high))
+    return intervals
+
+
+def calibration_metrics(probabilities, labels, bins=DEFAULT_CALIBRATION_BINS):
+    """
+    Qualité de la calibration
+
+    Returns:
+        dictionnaire {'brier', 'log_loss', 'ece'} (ece: écart moyen entre
+        probabilité et fréquence observée, sur `bins` intervalles égaux)
+    """
+    p = np.asarray(probabilities, dtype=np.float64)
+    y = np.asarray(labels, dtype=np.float64)
+    clipped = np.clip(p, 1e-7, 1 - 1e-7)
+    bin_index = np.minimum((p * bins).astype(np.int64), bins - 1)
+    gap = np.bincount(bin_index, p, bins) - np.bincount(bin_index, y, bins)
+    return {
+        'brier': float(np.mean((p - y) ** 2)),
+        'log_loss': float(-np.mean(y * np.log(clipped) + (1 - y) * np.log1p(-clipped))),
+        'ece': float(np.sum(np.abs(gap)) / max(len(p), 1)),
+    }
+
+
+def fit_platt(probabilities, labels, max_iterations=100):
+    """
+    Calibration de Platt: p' = sigmoid(a · logit(p) + b)
+
+    Régression logistique par la méthode de Newton, avec les cibles
+    lissées de Platt ((N+ + 1) / (N+ + 2) et 1 / (N- + 2)).
+
+    Returns:
+        dictionnaire {'method': 'platt', 'a', 'b'}
+    """
+    x = logit(probabilities)
+    y = np.asarray(labels, dtype=np.float64)
+    n_pos = y.sum()
+    n_neg = len(y) - n_pos
+    targets = np.where(y == 1, (n_pos + 1) / (n_pos + 2), 1 / (n_neg + 2))
+    design = np.column_stack([x, np.ones_like(x)])
+
+    def loss(params):
+        z = design @ params
+        # -log(sigmoid(z)) = logaddexp(0, -z)
+        return np.sum(targets * np.logaddexp(0, -z) + (1 - targets) * np.logaddexp(0, z))
+
+    params = np.array([1.0, 0.0])
+    current = loss(params)
+    for _ in range(max_iterations):
+        q = sigmoid(design @ params)
+        gradient = design.T @ (q - targets)
+        hessian = (design * (q * (1 - q))[:, None]).T @ design + 1e-9 * np.eye(2)
+        step = np.linalg.solve(hessian, gradient)
+        # Recherche linéaire: le pas de Newton peut dépasser si les classes sont séparées
+        scale = 1.0
+        while scale > 1e-6 and loss(params - scale * step) > current:
+            scale /= 2
+        params = params - scale * step
+        previous, current = current, loss(params)
+        if abs(previous - current) <= 1e-12 * max(1.0, abs(current)):
+            break
+    return {'method': CALIBRATION_PLATT, 'a': float(params[0]), 'b': float(params[1])}
+
+
+def isotonic_fit(x, y, weights=None):
+    """
+    Régression isotonique (croissante) par pool-adjacent-violators vectorisé
+
+    À chaque passe, toutes les suites de blocs adjacents qui violent l'ordre
+    sont fusionnées d'un coup (cumsum des frontières + bincount) : le nombre
+    de passes dépend de l'imbrication des violations, pas du nombre de points.
+
+    Args:
+        x: abscisses triées par ordre croissant, distinctes
+        y: valeurs (moyennes par abscisse)
+        weights: poids de chaque abscisse (None = 1)
+
+    Returns:
+        valeurs ajustées (croissantes), alignées sur x
+    """
+    y = np.asarray(y, dtype=np.float64)
+    weights = np.ones(len(y)) if weights is None else np.asarray(weights, dtype=np.float64)
+    sums, totals = y * weights, weights.copy()
+    block_of = np.arange(len(y))
+
+    while len(sums) > 1:
+        means = sums / totals
+        violations = means[:-1] > means[1:]
+        if not violations.any():
+            break
+        # Un nouveau bloc commence là où l'ordre est respecté avec le précédent
+        groups = np.cumsum(np.r_[True, ~violations]) - 1
+        sums = np.bincount(groups, sums)
+        totals = np.bincount(groups, totals)
+        block_of = groups[block_of]
+
+    return (sums / totals)[block_of]
+
+
+def fit_isotonic(probabilities, labels):
+    """
+    Calibration isotonique: fonction en escalier croissante des probabilités
+
+    Seuls les points où la fonction change sont conservés (début et fin de
+    chaque palier), interpolés linéairement par DecisionPolicy.calibrate.
+
+    Returns:
+        dictionnaire {'method': 'isotonic', 'x', 'y'}
+    """
+    unique, inverse = np.unique(np.asarray(probabilities, dtype=np.float64), return_inverse=True)
+    counts = np.bincount(inverse).astype(np.float64)
+    means = np.bincount(inverse, np.asarray(labels, dtype=np.float64)) / counts
+    fitted = isotonic_fit(unique, means, counts)
+
+    changes = np.flatnonzero(np.diff(fitted))
+    keep = np.unique(np.r_[0, changes, changes + 1, len(unique) - 1])
+    return {'method': CALIBRATION_ISOTONIC, 'x': unique[keep].tolist(), 'y': fitted[keep].tolist()}
+
+
+def fit_calibration(method, probabilities, labels):
+    """
+    Ajuste une calibration des probabilités
+
+    Args:
+        method: 'none', 'platt' ou 'isotonic'
+
+    Returns:
+        dictionnaire de calibration (DecisionPolicy), None pour 'none'
+    """
+    if method == CALIBRATION_PLATT:
+        return fit_platt(probabilities, labels)
+    if method == CALIBRATION_ISOTONIC:
+        return fit_isotonic(probabilities, labels)
+    return None
+
+
+def evaluate(probabilities, labels, method=CALIBRATION_NONE, target_sensitivity=DEFAULT_TARGET_SENSITIVITY,
+             holdout=0.0, replicates=DEFAULT_BOOTSTRAP, seed=None):
+    """
+    Choisit la politique de décision et mesure ses performances
+
+    Args:
+        probabilities: probabilités brutes du modèle
+        labels: étiquettes (1 = tumeur)
+        method: calibration ('none', 'platt' ou 'isotonic')
+        target_sensitivity: sensibilité visée pour le seuil
+        holdout: fraction réservée à l'évaluation (0 = calibration et
+            évaluation sur tout le dataset)
+        replicates: répliques bootstrap (0 = pas d'intervalles)
+        seed: graine du partage et du bootstrap
+
+    Returns:
+        (DecisionPolicy, rapport)
+    """
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    labels = np.asarray(labels, dtype=np.int64)
+    fit_indices, eval_indices = stratified_split(labels, holdout, seed)
+
+    policy = DecisionPolicy(calibration=fit_calibration(method, probabilities[fit_indices], labels[fit_indices]))
+    calibrated = np.asarray(policy.calibrate(probabilities), dtype=np.float64)
+    policy.threshold = threshold_for_sensitivity(calibrated[fit_indices], labels[fit_indices], target_sensitivity)
+
+    scores, truth = calibrated[eval_indices], labels[eval_indices]
+    report = {
+        'images': len(eval_indices),
+        'tumors': int(truth.sum()),
+        'calibration_images': len(fit_indices),
+        'target_sensitivity': target_sensitivity,
+        'auc_roc': roc_auc(scores, truth),
+        'average_precision': average_precision(scores, truth),
+        'at_threshold': confusion_at(scores, truth, policy.threshold),
+        'at_default_threshold': confusion_at(probabilities[eval_indices], truth, DecisionPolicy().threshold),
+        'calibration_before': calibration_metrics(probabilities[eval_indices], truth),
+        'calibration_after': calibration_metrics(scores, truth),
+    }
+    if replicates:
+        report['intervals'] = bootstrap_intervals(scores, truth, policy.threshold, replicates, seed=seed)
+    return policy, report
+
+
+def write_curves(path, probabilities, labels):
+    """Écrit les courbes ROC et précision-rappel (une ligne par seuil distinct)"""
+    fpr, tpr, thresholds = roc_curve(probabilities, labels)
+    precision, recall, _ = pr_curve(probabilities, labels)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['threshold', 'fpr', 'tpr', 'precision', 'recall'])
+        writer.writerows(zip(thresholds[1:].tolist(), fpr[1:].tolist(), tpr[1:].tolist(),
+                             precision.tolist(), recall.tolist()))
+
+
+def print_report(policy, report):
+    """Affiche le rapport d'évaluation"""
+
+    def interval(name):
+        low, high = report.get('intervals', {}).get(name, (None, None))
+        return f" [{low:.4f} - {high:.4f}]" if low is not None else ""
+
+    chosen, default = report['at_threshold'], report['at_default_threshold']
+    print(f"\nÉvaluation sur {report['images']} images ({report['tumors']} tumeurs)")
+    print(f"   - AUC ROC:            {report['auc_roc']:.4f}{interval('auc_roc')}")
+    print(f"   - Précision moyenne:  {report['average_precision']:.4f}{interval('average_precision')}")
+    print(f"   - Politique choisie:  {policy.describe()} "
+          f"(sensibilité cible {report['target_sensitivity']:.0%})")
+    print(f"{'':<22}{'seuil choisi':>14}{'seuil 0,5 brut':>16}")
+    for name, label in (('sensitivity', 'Sensibilité'), ('specificity', 'Spécificité'),
+                        ('precision', 'Précision'), ('accuracy', 'Accuracy')):
+        print(f"   - {label:<17}{chosen[name]:>14.4f}{default[name]:>16.4f}{interval(name)}")
+    before, after = report['calibration_before'], report['calibration_after']
+    print(f"   - Brier:              {before['brier']:.4f} → {after['brier']:.4f}")
+    print(f"   - ECE:                {before['ece']:.4f} → {after['ece']:.4f}")
+
+
+def main(argv=None):
+    """Point d'entrée: évaluation d'un modèle et choix de sa politique de décision"""
+    from prediction_cache import file_sha256
+
+    parser = argparse.ArgumentParser(description="Évaluation, calibration et seuil de décision du modèle")
+    parser.add_argument('data_dir', help="Dataset étiqueté (sous-dossiers yes/ et no/)")
+    parser.add_argument('-m', '--model', default=MODEL_PATH, help=f"Modèle évalué (défaut: {MODEL_PATH})")
+    parser.add_argument('-b', '--batch-size', type=int, default=32, help="Images par lot (défaut: 32)")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="Threads de décodage des images (défaut: nombre de cœurs, max 8)")
+    parser.add_argument('--predictions', default=DEFAULT_PREDICTIONS,
+                        help=f"Probabilités enregistrées (défaut: {DEFAULT_PREDICTIONS})")
+    parser.add_argument('--calibration', choices=(CALIBRATION_NONE, CALIBRATION_PLATT, CALIBRATION_ISOTONIC),
+                        default=CALIBRATION_PLATT, help=f"Calibration des probabilités (défaut: {CALIBRATION_PLATT})")
+    parser.add_argument('-t', '--target-sensitivity', type=float, default=DEFAULT_TARGET_SENSITIVITY,
+                        help=f"Sensibilité visée pour le seuil (défaut: {DEFAULT_TARGET_SENSITIVITY})")
+    parser.add_argument('--holdout', type=float, default=0.0,
+                        help="Fraction réservée à l'évaluation, calibration sur le reste (défaut: 0)")
+    parser.add_argument('--bootstrap', type=int, default=DEFAULT_BOOTSTRAP,
+                        help=f"Répliques bootstrap des intervalles de confiance (défaut: {DEFAULT_BOOTSTRAP}, 0 = aucun)")
+    parser.add_argument('--seed', type=int, default=42, help="Graine du partage et du bootstrap (défaut: 42)")
+    parser.add_argument('--curves', default=None, help="Fichier CSV des courbes ROC et précision-rappel")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Afficher le rapport sans écrire les métadonnées du modèle")
+    args = parser.parse_args(argv)
+
+    if not 0 < args.target_sensitivity <= 1:
+        parser.error("--target-sensitivity doit être compris entre 0 (exclu) et 1")
+    if not 0 <= args.holdout < 1:
+        parser.error("--holdout doit être compris entre 0 et 1 (exclu)")
+    if args.bootstrap < 0:
+        parser.error("--bootstrap doit être positif ou nul")
+
+    image_paths, labels = collect_labeled_images(args.data_dir)
+    if not image_paths:
+        print(f"❌ Aucune image dans {args.data_dir}/yes ou {args.data_dir}/no")
+        return 1
+
+    fingerprint = file_sha256(args.model)
+    _, labels, probabilities, errors = dataset_predictions(
+        image_paths, labels, args.model, fingerprint, args.predictions, args.batch_size, args.workers)
+    if errors:
+        print(f"⚠️  {len(errors)} images illisibles exclues de l'évaluation")
+    if labels.min(initial=1) == labels.max(initial=0):
+        print("❌ L'évaluation demande des images avec et sans tumeur")
+        return 1
+
+    start = time.perf_counter()
+    policy, report = evaluate(probabilities, labels, args.calibration, args.target_sensitivity,
+                              args.holdout, args.bootstrap, args.seed)
+    print(f"✓ Métriques calculées en {time.perf_counter() - start:.2f}s")
+    print_report(policy, report)
+
+    if args.curves:
+        write_curves(args.curves, policy.calibrate(probabilities), labels)
+        print(f"\n✓ Courbes enregistrées dans {args.curves}")
+    if not args.dry_run:
+        path = save_metadata(args.model, policy, fingerprint, report)
+        print(f"\n✓ Politique de décision enregistrée dans {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""
+Brain Tumor Detection - Cartes de saillance Grad-CAM
+=====================================================
+Montre les régions de l'IRM qui ont le plus contribué à la prédiction, à
+partir de la dernière couche Conv2D(128) du CNN (Grad-CAM).
+
+- La probabilité et la carte de chaleur sont obtenues dans la même passe
+  avant : pas d'appel séparé au modèle pour la prédiction ;
+- un seul `GradientTape` par lot (et non une passe par image) : en mode
+  inférence, chaque prédiction ne dépend que de sa propre image, le
+  gradient de la somme des prédictions donne donc le gradient de chacune ;
+- les cartes (56×56 pour le modèle du notebook) sont petites : elles sont
+  mises en cache avec les prédictions et superposées à la miniature.
+
+Nécessite un modèle Keras (.keras) : un modèle TFLite ne fournit pas de
+gradients.
+
+Usage:
+    python brain_tumor_detector_app.py --gradcam
+    python brain_tumor_detector_app.py batch dossier_irm/ --gradcam cartes/
+"""
+
+import hashlib
+import os
+
+import cv2
+import numpy as np
+
+from detector_core import IMG_SIZE
+from inference_engine import BaseEngine
+
+# Nombre de filtres de la dernière couche convolutive du modèle du notebook
+GRADCAM_FILTERS = 128
+DEFAULT_OVERLAY_ALPHA = 0.4
+OVERLAY_SUFFIX = "_gradcam.png"
+
+
+def last_conv_layer(model, filters=GRADCAM_FILTERS):
+    """
+    Dernière couche Conv2D du modèle
+
+    Args:
+        model: modèle Keras
+        filters: nombre de filtres recherché (la dernière Conv2D est
+            utilisée si aucune couche n'a ce nombre de filtres)
+
+    Returns:
+        couche Keras
+    """
+    from tensorflow import keras
+
+    convs = [layer for layer in model.layers if isinstance(layer, keras.layers.Conv2D)]
+    if not convs:
+        raise ValueError("Le modèle ne contient aucune couche Conv2D (Grad-CAM impossible)")
+
+    matching = [layer for layer in convs if layer.filters == filters]
+    return (matching or convs)[-1]
+
+
+class GradCam(BaseEngine):
+    """
+    Prédictions et cartes Grad-CAM d'un lot en une seule passe
+
+    Utilisable comme moteur d'inférence (predict_on_batch) : les cartes sont
+    alors calculées puis ignorées.
+
+    Args:
+        model: modèle Keras chargé
+        layer_name: couche convolutive utilisée (défaut: dernière Conv2D(128))
+        img_size: taille d'entrée du modèle
+        warmup_batch_sizes: tailles de lot préchauffées dès la création
+    """
+
+    def __init__(self, model, layer_name=None, img_size=IMG_SIZE, warmup_batch_sizes=()):
+        import tensorflow as tf
+        from tensorflow import keras
+
+        layer = model.get_layer(layer_name) if layer_name else last_conv_layer(model)
+        self.layer_name = layer.name
+        self.img_size = img_size
+
+        if isinstance(model, keras.Sequential):
+            # Couches appelées une à une: la sortie intermédiaire reste sur le chemin du gradient
+            def forward(images):
+                features = outputs = images
+                for current in model.layers:
+                    outputs = current(outputs, training=False)
+                    if current is layer:
+                        features = outputs
+                return features, outputs
+        else:
+            # Même graphe que le modèle, avec la sortie de la couche convolutive en plus
+            grad_model = keras.Model(model.inputs, [layer.output, model.outputs[0]])
+
+            def forward(images):
+                return grad_model(images, training=False)
+
+        def predict_with_cams(images):
+            with tf.GradientTape() as tape:
+                features, predictions = forward(images)
+                score = tf.reduce_sum(predictions)
+            grads = tape.gradient(score, features)
+
+            # Poids de chaque filtre: moyenne spatiale de son gradient
+            weights = tf.reduce_mean(grads, axis=(1, 2), keepdims=True)
+            cams = tf.nn.relu(tf.reduce_sum(features * weights, axis=-1))
+            cams = cams / (tf.reduce_max(cams, axis=(1, 2), keepdims=True) + 1e-8)
+            return predictions, cams
+
+        input_spec = tf.TensorSpec((None, img_size, img_size, 1), tf.float32)
+        self._predict_fn = tf.function(predict_with_cams, input_signature=[input_spec])
+
+        self.warmup_time = self.warmup(warmup_batch_sizes)
+
+    def predict_with_heatmaps(self, images):
+        """
+        Prédit un lot et calcule sa carte Grad-CAM
+
+        Args:
+            images: tableau float32 (N, img_size, img_size, 1)
+
+        Returns:
+            (probabilités (N,), cartes float32 (N, h, w) entre 0 et 1)
+        """
+        predictions, cams = self._predict_fn(np.asarray(images, dtype=np.float32))
+        return predictions.numpy().reshape(-1), cams.numpy()
+
+    def predict_on_batch(self, images):
+        """Prédictions seules, au format (N, 1) des moteurs d'inférence"""
+        return self.predict_with_heatmaps(images)[0].reshape(-1, 1)
+
+
+def heatmap_to_uint8(heatmap):
+    """Carte 0-1 → uint8 0-255 (format du cache)"""
+    return np.clip(np.asarray(heatmap) * 255 + 0.5, 0, 255).astype(np.uint8)
+
+
+def overlay_heatmap(image, heatmap, alpha=DEFAULT_OVERLAY_ALPHA):
+    """
+    Superpose une carte de chaleur (palette JET) à une image
+
+    Args:
+        image: image uint8 en niveaux de gris (H, W) ou RGB (H, W, 3)
+        heatmap: carte (h, w), float entre 0 et 1 ou uint8
+        alpha: opacité de la carte
+
+    Returns:
+        image RGB uint8 (H, W, 3)
+    """
+    height, width = image.shape[:2]
+    if heatmap.dtype != np.uint8:
+        heatmap = heatmap_to_uint8(heatmap)
+
+    heatmap = cv2.resize(heatmap, (width, height), interpolation=cv2.INTER_LINEAR)
+    colored = cv2.cvtColor(cv2.applyColorMap(heatmap, cv2.COLORMAP_JET), cv2.COLOR_BGR2RGB)
+    if image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+    return cv2.addWeighted(image, 1 - alpha, colored, alpha, 0)
+
+
+def overlay_path(output_dir, image_path):
+    """
+    Fichier PNG de la superposition d'une image
+
+    Nom de l'image, extension et empreinte courte du chemin absolu
+    (ex: Y1_jpg_3fa2c1d0_gradcam.png) : a/Y1.jpg, b/Y1.jpg et Y1.png ont
+    chacune leur superposition.
+    """
+    stem, ext = os.path.splitext(os.path.basename(image_path))
+    digest = hashlib.sha1(os.path.abspath(image_path).encode('utf-8')).hexdigest()[:8]
+    return os.path.join(output_dir, f"{stem}_{ext.lstrip('.').lower()}_{digest}{OVERLAY_SUFFIX}")
+
+
+def write_overlays(output_dir, image_paths, images, heatmaps, alpha=DEFAULT_OVERLAY_ALPHA):
+    """
+    Écrit les superpositions d'un lot en PNG
+
+    Args:
+        output_dir: dossier de destination (créé si besoin)
+        image_paths: chemins des images analysées
+        images: images uint8 (N, s, s) vues par le modèle
+        heatmaps: cartes Grad-CAM (N, h, w)
+        alpha: opacité de la carte
+
+    Returns:
+        liste des fichiers écrits
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    for image_path, image, heatmap in zip(image_paths, images, heatmaps):
+        path = overlay_path(output_dir, image_path)
+        cv2.imwrite(path, cv2.cvtColor(overlay_heatmap(image, heatmap, alpha), cv2.COLOR_RGB2BGR))
+        written.append(path)
+    return written
@@ -0,0 +1,337 @@
+"""
+Brain Tumor Detection - Lecture des grandes images et des fichiers multi-coupes
+================================================================================
+`cv2.imread` décode toujours l'image entière à pleine résolution (et seule
+la première page d'un TIFF), alors que le modèle n'en voit qu'une version
+224×224. Pour les exports de plusieurs centaines de mégapixels et les piles
+de coupes :
+
+- l'en-tête est lu d'abord (PIL, sans décodage) : une image qui n'a pas
+  besoin d'être réduite suit le chemin habituel (OpenCV, pixels identiques
+  à l'entraînement) ;
+- JPEG : décodage directement à 1/2, 1/4 ou 1/8 de la résolution (mise à
+  l'échelle dans le domaine DCT par libjpeg) ;
+- TIFF pyramidal : la plus petite page de résolution réduite
+  (NewSubfileType) suffisante est lue à la place de la pleine résolution ;
+- TIFF multi-pages : chaque coupe est une page, lue à la demande ; une
+  étude est analysée par lots de coupes dans un tampon réutilisé, la
+  mémoire reste donc bornée à une page décodée et un lot.
+
+L'image réduite garde au moins MIN_OVERSAMPLING fois la taille d'entrée du
+modèle avant le redimensionnement final (resize_for_model, comme à
+l'entraînement).
+
+Usage:
+    python brain_tumor_detector_app.py batch etudes/ --slices -o coupes.csv
+"""
+
+import io
+import math
+import os
+
+import numpy as np
+from PIL import Image
+
+from detector_core import IMG_SIZE, THRESHOLD, decode_grayscale, load_grayscale, pil_to_grayscale, \
+    resize_for_model
+from instrumentation import stage
+
+# Source des lignes de synthèse d'une étude (toutes ses coupes)
+SOURCE_STUDY = "study"
+
+# Taille minimale de l'image réduite, en multiple de la taille d'entrée du modèle
+MIN_OVERSAMPLING = 4
+
+# Même limite que le décodeur d'OpenCV (CV_IO_MAX_IMAGE_PIXELS) ; celle de PIL
+# (~179 mégapixels) refuserait les grands exports du scanner
+MAX_IMAGE_PIXELS = 1 << 30
+if Image.MAX_IMAGE_PIXELS is not None:
+    Image.MAX_IMAGE_PIXELS = max(Image.MAX_IMAGE_PIXELS, MAX_IMAGE_PIXELS)
+
+# Tag TIFF NewSubfileType : bit 0 = version de résolution réduite de la page précédente
+SUBFILE_TYPE_TAG = 254
+REDUCED_RESOLUTION = 1
+
+
+def slice_levels(img):
+    """
+    Coupes d'une image et leurs niveaux de résolution (lecture des en-têtes seulement)
+
+    Args:
+        img: image PIL ouverte
+
+    Returns:
+        liste des coupes ; chaque coupe est une liste de (page, (largeur, hauteur)),
+        pleine résolution en premier
+    """
+    slices = []
+    for page in range(getattr(img, 'n_frames', 1)):
+        if page:
+            img.seek(page)
+        tags = getattr(img, 'tag_v2', None)
+        reduced = tags is not None and tags.get(SUBFILE_TYPE_TAG, 0) & REDUCED_RESOLUTION
+        if reduced and slices:
+            slices[-1].append((page, img.size))
+        else:
+            slices.append([(page, img.size)])
+    return slices
+
+
+def target_side(img_size=IMG_SIZE):
+    """Plus petit côté de l'image réduite (MIN_OVERSAMPLING × taille du modèle)"""
+    return MIN_OVERSAMPLING * img_size
+
+
+def pick_level(levels, img_size=IMG_SIZE):
+    """
+    Niveau de résolution d'une coupe à décoder
+
+    Returns:
+        (page, (largeur, hauteur)) : le plus petit niveau dont le petit côté
+        atteint target_side, sinon la pleine résolution
+    """
+    target = target_side(img_size)
+    large_enough = [level for level in levels if min(level[1]) >= target]
+    if not large_enough:
+        return levels[0]
+    return min(large_enough, key=lambda level: level[1][0] * level[1][1])
+
+
+def page_to_grayscale(img):
+    """
+    Page PIL décodée → niveaux de gris uint8
+
+    Les pages 16 bits (fréquentes pour les exports médicaux) sont ramenées à
+    8 bits comme le fait OpenCV (division par 256).
+    """
+    if img.mode.startswith('I;16'):
+        return (np.asarray(img) >> 8).astype(np.uint8)
+    return pil_to_grayscale(img)
+
+
+def read_level(img, level, img_size=IMG_SIZE):
+    """
+    Décode une page au plus petit format suffisant
+
+    Args:
+        img: image PIL ouverte
+        level: (page, (largeur, hauteur)) choisi par pick_level
+        img_size: taille d'entrée du modèle
+
+    Returns:
+        tableau numpy 2D uint8 (le petit côté reste >= target_side si la page le permet)
+    """
+    page, (width, height) = level
+    if getattr(img, 'n_frames', 1) > 1:
+        img.seek(page)
+
+    if img.format == 'JPEG':
+        # Mise à l'échelle DCT: libjpeg choisit le plus grand facteur (1/2 à 1/8)
+        # qui garde au moins la taille demandée
+        scale = max(target_side(img_size) / min(width, height), 1 / 8)
+        if scale < 1:
+            img.draft('L', (math.ceil(width * scale), math.ceil(height * scale)))
+    return page_to_grayscale(img)
+
+
+def needs_reduction(img, slices, img_size=IMG_SIZE):
+    """
+    Faut-il quitter le décodage habituel (OpenCV) ?
+
+    Oui pour un fichier multi-coupes, une page de résolution réduite
+    utilisable, ou un JPEG au moins deux fois plus grand que target_side
+    (plus petit facteur de mise à l'échelle DCT : 1/2).
+    """
+    if len(slices) > 1:
+        return True
+    if pick_level(slices[0], img_size)[0] != 0:
+        return True
+    width, height = slices[0][0][1]
+    return img.format == 'JPEG' and min(width, height) >= 2 * target_side(img_size)
+
+
+def decode_reduced(source, img_size=IMG_SIZE, name=None):
+    """
+    Décode la première coupe d'une image en niveaux de gris, à résolution réduite si possible
+
+    Les images sans réduction possible (voir needs_reduction) sont décodées
+    comme à l'entraînement (decode_grayscale / load_grayscale).
+
+    Args:
+        source: chemin du fichier ou contenu brut (bytes)
+        img_size: taille d'entrée du modèle
+        name: nom de l'image pour les messages d'erreur
+
+    Returns:
+        tableau numpy 2D (hauteur, largeur) en uint8
+    """
+    is_path = isinstance(source, (str, os.PathLike))
+    name = name or (source if is_path else "image")
+    fallback = (lambda: load_grayscale(source)) if is_path else (lambda: decode_grayscale(source, name))
+
+    try:
+        img = Image.open(source if is_path else io.BytesIO(source))
+    except Exception:
+        # Format inconnu de PIL: décodage habituel (OpenCV)
+        return fallback()
+
+    with img:
+        try:
+            slices = slice_levels(img)
+            if not needs_reduction(img, slices, img_size):
+                return fallback()
+            return read_level(img, pick_level(slices[0], img_size), img_size)
+        except (OSError, ValueError, SyntaxError):
+            raise ValueError(f"Impossible de lire l'image: {name}")
+
+
+def count_slices(image_path):
+    """Nombre de coupes d'un fichier (1 pour une image simple ou illisible par PIL)"""
+    try:
+        with Image.open(image_path) as img:
+            return len(slice_levels(img))
+    except Exception:
+        return 1
+
+
+def iter_slices(image_path, img_size=IMG_SIZE):
+    """
+    Coupes d'un fichier, décodées une à une et redimensionnées pour le modèle
+
+    Une seule page décodée est en mémoire à la fois.
+
+    Args:
+        image_path: chemin du fichier (TIFF multi-pages, ou image simple)
+        img_size: taille d'entrée du modèle
+
+    Yields:
+        (indice de la coupe, image uint8 (img_size, img_size))
+    """
+    try:
+        img = Image.open(image_path)
+    except Exception:
+        # Format inconnu de PIL: une seule coupe, décodage habituel (OpenCV)
+        with stage('decode'):
+            image = load_grayscale(image_path)
+        yield 0, resize_for_model(image, img_size)
+        return
+
+    with img:
+        try:
+            slices = slice_levels(img)
+        except (OSError, ValueError, SyntaxError):
+            raise ValueError(f"Impossible de lire l'image: {image_path}")
+
+        if not needs_reduction(img, slices, img_size):
+            with stage('decode'):
+                image = load_grayscale(image_path)
+            yield 0, resize_for_model(image, img_size)
+            return
+
+        for index, levels in enumerate(slices):
+            try:
+                with stage('decode'):
+                    image = read_level(img, pick_level(levels, img_size), img_size)
+            except (OSError, ValueError, SyntaxError):
+                raise ValueError(f"Impossible de lire la coupe {index + 1} de {image_path}")
+            with stage('resize'):
+                resized = resize_for_model(image, img_size)
+            del image
+            yield index, resized
+
+
+def slice_name(image_path, index):
+    """Nom d'une coupe dans les résultats: chemin#numéro (à partir de 1)"""
+    return f"{image_path}#{index + 1}"
+
+
+class SliceBatch:
+    """
+    Lot de coupes (éventuellement de plusieurs études)
+
+    Attributes:
+        items: (chemin de l'étude, indice de la coupe ou None en cas d'erreur)
+        images: vue uint8 (len(items), img_size, img_size) sur le tampon partagé
+        valid: indices des coupes décodées avec succès
+        errors: dictionnaire {indice: message d'erreur}
+    """
+
+    def __init__(self, items, images, valid, errors):
+        self.items = items
+        self.images = images
+        self.valid = valid
+        self.errors = errors
+
+    def valid_images(self):
+        """Coupes à analyser uniquement (sans copie si tout le lot est valide)"""
+        if len(self.valid) == len(self.items):
+            return self.images
+        return self.images[self.valid]
+
+
+def iter_slice_batches(image_paths, batch_size, img_size=IMG_SIZE):
+    """
+    Génère des lots de batch_size coupes, études à la suite les unes des autres
+
+    Un seul tampon (batch_size, img_size, img_size) est réutilisé : les
+    images d'un lot ne doivent pas être conservées au-delà d'une itération.
+    Une erreur de lecture arrête l'étude concernée (ses coupes déjà lues
+    restent dans les lots précédents) et occupe une place du lot.
+
+    Yields:
+        SliceBatch
+    """
+    buffer = np.empty((batch_size, img_size, img_size), dtype=np.uint8)
+    items, errors = [], {}
+
+    def flush():
+        batch = SliceBatch(list(items), buffer[:len(items)],
+                           [i for i in range(len(items)) if i not in errors], dict(errors))
+        items.clear()
+        errors.clear()
+        return batch
+
+    for path in image_paths:
+        try:
+            for index, image in iter_slices(path, img_size):
+                buffer[len(items)] = image
+                items.append((path, index))
+                if len(items) == batch_size:
+                    yield flush()
+        except Exception as e:
+            errors[len(items)] = str(e)
+            items.append((path, None))
+            if len(items) == batch_size:
+                yield flush()
+
+    if items:
+        yield flush()
+
+
+def aggregate_study(probabilities, threshold=THRESHOLD):
+    """
+    Synthèse des coupes d'une étude
+
+    L'étude est positive dès qu'une coupe l'est : sa probabilité est celle
+    de la coupe la plus suspecte.
+
+    Args:
+        probabilities: probabilités des coupes, dans l'ordre
+        threshold: seuil de décision
+
+    Returns:
+        dictionnaire {'slices', 'probability', 'mean_probability',
+        'positive_slices', 'top_slice' (numéro à partir de 1)}
+    """
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    if not len(probabilities):
+        return {'slices': 0, 'probability': None, 'mean_probability': None,
+                'positive_slices': 0, 'top_slice': None}
+    top = int(np.argmax(probabilities))
+    return {
+        'slices': len(probabilities),
+        'probability': float(probabilities[top]),
+        'mean_probability': float(probabilities.mean()),
+        'positive_slices': int((probabilities > threshold).sum()),
+        'top_slice': top + 1,
+    }
@@ -0,0 +1,196 @@
+"""
+Brain Tumor Detection - Moteur d'inférence compilé
+===================================================
+Enveloppe autour du modèle Keras chargé qui remplace `model.predict` :
+
+- appel compilé avec `tf.function` et une signature fixe (None, 224, 224, 1) :
+  une seule trace sert pour toutes les tailles de lot ;
+- préchauffage au chargement : le premier appel (trace du graphe, allocation
+  des noyaux) n'est plus payé par la première analyse ;
+- pas d'adaptateur de données ni de boucle de `Model.predict` : la latence
+  d'une image seule est celle du réseau.
+
+`load_engine()` choisit le moteur selon le fichier : .keras (moteur compilé)
+ou .tflite (interpréteur TFLite quantifié, voir tflite_backend.py).
+
+Usage (mesure de latence p50/p99, model.predict vs moteur compilé):
+    python inference_engine.py --model best_brain_tumor_model.keras --runs 200
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from detector_core import MODEL_PATH, IMG_SIZE, load_detector_model
+
+DEFAULT_WARMUP_BATCH_SIZES = (1,)
+
+
+class BaseEngine:
+    """
+    Interface commune des moteurs d'inférence (Keras compilé, TFLite)
+
+    Les sous-classes définissent `img_size` et `predict_on_batch`.
+    """
+
+    img_size = IMG_SIZE
+    warmup_time = 0.0
+
+    def predict_on_batch(self, images):
+        raise NotImplementedError
+
+    def warmup(self, batch_sizes=DEFAULT_WARMUP_BATCH_SIZES):
+        """
+        Exécute une prédiction factice pour chaque taille de lot
+
+        Returns:
+            durée du préchauffage en secondes
+        """
+        start = time.perf_counter()
+        for batch_size in batch_sizes:
+            self.predict_on_batch(np.zeros((batch_size, self.img_size, self.img_size, 1), dtype=np.float32))
+        return time.perf_counter() - start
+
+    def predict(self, images, batch_size=None):
+        """
+        Prédit un nombre quelconque d'images, découpées en lots de batch_size
+
+        Args:
+            images: tableau float32 (N, img_size, img_size, 1)
+            batch_size: taille des lots (None = tout en un seul appel)
+
+        Returns:
+            tableau (N,) des probabilités de tumeur
+        """
+        images = np.asarray(images, dtype=np.float32)
+        if not batch_size or batch_size >= len(images):
+            return self.predict_on_batch(images).reshape(-1)
+
+        return np.concatenate([
+            self.predict_on_batch(images[start:start + batch_size]).reshape(-1)
+            for start in range(0, len(images), batch_size)
+        ])
+
+
+class InferenceEngine(BaseEngine):
+    """
+    Prédiction compilée et préchauffée autour d'un modèle Keras
+
+    Args:
+        model: modèle Keras chargé
+        img_size: taille d'entrée du modèle
+        warmup_batch_sizes: tailles de lot préchauffées dès la création
+    """
+
+    def __init__(self, model, img_size=IMG_SIZE, warmup_batch_sizes=DEFAULT_WARMUP_BATCH_SIZES):
+        import tensorflow as tf
+
+        self.model = model
+        self.img_size = img_size
+
+        input_spec = tf.TensorSpec((None, img_size, img_size, 1), tf.float32)
+        self._predict_fn = tf.function(
+            lambda images: model(images, training=False),
+            input_signature=[input_spec],
+        )
+
+        self.warmup_time = self.warmup(warmup_batch_sizes)
+
+    @classmethod
+    def from_path(cls, model_path=MODEL_PATH, **kwargs):
+        """Charge le modèle depuis un fichier .keras et crée le moteur"""
+        return cls(load_detector_model(model_path), **kwargs)
+
+    def predict_on_batch(self, images):
+        """
+        Prédit un lot en un seul appel au graphe compilé
+
+        Args:
+            images: tableau float32 (N, img_size, img_size, 1)
+
+        Returns:
+            tableau (N, 1) des probabilités (même format que Keras)
+        """
+        images = np.asarray(images, dtype=np.float32)
+        return self._predict_fn(images).numpy()
+
+
+def load_engine(model_path=MODEL_PATH, warmup_batch_sizes=DEFAULT_WARMUP_BATCH_SIZES, num_threads=None):
+    """
+    Charge le moteur adapté au fichier modèle
+
+    Args:
+        model_path: fichier .keras (moteur compilé) ou .tflite (interpréteur TFLite)
+        warmup_batch_sizes: tailles de lot préchauffées
+        num_threads: threads de l'interpréteur TFLite (None = défaut)
+
+    Returns:
+        moteur d'inférence (InferenceEngine ou TFLiteEngine)
+    """
+    if model_path.lower().endswith('.tflite'):
+        from tflite_backend import TFLiteEngine
+        return TFLiteEngine(model_path, num_threads=num_threads, warmup_batch_sizes=warmup_batch_sizes)
+
+    return InferenceEngine.from_path(model_path, warmup_batch_sizes=warmup_batch_sizes)
+
+
+def measure_latency(predict_fn, images, runs=100):
+    """
+    Mesure la latence d'une fonction de prédiction
+
+    Args:
+        predict_fn: fonction appelée avec le lot d'images
+        images: lot d'entrée
+        runs: nombre de mesures
+
+    Returns:
+        dictionnaire {'p50', 'p99', 'mean'} en millisecondes
+    """
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        predict_fn(images)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    latencies = np.array(latencies)
+    return {
+        'p50': float(np.percentile(latencies, 50)),
+        'p99': float(np.percentile(latencies, 99)),
+        'mean': float(latencies.mean()),
+    }
+
+
+def main(argv=None):
+    """Compare la latence de model.predict et du moteur compilé (lot de 1)"""
+    parser = argparse.ArgumentParser(description="Latence p50/p99: model.predict vs moteur compilé")
+    parser.add_argument('-m', '--model', default=MODEL_PATH, help=f"Chemin du modèle (défaut: {MODEL_PATH})")
+    parser.add_argument('-n', '--runs', type=int, default=100, help="Nombre de mesures (défaut: 100)")
+    parser.add_argument('-b', '--batch-size', type=int, default=1, help="Taille du lot (défaut: 1)")
+    args = parser.parse_args(argv)
+
+    model = load_detector_model(args.model)
+    images = np.random.rand(args.batch_size, IMG_SIZE, IMG_SIZE, 1).astype(np.float32)
+
+    # Avant: model.predict (premier appel mesuré à part, il inclut la trace)
+    start = time.perf_counter()
+    model.predict(images, verbose=0)
+    first_call = (time.perf_counter() - start) * 1000
+    before = measure_latency(lambda x: model.predict(x, verbose=0), images, args.runs)
+
+    # Après: moteur compilé et préchauffé
+    engine = InferenceEngine(model, warmup_batch_sizes=(args.batch_size,))
+    after = measure_latency(engine.predict_on_batch, images, args.runs)
+
+    print(f"\nLatence pour un lot de {args.batch_size} ({args.runs} mesures):")
+    print(f"   {'':22} {'p50':>10} {'p99':>10}")
+    print(f"   {'model.predict':22} {before['p50']:>8.2f}ms {before['p99']:>8.2f}ms"
+          f"   (1er appel: {first_call:.0f}ms)")
+    print(f"   {'InferenceEngine':22} {after['p50']:>8.2f}ms {after['p99']:>8.2f}ms"
+          f"   (préchauffage: {engine.warmup_time * 1000:.0f}ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,409 @@
+"""
+Brain Tumor Detection - Serveur d'inférence HTTP local
+=======================================================
+Charge le modèle une seule fois et analyse les images envoyées par HTTP
+(localhost), pour que les autres outils n'aient pas à charger TensorFlow
+et le CNN eux-mêmes.
+
+- Chaque requête est décodée dans son propre thread, puis placée dans une
+  file commune ;
+- un thread unique regroupe les requêtes simultanées en micro-lots (au plus
+  `max_batch_size` images, en attendant au plus `max_wait_ms` après la
+  première) et les analyse en un seul appel au modèle ;
+- la probabilité et la confiance sont celles de l'application
+  (même prétraitement, même interprétation) ;
+- avec --registry, le serveur suit la sélection active du registre des
+  modèles (model_registry.py) : la nouvelle version est chargée et
+  préchauffée en arrière-plan, puis sert les micro-lots suivants sans
+  interrompre ceux en cours ; chaque réponse indique la version qui l'a
+  produite et, pour un ensemble, la probabilité de chaque modèle.
+
+Usage:
+    python brain_tumor_detector_app.py serve --port 8000 --max-batch-size 32 --max-wait-ms 5
+    python brain_tumor_detector_app.py serve --registry model_registry.json
+    curl --data-binary @irm.jpg http://127.0.0.1:8000/predict
+
+Points d'accès:
+    POST /predict   corps = contenu brut du fichier image → JSON du résultat
+    POST /reload    relire le registre maintenant (--registry)
+    GET  /health    état du serveur, version du modèle et statistiques des micro-lots
+    GET  /metrics   temps par étape et ressources (format texte Prometheus)
+"""
+
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+from detector_core import (
+    MODEL_PATH, IMG_SIZE, THRESHOLD, resize_for_model, to_model_input,
+    interpret_prediction, result_status,
+)
+from inference_engine import load_engine
+from model_registry import DEFAULT_RELOAD_INTERVAL, HotSwapEngine, ModelRegistry, predict_members
+from model_metadata import DecisionPolicy, load_policy
+from prediction_cache import file_sha256
+from results_store import model_version
+from instrumentation import TRACER, stage
+from image_ingest import decode_reduced
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+DEFAULT_MAX_BATCH_SIZE = 32
+DEFAULT_MAX_WAIT_MS = 5.0
+MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+REQUEST_TIMEOUT = 60.0
+
+# Marqueur d'arrêt du thread de micro-lots
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    Regroupe les images soumises par plusieurs threads en micro-lots
+
+    Args:
+        engine: moteur d'inférence (predict_on_batch), éventuellement
+            HotSwapEngine : chaque micro-lot est alors analysé en entier par
+            la version active à son début
+        max_batch_size: nombre maximal d'images par appel au modèle
+        max_wait_ms: attente maximale après la première image d'un lot
+        img_size: taille d'entrée du modèle
+        model_version: version du modèle indiquée dans les réponses (sans registre)
+        policy: DecisionPolicy du modèle (sans registre ; celle de la version
+            active sinon) : les probabilités rendues sont calibrées
+    """
+
+    def __init__(self, engine, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                 img_size=IMG_SIZE, model_version=None, policy=None):
+        self.engine = engine
+        self.model_version = model_version
+        self.policy = policy or DecisionPolicy()
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.img_size = img_size
+
+        self.requests = 0
+        self.batches = 0
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, image, details=False):
+        """
+        Ajoute une image à analyser
+
+        Args:
+            image: image uint8 (img_size, img_size) déjà redimensionnée
+            details: ajouter au résultat {'model_version', 'models', 'threshold'}
+                (version qui a analysé l'image, probabilité de chaque modèle d'un
+                ensemble, seuil de décision de cette version)
+
+        Returns:
+            Future dont le résultat est (probabilité, taille du micro-lot),
+            ou (probabilité, taille du micro-lot, détails)
+        """
+        future = Future()
+        self._queue.put((image, future, details))
+        return future
+
+    def _collect(self, first):
+        """Complète un lot jusqu'à max_batch_size ou jusqu'à l'échéance"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+
+            batch = [item for item in self._collect(first) if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            engine, version, policy = self.engine, self.model_version, self.policy
+            if isinstance(engine, HotSwapEngine):
+                # Version figée pour tout le lot: une bascule ne concerne que les lots suivants
+                active = engine.active
+                engine, version, policy = active.engine, active.version, active.policy
+
+            batch_trace = TRACER.trace('server_batch', batch_size=len(batch))
+            try:
+                with TRACER.activate(batch_trace):
+                    with stage('normalize'):
+                        inputs = to_model_input(np.stack([image for image, _, _ in batch]))
+                    with stage('predict'):
+                        predictions, members = predict_members(engine, inputs)
+                    predictions = policy.calibrate(predictions)
+            except Exception as e:
+                batch_trace.finish(error=str(e))
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            batch_trace.finish()
+
+            self.requests += len(batch)
+            self.batches += 1
+            for k, ((_, future, details), prediction) in enumerate(zip(batch, predictions)):
+                if details:
+                    models = {name: float(p[k]) for name, p in members.items()}
+                    future.set_result((float(prediction), len(batch),
+                                       {'model_version': version, 'models': models,
+                                        'threshold': policy.threshold}))
+                else:
+                    future.set_result((float(prediction), len(batch)))
+
+    def model_status(self):
+        """Version servie (et état du rechargement avec un registre)"""
+        if isinstance(self.engine, HotSwapEngine):
+            return self.engine.status()
+        return {'model_version': self.model_version}
+
+    def stats(self):
+        """Statistiques des micro-lots depuis le démarrage"""
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'mean_batch_size': self.requests / self.batches if self.batches else 0.0,
+            'queued': self._queue.qsize(),
+        }
+
+    def close(self):
+        """Arrête le thread après les lots en attente"""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+
+def make_response(prediction, batch_size, image_name=None, details=None):
+    """Résultat JSON d'une analyse (mêmes valeurs que l'application, détails de MicroBatcher.submit)"""
+    has_tumor, confidence = interpret_prediction(prediction, (details or {}).get('threshold', THRESHOLD))
+    return {
+        'image': image_name,
+        'probability': prediction,
+        'confidence': confidence,
+        'has_tumor': bool(has_tumor),
+        'result': result_status(has_tumor),
+        'batch_size': batch_size,
+        **(details or {}),
+    }
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    """Requêtes HTTP du serveur d'inférence"""
+
+    server_version = "BrainTumorDetector/1.0"
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/health':
+            self.send_json(200, {'status': 'ok', 'model': self.server.model_path,
+                                 **self.server.batcher.model_status(), **self.server.batcher.stats(),
+                                 **TRACER.runtime_info()})
+        elif path == '/metrics':
+            body = TRACER.prometheus_text().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_json(404, {'error': "Point d'accès inconnu"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path == '/reload':
+            engine = self.server.batcher.engine
+            if not isinstance(engine, HotSwapEngine):
+                self.send_json(409, {'error': "Serveur démarré sans registre des modèles (--registry)"})
+                return
+            engine.check_for_update()
+            self.send_json(202 if engine.loading else 200, engine.status())
+            return
+        if url.path != '/predict':
+            self.send_json(404, {'error': "Point d'accès inconnu"})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            self.send_json(400, {'error': "En-tête Content-Length invalide"})
+            return
+        if length <= 0:
+            self.send_json(400, {'error': "Corps de la requête vide (contenu du fichier image attendu)"})
+            return
+        if length > MAX_UPLOAD_BYTES:
+            self.send_json(413, {'error': "Image trop volumineuse"})
+            return
+
+        image_name = parse_qs(url.query).get('name', [None])[0]
+        trace = TRACER.trace('server', image=image_name)
+
+        with trace.stage('read_body'):
+            data = self.rfile.read(length)
+
+        try:
+            with trace.stage('decode'):
+                image = decode_reduced(data, self.server.batcher.img_size, image_name or "requête")
+            with trace.stage('resize'):
+                image = resize_for_model(image, self.server.batcher.img_size)
+        except ValueError as e:
+            trace.finish(error=str(e))
+            self.send_json(400, {'error': str(e)})
+            return
+
+        try:
+            # Attente du micro-lot + prédiction
+            with trace.stage('batch_wait'):
+                prediction, batch_size, details = self.server.batcher.submit(image, details=True).result(
+                    timeout=REQUEST_TIMEOUT)
+        except Exception as e:
+            trace.finish(error=str(e))
+            self.send_json(500, {'error': f"Erreur lors de l'analyse: {e}"})
+            return
+
+        trace.finish(batch_size=batch_size, probability=prediction)
+        self.send_json(200, make_response(prediction, batch_size, image_name, details))
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class InferenceServer(ThreadingHTTPServer):
+    """
+    Serveur HTTP multi-thread partageant un seul MicroBatcher
+
+    Args:
+        address: (hôte, port)
+        batcher: MicroBatcher utilisé par toutes les requêtes
+        model_path: modèle chargé ou registre suivi (affiché par /health)
+        verbose: journaliser chaque requête
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, batcher, model_path=MODEL_PATH, verbose=False):
+        super().__init__(address, PredictionHandler)
+        self.batcher = batcher
+        self.model_path = model_path
+        self.verbose = verbose
+
+
+def parse_args(argv=None):
+    """Arguments de la ligne de commande du serveur"""
+    parser = argparse.ArgumentParser(
+        prog="brain_tumor_detector_app.py serve",
+        description="Serveur d'inférence HTTP local avec micro-lots dynamiques"
+    )
+    parser.add_argument('-m', '--model', default=MODEL_PATH,
+                        help=f"Chemin du modèle .keras ou .tflite (défaut: {MODEL_PATH})")
+    parser.add_argument('--registry', default=None, metavar='REGISTRE',
+                        help="Suivre la sélection active du registre des modèles (model_registry.py) "
+                             "à la place de --model : nouvelle version chargée sans interruption")
+    parser.add_argument('--reload-interval', type=float, default=DEFAULT_RELOAD_INTERVAL,
+                        help=f"Intervalle de relecture du registre en secondes (défaut: {DEFAULT_RELOAD_INTERVAL})")
+    parser.add_argument('-t', '--threads', type=int, default=None,
+                        help="Threads de l'interpréteur TFLite (défaut: nombre de cœurs)")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"Adresse d'écoute (défaut: {DEFAULT_HOST})")
+    parser.add_argument('-p', '--port', type=int, default=DEFAULT_PORT,
+                        help=f"Port d'écoute (défaut: {DEFAULT_PORT})")
+    parser.add_argument('-b', '--max-batch-size', type=int, default=DEFAULT_MAX_BATCH_SIZE,
+                        help=f"Images maximum par micro-lot (défaut: {DEFAULT_MAX_BATCH_SIZE})")
+    parser.add_argument('-w', '--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help=f"Attente maximale pour compléter un micro-lot (défaut: {DEFAULT_MAX_WAIT_MS}ms)")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Journaliser chaque requête")
+    parser.add_argument('--trace', default=None,
+                        help="Enregistrer le temps de chaque étape des requêtes (fichier JSONL)")
+    args = parser.parse_args(argv)
+
+    if args.max_batch_size < 1:
+        parser.error("--max-batch-size doit être supérieur ou égal à 1")
+    if args.max_wait_ms < 0:
+        parser.error("--max-wait-ms doit être positif")
+    if args.reload_interval <= 0:
+        parser.error("--reload-interval doit être strictement positif")
+
+    return args
+
+
+def serve_main(argv=None):
+    """Point d'entrée du mode serveur"""
+    args = parse_args(argv)
+
+    version = None
+    policy = None
+    try:
+        if args.registry:
+            engine = HotSwapEngine(ModelRegistry(args.registry), (1, args.max_batch_size), args.threads)
+        else:
+            engine = load_engine(args.model, warmup_batch_sizes=(1, args.max_batch_size), num_threads=args.threads)
+            fingerprint = file_sha256(args.model)
+            version = model_version(args.model, fingerprint)
+            policy = load_policy(args.model, fingerprint)
+    except Exception as e:
+        print(f"❌ Erreur lors du chargement du modèle: {e}")
+        return 1
+    if args.registry:
+        engine.start_watching(args.reload_interval)
+        print(f"✓ Modèle {engine.active.version} chargé depuis le registre {args.registry} "
+              f"(relu toutes les {args.reload_interval:g}s)")
+    else:
+        print(f"✓ Modèle chargé avec succès depuis {args.model}")
+        if not policy.is_default:
+            print(f"✓ Politique de décision: {policy.describe()}")
+
+    if args.trace:
+        TRACER.set_record_file(args.trace)
+
+    batcher = MicroBatcher(engine, args.max_batch_size, args.max_wait_ms, model_version=version, policy=policy)
+    server = InferenceServer((args.host, args.port), batcher, args.registry or args.model, args.verbose)
+    print(f"✓ Serveur prêt sur http://{args.host}:{server.server_port} "
+          f"(micro-lots de {args.max_batch_size} max, attente {args.max_wait_ms:g}ms)")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nArrêt du serveur...")
+    finally:
+        server.server_close()
+        batcher.close()
+        if args.registry:
+            engine.close()
+
+    stats = batcher.stats()
+    print(f"✓ {stats['requests']} images analysées en {stats['batches']} micro-lots "
+          f"(moyenne {stats['mean_batch_size']:.1f} images/lot)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(serve_main())
@@ -0,0 +1,377 @@
+"""
+Brain Tumor Detection - Mesure du temps par étape et des ressources
+====================================================================
+Instrumentation légère, active en permanence, de toutes les analyses
+(interface, analyse par lots, serveur, surveillance de dossiers) :
+
+- `stage(nom)` chronomètre une étape (lecture disque, décodage,
+  redimensionnement, prédiction, écriture des résultats...) et l'ajoute à
+  un histogramme par étape (seaux fixes : mémoire constante) ;
+- `trace(type, ...)` crée un enregistrement structuré pour une analyse ou
+  un lot ; les étapes exécutées pendant que la trace est active (même sur un
+  autre thread, via `activate`) y sont rattachées ;
+- chaque enregistrement contient aussi le pic de mémoire (RSS) du processus ;
+  les réglages des pools de threads TensorFlow sont exposés avec les métriques ;
+- export : fichier JSONL des enregistrements, texte au format Prometheus
+  (`/metrics` du serveur ou fichier réécrit périodiquement), résumé des
+  histogrammes (p50/p95/p99 par étape).
+
+Coût : deux lectures d'horloge et une insertion sous verrou par étape
+(quelques microsecondes), négligeable devant une prédiction.
+
+Usage (résumé d'un fichier de traces):
+    python instrumentation.py trace.jsonl
+"""
+
+import bisect
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Bornes supérieures des seaux des histogrammes (secondes), comme Prometheus
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_MAX_RECORDS = 1000
+METRIC_PREFIX = "brain_tumor"
+
+
+def peak_rss_bytes():
+    """Pic de mémoire résidente du processus en octets (None si indisponible)"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux: kilo-octets, macOS: octets
+        return peak if sys.platform == 'darwin' else peak * 1024
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss)
+    except Exception:
+        return None
+
+
+def tf_thread_settings():
+    """
+    Réglages des pools de threads TensorFlow (0 = choix automatique)
+
+    TensorFlow n'est jamais importé ici : None tant qu'il n'est pas chargé.
+    """
+    tf = sys.modules.get('tensorflow')
+    if tf is None:
+        return None
+    try:
+        return {
+            'intra_op': tf.config.threading.get_intra_op_parallelism_threads(),
+            'inter_op': tf.config.threading.get_inter_op_parallelism_threads(),
+        }
+    except Exception:
+        return None
+
+
+class Histogram:
+    """Histogramme à seaux fixes des durées d'une étape"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Estimation d'un quantile (interpolation linéaire dans le seau, bornée par min/max)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                lower = max(self.buckets[i - 1] if i > 0 else 0.0, self.min)
+                upper = min(self.buckets[i] if i < len(self.buckets) else self.max, self.max)
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.max
+
+    def summary(self):
+        """Statistiques en millisecondes"""
+        return {
+            'count': self.count,
+            'mean_ms': self.sum / self.count * 1000 if self.count else 0.0,
+            'p50_ms': self.quantile(0.50) * 1000,
+            'p95_ms': self.quantile(0.95) * 1000,
+            'p99_ms': self.quantile(0.99) * 1000,
+            'max_ms': self.max * 1000,
+        }
+
+
+class Trace:
+    """
+    Enregistrement structuré d'une analyse (ou d'un lot)
+
+    Args:
+        tracer: Tracer auquel l'enregistrement est rendu par finish()
+        kind: type d'analyse ('gui', 'batch', 'server', 'watch'...)
+        fields: champs supplémentaires (image, nombre d'images...)
+    """
+
+    def __init__(self, tracer, kind, **fields):
+        self.tracer = tracer
+        self.kind = kind
+        self.fields = fields
+        self.stages = {}
+        self.start = time.perf_counter()
+        self.finished = False
+
+    def add(self, name, seconds):
+        """Ajoute une durée d'étape (cumulée si l'étape se répète)"""
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        self.tracer.observe(name, seconds)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def finish(self, **fields):
+        """Termine l'analyse et enregistre l'enregistrement (une seule fois)"""
+        if self.finished:
+            return None
+        self.finished = True
+        self.fields.update(fields)
+        record = {
+            'timestamp': time.time(),
+            'kind': self.kind,
+            **self.fields,
+            'total_ms': (time.perf_counter() - self.start) * 1000,
+            'stages_ms': {name: seconds * 1000 for name, seconds in self.stages.items()},
+            'peak_rss_mb': (peak_rss_bytes() or 0) / (1024 * 1024),
+        }
+        self.tracer.record(record)
+        return record
+
+
+class Tracer:
+    """
+    Histogrammes par étape et derniers enregistrements d'analyse
+
+    Args:
+        max_records: nombre d'enregistrements gardés en mémoire
+    """
+
+    def __init__(self, max_records=DEFAULT_MAX_RECORDS):
+        self.enabled = True
+        self.records = deque(maxlen=max_records)
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._record_file = None
+        self._dump_thread = None
+        self._dump_stop = threading.Event()
+
+    def observe(self, name, seconds):
+        """Ajoute une durée à l'histogramme d'une étape"""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def current(self):
+        """Trace active sur ce thread (ou None)"""
+        return getattr(self._local, 'trace', None)
+
+    @contextmanager
+    def activate(self, trace):
+        """Rattache les étapes exécutées sur ce thread à `trace`"""
+        previous = self.current()
+        self._local.trace = trace
+        try:
+            yield trace
+        finally:
+            self._local.trace = previous
+
+    @contextmanager
+    def stage(self, name):
+        """Chronomètre une étape (histogramme + trace active éventuelle)"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            trace = self.current()
+            if trace is not None:
+                trace.add(name, seconds)
+            else:
+                self.observe(name, seconds)
+
+    def trace(self, kind, **fields):
+        """Crée l'enregistrement d'une analyse (à terminer avec finish())"""
+        return Trace(self, kind, **fields)
+
+    def record(self, record):
+        """Conserve un enregistrement et l'écrit dans le fichier JSONL éventuel"""
+        with self._lock:
+            self.records.append(record)
+            if self._record_file is not None:
+                self._record_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self._record_file.flush()
+
+    def set_record_file(self, path):
+        """Écrit chaque enregistrement dans un fichier JSONL (None = désactiver)"""
+        with self._lock:
+            if self._record_file is not None:
+                self._record_file.close()
+            self._record_file = open(path, 'a', encoding='utf-8') if path else None
+
+    def summary(self):
+        """Statistiques par étape: {étape: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}"""
+        with self._lock:
+            return {name: histogram.summary() for name, histogram in self._histograms.items()}
+
+    def runtime_info(self):
+        """Ressources du processus: pic de RSS et pools de threads TensorFlow"""
+        return {
+            'peak_rss_mb': (peak_rss_bytes() or 0) / (1024 * 1024),
+            'tf_threads': tf_thread_settings(),
+            'cpu_count': os.cpu_count(),
+        }
+
+    def prometheus_text(self):
+        """Métriques au format texte de Prometheus"""
+        name = f"{METRIC_PREFIX}_stage_seconds"
+        lines = [
+            f"# HELP {name} Durée des étapes d'analyse",
+            f"# TYPE {name} histogram",
+        ]
+        with self._lock:
+            for stage_name, histogram in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float('inf') else repr(bound)
+                    lines.append(f'{name}_bucket{{stage="{stage_name}",le="{le}"}} {cumulative}')
+                lines.append(f'{name}_sum{{stage="{stage_name}"}} {histogram.sum:.6f}')
+                lines.append(f'{name}_count{{stage="{stage_name}"}} {histogram.count}')
+
+        peak = peak_rss_bytes()
+        if peak is not None:
+            lines.append(f"# HELP {METRIC_PREFIX}_peak_rss_bytes Pic de mémoire résidente du processus")
+            lines.append(f"# TYPE {METRIC_PREFIX}_peak_rss_bytes gauge")
+            lines.append(f"{METRIC_PREFIX}_peak_rss_bytes {peak}")
+
+        threads = tf_thread_settings()
+        if threads is not None:
+            lines.append(f"# HELP {METRIC_PREFIX}_tf_threads Threads des pools TensorFlow (0 = automatique)")
+            lines.append(f"# TYPE {METRIC_PREFIX}_tf_threads gauge")
+            for pool, value in threads.items():
+                lines.append(f'{METRIC_PREFIX}_tf_threads{{pool="{pool}"}} {value}')
+
+        return "\n".join(lines) + "\n"
+
+    def start_periodic_dump(self, path, interval=30.0):
+        """Réécrit régulièrement `path` avec les métriques Prometheus (thread de fond)"""
+        self.stop_periodic_dump()
+        self._dump_stop.clear()
+
+        def run():
+            while not self._dump_stop.wait(interval):
+                self.dump_metrics(path)
+            self.dump_metrics(path)
+
+        self._dump_thread = threading.Thread(target=run, name="metrics-dump", daemon=True)
+        self._dump_thread.start()
+
+    def stop_periodic_dump(self):
+        if self._dump_thread is not None:
+            self._dump_stop.set()
+            self._dump_thread.join()
+            self._dump_thread = None
+
+    def dump_metrics(self, path):
+        """Écrit les métriques Prometheus dans un fichier (remplacement atomique)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def reset(self):
+        """Vide les histogrammes et les enregistrements"""
+        with self._lock:
+            self._histograms.clear()
+            self.records.clear()
+
+
+def print_summary(summary, runtime=None):
+    """Affiche le résumé des étapes (durées en millisecondes)"""
+    print(f"\n{'Étape':16} {'n':>7} {'moyenne':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for name, stats in sorted(summary.items(), key=lambda item: -item[1]['mean_ms'] * item[1]['count']):
+        print(f"{name:16} {stats['count']:>7} {stats['mean_ms']:>7.2f}ms {stats['p50_ms']:>7.2f}ms "
+              f"{stats['p95_ms']:>7.2f}ms {stats['p99_ms']:>7.2f}ms {stats['max_ms']:>7.2f}ms")
+    if runtime:
+        threads = runtime.get('tf_threads')
+        threads_text = (f", threads TensorFlow intra={threads['intra_op']} inter={threads['inter_op']}"
+                        if threads else "")
+        print(f"Pic de mémoire: {runtime['peak_rss_mb']:.0f} Mo{threads_text}")
+
+
+def summarize_records(path):
+    """Recalcule les histogrammes par étape à partir d'un fichier JSONL"""
+    tracer = Tracer(max_records=1)
+    peak = 0.0
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            peak = max(peak, record.get('peak_rss_mb', 0.0))
+            for name, ms in record.get('stages_ms', {}).items():
+                tracer.observe(name, ms / 1000)
+            tracer.observe(f"total ({record.get('kind')})", record.get('total_ms', 0.0) / 1000)
+    return tracer.summary(), peak
+
+
+# Instance partagée par toute l'application
+TRACER = Tracer()
+stage = TRACER.stage
+trace = TRACER.trace
+activate = TRACER.activate
+
+
+def main(argv=None):
+    """Résumé par étape d'un fichier de traces JSONL"""
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("Usage: python instrumentation.py trace.jsonl")
+        return 1
+
+    summary, peak = summarize_records(argv[0])
+    print_summary(summary)
+    print(f"Pic de mémoire: {peak:.0f} Mo")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+Brain Tumor Detection - Générateur de charge du serveur d'inférence
+====================================================================
+Envoie des images au serveur HTTP (inference_server.py) depuis plusieurs
+clients simultanés et mesure le débit et la latence (p50/p95/p99).
+
+Usage:
+    python brain_tumor_detector_app.py serve &
+    python load_generator.py --concurrency 16 --requests 1000
+    python load_generator.py dossier_irm/ -r --concurrency 32 --duration 30
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import quote
+
+import cv2
+import numpy as np
+
+from batch_inference import collect_image_paths
+from detector_core import read_image_bytes
+from inference_server import DEFAULT_HOST, DEFAULT_PORT
+
+DEFAULT_URL = f"http://{DEFAULT_HOST}:{DEFAULT_PORT}"
+DEFAULT_MAX_IMAGES = 256
+
+
+def synthetic_payloads(count=16, seed=0):
+    """Images JPEG aléatoires de tailles variées (sans dataset)"""
+    rng = np.random.default_rng(seed)
+    payloads = []
+    for i in range(count):
+        height, width = rng.integers(200, 640, size=2)
+        img = rng.integers(0, 256, (height, width), dtype=np.uint8)
+        payloads.append((f"synthetique_{i}.jpg", cv2.imencode('.jpg', img)[1].tobytes()))
+    return payloads
+
+
+def post_image(url, name, data, timeout=60):
+    """
+    Envoie une image au serveur
+
+    Returns:
+        réponse JSON décodée
+    """
+    request = urllib.request.Request(
+        f"{url}/predict?name={quote(name)}",
+        data=data,
+        headers={'Content-Type': 'application/octet-stream'},
+        method='POST',
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def run_load(url, payloads, concurrency=8, total_requests=None, duration=None):
+    """
+    Envoie des requêtes depuis `concurrency` clients simultanés
+
+    Args:
+        url: adresse du serveur
+        payloads: liste de (nom, contenu) envoyés à tour de rôle
+        concurrency: nombre de clients simultanés
+        total_requests: nombre total de requêtes (prioritaire sur duration)
+        duration: durée du test en secondes
+
+    Returns:
+        dictionnaire des mesures (débit, latences en ms, tailles des micro-lots, erreurs)
+    """
+    lock = threading.Lock()
+    latencies = []
+    batch_sizes = []
+    errors = []
+    counter = [0]
+    deadline = time.perf_counter() + duration if duration else None
+
+    def next_index():
+        with lock:
+            if total_requests is not None and counter[0] >= total_requests:
+                return None
+            if deadline is not None and time.perf_counter() >= deadline:
+                return None
+            counter[0] += 1
+            return counter[0] - 1
+
+    def client():
+        while True:
+            index = next_index()
+            if index is None:
+                return
+            name, data = payloads[index % len(payloads)]
+            start = time.perf_counter()
+            try:
+                response = post_image(url, name, data)
+            except (urllib.error.URLError, OSError, ValueError) as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+                batch_sizes.append(response.get('batch_size', 1))
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) if latencies else np.zeros(1)
+    return {
+        'requests': len(batch_sizes),
+        'errors': len(errors),
+        'first_error': errors[0] if errors else None,
+        'elapsed': elapsed,
+        'throughput': len(batch_sizes) / max(elapsed, 1e-9),
+        'p50': float(np.percentile(latencies, 50)),
+        'p95': float(np.percentile(latencies, 95)),
+        'p99': float(np.percentile(latencies, 99)),
+        'max': float(latencies.max()),
+        'mean_batch_size': float(np.mean(batch_sizes)) if batch_sizes else 0.0,
+    }
+
+
+def print_report(report, concurrency):
+    """Affiche les mesures du test de charge"""
+    print(f"\nRésultats ({concurrency} clients simultanés):")
+    print(f"   - Requêtes réussies: {report['requests']} en {report['elapsed']:.1f}s")
+    print(f"   - Débit: {report['throughput']:.1f} images/s")
+    print(f"   - Latence: p50 {report['p50']:.1f}ms, p95 {report['p95']:.1f}ms, "
+          f"p99 {report['p99']:.1f}ms, max {report['max']:.1f}ms")
+    print(f"   - Taille moyenne des micro-lots: {report['mean_batch_size']:.1f}")
+    if report['errors']:
+        print(f"   - ❌ Erreurs: {report['errors']} (ex: {report['first_error']})")
+
+
+def main(argv=None):
+    """Point d'entrée du générateur de charge"""
+    parser = argparse.ArgumentParser(description="Test de charge du serveur d'inférence HTTP")
+    parser.add_argument('inputs', nargs='*', help="Images et/ou dossiers envoyés (défaut: images synthétiques)")
+    parser.add_argument('-u', '--url', default=DEFAULT_URL, help=f"Adresse du serveur (défaut: {DEFAULT_URL})")
+    parser.add_argument('-c', '--concurrency', type=int, default=8, help="Clients simultanés (défaut: 8)")
+    parser.add_argument('-n', '--requests', type=int, default=None, help="Nombre total de requêtes (défaut: 500)")
+    parser.add_argument('-d', '--duration', type=float, default=None, help="Durée du test en secondes")
+    parser.add_argument('-r', '--recursive', action='store_true', help="Parcourir aussi les sous-dossiers")
+    parser.add_argument('-m', '--max-images', type=int, default=DEFAULT_MAX_IMAGES,
+                        help=f"Images différentes gardées en mémoire et envoyées en boucle (défaut: {DEFAULT_MAX_IMAGES})")
+    args = parser.parse_args(argv)
+
+    if args.requests is None and args.duration is None:
+        args.requests = 500
+
+    if args.inputs:
+        # Jeu d'images borné: le client ne garde pas tout un dossier d'archives en mémoire
+        paths = collect_image_paths(args.inputs, recursive=args.recursive)[:args.max_images]
+        if not paths:
+            print("❌ Aucune image trouvée")
+            return 1
+        payloads = [(os.path.basename(path), read_image_bytes(path)) for path in paths]
+    else:
+        payloads = synthetic_payloads()
+
+    try:
+        with urllib.request.urlopen(f"{args.url}/health", timeout=5) as response:
+            health = json.loads(response.read())
+    except (urllib.error.URLError, OSError) as e:
+        print(f"❌ Serveur injoignable sur {args.url}: {e}")
+        return 1
+    print(f"✓ Serveur prêt ({health['model']}), {len(payloads)} images différentes")
+
+    # Une requête de chauffe avant la mesure (une image illisible est refusée, sans gravité)
+    try:
+        post_image(args.url, *payloads[0])
+    except urllib.error.HTTPError:
+        pass
+
+    report = run_load(args.url, payloads, args.concurrency, args.requests, args.duration)
+    print_report(report, args.concurrency)
+    return 0 if report['errors'] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Brain Tumor Detection - Métadonnées du modèle (seuil de décision et calibration)
+=================================================================================
+Le seuil de 0,5 sur la probabilité brute du CNN n'est qu'une valeur par
+défaut. evaluation.py choisit, sur un dataset étiqueté, une calibration
+des probabilités (Platt ou isotonique) et le seuil qui atteint une
+sensibilité cible ; ils sont enregistrés à côté du modèle
+(best_brain_tumor_model.meta.json) avec l'empreinte du fichier modèle.
+
+L'interface, le mode batch, la surveillance de dossiers et le serveur
+appliquent cette politique de décision à la probabilité brute :
+probabilité calibrée, puis comparaison au seuil. Le cache des prédictions
+garde les probabilités brutes : recalibrer ne l'invalide pas. Des
+métadonnées dont l'empreinte ne correspond plus au modèle sont ignorées.
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+
+from detector_core import THRESHOLD, interpret_prediction
+
+METADATA_SUFFIX = ".meta.json"
+
+# Méthodes de calibration (evaluation.py)
+CALIBRATION_NONE = "none"
+CALIBRATION_PLATT = "platt"
+CALIBRATION_ISOTONIC = "isotonic"
+
+# Bornes des probabilités avant le logit (calibration de Platt)
+_EPSILON = 1e-7
+
+
+def logit(probabilities):
+    """Logit des probabilités, bornées à [1e-7, 1 - 1e-7]"""
+    p = np.clip(np.asarray(probabilities, dtype=np.float64), _EPSILON, 1 - _EPSILON)
+    return np.log(p) - np.log1p(-p)
+
+
+def sigmoid(values):
+    """Fonction logistique (stable pour les grandes valeurs)"""
+    return 0.5 * (1 + np.tanh(0.5 * np.asarray(values, dtype=np.float64)))
+
+
+class DecisionPolicy:
+    """
+    Calibration des probabilités et seuil de décision
+
+    Args:
+        threshold: seuil appliqué à la probabilité calibrée
+        calibration: dictionnaire {'method': 'platt', 'a', 'b'},
+            {'method': 'isotonic', 'x', 'y'} ou None (probabilité brute)
+    """
+
+    def __init__(self, threshold=THRESHOLD, calibration=None):
+        self.threshold = float(threshold)
+        self.calibration = calibration or {'method': CALIBRATION_NONE}
+        method = self.calibration['method']
+        if method == CALIBRATION_ISOTONIC:
+            self._x = np.asarray(self.calibration['x'], dtype=np.float64)
+            self._y = np.asarray(self.calibration['y'], dtype=np.float64)
+        elif method not in (CALIBRATION_NONE, CALIBRATION_PLATT):
+            raise ValueError(f"Méthode de calibration inconnue: {method}")
+
+    @property
+    def is_default(self):
+        """Politique d'origine (probabilité brute, seuil 0,5)"""
+        return self.calibration['method'] == CALIBRATION_NONE and self.threshold == THRESHOLD
+
+    def calibrate(self, probabilities):
+        """
+        Probabilités calibrées (vectorisé)
+
+        Args:
+            probabilities: probabilité brute ou tableau de probabilités brutes
+
+        Returns:
+            même forme que l'entrée (float si l'entrée est un scalaire)
+        """
+        method = self.calibration['method']
+        if method == CALIBRATION_NONE:
+            return probabilities
+        if method == CALIBRATION_PLATT:
+            calibrated = sigmoid(self.calibration['a'] * logit(probabilities) + self.calibration['b'])
+        else:
+            calibrated = np.interp(np.asarray(probabilities, dtype=np.float64), self._x, self._y)
+        return float(calibrated) if np.ndim(calibrated) == 0 else calibrated
+
+    def interpret(self, prediction):
+        """
+        Interprète une probabilité brute du modèle
+
+        Returns:
+            (probabilité calibrée, has_tumor, confidence)
+        """
+        probability = float(self.calibrate(float(prediction)))
+        has_tumor, confidence = interpret_prediction(probability, self.threshold)
+        return probability, has_tumor, confidence
+
+    def describe(self):
+        """Résumé affiché au chargement (ex: 'seuil 0.3127, calibration platt')"""
+        return f"seuil {self.threshold:.4f}, calibration {self.calibration['method']}"
+
+
+def metadata_path(model_path):
+    """Fichier des métadonnées d'un modèle (best_brain_tumor_model.meta.json)"""
+    return os.path.splitext(model_path)[0] + METADATA_SUFFIX
+
+
+def load_metadata(model_path):
+    """Métadonnées d'un modèle, ou None si elles n'existent pas"""
+    path = metadata_path(model_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_policy(model_path, fingerprint=None):
+    """
+    Politique de décision enregistrée pour un modèle
+
+    Args:
+        model_path: fichier modèle
+        fingerprint: empreinte SHA-256 du modèle (défaut: calculée si des
+            métadonnées existent)
+
+    Returns:
+        DecisionPolicy (politique d'origine sans métadonnées valides)
+    """
+    metadata = load_metadata(model_path)
+    if metadata is None:
+        return DecisionPolicy()
+
+    if fingerprint is None:
+        from prediction_cache import file_sha256
+        fingerprint = file_sha256(model_path)
+    if metadata.get('model_fingerprint') != fingerprint:
+        print(f"⚠️  {metadata_path(model_path)} ignoré: calibré pour une autre version du modèle")
+        return DecisionPolicy()
+    return DecisionPolicy(metadata['threshold'], metadata.get('calibration'))
+
+
+def save_metadata(model_path, policy, fingerprint, report=None):
+    """
+    Enregistre la politique de décision à côté du modèle
+
+    Args:
+        model_path: fichier modèle
+        policy: DecisionPolicy choisie
+        fingerprint: empreinte SHA-256 du modèle évalué
+        report: rapport d'évaluation (evaluation.py)
+
+    Returns:
+        chemin du fichier écrit
+    """
+    data = {
+        'model': os.path.basename(model_path),
+        'model_fingerprint': fingerprint,
+        'threshold': policy.threshold,
+        'calibration': policy.calibration,
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'report': report or {},
+    }
+    path = metadata_path(model_path)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,524 @@
+"""
+Brain Tumor Detection - Registre des modèles (rechargement à chaud, ensembles)
+===============================================================================
+Le modèle était chargé une seule fois au démarrage : le remplacer imposait
+de redémarrer l'interface, le serveur et la surveillance de dossiers, et de
+repayer à chaque fois le démarrage à froid de TensorFlow.
+
+- Le registre (model_registry.json) liste les versions enregistrées : nom,
+  fichier et empreinte SHA-256 ; un fichier modifié après son
+  enregistrement est refusé au chargement ;
+- `activate` choisit la sélection active : un modèle, ou plusieurs pour un
+  ensemble ;
+- HotSwapEngine relit le registre, charge et préchauffe la nouvelle
+  sélection dans un thread d'arrière-plan pendant que l'ancienne continue
+  d'analyser, puis bascule en une seule affectation : une prédiction en
+  cours se termine sur l'ancien modèle, les suivantes utilisent le nouveau ;
+- EnsembleEngine : les modèles d'un ensemble reçoivent le même lot
+  prétraité (un seul décodage, une seule normalisation) et prédisent en
+  parallèle (pool de threads, TensorFlow et TFLite libèrent le GIL) ; la
+  probabilité combinée est la moyenne de celles des modèles.
+
+Usage:
+    python model_registry.py register best_brain_tumor_model_v2.keras --name v2 --activate
+    python model_registry.py activate v2 compact        # ensemble de deux modèles
+    python model_registry.py list
+    python brain_tumor_detector_app.py serve --registry model_registry.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from inference_engine import BaseEngine, DEFAULT_WARMUP_BATCH_SIZES, load_engine
+from prediction_cache import file_sha256
+from model_metadata import DecisionPolicy, load_policy
+from results_store import model_version
+
+DEFAULT_REGISTRY = "model_registry.json"
+# Intervalle de relecture du registre par les processus de longue durée (serveur, interface)
+DEFAULT_RELOAD_INTERVAL = 5.0
+
+
+class ModelRegistry:
+    """
+    Registre JSON des versions de modèles et de la sélection active
+
+    Args:
+        registry_path: fichier JSON du registre (créé au premier enregistrement)
+    """
+
+    def __init__(self, registry_path=DEFAULT_REGISTRY):
+        self.registry_path = registry_path
+        self.models = {}
+        self.active = []
+        self._stat = None
+        self.refresh()
+
+    def refresh(self):
+        """
+        Relit le registre s'il a changé sur disque
+
+        Returns:
+            True si le contenu a été relu
+        """
+        try:
+            stat = os.stat(self.registry_path)
+        except FileNotFoundError:
+            return False
+        # save() remplace le fichier: nouvel inode à chaque écriture
+        key = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        if key == self._stat:
+            return False
+        with open(self.registry_path, encoding='utf-8') as f:
+            data = json.load(f)
+        self.models = data.get('models', {})
+        self.active = data.get('active', [])
+        self._stat = key
+        return True
+
+    def save(self):
+        """Écrit le registre (fichier temporaire puis remplacement atomique)"""
+        tmp_path = self.registry_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'models': self.models, 'active': self.active}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.registry_path)
+        stat = os.stat(self.registry_path)
+        self._stat = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def register(self, model_path, name=None):
+        """
+        Enregistre une version de modèle
+
+        Args:
+            model_path: fichier .keras ou .tflite
+            name: nom de la version (défaut: nom du fichier et début de son empreinte)
+
+        Returns:
+            nom de la version
+        """
+        if not os.path.isfile(model_path):
+            raise FileNotFoundError(f"Modèle introuvable: {model_path}")
+        self.refresh()
+        fingerprint = file_sha256(model_path)
+        version = model_version(model_path, fingerprint)
+        name = name or version
+        if name in self.models and self.models[name]['fingerprint'] != fingerprint:
+            raise ValueError(f"La version '{name}' existe déjà avec un autre fichier")
+
+        self.models[name] = {
+            'path': os.path.abspath(model_path),
+            'fingerprint': fingerprint,
+            'version': version,
+            'registered_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        self.save()
+        return name
+
+    def activate(self, names):
+        """
+        Choisit la sélection active (les processus qui suivent le registre basculent)
+
+        Args:
+            names: noms des versions ; plusieurs noms = ensemble
+        """
+        self.refresh()
+        names = list(dict.fromkeys(names))
+        unknown = [name for name in names if name not in self.models]
+        if not names or unknown:
+            raise ValueError(f"Version inconnue: {', '.join(unknown) or '(aucune)'}")
+        self.active = names
+        self.save()
+
+    def remove(self, name):
+        """Retire une version du registre (le fichier modèle n'est pas supprimé)"""
+        self.refresh()
+        if name not in self.models:
+            raise ValueError(f"Version inconnue: {name}")
+        if name in self.active:
+            raise ValueError(f"La version '{name}' est active: activer une autre version d'abord")
+        del self.models[name]
+        self.save()
+
+    def active_entries(self):
+        """Sélection active: liste de (nom, entrée du registre)"""
+        missing = [name for name in self.active if name not in self.models]
+        if missing:
+            raise ValueError(f"Version active absente du registre: {', '.join(missing)}")
+        return [(name, self.models[name]) for name in self.active]
+
+
+def selection_signature(entries):
+    """Identité d'une sélection: ((nom, empreinte), ...)"""
+    return tuple((name, entry['fingerprint']) for name, entry in entries)
+
+
+def selection_fingerprint(entries):
+    """
+    Empreinte d'une sélection (clé du cache des prédictions)
+
+    Pour un modèle seul, c'est celle de son fichier : le cache reste partagé
+    avec `-m fichier`. Pour un ensemble, empreinte des empreintes des modèles.
+    """
+    fingerprints = sorted(entry['fingerprint'] for _, entry in entries)
+    if len(fingerprints) == 1:
+        return fingerprints[0]
+    return hashlib.sha256("+".join(fingerprints).encode('ascii')).hexdigest()
+
+
+def selection_version(entries):
+    """Version d'une sélection enregistrée dans l'historique (versions des modèles jointes par +)"""
+    return "+".join(entry['version'] for _, entry in entries)
+
+
+def verify_entry(name, entry):
+    """Vérifie que le fichier d'une version n'a pas changé depuis son enregistrement"""
+    if not os.path.isfile(entry['path']):
+        raise FileNotFoundError(f"Modèle de la version '{name}' introuvable: {entry['path']}")
+    if file_sha256(entry['path']) != entry['fingerprint']:
+        raise ValueError(f"Le fichier de la version '{name}' a été modifié depuis son enregistrement "
+                         f"({entry['path']}): l'enregistrer sous une nouvelle version")
+
+
+class EnsembleEngine(BaseEngine):
+    """
+    Ensemble de moteurs prédisant le même lot en parallèle
+
+    Args:
+        engines: dictionnaire {nom: moteur}, même taille d'entrée pour tous
+    """
+
+    def __init__(self, engines):
+        if not engines:
+            raise ValueError("Un ensemble doit contenir au moins un modèle")
+        sizes = {engine.img_size for engine in engines.values()}
+        if len(sizes) != 1:
+            details = ", ".join(f"{name}: {engine.img_size}" for name, engine in engines.items())
+            raise ValueError(f"Les modèles d'un ensemble doivent avoir la même taille d'entrée ({details})")
+
+        self.engines = dict(engines)
+        self.img_size = sizes.pop()
+        self.warmup_time = sum(engine.warmup_time for engine in self.engines.values())
+        self._executor = ThreadPoolExecutor(len(self.engines), thread_name_prefix="ensemble")
+
+    def predict_members(self, images):
+        """
+        Prédit un lot avec chaque modèle, en parallèle
+
+        Args:
+            images: tableau float32 (N, img_size, img_size, 1), partagé par tous les modèles
+
+        Returns:
+            (probabilités combinées (N,), {nom: probabilités (N,)})
+        """
+        images = np.asarray(images, dtype=np.float32)
+        futures = {name: self._executor.submit(engine.predict_on_batch, images)
+                   for name, engine in self.engines.items()}
+        members = {name: np.asarray(future.result()).reshape(-1) for name, future in futures.items()}
+        return np.mean(list(members.values()), axis=0), members
+
+    def predict_on_batch(self, images):
+        """Probabilités combinées (N, 1), même format que les autres moteurs"""
+        return self.predict_members(images)[0].reshape(-1, 1)
+
+
+def load_models(entries, warmup_batch_sizes=DEFAULT_WARMUP_BATCH_SIZES, num_threads=None):
+    """
+    Charge et préchauffe les modèles d'une sélection
+
+    Args:
+        entries: liste de (nom, entrée du registre)
+        warmup_batch_sizes: tailles de lot préchauffées
+        num_threads: threads de l'interpréteur TFLite
+
+    Returns:
+        moteur du modèle seul, ou EnsembleEngine
+    """
+    engines = {}
+    for name, entry in entries:
+        verify_entry(name, entry)
+        engines[name] = load_engine(entry['path'], warmup_batch_sizes=warmup_batch_sizes, num_threads=num_threads)
+    if len(engines) == 1:
+        return next(iter(engines.values()))
+    return EnsembleEngine(engines)
+
+
+class ActiveModel:
+    """
+    Sélection chargée et prête à analyser
+
+    Attributes:
+        engine: moteur du modèle seul ou EnsembleEngine
+        names: noms des versions
+        version: version enregistrée dans l'historique (selection_version)
+        fingerprint: clé du cache des prédictions (selection_fingerprint)
+        signature: identité de la sélection (selection_signature)
+        policy: seuil et calibration (model_metadata) d'un modèle seul ;
+            politique d'origine pour un ensemble
+    """
+
+    def __init__(self, engine, entries):
+        self.engine = engine
+        self.names = [name for name, _ in entries]
+        self.version = selection_version(entries)
+        self.fingerprint = selection_fingerprint(entries)
+        self.signature = selection_signature(entries)
+        if len(entries) == 1:
+            self.policy = load_policy(entries[0][1]['path'], entries[0][1]['fingerprint'])
+        else:
+            self.policy = DecisionPolicy()
+
+
+def load_active(registry, warmup_batch_sizes=DEFAULT_WARMUP_BATCH_SIZES, num_threads=None, load_fn=load_models):
+    """
+    Charge la sélection active du registre
+
+    Returns:
+        ActiveModel
+    """
+    entries = registry.active_entries()
+    if not entries:
+        raise ValueError(f"Aucun modèle actif dans {registry.registry_path} "
+                         "(python model_registry.py activate NOM)")
+    return ActiveModel(load_fn(entries, warmup_batch_sizes, num_threads), entries)
+
+
+def predict_members(engine, images):
+    """
+    Probabilités combinées et probabilités de chaque modèle d'un ensemble
+
+    Args:
+        engine: moteur quelconque (EnsembleEngine, HotSwapEngine ou modèle seul)
+        images: tableau float32 (N, img_size, img_size, 1)
+
+    Returns:
+        (probabilités (N,), {nom: probabilités (N,)}) ; dictionnaire vide pour un modèle seul
+    """
+    if isinstance(engine, HotSwapEngine):
+        engine = engine.active.engine
+    if isinstance(engine, EnsembleEngine):
+        return engine.predict_members(images)
+    return np.asarray(engine.predict_on_batch(images)).reshape(-1), {}
+
+
+class HotSwapEngine(BaseEngine):
+    """
+    Moteur qui suit la sélection active du registre
+
+    La première sélection est chargée à la création ; les suivantes en
+    arrière-plan (check_for_update, ou start_watching pour une relecture
+    périodique). Lire `active` une fois par lot garantit que tout le lot est
+    analysé par la même version.
+
+    Args:
+        registry: ModelRegistry
+        warmup_batch_sizes: tailles de lot préchauffées à chaque chargement
+        num_threads: threads de l'interpréteur TFLite
+        auto_swap: basculer dès qu'une nouvelle sélection est prête ; sinon
+            elle attend un appel à swap_pending() (entre deux lots)
+        load_fn: fonction (entrées, warmup_batch_sizes, num_threads) → moteur
+    """
+
+    def __init__(self, registry, warmup_batch_sizes=DEFAULT_WARMUP_BATCH_SIZES, num_threads=None,
+                 auto_swap=True, load_fn=load_models):
+        self.registry = registry
+        self.warmup_batch_sizes = warmup_batch_sizes
+        self.num_threads = num_threads
+        self.auto_swap = auto_swap
+        self.load_fn = load_fn
+        self.reloads = 0
+        self.last_error = None
+
+        self._lock = threading.Lock()
+        self._pending = None
+        self._loading = None
+        self._failed = None
+        self._stop = threading.Event()
+        self._watcher = None
+
+        self._active = load_active(registry, warmup_batch_sizes, num_threads, load_fn)
+        self.warmup_time = self._active.engine.warmup_time
+
+    @property
+    def active(self):
+        """Sélection en service (ActiveModel)"""
+        return self._active
+
+    @property
+    def img_size(self):
+        return self._active.engine.img_size
+
+    @property
+    def loading(self):
+        """Un chargement est-il en cours en arrière-plan ?"""
+        return self._loading is not None
+
+    def predict_on_batch(self, images):
+        # Une seule lecture de la référence: l'appel se termine sur ce moteur même si une bascule a lieu
+        return self._active.engine.predict_on_batch(images)
+
+    def check_for_update(self):
+        """
+        Relit le registre et charge la nouvelle sélection en arrière-plan si elle a changé
+
+        Une sélection dont le chargement a échoué n'est pas retentée tant que
+        le registre ne change pas.
+
+        Returns:
+            True si un chargement a été lancé
+        """
+        try:
+            self.registry.refresh()
+            entries = self.registry.active_entries()
+        except (OSError, ValueError) as e:
+            self.last_error = f"Registre illisible: {e}"
+            return False
+        if not entries:
+            return False
+
+        signature = selection_signature(entries)
+        with self._lock:
+            if signature == self._active.signature:
+                # Retour à la sélection en service: chargement en cours ou en attente abandonné
+                self._pending = self._loading = self._failed = None
+                return False
+            if self._pending is not None and signature == self._pending.signature:
+                return False
+            if signature in (self._loading, self._failed):
+                return False
+            self._loading = signature
+
+        threading.Thread(target=self._background_load, args=(entries, signature),
+                         name="model-reload", daemon=True).start()
+        return True
+
+    def _background_load(self, entries, signature):
+        try:
+            loaded = ActiveModel(self.load_fn(entries, self.warmup_batch_sizes, self.num_threads), entries)
+        except Exception as e:
+            with self._lock:
+                if self._loading == signature:
+                    self._loading = None
+                    self._failed = signature
+                    self.last_error = str(e)
+            print(f"❌ Chargement de {selection_version(entries)} impossible, le modèle actuel reste actif: {e}")
+            return
+
+        with self._lock:
+            if self._loading != signature:
+                # Sélection remplacée entre-temps dans le registre
+                return
+            self._loading = self._failed = self.last_error = None
+            if self.auto_swap:
+                self._install(loaded)
+            else:
+                self._pending = loaded
+
+    def _install(self, loaded):
+        self._active = loaded
+        self._pending = None
+        self.reloads += 1
+        self.warmup_time = loaded.engine.warmup_time
+        print(f"✓ Modèle actif: {loaded.version}")
+
+    def swap_pending(self):
+        """
+        Bascule sur la sélection chargée en arrière-plan (mode auto_swap=False)
+
+        Returns:
+            ActiveModel devenu actif, ou None s'il n'y en a pas
+        """
+        with self._lock:
+            if self._pending is None:
+                return None
+            self._install(self._pending)
+            return self._active
+
+    def start_watching(self, interval=DEFAULT_RELOAD_INTERVAL):
+        """Relit le registre toutes les `interval` secondes (thread d'arrière-plan)"""
+        if self._watcher is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                self.check_for_update()
+
+        self._watcher = threading.Thread(target=run, name="registry-watcher", daemon=True)
+        self._watcher.start()
+
+    def status(self):
+        """État du rechargement (affiché par le serveur)"""
+        return {
+            'model_version': self._active.version,
+            'models': self._active.names,
+            'reloads': self.reloads,
+            'reloading': self.loading,
+            'reload_error': self.last_error,
+        }
+
+    def close(self):
+        """Arrête la relecture périodique du registre"""
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+
+def main(argv=None):
+    """Point d'entrée: gestion des versions et de la sélection active"""
+    parser = argparse.ArgumentParser(description="Registre des modèles (versions, modèle actif, ensembles)")
+    parser.add_argument('--registry', default=DEFAULT_REGISTRY,
+                        help=f"Fichier du registre (défaut: {DEFAULT_REGISTRY})")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    register_parser = subparsers.add_parser('register', help="Enregistrer une version de modèle")
+    register_parser.add_argument('model', help="Fichier .keras ou .tflite")
+    register_parser.add_argument('-n', '--name', default=None,
+                                 help="Nom de la version (défaut: fichier@empreinte)")
+    register_parser.add_argument('--activate', action='store_true', help="En faire le modèle actif")
+
+    activate_parser = subparsers.add_parser('activate',
+                                            help="Choisir le modèle actif (plusieurs noms: ensemble)")
+    activate_parser.add_argument('names', nargs='+', help="Noms des versions")
+
+    remove_parser = subparsers.add_parser('remove', help="Retirer une version du registre")
+    remove_parser.add_argument('name', help="Nom de la version")
+
+    subparsers.add_parser('list', help="Lister les versions enregistrées")
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.registry)
+    try:
+        if args.command == 'register':
+            name = registry.register(args.model, args.name)
+            print(f"✓ Version '{name}' enregistrée ({registry.models[name]['version']})")
+            if args.activate:
+                registry.activate([name])
+                print(f"✓ Modèle actif: {name}")
+        elif args.command == 'activate':
+            registry.activate(args.names)
+            kind = "Ensemble actif" if len(registry.active) > 1 else "Modèle actif"
+            print(f"✓ {kind}: {' + '.join(registry.active)}")
+        elif args.command == 'remove':
+            registry.remove(args.name)
+            print(f"✓ Version '{args.name}' retirée du registre")
+        else:
+            print(f"{len(registry.models)} versions dans {args.registry}:")
+            for name, entry in registry.models.items():
+                marker = "*" if name in registry.active else " "
+                print(f" {marker} {name:<24} {entry['version']:<40} {entry['registered_at']}  {entry['path']}")
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
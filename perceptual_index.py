@@ -0,0 +1,290 @@
+"""
+Brain Tumor Detection - Index des quasi-doublons (empreintes perceptuelles)
+============================================================================
+Les archives contiennent de nombreuses ré-exportations d'une même IRM
+(JPEG ré-encodés, recadrages légers, copies renommées) : l'empreinte des
+octets (prediction_cache.image_hash) ne les reconnaît pas.
+
+- Empreinte perceptuelle pHash (64 bits) calculée sur l'image 224×224 en
+  niveaux de gris vue par le modèle : réduction à 32×32, DCT, signe des 8×8
+  basses fréquences par rapport à leur médiane ;
+- deux images sont des quasi-doublons si leurs empreintes diffèrent d'au
+  plus `max_distance` bits (distance de Hamming) ;
+- recherche rapide par indexation multiple (multi-index hashing) :
+  l'empreinte est coupée en 4 blocs de 16 bits ; deux empreintes à moins de
+  d bits ont au moins un bloc à moins de d // 4 bits, seuls les candidats
+  de ces blocs sont comparés (quelques dizaines, même sur des centaines de
+  milliers d'images).
+
+Les empreintes sont enregistrées dans le cache des prédictions : le mode
+batch et la surveillance de dossiers réutilisent alors le résultat d'un
+quasi-doublon déjà analysé (source `duplicate`).
+
+Usage:
+    python brain_tumor_detector_app.py batch archives/ --near-duplicates 4
+    python perceptual_index.py archives/ -r -o doublons.csv
+"""
+
+import argparse
+import csv
+import itertools
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from detector_core import IMG_SIZE
+
+# Origine d'un résultat repris d'un quasi-doublon déjà analysé
+SOURCE_DUPLICATE = "duplicate"
+
+PHASH_SIZE = 32          # côté de l'image réduite avant la DCT
+PHASH_BITS = 8           # côté du bloc de basses fréquences (8×8 = 64 bits)
+HASH_CHUNKS = 4          # blocs de l'indexation multiple
+CHUNK_BITS = 64 // HASH_CHUNKS
+DEFAULT_MAX_DISTANCE = 4
+
+DEFAULT_CLUSTERS_OUTPUT = "duplicate_clusters.csv"
+
+
+def phash(image):
+    """
+    Empreinte perceptuelle d'une image
+
+    Args:
+        image: image uint8 en niveaux de gris (224×224, celle vue par le modèle)
+
+    Returns:
+        entier non signé de 64 bits
+    """
+    small = cv2.resize(image, (PHASH_SIZE, PHASH_SIZE), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:PHASH_BITS, :PHASH_BITS].reshape(-1)
+    bits = low > np.median(low)
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def phash_batch(images):
+    """Empreintes d'un lot d'images uint8 (N, s, s) → liste d'entiers"""
+    return [phash(image) for image in images]
+
+
+def hamming(a, b):
+    """Nombre de bits différents entre deux empreintes"""
+    return bin(a ^ b).count('1')
+
+
+def to_signed(value):
+    """Empreinte 64 bits non signée → entier signé (colonne INTEGER de SQLite)"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value):
+    """Entier signé lu dans SQLite → empreinte 64 bits non signée"""
+    return value + (1 << 64) if value < 0 else value
+
+
+def _chunk_masks(bits):
+    """Masques XOR de CHUNK_BITS bits ayant au plus `bits` bits à 1"""
+    masks = [0]
+    for count in range(1, bits + 1):
+        for positions in itertools.combinations(range(CHUNK_BITS), count):
+            masks.append(sum(1 << p for p in positions))
+    return masks
+
+
+class HashIndex:
+    """
+    Index des empreintes perceptuelles (indexation multiple, 4 blocs de 16 bits)
+
+    Args:
+        max_distance: distance de Hamming maximale entre quasi-doublons
+    """
+
+    def __init__(self, max_distance=DEFAULT_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.hashes = []
+        self.values = []
+        self._tables = [{} for _ in range(HASH_CHUNKS)]
+        self._masks = _chunk_masks(max_distance // HASH_CHUNKS)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    @staticmethod
+    def _chunks(value):
+        mask = (1 << CHUNK_BITS) - 1
+        return [(value >> (i * CHUNK_BITS)) & mask for i in range(HASH_CHUNKS)]
+
+    def add(self, value_hash, value=None):
+        """
+        Ajoute une empreinte
+
+        Args:
+            value_hash: empreinte pHash (entier 64 bits)
+            value: donnée associée (par ex. probabilité, chemin)
+
+        Returns:
+            identifiant de l'entrée (ordre d'ajout)
+        """
+        entry = len(self.hashes)
+        self.hashes.append(value_hash)
+        self.values.append(value)
+        for table, chunk in zip(self._tables, self._chunks(value_hash)):
+            table.setdefault(chunk, []).append(entry)
+        return entry
+
+    def search(self, value_hash, max_distance=None):
+        """
+        Entrées à au plus max_distance bits d'une empreinte
+
+        Returns:
+            liste de (distance, identifiant), la plus proche en premier
+        """
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        candidates = set()
+        for table, chunk in zip(self._tables, self._chunks(value_hash)):
+            for mask in self._masks:
+                candidates.update(table.get(chunk ^ mask, ()))
+
+        matches = []
+        for entry in candidates:
+            distance = hamming(value_hash, self.hashes[entry])
+            if distance <= max_distance:
+                matches.append((distance, entry))
+        return sorted(matches)
+
+    def nearest(self, value_hash):
+        """
+        Quasi-doublon le plus proche
+
+        Returns:
+            (distance, donnée associée), ou None s'il n'y en a pas
+        """
+        matches = self.search(value_hash)
+        if not matches:
+            return None
+        distance, entry = matches[0]
+        return distance, self.values[entry]
+
+
+def load_hash_index(cache, max_distance=DEFAULT_MAX_DISTANCE):
+    """
+    Index des images déjà analysées, construit depuis le cache des prédictions
+
+    Args:
+        cache: PredictionCache (empreintes enregistrées par put_phashes)
+        max_distance: distance de Hamming maximale entre quasi-doublons
+
+    Returns:
+        HashIndex dont les données sont les probabilités
+    """
+    index = HashIndex(max_distance)
+    for value_hash, probability in cache.phash_entries():
+        index.add(value_hash, probability)
+    return index
+
+
+def duplicate_clusters(hashes, max_distance=DEFAULT_MAX_DISTANCE):
+    """
+    Regroupe des empreintes en groupes de quasi-doublons (union-find)
+
+    Deux images sont dans le même groupe si une chaîne de quasi-doublons
+    les relie.
+
+    Args:
+        hashes: empreintes pHash
+        max_distance: distance de Hamming maximale entre quasi-doublons
+
+    Returns:
+        liste des groupes (listes d'indices dans hashes, triées) d'au moins deux images
+    """
+    index = HashIndex(max_distance)
+    parent = list(range(len(hashes)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # Chaque empreinte n'est comparée qu'aux précédentes (déjà indexées)
+    for i, value_hash in enumerate(hashes):
+        for _, j in index.search(value_hash):
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j:
+                parent[max(root_i, root_j)] = min(root_i, root_j)
+        index.add(value_hash)
+
+    groups = {}
+    for i in range(len(hashes)):
+        groups.setdefault(find(i), []).append(i)
+    return sorted((group for group in groups.values() if len(group) > 1), key=lambda g: (-len(g), g[0]))
+
+
+def corpus_hashes(image_paths, batch_size=64, workers=None, img_size=IMG_SIZE):
+    """
+    Empreintes d'un corpus (pipeline de décodage parallèle, mémoire bornée)
+
+    Returns:
+        (chemins lus, empreintes, erreurs {chemin: message})
+    """
+    from decode_pipeline import iter_decoded_batches
+
+    paths, hashes, errors = [], [], {}
+    for batch in iter_decoded_batches(image_paths, batch_size, workers, img_size=img_size):
+        for i, error in batch.errors.items():
+            errors[batch.paths[i]] = error
+        hashes.extend(phash_batch(batch.valid_images()))
+        paths.extend(batch.paths[i] for i in batch.valid)
+    return paths, hashes, errors
+
+
+def main(argv=None):
+    """Point d'entrée: groupes de quasi-doublons d'un corpus d'images"""
+    from batch_inference import collect_image_paths
+
+    parser = argparse.ArgumentParser(description="Groupes de quasi-doublons (empreintes perceptuelles)")
+    parser.add_argument('inputs', nargs='+', help="Images et/ou dossiers d'images")
+    parser.add_argument('-o', '--output', default=DEFAULT_CLUSTERS_OUTPUT,
+                        help=f"Fichier CSV des groupes (défaut: {DEFAULT_CLUSTERS_OUTPUT})")
+    parser.add_argument('-d', '--distance', type=int, default=DEFAULT_MAX_DISTANCE,
+                        help=f"Distance de Hamming maximale, sur 64 bits (défaut: {DEFAULT_MAX_DISTANCE})")
+    parser.add_argument('-r', '--recursive', action='store_true', help="Parcourir aussi les sous-dossiers")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="Threads de décodage des images (défaut: nombre de cœurs, max 8)")
+    args = parser.parse_args(argv)
+
+    if not 0 <= args.distance < 64:
+        parser.error("--distance doit être compris entre 0 et 63")
+
+    image_paths = collect_image_paths(args.inputs, recursive=args.recursive)
+    if not image_paths:
+        print("❌ Aucune image trouvée")
+        return 1
+
+    print(f"Empreintes de {len(image_paths)} images...")
+    start = time.perf_counter()
+    paths, hashes, errors = corpus_hashes(image_paths, workers=args.workers)
+    hashed = time.perf_counter()
+    clusters = duplicate_clusters(hashes, args.distance)
+    elapsed = time.perf_counter() - hashed
+
+    with open(args.output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['cluster', 'image', 'distance'])
+        for number, group in enumerate(clusters, 1):
+            reference = hashes[group[0]]
+            for i in group:
+                writer.writerow([number, paths[i], hamming(reference, hashes[i])])
+
+    duplicates = sum(len(group) - 1 for group in clusters)
+    print(f"✓ {len(paths)} empreintes en {hashed - start:.1f}s, groupes en {elapsed:.2f}s")
+    print(f"   - Groupes de quasi-doublons: {len(clusters)} ({duplicates} images en double)")
+    print(f"   - Erreurs de lecture: {len(errors)}")
+    print(f"   - Résultats: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
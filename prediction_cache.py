@@ -0,0 +1,329 @@
+"""
+Brain Tumor Detection - Cache des prédictions
+==============================================
+Cache persistant (SQLite) des probabilités déjà calculées, adressé par le
+contenu : la clé est une empreinte des octets de l'image, associée à
+l'empreinte du fichier modèle.
+
+- Une IRM ré-ouverte ou ré-analysée (même renommée) n'est pas ré-analysée.
+- Si le fichier modèle change, toutes les entrées sont invalidées automatiquement.
+- Taille bornée : au-delà de `max_entries`, les entrées les moins récemment
+  utilisées sont supprimées (LRU).
+- Les entrées récentes sont aussi gardées en mémoire : un succès du cache
+  coûte quelques microsecondes.
+- Les cartes Grad-CAM (gradcam.py) sont enregistrées à côté des prédictions
+  (uint8, quelques Ko) et suivent les mêmes invalidations et évictions.
+- De même pour les empreintes perceptuelles (perceptual_index.py), qui
+  permettent de reconnaître les quasi-doublons d'une image déjà analysée.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from perceptual_index import to_signed, to_unsigned
+
+DEFAULT_CACHE_PATH = "prediction_cache.sqlite"
+DEFAULT_MAX_ENTRIES = 100_000
+DEFAULT_MEMORY_ENTRIES = 4096
+
+# Libellés de l'origine d'un résultat (CSV, log, interface)
+SOURCE_CACHE = "cache"
+SOURCE_MODEL = "model"
+
+
+def image_hash(data):
+    """Empreinte du contenu d'une image (BLAKE2b 128 bits, hexadécimal)"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Empreinte SHA-256 d'un fichier (lecture par blocs)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    """
+    Cache persistant des probabilités de tumeur
+
+    Utilisable depuis plusieurs threads (accès protégés par un verrou).
+
+    Args:
+        model_path: fichier modèle dont les prédictions sont mises en cache
+        cache_path: fichier SQLite du cache
+        max_entries: nombre maximal d'entrées sur disque
+        memory_entries: nombre d'entrées gardées en mémoire
+        fingerprint: empreinte du modèle déjà connue (registre des modèles,
+            ensembles) ; model_path n'est alors pas lu
+    """
+
+    def __init__(self, model_path, cache_path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES,
+                 memory_entries=DEFAULT_MEMORY_ENTRIES, fingerprint=None):
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._touched = {}
+
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            " image_hash TEXT PRIMARY KEY,"
+            " probability REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON predictions(last_access)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS heatmaps ("
+            " image_hash TEXT PRIMARY KEY,"
+            " height INTEGER NOT NULL,"
+            " width INTEGER NOT NULL,"
+            " heatmap BLOB NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS phashes ("
+            " image_hash TEXT PRIMARY KEY,"
+            " phash INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+        if fingerprint is None:
+            fingerprint = self._file_fingerprint(model_path)
+        self.model_fingerprint = self._check_model(fingerprint)
+        self._conn.commit()
+        self._count = self._count_entries()
+
+    def _count_entries(self):
+        return self._conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+    def _meta(self, key):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _file_fingerprint(self, model_path):
+        """Empreinte du fichier modèle"""
+        stat = os.stat(model_path)
+        model_stat = f"{os.path.abspath(model_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+
+        # Ne re-hacher le fichier modèle que si sa taille ou sa date ont changé
+        # (empreinte mémorisée avec le fichier: celle du cache peut être celle d'un ensemble)
+        cached_stat, _, fingerprint = (self._meta('model_stat') or '').rpartition('#')
+        if cached_stat == model_stat:
+            return fingerprint
+        fingerprint = file_sha256(model_path)
+        self._set_meta('model_stat', f"{model_stat}#{fingerprint}")
+        return fingerprint
+
+    def _check_model(self, fingerprint):
+        """Vide le cache si le modèle a changé"""
+        if self._meta('model_fingerprint') != fingerprint:
+            self._conn.execute("DELETE FROM predictions")
+            self._conn.execute("DELETE FROM heatmaps")
+            self._conn.execute("DELETE FROM phashes")
+            self._set_meta('model_fingerprint', fingerprint)
+
+        return fingerprint
+
+    def set_model_fingerprint(self, fingerprint):
+        """
+        Change de modèle sans rouvrir le cache (rechargement à chaud)
+
+        Les entrées sont invalidées si l'empreinte diffère de l'actuelle.
+        """
+        with self._lock:
+            if fingerprint != self.model_fingerprint:
+                self._memory.clear()
+                self._touched.clear()
+            self.model_fingerprint = self._check_model(fingerprint)
+            self._conn.commit()
+            self._count = self._count_entries()
+
+    def _remember(self, key, probability):
+        self._memory[key] = probability
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """
+        Probabilité en cache pour une image
+
+        Args:
+            key: empreinte de l'image (image_hash)
+
+        Returns:
+            probabilité, ou None si l'image n'est pas en cache
+        """
+        with self._lock:
+            probability = self._memory.get(key)
+            if probability is None:
+                row = self._conn.execute(
+                    "SELECT probability FROM predictions WHERE image_hash = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                probability = row[0]
+
+            self._remember(key, probability)
+            # Date d'accès écrite en différé (au prochain enregistrement)
+            self._touched[key] = time.time()
+            self.hits += 1
+            return probability
+
+    def put(self, key, probability):
+        """Enregistre la probabilité d'une image"""
+        self.put_many([(key, probability)])
+
+    def put_many(self, items):
+        """
+        Enregistre plusieurs probabilités en une seule transaction
+
+        Args:
+            items: liste de (image_hash, probabilité)
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE predictions SET last_access = ? WHERE image_hash = ?",
+                [(accessed, key) for key, accessed in self._touched.items()],
+            )
+            self._touched.clear()
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO predictions (image_hash, probability, last_access) VALUES (?, ?, ?)",
+                [(key, float(probability), now) for key, probability in items],
+            )
+            for key, probability in items:
+                self._remember(key, float(probability))
+            # Majorant: un remplacement est compté comme une nouvelle entrée
+            self._count += len(items)
+
+            self._evict()
+            self._conn.commit()
+
+    def get_heatmap(self, key):
+        """
+        Carte Grad-CAM en cache pour une image
+
+        Args:
+            key: empreinte de l'image (image_hash)
+
+        Returns:
+            tableau uint8 (h, w), ou None si la carte n'est pas en cache
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT height, width, heatmap FROM heatmaps WHERE image_hash = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        height, width, data = row
+        return np.frombuffer(data, dtype=np.uint8).reshape(height, width)
+
+    def put_heatmaps(self, items):
+        """
+        Enregistre plusieurs cartes Grad-CAM en une seule transaction
+
+        Les cartes sont supprimées avec la prédiction de la même image
+        (éviction, changement de modèle).
+
+        Args:
+            items: liste de (image_hash, carte uint8 (h, w))
+        """
+        rows = []
+        for key, heatmap in items:
+            heatmap = np.ascontiguousarray(heatmap, dtype=np.uint8)
+            rows.append((key, heatmap.shape[0], heatmap.shape[1], heatmap.tobytes()))
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO heatmaps (image_hash, height, width, heatmap) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def put_phashes(self, items):
+        """
+        Enregistre les empreintes perceptuelles de plusieurs images analysées
+
+        Args:
+            items: liste de (image_hash, empreinte pHash 64 bits)
+        """
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO phashes (image_hash, phash) VALUES (?, ?)",
+                [(key, to_signed(value)) for key, value in items],
+            )
+            self._conn.commit()
+
+    def phash_entries(self):
+        """
+        Empreintes perceptuelles des images en cache
+
+        Returns:
+            liste de (empreinte pHash, probabilité)
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT phashes.phash, predictions.probability FROM phashes"
+                " JOIN predictions ON predictions.image_hash = phashes.image_hash"
+            ).fetchall()
+        return [(to_unsigned(value), probability) for value, probability in rows]
+
+    def _evict(self):
+        """
+        Supprime les entrées les moins récemment utilisées au-delà de max_entries
+
+        Le nombre d'entrées n'est recompté (COUNT(*), parcours de l'index)
+        que lorsque le compteur tenu à jour dépasse la limite.
+        """
+        if self._count <= self.max_entries:
+            return
+        count = self._count = self._count_entries()
+        if count <= self.max_entries:
+            return
+
+        # Marge de 10% pour ne pas évincer à chaque enregistrement
+        excess = count - int(self.max_entries * 0.9)
+        self._conn.execute(
+            "DELETE FROM predictions WHERE image_hash IN ("
+            " SELECT image_hash FROM predictions ORDER BY last_access LIMIT ?)",
+            (excess,),
+        )
+        self._count = count - excess
+        self._conn.execute(
+            "DELETE FROM heatmaps WHERE image_hash NOT IN (SELECT image_hash FROM predictions)"
+        )
+        self._conn.execute(
+            "DELETE FROM phashes WHERE image_hash NOT IN (SELECT image_hash FROM predictions)"
+        )
+        self._memory.clear()
+
+    def __len__(self):
+        with self._lock:
+            return self._count_entries()
+
+    def close(self):
+        """Écrit les dates d'accès en attente et ferme la base"""
+        self.put_many([])
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,368 @@
+"""
+Brain Tumor Detection - Historique des analyses
+================================================
+Base SQLite indexée des résultats, qui remplace le fichier texte
+`analysis_log.txt` :
+
+- une ligne par analyse (date, image, résultat, probabilité, confiance,
+  version du modèle, origine du résultat) ;
+- index sur l'image, la date, le résultat et la version du modèle : les
+  requêtes du type « tous les positifs de la semaine dernière » restent
+  rapides même avec des millions d'analyses ;
+- écritures mises en tampon et validées par transactions groupées
+  (mode batch), ou immédiatement (interface graphique) ;
+- import de l'ancien `analysis_log.txt` (marqueurs de conflit git ignorés,
+  doublons supprimés).
+
+Usage:
+    python results_store.py import analysis_log.txt
+    python results_store.py query --positives --days 7
+    python results_store.py query --image Y1.jpg --limit 20
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+from detector_core import THRESHOLD, interpret_prediction, result_status
+
+DEFAULT_RESULTS_DB = "analysis_results.sqlite"
+LEGACY_LOG_PATH = "analysis_log.txt"
+DEFAULT_FLUSH_SIZE = 256
+DEFAULT_FLUSH_INTERVAL = 2.0
+
+# Format des dates (trié chronologiquement par ordre alphabétique)
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Origine des résultats importés depuis l'ancien fichier texte
+SOURCE_LEGACY = "legacy"
+
+RESULT_COLUMNS = ['id', 'timestamp', 'image', 'image_path', 'result', 'probability',
+                  'confidence', 'model_version', 'source']
+
+
+def model_version(model_path, fingerprint=None):
+    """
+    Identifiant de version du modèle: nom du fichier et début de son empreinte
+
+    Args:
+        model_path: fichier modèle
+        fingerprint: empreinte SHA-256 déjà calculée (ex: PredictionCache.model_fingerprint)
+    """
+    if fingerprint is None:
+        from prediction_cache import file_sha256
+        fingerprint = file_sha256(model_path)
+    return f"{os.path.basename(model_path)}@{fingerprint[:12]}"
+
+
+def parse_legacy_log(path):
+    """
+    Lit les analyses de l'ancien fichier texte analysis_log.txt
+
+    Les marqueurs de conflit git (<<<<<<<, =======, >>>>>>>) sont ignorés ;
+    une analyse présente des deux côtés d'un conflit apparaît deux fois.
+
+    Returns:
+        liste de dictionnaires (timestamp, image, result, probability, confidence, source)
+    """
+    fields = {
+        'Date': 'timestamp',
+        'Image': 'image',
+        'Résultat': 'result',
+        'Probabilité': 'probability',
+        'Confiance': 'confidence',
+        'Source': 'source',
+    }
+    entries = []
+    entry = {}
+
+    def close_entry():
+        if {'timestamp', 'image', 'result', 'probability'} <= entry.keys():
+            entries.append(dict(entry))
+        entry.clear()
+
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith(('<<<<<<<', '>>>>>>>')) or line == '=======':
+                close_entry()
+                continue
+            if line.startswith('=' * 20):
+                # Séparateur de bloc: début ou fin d'une analyse
+                close_entry()
+                continue
+
+            key, sep, value = line.partition(':')
+            if not sep or key.strip() not in fields:
+                continue
+            field = fields[key.strip()]
+            value = value.strip()
+            if field in ('probability', 'confidence'):
+                try:
+                    value = float(value.rstrip('%')) / 100
+                except ValueError:
+                    continue
+            entry[field] = value
+
+    close_entry()
+    return entries
+
+
+class ResultsStore:
+    """
+    Historique SQLite des analyses
+
+    Les résultats sont mis en tampon puis écrits en une seule transaction
+    lorsque le tampon atteint `flush_size` lignes ou que la plus ancienne
+    ligne attend depuis plus de `flush_interval` secondes.
+
+    Args:
+        db_path: fichier SQLite
+        flush_size: nombre de résultats par transaction (1 = écriture immédiate)
+        flush_interval: délai maximal (s) avant l'écriture d'un résultat en tampon
+    """
+
+    def __init__(self, db_path=DEFAULT_RESULTS_DB, flush_size=DEFAULT_FLUSH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.db_path = db_path
+        self.flush_size = max(1, flush_size)
+        self.flush_interval = flush_interval
+
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._buffer_since = None
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " id INTEGER PRIMARY KEY,"
+            " timestamp TEXT NOT NULL,"
+            " image TEXT NOT NULL,"
+            " image_path TEXT,"
+            " result TEXT NOT NULL,"
+            " probability REAL NOT NULL,"
+            " confidence REAL,"
+            " model_version TEXT,"
+            " source TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_timestamp ON results(timestamp)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_image ON results(image, timestamp)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_result ON results(result, timestamp)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_model ON results(model_version, timestamp)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, image_path, prediction, model_version=None, source=None, timestamp=None, threshold=THRESHOLD):
+        """
+        Ajoute le résultat d'une analyse
+
+        Args:
+            image_path: image analysée
+            prediction: probabilité de tumeur (0-1)
+            model_version: version du modèle (voir model_version())
+            source: origine du résultat ('model', 'cache', ...)
+            timestamp: date de l'analyse (défaut: maintenant)
+            threshold: seuil de décision (métadonnées du modèle)
+        """
+        has_tumor, confidence = interpret_prediction(float(prediction), threshold)
+        timestamp = timestamp or datetime.now()
+        if isinstance(timestamp, datetime):
+            timestamp = timestamp.strftime(TIMESTAMP_FORMAT)
+
+        row = (timestamp, os.path.basename(image_path), image_path, result_status(has_tumor),
+               float(prediction), float(confidence), model_version, source)
+
+        with self._lock:
+            if not self._buffer:
+                self._buffer_since = time.monotonic()
+            self._buffer.append(row)
+            due = (len(self._buffer) >= self.flush_size
+                   or time.monotonic() - self._buffer_since >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Écrit les résultats en tampon en une seule transaction"""
+        with self._lock:
+            if not self._buffer:
+                return
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO results (timestamp, image, image_path, result, probability,"
+                    " confidence, model_version, source) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    self._buffer,
+                )
+            self._buffer = []
+            self._buffer_since = None
+
+    def import_legacy_log(self, path=LEGACY_LOG_PATH, force=False):
+        """
+        Importe l'ancien fichier texte analysis_log.txt
+
+        Les analyses déjà présentes (même date, image et probabilité) ne sont
+        pas dupliquées : l'import peut être relancé sans risque. Sauf avec
+        force=True, un fichier déjà importé et inchangé n'est pas relu.
+
+        Returns:
+            nombre d'analyses importées
+        """
+        self.flush()
+        stat = os.stat(path)
+        meta_key = f"legacy:{os.path.abspath(path)}"
+        file_stat = f"{stat.st_size}|{stat.st_mtime_ns}"
+
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (meta_key,)).fetchone()
+        if not force and row is not None and row[0] == file_stat:
+            return 0
+
+        entries = parse_legacy_log(path)
+
+        with self._lock, self._conn:
+            existing = set(self._conn.execute(
+                "SELECT timestamp, image, ROUND(probability, 4) FROM results"
+                " WHERE timestamp BETWEEN ? AND ?",
+                (min((e['timestamp'] for e in entries), default=''),
+                 max((e['timestamp'] for e in entries), default='')),
+            ))
+
+            rows = []
+            for e in entries:
+                key = (e['timestamp'], e['image'], round(e['probability'], 4))
+                if key in existing:
+                    continue
+                existing.add(key)
+                rows.append((e['timestamp'], e['image'], None, e['result'], e['probability'],
+                             e.get('confidence'), None, e.get('source', SOURCE_LEGACY)))
+
+            self._conn.executemany(
+                "INSERT INTO results (timestamp, image, image_path, result, probability,"
+                " confidence, model_version, source) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (meta_key, file_stat))
+        return len(rows)
+
+    def query(self, image=None, has_tumor=None, since=None, until=None, model_version=None,
+              limit=None):
+        """
+        Recherche des analyses (les plus récentes d'abord)
+
+        Args:
+            image: nom de fichier de l'image
+            has_tumor: True (positifs), False (négatifs) ou None (tous)
+            since, until: bornes de date (datetime ou texte 'AAAA-MM-JJ HH:MM:SS')
+            model_version: version du modèle
+            limit: nombre maximal de résultats
+
+        Returns:
+            liste de dictionnaires (clés: RESULT_COLUMNS)
+        """
+        self.flush()
+
+        conditions = []
+        params = []
+        if image is not None:
+            conditions.append("image = ?")
+            params.append(image)
+        if has_tumor is not None:
+            conditions.append("result = ?")
+            params.append(result_status(has_tumor))
+        if since is not None:
+            conditions.append("timestamp >= ?")
+            params.append(since.strftime(TIMESTAMP_FORMAT) if isinstance(since, datetime) else since)
+        if until is not None:
+            conditions.append("timestamp <= ?")
+            params.append(until.strftime(TIMESTAMP_FORMAT) if isinstance(until, datetime) else until)
+        if model_version is not None:
+            conditions.append("model_version = ?")
+            params.append(model_version)
+
+        sql = f"SELECT {', '.join(RESULT_COLUMNS)} FROM results"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY timestamp DESC, id DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(zip(RESULT_COLUMNS, row)) for row in rows]
+
+    def __len__(self):
+        self.flush()
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self):
+        """Écrit les résultats en attente et ferme la base"""
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+
+def main(argv=None):
+    """Import de l'ancien log et consultation de l'historique"""
+    parser = argparse.ArgumentParser(description="Historique des analyses (SQLite)")
+    parser.add_argument('--db', default=DEFAULT_RESULTS_DB,
+                        help=f"Base des résultats (défaut: {DEFAULT_RESULTS_DB})")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help="Importer un ancien analysis_log.txt")
+    import_parser.add_argument('log', nargs='?', default=LEGACY_LOG_PATH,
+                               help=f"Fichier texte à importer (défaut: {LEGACY_LOG_PATH})")
+
+    query_parser = subparsers.add_parser('query', help="Rechercher des analyses")
+    query_parser.add_argument('--image', help="Nom de fichier de l'image")
+    group = query_parser.add_mutually_exclusive_group()
+    group.add_argument('--positives', action='store_true', help="Tumeurs détectées uniquement")
+    group.add_argument('--negatives', action='store_true', help="Pas de tumeur uniquement")
+    query_parser.add_argument('--days', type=int, help="Analyses des N derniers jours")
+    query_parser.add_argument('--since', help="Date de début (AAAA-MM-JJ)")
+    query_parser.add_argument('--until', help="Date de fin (AAAA-MM-JJ)")
+    query_parser.add_argument('--model-version', help="Version du modèle")
+    query_parser.add_argument('-n', '--limit', type=int, default=50,
+                              help="Nombre maximal de résultats (défaut: 50, 0 = tous)")
+    args = parser.parse_args(argv)
+
+    with ResultsStore(args.db) as store:
+        if args.command == 'import':
+            if not os.path.exists(args.log):
+                print(f"❌ Fichier introuvable: {args.log}")
+                return 1
+            imported = store.import_legacy_log(args.log, force=True)
+            print(f"✓ {imported} analyses importées depuis {args.log} ({len(store)} au total)")
+            return 0
+
+        since = args.since
+        if args.days is not None:
+            since = datetime.now() - timedelta(days=args.days)
+        until = f"{args.until} 23:59:59" if args.until else None
+        has_tumor = True if args.positives else False if args.negatives else None
+
+        start = time.perf_counter()
+        rows = store.query(args.image, has_tumor, since, until, args.model_version, args.limit or None)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        for row in rows:
+            print(f"{row['timestamp']}  {row['result']:16} {row['probability'] * 100:6.2f}%  "
+                  f"{row['image']}  ({row['model_version'] or row['source'] or ''})")
+        print(f"\n✓ {len(rows)} analyses ({elapsed:.1f}ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,750 @@
+"""
+Brain Tumor Detection - Analyse par lots répartie (processus, machines, reprise)
+=================================================================================
+Un seul processus batch, avec les réglages de threads par défaut de
+TensorFlow, n'occupe pas toutes les machines à nombreux cœurs, et une
+interruption en cours de route fait perdre toute l'analyse.
+
+- `plan` : la liste des images (triée, chemins absolus) est découpée en
+  tranches de taille fixe (shards) ; le découpage ne dépend que de la
+  liste et de la taille des tranches, pas du nombre de processus ;
+- `run` : N processus (spawn) analysent les tranches avec run_batch ;
+  chacun a ses propres cœurs (affinité CPU) et ses réglages de threads
+  TensorFlow (intra-op / inter-op) ;
+- chaque tranche a son CSV de résultats, écrit lot par lot : c'est le
+  point de reprise. Une tranche est réservée par un fichier verrou créé
+  de façon exclusive ; un verrou abandonné (processus arrêté, ou sans
+  activité depuis plus de `--lease` secondes) est repris. Plusieurs
+  machines peuvent donc lancer `run` sur le même dossier partagé ;
+- `merge` : les CSV des tranches sont réunis en un seul fichier, dans
+  l'ordre de la liste ;
+- `scale` : débit (images/s) en fonction du nombre de processus.
+
+Le cache des prédictions et l'historique (SQLite) ne sont pas utilisés par
+les processus : un même fichier SQLite partagé entre machines n'est pas
+fiable.
+
+Usage:
+    python brain_tumor_detector_app.py shard plan archives/ -r --run-dir nuit_2026_10
+    python brain_tumor_detector_app.py shard run nuit_2026_10 -w 8
+    python brain_tumor_detector_app.py shard status nuit_2026_10
+    python brain_tumor_detector_app.py shard merge nuit_2026_10 -o resultats.csv
+    python brain_tumor_detector_app.py shard scale archives/ -w 1 2 4 8
+"""
+
+import argparse
+import csv
+import json
+import math
+import multiprocessing
+import os
+import platform
+import queue
+import socket
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from detector_core import MODEL_PATH, result_status
+from batch_inference import DEFAULT_BATCH_SIZE, DEFAULT_OUTPUT, RESULT_FIELDS, collect_image_paths, run_batch
+from decode_pipeline import default_workers
+from prediction_cache import file_sha256
+
+DEFAULT_SHARD_SIZE = 1000
+# Verrou d'une tranche sans activité (CSV ni verrou modifiés) au-delà de ce délai: repris
+DEFAULT_LEASE = 600.0
+# Threads (cœurs) par processus pour le nombre de processus par défaut
+DEFAULT_THREADS_PER_WORKER = 4
+DEFAULT_SCALING_IMAGES = 2048
+DEFAULT_SCALING_REPORT = "scaling_report.json"
+
+MANIFEST_FILE = "manifest.json"
+PATHS_FILE = "manifest.txt"
+SHARDS_DIR = "shards"
+RUNS_FILE = "runs.jsonl"
+
+HOST = socket.gethostname()
+
+
+def available_cpus():
+    """Cœurs utilisables par ce processus (affinité actuelle si connue)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def split_cpus(cpus, workers):
+    """
+    Répartit les cœurs entre les processus (groupes contigus de tailles voisines)
+
+    Returns:
+        liste de `workers` listes de cœurs (un cœur partagé à tour de rôle
+        s'il y a plus de processus que de cœurs)
+    """
+    if workers >= len(cpus):
+        return [[cpus[i % len(cpus)]] for i in range(workers)]
+    bounds = [i * len(cpus) // workers for i in range(workers + 1)]
+    return [cpus[bounds[i]:bounds[i + 1]] for i in range(workers)]
+
+
+def set_cpu_affinity(cpus):
+    """
+    Restreint le processus courant aux cœurs indiqués
+
+    Returns:
+        True si l'affinité a été appliquée (Linux, ou psutil installé)
+    """
+    try:
+        if hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, cpus)
+            return True
+        import psutil
+        psutil.Process().cpu_affinity(list(cpus))
+        return True
+    except Exception:
+        return False
+
+
+def configure_threads(intra_op, inter_op):
+    """Pools de threads TensorFlow du processus (avant toute opération TensorFlow)"""
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(intra_op)
+    tf.config.threading.set_inter_op_parallelism_threads(inter_op)
+
+
+def _write_json(path, data):
+    """Écriture atomique d'un fichier JSON (visible entier ou pas du tout)"""
+    tmp_path = f"{path}.{HOST}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def plan_run(run_dir, image_paths, model_path=MODEL_PATH, shard_size=DEFAULT_SHARD_SIZE):
+    """
+    Prépare une analyse répartie: liste des images et découpage en tranches
+
+    Args:
+        run_dir: dossier de l'analyse (partagé entre machines le cas échéant)
+        image_paths: images à analyser
+        model_path: modèle utilisé par tous les processus (empreinte vérifiée)
+        shard_size: nombre d'images par tranche
+
+    Returns:
+        manifeste (dictionnaire)
+    """
+    manifest_path = os.path.join(run_dir, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        raise ValueError(f"{run_dir} contient déjà une analyse (supprimer le dossier pour recommencer)")
+
+    paths = sorted(set(os.path.abspath(path) for path in image_paths))
+    os.makedirs(os.path.join(run_dir, SHARDS_DIR), exist_ok=True)
+    with open(os.path.join(run_dir, PATHS_FILE), 'w', encoding='utf-8') as f:
+        f.writelines(path + "\n" for path in paths)
+
+    manifest = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'model': os.path.abspath(model_path),
+        'model_fingerprint': file_sha256(model_path),
+        'images': len(paths),
+        'shard_size': shard_size,
+        'shards': math.ceil(len(paths) / shard_size),
+    }
+    # Le manifeste est écrit en dernier: sa présence signifie que le plan est complet
+    _write_json(manifest_path, manifest)
+    return manifest
+
+
+def load_manifest(run_dir):
+    """
+    Manifeste et liste des images d'une analyse répartie
+
+    Returns:
+        (manifeste, liste des chemins)
+    """
+    with open(os.path.join(run_dir, MANIFEST_FILE), encoding='utf-8') as f:
+        manifest = json.load(f)
+    with open(os.path.join(run_dir, PATHS_FILE), encoding='utf-8') as f:
+        paths = [line.rstrip("\n") for line in f if line.strip()]
+    if len(paths) != manifest['images']:
+        raise ValueError(f"{PATHS_FILE} ne correspond pas au manifeste de {run_dir}")
+    return manifest, paths
+
+
+def shard_images(paths, shard_size, index):
+    """Images de la tranche index"""
+    return paths[index * shard_size:(index + 1) * shard_size]
+
+
+def shard_file(run_dir, index, suffix):
+    """Fichier d'une tranche (suffixes: .csv résultats, .lock verrou, .done fin)"""
+    return os.path.join(run_dir, SHARDS_DIR, f"shard_{index:05d}{suffix}")
+
+
+def _pid_alive(pid):
+    """Le processus pid de cette machine existe-t-il encore (True si on ne peut pas le savoir)"""
+    if os.name != 'posix':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+def _read_lock(lock_path):
+    """
+    Contenu d'un verrou
+
+    Returns:
+        (octets du fichier, propriétaire: dictionnaire, vide si illisible)
+    """
+    with open(lock_path, 'rb') as f:
+        data = f.read()
+    try:
+        return data, json.loads(data)
+    except ValueError:
+        return data, {}
+
+
+def _lock_is_stale(lock_path, owner, csv_path, lease):
+    """Verrou d'un processus arrêté (même machine) ou sans activité depuis plus de lease secondes"""
+    if owner.get('host') == HOST and owner.get('pid') and not _pid_alive(owner['pid']):
+        return True
+
+    # Activité: le CSV est complété à chaque lot
+    last = os.path.getmtime(lock_path)
+    if os.path.exists(csv_path):
+        last = max(last, os.path.getmtime(csv_path))
+    return time.time() - last > lease
+
+
+def claim_shard(run_dir, index, worker=0, lease=DEFAULT_LEASE):
+    """
+    Réserve une tranche pour ce processus
+
+    Le verrou est créé de façon exclusive (O_EXCL) : une seule réservation
+    réussit, même entre machines. Un verrou abandonné est d'abord renommé,
+    puis relu : si ce n'est plus le verrou jugé abandonné (un autre
+    processus l'a repris entre-temps), il est remis en place et la tranche
+    est laissée à son nouveau propriétaire. Sinon la réservation est retentée.
+
+    Returns:
+        True si la tranche est réservée par ce processus
+    """
+    lock_path = shard_file(run_dir, index, ".lock")
+    # Jeton unique: deux réservations n'ont jamais le même contenu
+    owner = {'host': HOST, 'pid': os.getpid(), 'worker': worker,
+             'claimed_at': datetime.now().isoformat(timespec='seconds'), 'token': os.urandom(8).hex()}
+    for _ in range(2):
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                judged, current = _read_lock(lock_path)
+                if not _lock_is_stale(lock_path, current, shard_file(run_dir, index, ".csv"), lease):
+                    return False
+                stale_path = f"{lock_path}.stale.{HOST}.{os.getpid()}"
+                os.rename(lock_path, stale_path)
+            except OSError:
+                # Verrou libéré ou repris par un autre processus entre-temps
+                continue
+            moved, _ = _read_lock(stale_path)
+            if moved != judged:
+                # Verrou frais d'un autre processus: le remettre, sauf si un troisième a déjà réservé
+                try:
+                    os.link(stale_path, lock_path)
+                except OSError:
+                    pass
+                os.remove(stale_path)
+                return False
+            os.remove(stale_path)
+            continue
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(owner, f)
+        return True
+    return False
+
+
+def release_shard(run_dir, index):
+    """Libère le verrou d'une tranche (seulement s'il appartient encore à ce processus)"""
+    lock_path = shard_file(run_dir, index, ".lock")
+    try:
+        with open(lock_path, encoding='utf-8') as f:
+            owner = json.load(f)
+        if owner.get('host') == HOST and owner.get('pid') == os.getpid():
+            os.remove(lock_path)
+    except (OSError, ValueError):
+        pass
+
+
+def read_checkpoint(csv_path):
+    """
+    Images déjà analysées d'une tranche (point de reprise)
+
+    Une dernière ligne incomplète (processus arrêté pendant l'écriture) est
+    retirée du fichier.
+
+    Returns:
+        liste des chemins présents dans le CSV
+    """
+    if not os.path.exists(csv_path):
+        return []
+    with open(csv_path, 'rb+') as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            f.truncate(end)
+    if not end:
+        return []
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        return [row['image'] for row in csv.DictReader(f)]
+
+
+def process_shard(run_dir, index, paths, engine, batch_size=DEFAULT_BATCH_SIZE, decode_workers=None,
+                  policy=None, worker=0):
+    """
+    Analyse une tranche réservée, en reprenant après les images déjà dans son CSV
+
+    Args:
+        run_dir: dossier de l'analyse
+        index: numéro de la tranche
+        paths: images de la tranche
+        engine: moteur d'inférence chargé
+        batch_size: images par appel au modèle
+        decode_workers: threads de décodage (None = automatique)
+        policy: DecisionPolicy du modèle
+        worker: numéro du processus (rapport)
+
+    Returns:
+        statistiques de la tranche (aussi écrites dans shard_XXXXX.done)
+    """
+    csv_path = shard_file(run_dir, index, ".csv")
+    done = set(read_checkpoint(csv_path))
+    remaining = [path for path in paths if path not in done]
+
+    start = time.perf_counter()
+    results = run_batch(remaining, engine, batch_size, csv_path, workers=decode_workers,
+                        policy=policy, append=True)
+    stats = {
+        'shard': index,
+        'images': len(paths),
+        'analyzed': len(results),
+        'resumed': len(paths) - len(remaining),
+        'errors': sum(1 for r in results if r['error']),
+        'elapsed': time.perf_counter() - start,
+        'host': HOST,
+        'pid': os.getpid(),
+        'worker': worker,
+        'finished_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    _write_json(shard_file(run_dir, index, ".done"), stats)
+    return stats
+
+
+def shard_state(run_dir, index):
+    """
+    État d'une tranche
+
+    Returns:
+        ('done', statistiques), ('running', propriétaire du verrou) ou ('pending', None)
+    """
+    try:
+        with open(shard_file(run_dir, index, ".done"), encoding='utf-8') as f:
+            return 'done', json.load(f)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open(shard_file(run_dir, index, ".lock"), encoding='utf-8') as f:
+            return 'running', json.load(f)
+    except (OSError, ValueError):
+        return 'pending', None
+
+
+def worker_main(run_dir, worker, cpus, intra_op, inter_op, batch_size, decode_workers, lease, model_path,
+                results):
+    """
+    Processus d'analyse: réglages des threads, chargement du modèle, puis tranches libres
+
+    Le rapport du processus est déposé dans la file results (dictionnaire,
+    avec 'error' en cas d'échec).
+    """
+    report = {'worker': worker, 'host': HOST, 'pid': os.getpid(), 'cpus': list(cpus),
+              'intra_op': intra_op, 'inter_op': inter_op, 'shards': [], 'images': 0}
+    claimed = None
+    try:
+        report['affinity'] = set_cpu_affinity(cpus)
+        configure_threads(intra_op, inter_op)
+
+        from inference_engine import load_engine
+        from model_metadata import load_policy
+
+        manifest, paths = load_manifest(run_dir)
+        model_path = model_path or manifest['model']
+        fingerprint = file_sha256(model_path)
+        if fingerprint != manifest['model_fingerprint']:
+            raise ValueError(f"{model_path} n'est pas le modèle de l'analyse (empreinte différente)")
+
+        load_start = time.perf_counter()
+        engine = load_engine(model_path, warmup_batch_sizes=(batch_size,), num_threads=intra_op)
+        policy = load_policy(model_path, fingerprint)
+        report['load_time'] = time.perf_counter() - load_start
+
+        # Fenêtre de mesure du débit: modèle prêt → dernière tranche terminée (horloge commune)
+        report['start'] = time.time()
+        for index in range(manifest['shards']):
+            if os.path.exists(shard_file(run_dir, index, ".done")):
+                continue
+            if not claim_shard(run_dir, index, worker, lease):
+                continue
+            claimed = index
+            stats = process_shard(run_dir, index, shard_images(paths, manifest['shard_size'], index),
+                                  engine, batch_size, decode_workers, policy, worker)
+            release_shard(run_dir, index)
+            claimed = None
+            report['shards'].append(index)
+            report['images'] += stats['analyzed']
+            print(f"✓ [processus {worker}] tranche {index + 1}/{manifest['shards']}: "
+                  f"{stats['analyzed']} images en {stats['elapsed']:.1f}s"
+                  + (f" (reprise après {stats['resumed']})" if stats['resumed'] else ""), flush=True)
+        report['end'] = time.time()
+    except KeyboardInterrupt:
+        report['error'] = "interrompu"
+    except Exception as e:
+        report['error'] = str(e)
+    finally:
+        if claimed is not None:
+            release_shard(run_dir, claimed)
+        results.put(report)
+
+
+def run_shards(run_dir, workers=None, intra_op=None, inter_op=1, affinity=True, batch_size=DEFAULT_BATCH_SIZE,
+               decode_workers=None, lease=DEFAULT_LEASE, model_path=None):
+    """
+    Analyse les tranches libres avec plusieurs processus sur cette machine
+
+    Args:
+        run_dir: dossier de l'analyse (plan_run)
+        workers: nombre de processus (défaut: un par groupe de 4 cœurs)
+        intra_op: threads TensorFlow par opération et par processus (défaut: cœurs du processus)
+        inter_op: opérations TensorFlow en parallèle par processus
+        affinity: attacher chaque processus à ses propres cœurs
+        batch_size: images par appel au modèle
+        decode_workers: threads de décodage par processus (défaut: cœurs du processus, 8 au plus)
+        lease: délai (s) sans activité après lequel le verrou d'une tranche est repris
+        model_path: modèle (défaut: celui du manifeste, par exemple monté ailleurs sur une autre machine)
+
+    Returns:
+        résumé de l'exécution (aussi ajouté à runs.jsonl)
+    """
+    cpus = available_cpus()
+    workers = workers or max(1, len(cpus) // DEFAULT_THREADS_PER_WORKER)
+    groups = split_cpus(cpus, workers)
+
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    processes = []
+    start = time.perf_counter()
+    for worker, group in enumerate(groups):
+        threads = intra_op or len(group)
+        process = context.Process(
+            target=worker_main, name=f"shard-worker-{worker}",
+            args=(run_dir, worker, group if affinity else cpus, threads, inter_op, batch_size,
+                  decode_workers or min(default_workers(), len(group)), lease, model_path, results),
+        )
+        process.start()
+        processes.append(process)
+
+    reports = []
+    try:
+        while len(reports) < len(processes):
+            try:
+                reports.append(results.get(timeout=1.0))
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes):
+                    break
+    finally:
+        for process in processes:
+            process.join()
+    elapsed = time.perf_counter() - start
+
+    # Débit: toutes les images analysées sur la fenêtre où au moins un modèle était prêt
+    active = [r for r in reports if r.get('images')]
+    images = sum(r['images'] for r in reports)
+    window = max(r['end'] for r in active) - min(r['start'] for r in active) if active else 0.0
+    summary = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'host': HOST,
+        'workers': workers,
+        'intra_op': [r['intra_op'] for r in reports],
+        'inter_op': inter_op,
+        'affinity': affinity,
+        'batch_size': batch_size,
+        'images': images,
+        'elapsed': elapsed,
+        'processing_time': window,
+        'images_per_sec': images / window if window > 0 else 0.0,
+        'errors': {r['worker']: r['error'] for r in reports if r.get('error')},
+        'lost_workers': len(processes) - len(reports),
+    }
+    with open(os.path.join(run_dir, RUNS_FILE), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(summary, ensure_ascii=False) + "\n")
+    return summary
+
+
+def run_status(run_dir):
+    """
+    Avancement d'une analyse répartie
+
+    Returns:
+        dictionnaire {'done', 'running', 'pending': nombres de tranches,
+        'images_done': images des tranches terminées, 'owners': {tranche: propriétaire}}
+    """
+    manifest, _ = load_manifest(run_dir)
+    status = {'shards': manifest['shards'], 'done': 0, 'running': 0, 'pending': 0, 'images_done': 0,
+              'owners': {}}
+    for index in range(manifest['shards']):
+        state, info = shard_state(run_dir, index)
+        status[state] += 1
+        if state == 'done':
+            status['images_done'] += info['images']
+        elif state == 'running':
+            status['owners'][index] = info
+    return status
+
+
+def merge_shards(run_dir, output_path=DEFAULT_OUTPUT, partial=False):
+    """
+    Réunit les CSV des tranches en un seul fichier, dans l'ordre de la liste des images
+
+    Args:
+        run_dir: dossier de l'analyse
+        output_path: fichier CSV fusionné (RESULT_FIELDS)
+        partial: accepter des tranches non terminées (images manquantes omises)
+
+    Returns:
+        dictionnaire {'images', 'missing', 'positives', 'errors'}
+    """
+    manifest, paths = load_manifest(run_dir)
+    unfinished = [i for i in range(manifest['shards']) if shard_state(run_dir, i)[0] != 'done']
+    if unfinished and not partial:
+        raise ValueError(f"{len(unfinished)} tranche(s) non terminée(s) (--partial pour fusionner quand même)")
+
+    counts = {'images': 0, 'missing': 0, 'positives': 0, 'errors': 0}
+    with open(output_path, 'w', newline='', encoding='utf-8') as out_file:
+        writer = csv.DictWriter(out_file, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        for index in range(manifest['shards']):
+            rows = {}
+            csv_path = shard_file(run_dir, index, ".csv")
+            if os.path.exists(csv_path):
+                read_checkpoint(csv_path)
+                with open(csv_path, newline='', encoding='utf-8') as f:
+                    # Une image analysée deux fois (tranche reprise) n'est écrite qu'une fois
+                    rows = {row['image']: row for row in csv.DictReader(f)}
+            for path in shard_images(paths, manifest['shard_size'], index):
+                row = rows.get(path)
+                if row is None:
+                    counts['missing'] += 1
+                    continue
+                writer.writerow(row)
+                counts['images'] += 1
+                counts['errors'] += bool(row['error'])
+                counts['positives'] += row['result'] == result_status(True)
+    return counts
+
+
+def default_worker_counts(cpus):
+    """Nombres de processus mesurés par défaut: 1, 2, 4... jusqu'au nombre de cœurs"""
+    counts = [1]
+    while counts[-1] * 2 <= len(cpus):
+        counts.append(counts[-1] * 2)
+    if counts[-1] != len(cpus):
+        counts.append(len(cpus))
+    return counts
+
+
+def scaling_report(image_paths, model_path=MODEL_PATH, worker_counts=None, batch_size=DEFAULT_BATCH_SIZE,
+                   inter_op=1, affinity=True):
+    """
+    Débit de l'analyse répartie selon le nombre de processus
+
+    Chaque mesure analyse les mêmes images dans un dossier temporaire, avec
+    les mêmes tranches ; le chargement des modèles n'est pas compté.
+
+    Returns:
+        rapport {'metadata', 'runs': [{'workers', 'intra_op', 'images_per_sec', 'speedup', 'efficiency'}]}
+    """
+    cpus = available_cpus()
+    worker_counts = sorted(set(worker_counts or default_worker_counts(cpus)))
+    # Au moins 4 tranches par processus pour le plus grand nombre de processus (équilibrage)
+    shard_size = max(batch_size, math.ceil(len(image_paths) / (4 * worker_counts[-1])))
+
+    runs = []
+    for workers in worker_counts:
+        with tempfile.TemporaryDirectory() as run_dir:
+            plan_run(run_dir, image_paths, model_path, shard_size)
+            summary = run_shards(run_dir, workers, inter_op=inter_op, affinity=affinity, batch_size=batch_size)
+        if summary['errors'] or summary['lost_workers']:
+            raise RuntimeError(f"{workers} processus: {summary['errors'] or 'processus arrêté'}")
+        runs.append({'workers': workers, 'intra_op': summary['intra_op'][0], 'images': summary['images'],
+                     'processing_time': summary['processing_time'],
+                     'images_per_sec': summary['images_per_sec']})
+        print(f"✓ {workers} processus: {summary['images_per_sec']:.1f} images/s", flush=True)
+
+    reference = runs[0]
+    for run in runs:
+        run['speedup'] = run['images_per_sec'] / reference['images_per_sec'] if reference['images_per_sec'] else 0.0
+        run['efficiency'] = run['speedup'] * reference['workers'] / run['workers']
+
+    metadata = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'host': HOST,
+        'model': os.path.basename(model_path),
+        'images': len(image_paths),
+        'batch_size': batch_size,
+        'shard_size': shard_size,
+        'inter_op': inter_op,
+        'affinity': affinity,
+        'cpus': len(cpus),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+    }
+    return {'metadata': metadata, 'runs': runs}
+
+
+def print_scaling_report(report):
+    """Affiche le débit selon le nombre de processus"""
+    print(f"\n{'Processus':>9} {'Threads':>8} {'Images/s':>10} {'Accélération':>13} {'Efficacité':>11}")
+    for run in report['runs']:
+        print(f"{run['workers']:>9} {run['intra_op']:>8} {run['images_per_sec']:>10.1f} "
+              f"{run['speedup']:>12.2f}x {run['efficiency'] * 100:>10.0f}%")
+
+
+def shard_main(argv=None):
+    """Point d'entrée: plan, run, status, merge et scale"""
+    parser = argparse.ArgumentParser(description="Analyse par lots répartie en tranches (processus, machines)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    plan_parser = subparsers.add_parser('plan', help="Découper la liste des images en tranches")
+    plan_parser.add_argument('inputs', nargs='+', help="Images et/ou dossiers")
+    plan_parser.add_argument('--run-dir', required=True, help="Dossier de l'analyse (partagé entre machines)")
+    plan_parser.add_argument('-m', '--model', default=MODEL_PATH, help=f"Modèle (défaut: {MODEL_PATH})")
+    plan_parser.add_argument('-r', '--recursive', action='store_true', help="Parcourir les sous-dossiers")
+    plan_parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE,
+                             help=f"Images par tranche (défaut: {DEFAULT_SHARD_SIZE})")
+
+    def add_run_options(subparser):
+        subparser.add_argument('-b', '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                               help=f"Images par appel au modèle (défaut: {DEFAULT_BATCH_SIZE})")
+        subparser.add_argument('--inter-op', type=int, default=1,
+                               help="Opérations TensorFlow en parallèle par processus (défaut: 1)")
+        subparser.add_argument('--no-affinity', action='store_true',
+                               help="Ne pas attacher chaque processus à ses propres cœurs")
+
+    run_parser = subparsers.add_parser('run', help="Analyser les tranches libres (reprend une analyse interrompue)")
+    run_parser.add_argument('run_dir', help="Dossier de l'analyse")
+    run_parser.add_argument('-w', '--workers', type=int, default=None,
+                            help=f"Nombre de processus (défaut: un par groupe de {DEFAULT_THREADS_PER_WORKER} cœurs)")
+    add_run_options(run_parser)
+    run_parser.add_argument('--intra-op', type=int, default=None,
+                            help="Threads TensorFlow par opération et par processus (défaut: cœurs du processus)")
+    run_parser.add_argument('--decode-workers', type=int, default=None,
+                            help="Threads de décodage par processus (défaut: cœurs du processus, 8 au plus)")
+    run_parser.add_argument('--lease', type=float, default=DEFAULT_LEASE,
+                            help=f"Secondes sans activité avant de reprendre la tranche d'un autre processus "
+                                 f"(défaut: {DEFAULT_LEASE:.0f})")
+    run_parser.add_argument('-m', '--model', default=None,
+                            help="Modèle, s'il est ailleurs sur cette machine (même empreinte que le plan)")
+
+    status_parser = subparsers.add_parser('status', help="Avancement des tranches")
+    status_parser.add_argument('run_dir', help="Dossier de l'analyse")
+
+    merge_parser = subparsers.add_parser('merge', help="Réunir les résultats des tranches")
+    merge_parser.add_argument('run_dir', help="Dossier de l'analyse")
+    merge_parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT,
+                              help=f"Fichier CSV fusionné (défaut: {DEFAULT_OUTPUT})")
+    merge_parser.add_argument('--partial', action='store_true', help="Fusionner même si des tranches manquent")
+
+    scale_parser = subparsers.add_parser('scale', help="Débit selon le nombre de processus")
+    scale_parser.add_argument('inputs', nargs='+', help="Images et/ou dossiers")
+    scale_parser.add_argument('-m', '--model', default=MODEL_PATH, help=f"Modèle (défaut: {MODEL_PATH})")
+    scale_parser.add_argument('-r', '--recursive', action='store_true', help="Parcourir les sous-dossiers")
+    scale_parser.add_argument('-n', '--images', type=int, default=DEFAULT_SCALING_IMAGES,
+                              help=f"Images analysées par mesure (défaut: {DEFAULT_SCALING_IMAGES})")
+    scale_parser.add_argument('-o', '--output', default=DEFAULT_SCALING_REPORT,
+                              help=f"Rapport JSON (défaut: {DEFAULT_SCALING_REPORT})")
+    scale_parser.add_argument('-w', '--workers', type=int, nargs='+', default=None,
+                              help="Nombres de processus mesurés (défaut: 1, 2, 4... jusqu'au nombre de cœurs)")
+    add_run_options(scale_parser)
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'plan':
+            image_paths = collect_image_paths(args.inputs, recursive=args.recursive)
+            if not image_paths:
+                print("❌ Aucune image trouvée")
+                return 1
+            manifest = plan_run(args.run_dir, image_paths, args.model, args.shard_size)
+            print(f"✓ {manifest['images']} images en {manifest['shards']} tranches de {args.shard_size} "
+                  f"dans {args.run_dir}")
+
+        elif args.command == 'run':
+            manifest, _ = load_manifest(args.run_dir)
+            print(f"Analyse de {args.run_dir}: {manifest['images']} images, {manifest['shards']} tranches...")
+            summary = run_shards(args.run_dir, args.workers, args.intra_op, args.inter_op, not args.no_affinity,
+                                 args.batch_size, args.decode_workers, args.lease, args.model)
+            for worker, error in summary['errors'].items():
+                print(f"❌ Processus {worker}: {error}")
+            status = run_status(args.run_dir)
+            print(f"\n✓ {summary['images']} images analysées par {summary['workers']} processus en "
+                  f"{summary['elapsed']:.1f}s ({summary['images_per_sec']:.1f} images/s hors chargement)")
+            print(f"   - Tranches terminées: {status['done']}/{status['shards']}"
+                  + (f", {status['running']} en cours ailleurs" if status['running'] else ""))
+            if status['done'] == status['shards']:
+                print(f"   - Fusion: python brain_tumor_detector_app.py shard merge {args.run_dir}")
+            if summary['errors'] or summary['lost_workers']:
+                return 1
+
+        elif args.command == 'status':
+            status = run_status(args.run_dir)
+            print(f"{args.run_dir}: {status['done']}/{status['shards']} tranches terminées "
+                  f"({status['images_done']} images), {status['running']} en cours, {status['pending']} en attente")
+            for index, owner in status['owners'].items():
+                print(f"   - tranche {index + 1}: {owner.get('host')} (pid {owner.get('pid')}, "
+                      f"depuis {owner.get('claimed_at')})")
+
+        elif args.command == 'merge':
+            counts = merge_shards(args.run_dir, args.output, args.partial)
+            print(f"✓ {counts['images']} résultats fusionnés dans {args.output}")
+            print(f"   - Tumeurs détectées: {counts['positives']}")
+            print(f"   - Erreurs de lecture: {counts['errors']}")
+            if counts['missing']:
+                print(f"   - ⚠️  Images sans résultat (tranches non terminées): {counts['missing']}")
+
+        else:
+            image_paths = collect_image_paths(args.inputs, recursive=args.recursive)[:args.images]
+            if not image_paths:
+                print("❌ Aucune image trouvée")
+                return 1
+            print(f"Mesure du débit sur {len(image_paths)} images...")
+            report = scaling_report(image_paths, args.model, args.workers, args.batch_size, args.inter_op,
+                                    not args.no_affinity)
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            print_scaling_report(report)
+            print(f"\n✓ Rapport enregistré dans {args.output}")
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"❌ {e}")
+        return 1
+    except KeyboardInterrupt:
+        print("\n⏹ Interrompu: relancer 'run' sur le même dossier pour reprendre")
+        return 130
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(shard_main())
@@ -0,0 +1,591 @@
+"""
+Brain Tumor Detection - Galerie d'une étude (dossier entier d'IRM)
+===================================================================
+La fenêtre principale n'affiche qu'une image à la fois. La galerie ouvre un
+dossier entier (par exemple les 200 coupes exportées d'une étude) :
+
+- liste virtualisée : seules les lignes visibles existent dans le canevas
+  (un petit nombre de lignes recyclées au défilement), quel que soit le
+  nombre d'images ;
+- miniatures fabriquées en arrière-plan (décodage à résolution réduite),
+  uniquement pour les lignes visibles ; les PhotoImage sont gardées dans
+  un cache LRU borné en nombre et en octets ;
+- « Tout analyser » : l'étude est analysée par lots (batch_inference.run_batch
+  sur le thread d'analyse de l'application, au plus quelques lots en file)
+  et chaque ligne affiche son résultat dès que son lot est terminé.
+
+Les résultats sont gardés sous forme compacte (un statut et une probabilité
+par image) : la mémoire et la latence de l'interface restent stables, même
+pour des dizaines de milliers d'images.
+
+Usage:
+    python brain_tumor_detector_app.py --study etude_2026_03/
+"""
+
+import os
+import queue
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import tkinter as tk
+from tkinter import ttk
+from PIL import Image, ImageTk
+
+from detector_core import IMG_SIZE, result_status
+from image_ingest import decode_reduced
+
+THUMBNAIL_SIZE = 64
+ROW_HEIGHT = THUMBNAIL_SIZE + 8
+DEFAULT_THUMBNAIL_WORKERS = 2
+
+# Cache des miniatures: au plus 512 PhotoImage et 16 Mo (4 octets par pixel dans Tk)
+DEFAULT_THUMBNAIL_CACHE_ENTRIES = 512
+DEFAULT_THUMBNAIL_CACHE_BYTES = 16 * 1024 * 1024
+
+# Analyse de l'étude: images par lot, lots en file sur le thread d'analyse
+STUDY_CHUNK_SIZE = 32
+MAX_STUDY_CHUNKS = 2
+
+POLL_INTERVAL_MS = 50
+
+# Statut de chaque image de l'étude
+STATUS_PENDING = 0
+STATUS_QUEUED = 1
+STATUS_POSITIVE = 2
+STATUS_NEGATIVE = 3
+STATUS_ERROR = 4
+
+
+def make_thumbnail(image_path, size=THUMBNAIL_SIZE, img_size=IMG_SIZE):
+    """
+    Miniature d'une image (première coupe, décodée à résolution réduite si possible)
+
+    Returns:
+        tableau uint8 (hauteur, largeur), côté maximal `size`, ratio conservé
+    """
+    img = Image.fromarray(decode_reduced(image_path, img_size))
+    img.thumbnail((size, size), Image.Resampling.LANCZOS)
+    return np.asarray(img)
+
+
+def visible_range(top, height, row_height, row_count):
+    """
+    Lignes visibles d'une liste virtualisée
+
+    Args:
+        top: ordonnée (dans le canevas) du haut de la zone visible
+        height: hauteur de la zone visible
+        row_height: hauteur d'une ligne
+        row_count: nombre total de lignes
+
+    Returns:
+        range des indices des lignes au moins partiellement visibles
+    """
+    first = max(0, int(top // row_height))
+    last = min(row_count, int((top + max(height, 0)) // row_height) + 1)
+    return range(first, max(first, last))
+
+
+class ThumbnailCache:
+    """
+    Cache LRU des miniatures, borné en nombre d'entrées et en octets
+
+    Args:
+        max_entries: nombre maximal de miniatures
+        max_bytes: taille maximale cumulée (octets)
+    """
+
+    def __init__(self, max_entries=DEFAULT_THUMBNAIL_CACHE_ENTRIES, max_bytes=DEFAULT_THUMBNAIL_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key):
+        """Miniature en cache (marquée comme la plus récente), ou None"""
+        item = self._items.get(key)
+        if item is None:
+            return None
+        self._items.move_to_end(key)
+        return item[0]
+
+    def put(self, key, value, nbytes):
+        """
+        Ajoute une miniature, puis retire les plus anciennes au-delà des limites
+
+        La dernière miniature ajoutée est toujours gardée, même si elle
+        dépasse seule max_bytes.
+        """
+        if key in self._items:
+            self.nbytes -= self._items.pop(key)[1]
+        self._items[key] = (value, nbytes)
+        self.nbytes += nbytes
+        while len(self._items) > 1 and (len(self._items) > self.max_entries or self.nbytes > self.max_bytes):
+            _, (_, size) = self._items.popitem(last=False)
+            self.nbytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        """Vide le cache"""
+        self._items.clear()
+        self.nbytes = 0
+
+
+class ThumbnailLoader:
+    """
+    Fabrication des miniatures en arrière-plan
+
+    Seules les images demandées en dernier (lignes visibles) sont traitées :
+    une nouvelle demande remplace la précédente, les lignes sorties de
+    l'écran avant leur tour ne sont jamais décodées.
+
+    Args:
+        size: côté maximal des miniatures
+        workers: nombre de threads de décodage
+        img_size: taille d'entrée du modèle (résolution minimale du décodage réduit)
+    """
+
+    def __init__(self, size=THUMBNAIL_SIZE, workers=DEFAULT_THUMBNAIL_WORKERS, img_size=IMG_SIZE):
+        self.size = size
+        self.img_size = img_size
+        self._wanted = []
+        self._busy = set()
+        self._closed = False
+        self._condition = threading.Condition()
+        self._done = queue.Queue()
+        self._threads = [threading.Thread(target=self._run, name=f"thumbnails-{i}", daemon=True)
+                         for i in range(max(1, workers))]
+        for thread in self._threads:
+            thread.start()
+
+    def request(self, paths):
+        """Remplace la liste des miniatures à fabriquer (dans l'ordre d'affichage)"""
+        with self._condition:
+            self._wanted = [path for path in paths if path not in self._busy]
+            self._condition.notify_all()
+
+    def poll(self):
+        """
+        Miniatures terminées depuis le dernier appel (sans bloquer)
+
+        Returns:
+            liste de (chemin, miniature uint8 ou None, erreur ou None)
+        """
+        done = []
+        while True:
+            try:
+                done.append(self._done.get_nowait())
+            except queue.Empty:
+                break
+        with self._condition:
+            self._busy.difference_update(path for path, _, _ in done)
+        return done
+
+    def close(self):
+        """Arrête les threads (les miniatures en cours sont abandonnées)"""
+        with self._condition:
+            self._closed = True
+            self._wanted = []
+            self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._wanted and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                path = self._wanted.pop(0)
+                # Occupé jusqu'à sa récupération par poll(): pas de second décodage
+                self._busy.add(path)
+            try:
+                self._done.put((path, make_thumbnail(path, self.size, self.img_size), None))
+            except Exception as e:
+                self._done.put((path, None, str(e)))
+
+
+class VirtualList:
+    """
+    Liste à défilement dont seules les lignes visibles sont dessinées
+
+    Un petit nombre de lignes (groupes d'éléments du canevas) est créé
+    puis recyclé au défilement : la hauteur de la zone de défilement est
+    celle de toutes les lignes, mais le canevas ne contient jamais plus
+    d'éléments que l'écran n'en montre.
+
+    Args:
+        parent: widget parent
+        row_height: hauteur d'une ligne (pixels)
+        create_slot: fonction (canevas) → ligne réutilisable ; la ligne est un
+            dictionnaire dont 'items' liste les éléments du canevas, dessinés à y = 0
+        render_row: fonction (ligne, indice) qui met à jour le contenu d'une ligne
+        on_visible: fonction (range des lignes visibles) appelée après chaque rendu
+        bg: couleur de fond
+    """
+
+    def __init__(self, parent, row_height, create_slot, render_row, on_visible=None, bg="white"):
+        self.row_height = row_height
+        self.create_slot = create_slot
+        self.render_row = render_row
+        self.on_visible = on_visible
+        self.row_count = 0
+        self.visible = range(0)
+
+        self.frame = tk.Frame(parent, bg=bg)
+        self.canvas = tk.Canvas(self.frame, bg=bg, highlightthickness=0, yscrollincrement=row_height)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self._on_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self._slots = []
+        self._slot_rows = []
+        self._pending_refresh = None
+
+        self.canvas.bind("<Configure>", lambda event: self.refresh())
+        self.canvas.bind("<MouseWheel>", self._on_mousewheel)
+        self.canvas.bind("<Button-4>", lambda event: self.canvas.yview_scroll(-3, 'units'))
+        self.canvas.bind("<Button-5>", lambda event: self.canvas.yview_scroll(3, 'units'))
+
+    def set_row_count(self, row_count):
+        """Change le nombre de lignes (zone de défilement) et redessine"""
+        self.row_count = row_count
+        self.canvas.configure(scrollregion=(0, 0, 1, row_count * self.row_height))
+        self.refresh()
+
+    def row_at(self, y):
+        """Indice de la ligne sous l'ordonnée y (coordonnées de la fenêtre), ou None"""
+        index = int(self.canvas.canvasy(y) // self.row_height)
+        return index if 0 <= index < self.row_count else None
+
+    def refresh_rows(self, indices):
+        """Redessine les lignes indiquées si elles sont visibles"""
+        for slot, row in zip(self._slots, self._slot_rows):
+            if row is not None and row in indices:
+                self.render_row(slot, row)
+
+    def refresh(self):
+        """Redessine les lignes visibles (regroupé si appelé plusieurs fois de suite)"""
+        if self._pending_refresh is None:
+            self._pending_refresh = self.canvas.after_idle(self._refresh)
+
+    def _refresh(self):
+        self._pending_refresh = None
+        top = self.canvas.canvasy(0)
+        self.visible = visible_range(top, self.canvas.winfo_height(), self.row_height, self.row_count)
+
+        while len(self._slots) < len(self.visible):
+            self._slots.append(self.create_slot(self.canvas))
+            self._slot_rows.append(None)
+
+        for k, slot in enumerate(self._slots):
+            row = self.visible[k] if k < len(self.visible) else None
+            state = tk.NORMAL if row is not None else tk.HIDDEN
+            for item in slot['items']:
+                self.canvas.itemconfigure(item, state=state)
+            if row is None:
+                self._slot_rows[k] = None
+                continue
+            # Déplacement relatif: les éléments de la ligne sont dessinés à partir de y = 0
+            y = row * self.row_height
+            self.canvas.move(slot['tag'], 0, y - slot.get('y', 0))
+            slot['y'] = y
+            self._slot_rows[k] = row
+            self.render_row(slot, row)
+
+        if self.on_visible is not None:
+            self.on_visible(self.visible)
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.refresh()
+
+    def _on_mousewheel(self, event):
+        self.canvas.yview_scroll(-3 if event.delta > 0 else 3, 'units')
+
+
+class StudyGallery:
+    """
+    Fenêtre de galerie d'une étude
+
+    Args:
+        root: fenêtre principale
+        folder: dossier de l'étude (titre)
+        paths: images de l'étude
+        on_analyze_all: fonction appelée par « Tout analyser »
+        on_cancel: fonction appelée par « Annuler »
+        on_select: fonction (chemin) appelée au clic sur une ligne
+        on_close: fonction appelée à la fermeture de la fenêtre
+        colors: couleurs de l'application {'primary', 'success', 'danger', 'text', 'bg'}
+    """
+
+    def __init__(self, root, folder, paths, on_analyze_all, on_cancel, on_select, on_close=None, colors=None):
+        self.folder = folder
+        self.paths = paths
+        self.on_close = on_close
+        self.colors = {'primary': "#2563eb", 'success': "#10b981", 'danger': "#ef4444",
+                       'text': "#1f2937", 'bg': "#f0f4f8", **(colors or {})}
+        self.closed = False
+        self.selected = None
+        self.model_ready = False
+        self._slot_count = 0
+        # Prochaine image à envoyer à l'analyse (next_chunk)
+        self._cursor = len(paths)
+
+        # Résultats compacts: un statut et une probabilité par image, messages d'erreur à part
+        self.status = np.full(len(paths), STATUS_PENDING, dtype=np.int8)
+        self.probabilities = np.full(len(paths), np.nan, dtype=np.float32)
+        self.errors = {}
+        self.analyzed = 0
+        self.positives = 0
+
+        self.thumbnails = ThumbnailCache()
+        self.thumbnail_errors = set()
+        self.loader = ThumbnailLoader()
+
+        self.window = tk.Toplevel(root)
+        self.window.title(f"Étude - {os.path.basename(os.path.normpath(folder))}")
+        self.window.geometry("560x700")
+        self.window.configure(bg=self.colors['bg'])
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self.create_widgets(on_analyze_all, on_cancel)
+        self.on_select = on_select
+
+        self.list.set_row_count(len(paths))
+        self.update_summary()
+        self.window.after(POLL_INTERVAL_MS, self.poll_thumbnails)
+
+    def create_widgets(self, on_analyze_all, on_cancel):
+        """Crée les widgets de la galerie"""
+        top = tk.Frame(self.window, bg=self.colors['bg'])
+        top.pack(fill=tk.X, padx=15, pady=(15, 5))
+
+        self.analyze_btn = tk.Button(
+            top,
+            text="🔍 Tout analyser",
+            command=on_analyze_all,
+            font=("Segoe UI", 11, "bold"),
+            bg=self.colors['success'],
+            fg="white",
+            activebackground="#059669",
+            activeforeground="white",
+            cursor="hand2",
+            relief=tk.FLAT,
+            padx=20,
+            pady=8,
+            state=tk.DISABLED
+        )
+        self.analyze_btn.pack(side=tk.LEFT)
+
+        self.cancel_btn = tk.Button(
+            top,
+            text="⏹ Annuler",
+            command=on_cancel,
+            font=("Segoe UI", 11, "bold"),
+            bg="#6b7280",
+            fg="white",
+            activebackground="#4b5563",
+            activeforeground="white",
+            cursor="hand2",
+            relief=tk.FLAT,
+            padx=20,
+            pady=8,
+            state=tk.DISABLED
+        )
+        self.cancel_btn.pack(side=tk.LEFT, padx=(10, 0))
+
+        self.summary_label = tk.Label(
+            self.window,
+            font=("Segoe UI", 10),
+            bg=self.colors['bg'],
+            fg=self.colors['text'],
+            anchor="w"
+        )
+        self.summary_label.pack(fill=tk.X, padx=15)
+
+        self.progress_bar = ttk.Progressbar(self.window, mode='determinate', maximum=max(len(self.paths), 1))
+        self.progress_bar.pack(fill=tk.X, padx=15, pady=(5, 10))
+
+        self.list = VirtualList(self.window, ROW_HEIGHT, self.create_slot, self.render_row,
+                                on_visible=self.request_thumbnails)
+        self.list.frame.pack(fill=tk.BOTH, expand=True, padx=15, pady=(0, 15))
+        self.list.canvas.bind("<Button-1>", self.on_click)
+
+    def create_slot(self, canvas):
+        """Éléments d'une ligne de la liste (fond, miniature, nom, résultat)"""
+        tag = f"slot{self._slot_count}"
+        self._slot_count += 1
+        text_x = THUMBNAIL_SIZE + 16
+        return {
+            'tag': tag,
+            'photo': None,
+            'items': [
+                canvas.create_rectangle(0, 0, 2000, ROW_HEIGHT, outline="", fill="white", tags=(tag,)),
+                canvas.create_image(4 + THUMBNAIL_SIZE // 2, ROW_HEIGHT // 2, tags=(tag,)),
+                canvas.create_text(text_x, ROW_HEIGHT // 2 - 10, anchor="w", font=("Segoe UI", 10, "bold"),
+                                   fill=self.colors['text'], tags=(tag,)),
+                canvas.create_text(text_x, ROW_HEIGHT // 2 + 10, anchor="w", font=("Segoe UI", 9), tags=(tag,)),
+            ],
+        }
+
+    def row_status(self, index):
+        """Texte et couleur du résultat d'une image"""
+        status = self.status[index]
+        if status == STATUS_POSITIVE or status == STATUS_NEGATIVE:
+            positive = status == STATUS_POSITIVE
+            text = f"{result_status(positive)} ({self.probabilities[index] * 100:.2f}%)"
+            return text, self.colors['danger'] if positive else self.colors['success']
+        if status == STATUS_ERROR:
+            return f"ERREUR: {self.errors.get(index, '')}", self.colors['danger']
+        if status == STATUS_QUEUED:
+            return "⏳ Analyse en cours...", "#6b7280"
+        return "En attente d'analyse", "#6b7280"
+
+    def render_row(self, slot, index):
+        """Met à jour une ligne recyclée pour l'image index"""
+        canvas = self.list.canvas
+        background, image, name, result = slot['items']
+        canvas.itemconfigure(background, fill="#e0e7ff" if index == self.selected else "white")
+
+        # Garder une référence: la PhotoImage reste affichée même si le cache l'a retirée
+        slot['photo'] = self.thumbnails.get(self.paths[index])
+        canvas.itemconfigure(image, image=slot['photo'] or "")
+
+        canvas.itemconfigure(name, text=f"{index + 1}. {os.path.basename(self.paths[index])}")
+        text, color = self.row_status(index)
+        canvas.itemconfigure(result, text=text, fill=color)
+
+    def request_thumbnails(self, visible):
+        """Demande les miniatures manquantes des lignes visibles"""
+        self.loader.request([self.paths[i] for i in visible
+                             if self.paths[i] not in self.thumbnails and i not in self.thumbnail_errors])
+
+    def poll_thumbnails(self):
+        """Convertit les miniatures terminées en PhotoImage (boucle Tkinter)"""
+        if self.closed:
+            return
+        updated = set()
+        visible = self.list.visible
+        for path, thumbnail, error in self.loader.poll():
+            index = self.index_of(path, visible)
+            if thumbnail is None:
+                if index is not None:
+                    self.thumbnail_errors.add(index)
+                continue
+            photo = ImageTk.PhotoImage(Image.fromarray(thumbnail), master=self.window)
+            self.thumbnails.put(path, photo, photo.width() * photo.height() * 4)
+            if index is not None:
+                updated.add(index)
+        if updated:
+            self.list.refresh_rows(updated)
+        self.window.after(POLL_INTERVAL_MS, self.poll_thumbnails)
+
+    def index_of(self, path, rows):
+        """Indice d'une image parmi les lignes indiquées, ou None"""
+        for i in rows:
+            if self.paths[i] == path:
+                return i
+        return None
+
+    def on_click(self, event):
+        """Sélectionne une ligne et l'affiche dans la fenêtre principale"""
+        index = self.list.row_at(event.y)
+        if index is None:
+            return
+        previous, self.selected = self.selected, index
+        self.list.refresh_rows({index} if previous is None else {index, previous})
+        self.on_select(self.paths[index])
+
+    def set_model_ready(self, ready=True):
+        """Modèle chargé: « Tout analyser » disponible"""
+        self.model_ready = ready
+        self.update_summary()
+
+    def start_analysis(self):
+        """« Tout analyser »: parcourt de nouveau l'étude (images pas encore analysées)"""
+        self._cursor = 0
+        self.update_summary()
+
+    def stop_analysis(self):
+        """N'envoie plus d'images à l'analyse ; les images en file redeviennent en attente"""
+        self._cursor = len(self.paths)
+        queued = np.flatnonzero(self.status == STATUS_QUEUED)
+        self.status[queued] = STATUS_PENDING
+        self.list.refresh_rows(set(queued.tolist()))
+        self.update_summary()
+
+    def next_chunk(self, size=STUDY_CHUNK_SIZE, block=4096):
+        """
+        Prochaines images à analyser, marquées comme envoyées
+
+        Le statut est parcouru par blocs à partir de la position courante :
+        le coût ne dépend pas de la taille de l'étude.
+
+        Returns:
+            liste d'indices (vide quand toute l'étude a été envoyée)
+        """
+        indices = []
+        while len(indices) < size and self._cursor < len(self.paths):
+            window = self.status[self._cursor:self._cursor + block]
+            found = np.flatnonzero(window == STATUS_PENDING)[:size - len(indices)]
+            indices.extend((found + self._cursor).tolist())
+            self._cursor += int(found[-1]) + 1 if len(indices) == size else len(window)
+        self.status[indices] = STATUS_QUEUED
+        self.list.refresh_rows(set(indices))
+        self.update_summary()
+        return indices
+
+    def set_results(self, indices, rows):
+        """
+        Résultats d'un lot (lignes de batch_inference.run_batch, probabilités calibrées)
+
+        Args:
+            indices: indices des images du lot
+            rows: résultats, dans le même ordre
+        """
+        for k, row in zip(indices, rows):
+            if row['error']:
+                self.status[k] = STATUS_ERROR
+                self.errors[k] = row['error']
+            else:
+                positive = row['result'] == result_status(True)
+                self.status[k] = STATUS_POSITIVE if positive else STATUS_NEGATIVE
+                self.probabilities[k] = float(row['probability'])
+                self.positives += positive
+            self.analyzed += 1
+        self.list.refresh_rows(set(indices))
+        self.update_summary()
+
+    def set_error(self, indices, error):
+        """Lot dont l'analyse a échoué"""
+        self.set_results(indices, [{'error': error}] * len(indices))
+
+    def update_summary(self):
+        """Compteurs, barre de progression et boutons"""
+        queued = self._cursor < len(self.paths) or bool(np.any(self.status == STATUS_QUEUED))
+        text = f"{len(self.paths)} images — {self.analyzed} analysées, {self.positives} avec tumeur détectée"
+        if len(self.errors):
+            text += f", {len(self.errors)} erreurs"
+        self.summary_label.config(text=text)
+        self.progress_bar.config(value=self.analyzed)
+        self.cancel_btn.config(state=tk.NORMAL if queued else tk.DISABLED)
+        self.analyze_btn.config(state=tk.NORMAL if self.model_ready and not queued else tk.DISABLED)
+
+    def close(self):
+        """Ferme la fenêtre et arrête la fabrication des miniatures"""
+        if self.closed:
+            return
+        self.closed = True
+        self.loader.close()
+        self.thumbnails.clear()
+        self.window.destroy()
+        if self.on_close is not None:
+            self.on_close()
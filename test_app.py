@@ -166,6 +166,1549 @@ def test_model_architecture(model):
         print(f"❌ Erreur lors de l'analyse: {str(e)}")
         return False
 
+def test_batch_inference():
+    """Test 7: Vérifier l'analyse par lots (sans interface)"""
+    print("\n" + "="*60)
+    print("TEST 7: Analyse par lots")
+    print("="*60)
+    
+    import tempfile
+    from batch_inference import collect_image_paths, run_batch
+    
+    class ConstantModel:
+        """Modèle factice: renvoie la luminosité moyenne de chaque image"""
+        def predict_on_batch(self, batch):
+            return batch.mean(axis=(1, 2, 3)).reshape(-1, 1)
+    
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Images de tailles variées + un fichier illisible
+            for i, size in enumerate([(100, 150), (300, 300), (512, 400)]):
+                value = 50 * (i + 1)
+                cv2.imwrite(os.path.join(tmp_dir, f"img{i}.png"), np.full(size, value, dtype=np.uint8))
+            with open(os.path.join(tmp_dir, "corrompue.jpg"), "w") as f:
+                f.write("pas une image")
+            with open(os.path.join(tmp_dir, "notes.txt"), "w") as f:
+                f.write("ignoré")
+            
+            paths = collect_image_paths([tmp_dir])
+            output = os.path.join(tmp_dir, "resultats.csv")
+            results = run_batch(paths, ConstantModel(), batch_size=2, output_path=output)
+            
+            with open(output, encoding='utf-8') as f:
+                rows = f.read().strip().splitlines()
+        
+        probabilities = [round(float(r['probability']), 3) for r in results if not r['error']]
+        errors = [r for r in results if r['error']]
+        
+        ok = (len(paths) == 4 and len(rows) == 5 and len(errors) == 1
+              and probabilities == [round(50 * i / 255, 3) for i in (1, 2, 3)])
+        
+        if ok:
+            print(f"✅ SUCCÈS: {len(results)} images traitées par lots de 2")
+            print(f"   - Probabilités: {probabilities}")
+            print(f"   - Erreurs de lecture: {len(errors)}")
+        else:
+            print(f"❌ ÉCHEC: Résultats inattendus ({len(paths)} images, {len(errors)} erreurs)")
+        return ok
+    except Exception as e:
+        print(f"❌ ÉCHEC: Erreur lors de l'analyse par lots")
+        print(f"   Erreur: {str(e)}")
+        return False
+
+def test_analysis_worker():
+    """Test 8: Vérifier la file d'analyses en arrière-plan (annulation comprise)"""
+    print("\n" + "="*60)
+    print("TEST 8: Analyses en arrière-plan")
+    print("="*60)
+    
+    import threading
+    import time
+    from analysis_worker import AnalysisWorker, DONE, ERROR, CANCELLED, READY, INIT_ERROR
+    
+    release = threading.Event()
+    
+    def fake_analysis(image_path, image=None):
+        if image_path == "bloquante.jpg":
+            release.wait(timeout=5)
+        if image_path == "corrompue.jpg":
+            raise ValueError("image illisible")
+        return 0.75
+    
+    def failing_init():
+        raise FileNotFoundError("modèle introuvable")
+    
+    try:
+        worker = AnalysisWorker(fake_analysis, init_fn=lambda: "modèle")
+        first = worker.submit("bloquante.jpg")
+        second = worker.submit("a_annuler.jpg")
+        third = worker.submit("corrompue.jpg")
+        worker.cancel(second.id)
+        release.set()
+        
+        # Attendre la fin de toutes les analyses
+        deadline = time.time() + 5
+        while worker.pending_count() and time.time() < deadline:
+            time.sleep(0.01)
+        
+        final = {job.id: status for status, job in worker.poll() if status != "running"}
+        worker.shutdown(wait=True)
+        
+        # Échec du chargement du modèle: les analyses soumises sont en erreur
+        broken = AnalysisWorker(fake_analysis, init_fn=failing_init)
+        orphan = broken.submit("img.jpg")
+        broken.shutdown(wait=True)
+        broken_events = [(status, job.id) for status, job in broken.poll()]
+        
+        ok = (final == {0: READY, first.id: DONE, second.id: CANCELLED, third.id: ERROR}
+              and first.result == 0.75
+              and broken_events[0] == (INIT_ERROR, 0) and orphan.status in (ERROR, CANCELLED))
+        if ok:
+            print("✅ SUCCÈS: Chargement, analyse terminée, annulée et en erreur correctement signalés")
+        else:
+            print(f"❌ ÉCHEC: États inattendus {final}")
+        return ok
+    except Exception as e:
+        print(f"❌ ÉCHEC: Erreur du thread d'analyse")
+        print(f"   Erreur: {str(e)}")
+        return False
+
+def test_inference_engine():
+    """Test 9: Vérifier que le moteur compilé donne les mêmes prédictions que model.predict"""
+    print("\n" + "="*60)
+    print("TEST 9: Moteur d'inférence compilé")
+    print("="*60)
+    
+    from tensorflow import keras
+    from inference_engine import InferenceEngine
+    
+    try:
+        # Petit modèle avec la même entrée que le CNN (224×224×1)
+        model = keras.Sequential([
+            keras.Input(shape=(224, 224, 1)),
+            keras.layers.Conv2D(4, (3, 3), activation='relu'),
+            keras.layers.BatchNormalization(),
+            keras.layers.GlobalAveragePooling2D(),
+            keras.layers.Dense(1, activation='sigmoid'),
+        ])
+        images = np.random.rand(5, 224, 224, 1).astype('float32')
+        
+        engine = InferenceEngine(model)
+        expected = model.predict(images, verbose=0).reshape(-1)
+        single = np.array([engine.predict(img[None])[0] for img in images])
+        batched = engine.predict(images, batch_size=2)
+        
+        ok = np.allclose(single, expected, atol=1e-5) and np.allclose(batched, expected, atol=1e-5)
+        if ok:
+            print(f"✅ SUCCÈS: Prédictions identiques (lot de 1 et lots de 2)")
+            print(f"   - Préchauffage: {engine.warmup_time * 1000:.0f}ms")
+        else:
+            print(f"❌ ÉCHEC: Écart maximal {np.abs(batched - expected).max():.6f}")
+        return ok
+    except Exception as e:
+        print(f"❌ ÉCHEC: Erreur du moteur d'inférence")
+        print(f"   Erreur: {str(e)}")
+        return False
+
+def test_tflite_export():
+    """Test 10: Vérifier l'export TFLite quantifié et sa concordance avec Keras"""
+    print("\n" + "="*60)
+    print("TEST 10: Export TFLite (float16 / int8)")
+    print("="*60)
+    
+    import tempfile
+    from tensorflow import keras
+    from tflite_backend import export_tflite, TFLiteEngine
+    
+    try:
+        model = keras.Sequential([
+            keras.Input(shape=(224, 224, 1)),
+            keras.layers.Conv2D(4, (3, 3), activation='relu'),
+            keras.layers.BatchNormalization(),
+            keras.layers.GlobalAveragePooling2D(),
+            keras.layers.Dense(1, activation='sigmoid'),
+        ])
+        images = np.random.rand(3, 224, 224, 1).astype('float32')
+        expected = model.predict(images, verbose=0).reshape(-1)
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Images de calibration (prétraitement identique à l'analyse)
+            calibration_paths = []
+            for i in range(4):
+                path = os.path.join(tmp_dir, f"calib{i}.png")
+                cv2.imwrite(path, np.random.randint(0, 255, (300, 260), dtype=np.uint8))
+                calibration_paths.append(path)
+            
+            # Grand JPEG (décodage réduit): la calibration voit les mêmes pixels que l'analyse
+            from detector_core import preprocess_image
+            from tflite_backend import calibration_dataset
+            large_path = os.path.join(tmp_dir, "calib_large.jpg")
+            cv2.imwrite(large_path, np.random.randint(0, 255, (2000, 2200), dtype=np.uint8))
+            samples = list(calibration_dataset(calibration_paths + [large_path])())
+            by_path = {p: preprocess_image(p) for p in calibration_paths + [large_path]}
+            same_preprocessing = len(samples) == len(by_path) and all(
+                any(np.array_equal(sample[0], expected_input) for expected_input in by_path.values())
+                for sample in samples)
+            print(f"   - Calibration prétraitée comme l'analyse: {same_preprocessing}")
+            
+            diffs = {}
+            for quantization in ('float16', 'int8'):
+                output = os.path.join(tmp_dir, f"model_{quantization}.tflite")
+                export_tflite(model, output, quantization, calibration_paths)
+                engine = TFLiteEngine(output, num_threads=2)
+                diffs[quantization] = float(np.abs(engine.predict(images) - expected).max())
+        
+        ok = same_preprocessing and diffs['float16'] < 1e-2 and diffs['int8'] < 5e-2
+        if ok:
+            print(f"✅ SUCCÈS: Modèles TFLite exportés et concordants")
+        else:
+            print(f"❌ ÉCHEC: Écarts trop importants")
+        for quantization, diff in diffs.items():
+            print(f"   - {quantization}: écart max {diff:.5f}")
+        return ok
+    except Exception as e:
+        print(f"❌ ÉCHEC: Erreur lors de l'export TFLite")
+        print(f"   Erreur: {str(e)}")
+        return False
+
+def test_single_decode():
+    """Test 11: Vérifier que l'image décodée une fois donne les mêmes pixels que cv2.imread"""
+    print("\n" + "="*60)
+    print("TEST 11: Décodage unique (affichage + analyse)")
+    print("="*60)
+    
+    import tempfile
+    from PIL import Image
+    from detector_core import load_grayscale, pil_to_grayscale, preprocess_array
+    
+    try:
+        color = np.random.randint(0, 255, (180, 240, 3), dtype=np.uint8)
+        ok = True
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for ext in ('jpg', 'bmp', 'tiff'):
+                path = os.path.join(tmp_dir, f"couleur.{ext}")
+                cv2.imwrite(path, color)
+                
+                # Ancien chemin de l'application: cv2.imread → resize → /255
+                reference = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+                reference_input = (cv2.resize(reference, (224, 224)).astype('float32') / 255.0).reshape(1, 224, 224, 1)
+                
+                gray = load_grayscale(path)
+                with Image.open(path) as pil_img:
+                    pil_gray = pil_to_grayscale(pil_img)
+                
+                same_input = np.array_equal(preprocess_array(gray), reference_input)
+                same_pil = np.array_equal(pil_gray, reference)
+                print(f"   - {ext:5}: tenseur identique={same_input}, conversion PIL identique={same_pil}")
+                ok = ok and same_input and same_pil
+        
+        if ok:
+            print("✅ SUCCÈS: Affichage et analyse dérivés des mêmes pixels")
+        else:
+            print("❌ ÉCHEC: Conversions en niveaux de gris différentes")
+        return ok
+    except Exception as e:
+        print(f"❌ ÉCHEC: Erreur lors du décodage")
+        print(f"   Erreur: {str(e)}")
+        return False
+
+def test_prediction_cache():
+    """Test 12: Vérifier le cache des prédictions (succès, invalidation, éviction)"""
+    print("\n" + "="*60)
+    print("TEST 12: Cache des prédictions")
+    print("="*60)
+    
+    import tempfile
+    from prediction_cache import PredictionCache, image_hash
+    
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            model_path = os.path.join(tmp_dir, "modele.keras")
+            cache_path = os.path.join(tmp_dir, "cache.sqlite")
+            with open(model_path, 'wb') as f:
+                f.write(b"poids v1")
+            
+            key = image_hash(b"contenu de l'image")
+            cache = PredictionCache(model_path, cache_path)
+            miss = cache.get(key) is None
+            cache.put(key, 0.8)
+            cache.close()
+            
+            # Réouverture: la prédiction est retrouvée sur disque
+            cache = PredictionCache(model_path, cache_path)
+            hit = cache.get(key) == 0.8
+            cache.close()
+            print(f"   - Absent puis retrouvé après réouverture: {miss and hit}")
+            
+            # Nouveau modèle: le cache est invalidé
+            with open(model_path, 'wb') as f:
+                f.write(b"poids v2 (reentraine)")
+            cache = PredictionCache(model_path, cache_path)
+            invalidated = cache.get(key) is None
+            print(f"   - Invalidé après changement du modèle: {invalidated}")
+            
+            # Taille bornée
+            cache.max_entries = 10
+            cache.put_many([(image_hash(bytes([i])), i / 20) for i in range(15)])
+            bounded = len(cache) <= 10
+            print(f"   - Taille bornée (max 10): {len(cache)} entrées")
+            
+            # Remplacements d'entrées existantes: aucune éviction à tort
+            kept = len(cache)
+            for _ in range(5):
+                cache.put_many([(image_hash(bytes([14])), 0.5)] * 3)
+            stable = len(cache) == kept and cache.get(image_hash(bytes([14]))) == 0.5
+            print(f"   - Remplacements sans éviction: {stable}")
+            cache.close()
+        
+        ok = miss and hit and invalidated and bounded and stable
+        if ok:
+            print("✅ SUCCÈS: Cache des prédictions fonctionnel")
+        else:
+            print("❌ ÉCHEC: Comportement du cache inattendu")
+        return ok
+    except Exception as e:
+        print(f"❌ ÉCHEC: Erreur du cache des prédictions")
+        print(f"   Erreur: {str(e)}")
+        return False
+
+def test_results_store():
+    """Test 13: Vérifier l'historique des analyses (import de l'ancien log, requêtes)"""
+    print("\n" + "="*60)
+    print("TEST 13: Historique des analyses")
+    print("="*60)
+    
+    import tempfile
+    from results_store import ResultsStore, parse_legacy_log
+    
+    block = (
+        "\n" + "="*60 + "\n"
+        "Date: {date}\nImage: {image}\nRésultat: {result}\n"
+        "Probabilité: {prob}%\nConfiance: {conf}%\n" + "="*60 + "\n"
+    )
+    ours = block.format(date="2026-02-12 17:32:35", image="Y2.jpg", result="TUMEUR DÉTECTÉE", prob="54.88", conf="54.88")
+    theirs = block.format(date="2026-02-13 14:00:40", image="1 no.jpeg", result="PAS DE TUMEUR", prob="49.70", conf="50.30")
+    
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Ancien log avec conflit git: la même analyse des deux côtés
+            log_path = os.path.join(tmp_dir, "analysis_log.txt")
+            with open(log_path, 'w', encoding='utf-8') as f:
+                f.write("<<<<<<< HEAD\n" + ours + theirs + "=======\n" + ours + ">>>>>>> abc123\n")
+            
+            parsed = len(parse_legacy_log(log_path))
+            db_path = os.path.join(tmp_dir, "results.sqlite")
+            with ResultsStore(db_path, flush_size=100) as store:
+                imported = store.import_legacy_log(log_path)
+                reimported = store.import_legacy_log(log_path, force=True)
+                print(f"   - Ancien log: {parsed} blocs lus, {imported} importés, {reimported} au 2e import")
+                
+                # Écritures groupées: rien n'est écrit avant flush()
+                for i in range(50):
+                    store.add(f"/irm/scan_{i}.jpg", i / 50, model_version="modele@abc", source="model")
+                buffered = store._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 2
+                total = len(store)
+                print(f"   - Écritures en tampon: {buffered}, total après flush: {total}")
+                
+                positives = store.query(has_tumor=True, since="2026-02-12")
+                by_image = store.query(image="Y2.jpg")
+                print(f"   - Positifs: {len(positives)}, analyses de Y2.jpg: {len(by_image)}")
+        
+        ok = (parsed == 3 and imported == 2 and reimported == 0 and buffered and total == 52
+              and len(positives) == 25 and len(by_image) == 1)
+        if ok:
+            print("✅ SUCCÈS: Historique des analyses fonctionnel")
+        else:
+            print("❌ ÉCHEC: Historique des analyses incorrect")
+        return ok
+    except Exception as e:
+        print(f"❌ ÉCHEC: Erreur de l'historique des analyses")
+        print(f"   Erreur: {str(e)}")
+        return False
+
+def test_inference_server():
+    """Test 14: Vérifier le serveur HTTP et le regroupement en micro-lots"""
+    print("\n" + "="*60)
+    print("TEST 14: Serveur d'inférence HTTP")
+    print("="*60)
+    
+    import json
+    import threading
+    import urllib.request
+    from detector_core import interpret_prediction
+    from inference_server import MicroBatcher, InferenceServer
+    
+    class MeanModel:
+        """Modèle factice: renvoie la luminosité moyenne de chaque image"""
+        def __init__(self):
+            self.calls = 0
+        def predict_on_batch(self, batch):
+            self.calls += 1
+            return batch.mean(axis=(1, 2, 3)).reshape(-1, 1)
+    
+    try:
+        model = MeanModel()
+        batcher = MicroBatcher(model, max_batch_size=8, max_wait_ms=50)
+        
+        # 16 requêtes simultanées: regroupées en quelques appels au modèle
+        futures = [batcher.submit(np.full((224, 224), 16 * i, dtype=np.uint8)) for i in range(16)]
+        outcomes = [future.result(timeout=10) for future in futures]
+        correct = all(abs(p - 16 * i / 255) < 1e-6 for i, (p, _) in enumerate(outcomes))
+        max_batch = max(size for _, size in outcomes)
+        print(f"   - 16 images en {model.calls} appels au modèle (lot max: {max_batch})")
+        
+        server = InferenceServer(('127.0.0.1', 0), batcher)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            data = cv2.imencode('.png', np.full((300, 200), 200, dtype=np.uint8))[1].tobytes()
+            url = f"http://127.0.0.1:{server.server_port}/predict?name=irm.png"
+            with urllib.request.urlopen(urllib.request.Request(url, data=data), timeout=10) as response:
+                answer = json.loads(response.read())
+            
+            # En-tête Content-Length invalide: erreur 400 explicite, pas de réponse vide
+            import http.client
+            connection = http.client.HTTPConnection('127.0.0.1', server.server_port, timeout=10)
+            connection.putrequest('POST', '/predict')
+            connection.putheader('Content-Length', 'abc')
+            connection.endheaders()
+            response = connection.getresponse()
+            rejected = response.status == 400 and 'Content-Length' in json.loads(response.read())['error']
+            connection.close()
+            print(f"   - Content-Length invalide refusé (400): {rejected}")
+        finally:
+            server.shutdown()
+            server.server_close()
+            batcher.close()
+        
+        has_tumor, confidence = interpret_prediction(200 / 255)
+        same = (answer['has_tumor'] == has_tumor and abs(answer['confidence'] - confidence) < 1e-6)
+        print(f"   - Réponse HTTP: {answer['result']} ({answer['probability'] * 100:.2f}%)")
+        
+        ok = correct and model.calls < 16 and max_batch <= 8 and same and rejected
+        if ok:
+            print("✅ SUCCÈS: Micro-lots et réponses HTTP corrects")
+        else:
+            print("❌ ÉCHEC: Résultats du serveur incorrects")
+        return ok
+    except Exception as e:
+        print(f"❌ ÉCHEC: Erreur du serveur d'inférence")
+        print(f"   Erreur: {str(e)}")
+        return False
+
+def test_watch_folder():
+    """Test 15: Vérifier la surveillance de dossiers et le point de reprise"""
+    print("\n" + "="*60)
+    print("TEST 15: Surveillance de dossiers")
+    print("="*60)
+    
+    import tempfile
+    from watch_folder import FolderWatcher, WatchCheckpoint, process_ready
+    
+    class MeanModel:
+        """Modèle factice: renvoie la luminosité moyenne de chaque image"""
+        def predict_on_batch(self, batch):
+            return batch.mean(axis=(1, 2, 3)).reshape(-1, 1)
+    
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            scans = os.path.join(tmp_dir, "scanner")
+            os.makedirs(scans)
+            for i in range(3):
+                cv2.imwrite(os.path.join(scans, f"irm{i}.png"), np.full((120, 120), 60 * i, dtype=np.uint8))
+            with open(os.path.join(scans, "notes.txt"), "w") as f:
+                f.write("ignoré")
+            
+            checkpoint_path = os.path.join(tmp_dir, "checkpoint.sqlite")
+            output = os.path.join(tmp_dir, "resultats.csv")
+            checkpoint = WatchCheckpoint(checkpoint_path)
+            watcher = FolderWatcher([scans], checkpoint, settle=0)
+            
+            # Un fichier n'est prêt qu'une fois stable sur deux scrutations
+            first = watcher.poll()
+            ready = watcher.poll()
+            print(f"   - 1re scrutation: {len(first)} prêts, 2e scrutation: {len(ready)} prêts")
+            process_ready(ready, MeanModel(), checkpoint, output, batch_size=2)
+            checkpoint.close()
+            
+            # Redémarrage: seuls les nouveaux fichiers sont analysés
+            cv2.imwrite(os.path.join(scans, "irm3.png"), np.full((120, 120), 250, dtype=np.uint8))
+            checkpoint = WatchCheckpoint(checkpoint_path)
+            watcher = FolderWatcher([scans], checkpoint, settle=0)
+            watcher.poll()
+            after_restart = watcher.poll()
+            process_ready(after_restart, MeanModel(), checkpoint, output)
+            checkpoint.close()
+            print(f"   - Après redémarrage: {len(after_restart)} nouveau(x) fichier(s)")
+            
+            with open(output, encoding='utf-8') as f:
+                rows = f.read().splitlines()
+            print(f"   - Lignes du CSV: {len(rows) - 1}")
+        
+        ok = (len(first) == 0 and len(ready) == 3 and list(after_restart) == [os.path.join(scans, "irm3.png")]
+              and len(rows) == 5)
+        if ok:
+            print("✅ SUCCÈS: Nouveaux fichiers détectés et analysés une seule fois")
+        else:
+            print("❌ ÉCHEC: Surveillance de dossiers incorrecte")
+        return ok
+    except Exception as e:
+        print(f"❌ ÉCHEC: Erreur de la surveillance de dossiers")
+        print(f"   Erreur: {str(e)}")
+        return False
+
+def test_benchmark_compare():
+    """Test 16: Vérifier la détection des régressions du banc de mesure"""
+    print("\n" + "="*60)
+    print("TEST 16: Banc de mesure (comparaison à la référence)")
+    print("="*60)
+    
+    import tempfile
+    from benchmark import metric, compare_to_baseline, make_corpus
+    
+    try:
+        baseline = {'metrics': {
+            'end_to_end_images_per_s': metric(100.0, 'images/s', True),
+            'predict_b1_p50_ms': metric(10.0, 'ms', False),
+            'predict_b1_p99_ms': metric(20.0, 'ms', False, gate=False),
+        }}
+        faster = {'metrics': {
+            'end_to_end_images_per_s': metric(120.0, 'images/s', True),
+            'predict_b1_p50_ms': metric(8.0, 'ms', False),
+            'predict_b1_p99_ms': metric(40.0, 'ms', False, gate=False),
+        }}
+        slower = {'metrics': {
+            'end_to_end_images_per_s': metric(80.0, 'images/s', True),
+            'predict_b1_p50_ms': metric(10.5, 'ms', False),
+            'predict_b1_p99_ms': metric(20.0, 'ms', False, gate=False),
+        }}
+        
+        flagged_faster = [row[0] for row in compare_to_baseline(faster, baseline, 0.15) if row[-1]]
+        flagged_slower = [row[0] for row in compare_to_baseline(slower, baseline, 0.15) if row[-1]]
+        print(f"   - Plus rapide: régressions {flagged_faster}")
+        print(f"   - Débit -20%, latence +5%: régressions {flagged_slower}")
+        
+        # Corpus reproductible: mêmes fichiers à chaque exécution
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            first = [open(p, 'rb').read() for p in make_corpus(tmp_dir, 4)]
+            second = [open(p, 'rb').read() for p in make_corpus(tmp_dir, 4)]
+        reproducible = first == second
+        print(f"   - Corpus synthétique reproductible: {reproducible}")
+        
+        ok = flagged_faster == [] and flagged_slower == ['end_to_end_images_per_s'] and reproducible
+        if ok:
+            print("✅ SUCCÈS: Régressions détectées au-delà de la tolérance")
+        else:
+            print("❌ ÉCHEC: Comparaison à la référence incorrecte")
+        return ok
+    except Exception as e:
+        print(f"❌ ÉCHEC: Erreur du banc de mesure")
+        print(f"   Erreur: {str(e)}")
+        return False
+
+def test_instrumentation():
+    """Test 17: Vérifier le chronométrage des étapes et l'export des métriques"""
+    print("\n" + "="*60)
+    print("TEST 17: Temps par étape et ressources")
+    print("="*60)
+    
+    import threading
+    import time
+    from instrumentation import Tracer
+    
+    try:
+        tracer = Tracer()
+        trace = tracer.trace('gui', image="irm.jpg")
+        with tracer.activate(trace):
+            with tracer.stage('decode'):
+                time.sleep(0.002)
+        
+        # Étape exécutée sur un autre thread mais rattachée à la même analyse
+        def worker():
+            with tracer.activate(trace):
+                with tracer.stage('predict'):
+                    time.sleep(0.01)
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        
+        # Étape hors analyse: histogramme seulement
+        with tracer.stage('decode'):
+            pass
+        
+        record = trace.finish(source="model")
+        summary = tracer.summary()
+        print(f"   - Étapes de l'analyse: {sorted(record['stages_ms'])}, total {record['total_ms']:.1f}ms")
+        print(f"   - Histogramme 'decode': {summary['decode']['count']} mesures")
+        
+        text = tracer.prometheus_text()
+        prometheus_ok = ('brain_tumor_stage_seconds_count{stage="predict"} 1' in text
+                         and 'le="+Inf"' in text)
+        print(f"   - Export Prometheus: {prometheus_ok}")
+        
+        # Coût d'une étape chronométrée
+        start = time.perf_counter()
+        for _ in range(10000):
+            with tracer.stage('vide'):
+                pass
+        overhead_us = (time.perf_counter() - start) / 10000 * 1e6
+        print(f"   - Coût par étape: {overhead_us:.1f}µs")
+        
+        ok = (sorted(record['stages_ms']) == ['decode', 'predict'] and record['stages_ms']['predict'] >= 10
+              and summary['decode']['count'] == 2 and prometheus_ok and overhead_us < 100
+              and record['peak_rss_mb'] > 0)
+        if ok:
+            print("✅ SUCCÈS: Étapes chronométrées et métriques exportées")
+        else:
+            print("❌ ÉCHEC: Instrumentation incorrecte")
+        return ok
+    except Exception as e:
+        print(f"❌ ÉCHEC: Erreur de l'instrumentation")
+        print(f"   Erreur: {str(e)}")
+        return False
+
+def test_dataset_cache():
+    """Test 18: Vérifier le cache pré-décodé du dataset et sa mise à jour incrémentale"""
+    print("\n" + "="*60)
+    print("TEST 18: Cache du dataset d'entraînement")
+    print("="*60)
+    
+    import tempfile
+    from dataset_cache import DatasetCache
+    from detector_core import load_grayscale, resize_for_model
+    
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            data_dir = os.path.join(tmp_dir, "dataset")
+            for class_dir in ("yes", "no"):
+                os.makedirs(os.path.join(data_dir, class_dir))
+            rng = np.random.default_rng(0)
+            for i in range(4):
+                cv2.imwrite(os.path.join(data_dir, "yes", f"y{i}.png"), rng.integers(0, 256, (300, 260), dtype=np.uint8))
+                cv2.imwrite(os.path.join(data_dir, "no", f"n{i}.jpg"), rng.integers(0, 256, (180, 240), dtype=np.uint8))
+            
+            cache_dir = os.path.join(tmp_dir, "cache")
+            first = DatasetCache(cache_dir).update(data_dir)
+            
+            # Nouvelle session: rien n'est re-décodé
+            cache = DatasetCache(cache_dir)
+            second = cache.update(data_dir)
+            print(f"   - 1re mise à jour: {first['added']} ajoutées, 2e: {second['unchanged']} inchangées")
+            
+            # Ajout, renommage et suppression de fichiers
+            cv2.imwrite(os.path.join(data_dir, "yes", "y9.png"), np.full((200, 200), 90, dtype=np.uint8))
+            os.rename(os.path.join(data_dir, "no", "n0.jpg"), os.path.join(data_dir, "no", "n0_copie.jpg"))
+            os.remove(os.path.join(data_dir, "yes", "y1.png"))
+            third = cache.update(data_dir)
+            print(f"   - Après modifications: {third['added']} ajoutée, {third['removed']} supprimée, "
+                  f"{third['unchanged']} réutilisées")
+            
+            X, y = DatasetCache(cache_dir).load()
+            expected = [resize_for_model(load_grayscale(os.path.join(data_dir, path))) for path in cache.paths]
+            identical = all(np.array_equal(X[i], img) for i, img in enumerate(expected))
+            print(f"   - {X.shape[0]} images {X.dtype} (memory-map: {isinstance(X, np.memmap)}), "
+                  f"identiques au prétraitement: {identical}")
+            
+            splits = cache.split(test_split=0.25, validation_split=0.25)
+            images, labels = next(cache.batches(splits['test'], batch_size=8))
+            del X
+            cache.close()
+        
+        ok = (first['added'] == 8 and second['unchanged'] == 8 and third['added'] == 1
+              and third['removed'] == 1 and third['unchanged'] == 7 and identical
+              and list(y).count(1) == 4 and images.dtype == np.float32 and sorted(labels) == [0, 1])
+        if ok:
+            print("✅ SUCCÈS: Dataset décodé une seule fois et mis à jour incrémentalement")
+        else:
+            print("❌ ÉCHEC: Cache du dataset incorrect")
+        return ok
+    except Exception as e:
+        print(f"❌ ÉCHEC: Erreur du cache du dataset")
+        print(f"   Erreur: {str(e)}")
+        return False
+
+def test_training_pipeline():
+    """Test 19: Vérifier le pipeline d'entraînement tf.data et son augmentation"""
+    print("\n" + "="*60)
+    print("TEST 19: Pipeline d'entraînement tf.data")
+    print("="*60)
+    
+    import tempfile
+    import tensorflow as tf
+    from dataset_cache import DatasetCache
+    from detector_core import collect_labeled_images
+    from training_pipeline import (affine_transforms, dataset_from_cache, dataset_from_files, random_parameters,
+                                   NOTEBOOK_AUGMENTATION)
+    
+    try:
+        # Transformation affine: rotation de 90° autour du centre = np.rot90 (sens horaire)
+        img = np.random.default_rng(0).random((1, 32, 32, 1)).astype(np.float32)
+        params = [tf.constant([value], tf.float32) for value in (90, 0, 0, 0, 1, 1)]
+        rotated = tf.raw_ops.ImageProjectiveTransformV3(
+            images=img, transforms=affine_transforms(*params, img_size=32), output_shape=[32, 32],
+            fill_value=0.0, interpolation='BILINEAR', fill_mode='NEAREST').numpy()
+        rotation_ok = np.allclose(rotated[0, :, :, 0], np.rot90(img[0, :, :, 0], -1), atol=1e-4)
+        print(f"   - Rotation de 90°: {rotation_ok}")
+        
+        # Paramètres tirés indépendamment (graine fixée, dans le graphe comme dans tf.data)
+        tf.random.set_seed(42)
+        draw = tf.function(lambda: random_parameters(64, NOTEBOOK_AUGMENTATION, 224, seed=42))
+        drawn = [draw()[name].numpy() for name in
+                 ('rotation', 'shift_rows', 'shift_cols', 'shear', 'zoom_rows', 'zoom_cols')]
+        correlation = np.abs(np.corrcoef(np.stack(drawn)) - np.eye(len(drawn))).max()
+        independent = correlation < 0.9
+        print(f"   - Paramètres de l'augmentation indépendants: {independent} (corrélation max {correlation:.2f})")
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            data_dir = os.path.join(tmp_dir, "dataset")
+            for class_dir in ("yes", "no"):
+                os.makedirs(os.path.join(data_dir, class_dir))
+                for i in range(5):
+                    cv2.imwrite(os.path.join(data_dir, class_dir, f"{class_dir}{i}.png"),
+                                np.full((100, 120), 30 * i + (100 if class_dir == "yes" else 0), dtype=np.uint8))
+            
+            cache = DatasetCache(os.path.join(tmp_dir, "cache"))
+            cache.update(data_dir)
+            
+            # Évaluation: ordre conservé, mêmes images que le décodage des fichiers
+            paths, labels = collect_labeled_images(data_dir)
+            from_cache = np.concatenate([x.numpy() for x, _ in dataset_from_cache(cache, batch_size=4)])
+            from_files = np.concatenate([x.numpy() for x, _ in dataset_from_files(paths, labels, batch_size=4)])
+            identical = np.array_equal(from_cache, from_files)
+            print(f"   - Cache et fichiers: {from_cache.shape} {from_cache.dtype}, identiques: {identical}")
+            
+            # Entraînement: lots mélangés différemment à chaque epoch, labels alignés
+            train = dataset_from_cache(cache, batch_size=4, training=True, seed=1)
+            epochs = [np.concatenate([y.numpy() for _, y in train]) for _ in range(2)]
+            x, y = next(iter(train))
+            print(f"   - Lot d'entraînement: {tuple(x.shape)}, plage [{x.numpy().min():.2f}, {x.numpy().max():.2f}]")
+            cache.close()
+        
+        ok = (rotation_ok and independent and identical and from_cache.shape == (10, 224, 224, 1)
+              and sorted(epochs[0]) == sorted(labels) and len(epochs[1]) == 10
+              and x.shape == (4, 224, 224, 1) and 0 <= x.numpy().min() and x.numpy().max() <= 1)
+        if ok:
+            print("✅ SUCCÈS: Lots tf.data normalisés et augmentés")
+        else:
+            print("❌ ÉCHEC: Pipeline d'entraînement incorrect")
+        return ok
+    except Exception as e:
+        print(f"❌ ÉCHEC: Erreur du pipeline d'entraînement")
+        print(f"   Erreur: {str(e)}")
+        return False
+
+def test_tta():
+    """Test 20: Vérifier l'analyse renforcée (TTA): vues augmentées analysées en un seul lot"""
+    print("\n" + "="*60)
+    print("TEST 20: Augmentation au moment de l'analyse (TTA)")
+    print("="*60)
+    
+    import tempfile
+    from batch_inference import run_batch
+    from tta_inference import augmented_views, predict_tta, SOURCE_TTA
+    
+    class LeftHalfModel:
+        """Modèle factice: luminosité moyenne de la moitié gauche, nombre d'appels compté"""
+        calls = 0
+        def predict_on_batch(self, batch):
+            self.calls += 1
+            return batch[:, :, :112].mean(axis=(1, 2, 3)).reshape(-1, 1)
+    
+    try:
+        # Image à moitié claire: le retournement horizontal change la prédiction
+        image = np.zeros((224, 224), dtype=np.uint8)
+        image[:, :112] = 200
+        views = augmented_views(image, 8)
+        identity_ok = np.array_equal(views[0], image) and np.array_equal(views[1], image[:, ::-1])
+        print(f"   - Vues: {views.shape}, vue 0 = image d'origine, vue 1 = retournée: {identity_ok}")
+        
+        model = LeftHalfModel()
+        uniform = np.full((224, 224), 128, dtype=np.uint8)
+        means, variances = predict_tta(model, np.stack([image, uniform]), n_views=8)
+        print(f"   - Moyennes: {np.round(means, 3)}, variances: {np.round(variances, 4)}, appels: {model.calls}")
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "irm.png")
+            cv2.imwrite(path, image)
+            results = run_batch([path], LeftHalfModel(), batch_size=4, tta_views=4)
+        print(f"   - Analyse par lots: source={results[0]['source']}, variance={results[0]['tta_variance']}")
+        
+        ok = (identity_ok and model.calls == 1 and variances[0] > 0.01 and variances[1] < 1e-6
+              and abs(means[1] - 128 / 255) < 1e-3 and results[0]['source'] == SOURCE_TTA
+              and float(results[0]['tta_variance']) > 0)
+        if ok:
+            print("✅ SUCCÈS: Probabilité moyenne et variance calculées en un seul appel")
+        else:
+            print("❌ ÉCHEC: Analyse TTA incorrecte")
+        return ok
+    except Exception as e:
+        print(f"❌ ÉCHEC: Erreur de l'analyse TTA")
+        print(f"   Erreur: {str(e)}")
+        return False
+
+def test_gradcam():
+    """Test 21: Vérifier les cartes Grad-CAM calculées par lot dans la même passe que la prédiction"""
+    print("\n" + "="*60)
+    print("TEST 21: Cartes de saillance Grad-CAM")
+    print("="*60)
+    
+    import tempfile
+    from tensorflow import keras
+    from gradcam import GradCam, heatmap_to_uint8, overlay_heatmap, write_overlays
+    from prediction_cache import PredictionCache
+    
+    try:
+        # Petit modèle avec une dernière couche Conv2D(128), comme le CNN du notebook
+        model = keras.Sequential([
+            keras.Input(shape=(224, 224, 1)),
+            keras.layers.Conv2D(4, (3, 3), activation='relu', padding='same'),
+            keras.layers.MaxPooling2D((4, 4)),
+            keras.layers.Conv2D(128, (3, 3), activation='relu', padding='same'),
+            keras.layers.BatchNormalization(),
+            keras.layers.GlobalAveragePooling2D(),
+            keras.layers.Dense(1, activation='sigmoid'),
+        ])
+        images = np.random.rand(4, 224, 224, 1).astype('float32')
+        
+        gradcam = GradCam(model)
+        predictions, heatmaps = gradcam.predict_with_heatmaps(images)
+        expected = model.predict(images, verbose=0).reshape(-1)
+        single = np.stack([gradcam.predict_with_heatmaps(img[None])[1][0] for img in images])
+        print(f"   - Couche: {gradcam.layer_name}, cartes: {heatmaps.shape}")
+        print(f"   - Écart lot / image par image: {np.abs(heatmaps - single).max():.2e}")
+        
+        overlay = overlay_heatmap((images[0, :, :, 0] * 255).astype(np.uint8)[:200], heatmaps[0])
+        print(f"   - Superposition: {overlay.shape}")
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            model_path = os.path.join(tmp_dir, "model.keras")
+            with open(model_path, 'wb') as f:
+                f.write(b"modele")
+            cache = PredictionCache(model_path, os.path.join(tmp_dir, "cache.sqlite"))
+            cache.put("irm", float(predictions[0]))
+            cache.put_heatmaps([("irm", heatmap_to_uint8(heatmaps[0]))])
+            cached = cache.get_heatmap("irm")
+            cache.close()
+            
+            # Même nom dans deux dossiers, ou avec deux extensions: superpositions distinctes
+            written = write_overlays(os.path.join(tmp_dir, "cartes"), ["a/irm_1.jpg", "b/irm_1.jpg", "a/irm_1.png"],
+                                     (images[:3, :, :, 0] * 255).astype(np.uint8), heatmaps[:3])
+            files_ok = all(os.path.exists(path) for path in written) and len(set(written)) == 3
+            
+            # Mode batch: probabilités et cartes enregistrées, cache non consulté (superpositions toujours écrites)
+            from batch_inference import run_batch
+            from prediction_cache import SOURCE_CACHE, image_hash
+            paths = []
+            for i in range(3):
+                path = os.path.join(tmp_dir, f"scan{i}.png")
+                cv2.imwrite(path, np.random.randint(0, 255, (240, 220), dtype=np.uint8))
+                paths.append(path)
+            cache = PredictionCache(model_path, os.path.join(tmp_dir, "cache.sqlite"))
+            runs = []
+            for run in ("run1", "run2"):
+                runs.append(run_batch(paths, gradcam, 2, None, cache=cache,
+                                      gradcam_dir=os.path.join(tmp_dir, run)))
+            keys = [image_hash(open(path, 'rb').read()) for path in paths]
+            batch_cached = all(abs(cache.get(key) - float(r['probability'])) < 1e-6 and cache.get_heatmap(key) is not None
+                               for key, r in zip(keys, runs[0]))
+            bypassed = (all(r['source'] != SOURCE_CACHE for r in runs[1])
+                        and len(os.listdir(os.path.join(tmp_dir, "run2"))) == 3)
+            cache.close()
+        print(f"   - Cache: {cached is not None and cached.shape}, PNG écrits: {len(written)}")
+        print(f"   - Batch: résultats en cache {batch_cached}, cache non consulté {bypassed}")
+        
+        ok = (gradcam.layer_name == model.layers[2].name and heatmaps.shape == (4, 56, 56)
+              and np.allclose(predictions, expected, atol=1e-5)
+              and np.allclose(heatmaps, single, atol=1e-4)
+              and heatmaps.min() >= 0 and heatmaps.max() <= 1
+              and overlay.shape == (200, 224, 3)
+              and cached is not None and np.array_equal(cached, heatmap_to_uint8(heatmaps[0]))
+              and files_ok and os.path.basename(written[0]).startswith("irm_1_jpg_")
+              and written[0].endswith("_gradcam.png")
+              and batch_cached and bypassed)
+        if ok:
+            print("✅ SUCCÈS: Cartes Grad-CAM identiques par lot et image par image")
+        else:
+            print("❌ ÉCHEC: Cartes Grad-CAM incorrectes")
+        return ok
+    except Exception as e:
+        print(f"❌ ÉCHEC: Erreur du calcul Grad-CAM")
+        print(f"   Erreur: {str(e)}")
+        return False
+
+def test_cascade():
+    """Test 22: Vérifier la cascade (tri basse résolution, escalade des cas incertains)"""
+    print("\n" + "="*60)
+    print("TEST 22: Analyse en cascade")
+    print("="*60)
+    
+    import tempfile
+    from batch_inference import run_batch
+    from cascade import CascadeEngine, SOURCE_SCREEN, calibrate_band, cascade_metrics
+    
+    class MeanEngine:
+        """Moteur factice: luminosité moyenne, images reçues comptées"""
+        def __init__(self, img_size):
+            self.img_size = img_size
+            self.warmup_time = 0.0
+            self.seen = 0
+        def predict_on_batch(self, batch):
+            assert batch.shape[1] == self.img_size
+            self.seen += len(batch)
+            return batch.mean(axis=(1, 2, 3)).reshape(-1, 1)
+    
+    try:
+        # Validation: le tri sépare bien les cas francs, le modèle complet tranche les autres
+        labels = np.array([1, 1, 1, 1, 0, 0, 0, 0])
+        screen = np.array([0.95, 0.70, 0.40, 0.30, 0.05, 0.10, 0.45, 0.60])
+        full = np.array([0.90, 0.80, 0.70, 0.20, 0.10, 0.20, 0.30, 0.40])
+        low, high = calibrate_band(screen, full, labels)
+        metrics = cascade_metrics(screen, full, labels, low, high)
+        print(f"   - Bande: ]{low:.3f}, {high:.3f}[, escalade {metrics['escalation_rate'] * 100:.0f}%")
+        print(f"   - Rappel: complet {metrics['full']['recall']:.2f}, cascade {metrics['cascade']['recall']:.2f}")
+        
+        screen_engine, full_engine = MeanEngine(96), MeanEngine(224)
+        engine = CascadeEngine(screen_engine, full_engine, 0.3, 0.7)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = []
+            for i, value in enumerate([20, 128, 240]):
+                path = os.path.join(tmp_dir, f"irm_{i}.png")
+                cv2.imwrite(path, np.full((300, 300), value, dtype=np.uint8))
+                paths.append(path)
+            results = run_batch(paths, engine, batch_size=8)
+        sources = [r['source'] for r in results]
+        print(f"   - Sources: {sources}, modèle complet: {full_engine.seen}/{screen_engine.seen} images")
+        
+        ok = (0.30 < low < 0.40 and 0.60 < high < 0.70 and abs(metrics['escalation_rate'] - 3 / 8) < 1e-9
+              and metrics['cascade']['recall'] >= metrics['full']['recall']
+              and metrics['cascade']['specificity'] >= metrics['full']['specificity']
+              and sources == [SOURCE_SCREEN, 'model', SOURCE_SCREEN]
+              and full_engine.seen == 1 and screen_engine.seen == 3
+              and abs(engine.escalation_rate - 1 / 3) < 1e-9)
+        if ok:
+            print("✅ SUCCÈS: Seuls les cas incertains sont envoyés au modèle complet")
+        else:
+            print("❌ ÉCHEC: Cascade incorrecte")
+        return ok
+    except Exception as e:
+        print(f"❌ ÉCHEC: Erreur de la cascade")
+        print(f"   Erreur: {str(e)}")
+        return False
+
+def test_compact_model():
+    """Test 23: Vérifier l'élagage structuré du modèle compact"""
+    print("\n" + "="*60)
+    print("TEST 23: Modèle compact (élagage)")
+    print("="*60)
+    
+    try:
+        from tensorflow import keras
+        from tensorflow.keras import layers
+        from compact_model import prune_filters
+        
+        x = np.random.RandomState(0).rand(4, 16, 16, 1).astype(np.float32)
+        ok = True
+        for head in (layers.GlobalAveragePooling2D, layers.Flatten):
+            model = keras.Sequential([
+                keras.Input(shape=(16, 16, 1)),
+                layers.Conv2D(8, (3, 3), activation='relu', padding='same'),
+                layers.BatchNormalization(),
+                layers.Conv2D(6, (3, 3), activation='relu', padding='same'),
+                layers.MaxPooling2D(pool_size=(2, 2)),
+                head(),
+                layers.Dense(4, activation='relu'),
+                layers.Dense(1, activation='sigmoid'),
+            ])
+            # Un filtre sur deux nul: l'élagage doit supprimer exactement ceux-là
+            for layer in model.layers:
+                if isinstance(layer, layers.Conv2D):
+                    kernel, bias = layer.get_weights()
+                    kernel[..., ::2] = 0
+                    bias[::2] = 0
+                    layer.set_weights([kernel, bias])
+            
+            pruned = prune_filters(model, 0.5)
+            filters = [layer.filters for layer in pruned.layers if isinstance(layer, layers.Conv2D)]
+            gap = np.abs(model.predict(x, verbose=0) - pruned.predict(x, verbose=0)).max()
+            print(f"   - {head.__name__}: {model.count_params()} → {pruned.count_params()} paramètres, "
+                  f"filtres {filters}, écart {gap:.2e}")
+            ok = ok and filters == [4, 3] and pruned.count_params() < model.count_params() and gap < 1e-5
+        
+        if ok:
+            print("✅ SUCCÈS: Filtres élagués sans changer les prédictions")
+        else:
+            print("❌ ÉCHEC: Élagage incorrect")
+        return ok
+    except Exception as e:
+        print(f"❌ ÉCHEC: Erreur de l'élagage")
+        print(f"   Erreur: {str(e)}")
+        return False
+
+def test_image_ingest():
+    """Test 24: Vérifier la lecture à résolution réduite et l'analyse des coupes"""
+    print("\n" + "="*60)
+    print("TEST 24: Grandes images et fichiers multi-coupes")
+    print("="*60)
+    
+    import tempfile
+    from PIL import Image, TiffImagePlugin
+    from batch_inference import run_studies
+    from image_ingest import decode_reduced, count_slices, iter_slices
+    
+    class MeanEngine:
+        """Moteur factice: luminosité moyenne"""
+        def predict_on_batch(self, batch):
+            return batch.mean(axis=(1, 2, 3)).reshape(-1, 1)
+    
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Pile de 3 coupes de luminosités différentes
+            stack = os.path.join(tmp_dir, "etude.tiff")
+            pages = [Image.fromarray(np.full((300, 300), value, dtype=np.uint8)) for value in (20, 240, 128)]
+            pages[0].save(stack, save_all=True, append_images=pages[1:])
+            
+            # TIFF pyramidal: pleine résolution puis pages de résolution réduite (NewSubfileType = 1)
+            pyramid = os.path.join(tmp_dir, "pyramide.tiff")
+            with TiffImagePlugin.AppendingTiffWriter(pyramid, True) as tiff:
+                for level, side in enumerate((1024, 256, 32)):
+                    Image.fromarray(np.full((side, side), 100, dtype=np.uint8)).save(
+                        tiff, tiffinfo={254: 1} if level else {})
+                    tiff.newFrame()
+            
+            # Grand JPEG (mise à l'échelle DCT) et image ordinaire
+            large_jpeg = os.path.join(tmp_dir, "grand.jpg")
+            cv2.imwrite(large_jpeg, np.full((1000, 800), 200, dtype=np.uint8))
+            small = os.path.join(tmp_dir, "irm.png")
+            cv2.imwrite(small, np.full((100, 100), 60, dtype=np.uint8))
+            bad = os.path.join(tmp_dir, "corrompue.jpg")
+            with open(bad, 'wb') as f:
+                f.write(b"pas une image")
+            
+            # img_size=16: réduction jusqu'à 4 × 16 = 64 pixels au moins
+            pyramid_shape = decode_reduced(pyramid, 16).shape
+            jpeg_shape = decode_reduced(large_jpeg, 16).shape
+            small_ok = np.array_equal(decode_reduced(small, 16), cv2.imread(small, cv2.IMREAD_GRAYSCALE))
+            slice_values = [int(image[0, 0]) for _, image in iter_slices(stack, 16)]
+            slice_counts = (count_slices(pyramid), count_slices(stack))
+            print(f"   - Pyramide: {pyramid_shape}, JPEG: {jpeg_shape}, coupes: {slice_values}")
+            
+            results, studies = run_studies([stack, small, bad], MeanEngine(), batch_size=2, img_size=16)
+        
+        by_study = {os.path.basename(s['study']): s for s in studies}
+        print(f"   - {len(results)} lignes de coupes, études: "
+              f"{[(name, s['slices'], s['top_slice']) for name, s in by_study.items()]}")
+        
+        ok = (pyramid_shape == (256, 256) and jpeg_shape == (125, 100) and small_ok
+              and slice_values == [20, 240, 128] and slice_counts == (1, 3)
+              and len(results) == 5 and results[1]['image'].endswith("etude.tiff#2")
+              and by_study['etude.tiff']['slices'] == 3 and by_study['etude.tiff']['top_slice'] == 2
+              and abs(float(by_study['etude.tiff']['probability']) - 240 / 255) < 1e-4
+              and by_study['etude.tiff']['positive_slices'] == 2
+              and by_study['corrompue.jpg']['result'] == 'ERREUR')
+        if ok:
+            print("✅ SUCCÈS: Lecture réduite et synthèse par étude correctes")
+        else:
+            print("❌ ÉCHEC: Lecture des grandes images incorrecte")
+        return ok
+    except Exception as e:
+        print(f"❌ ÉCHEC: Erreur de lecture des coupes")
+        print(f"   Erreur: {str(e)}")
+        return False
+
+def test_near_duplicates():
+    """Test 25: Vérifier l'index des quasi-doublons (pHash, indexation multiple)"""
+    print("\n" + "="*60)
+    print("TEST 25: Quasi-doublons")
+    print("="*60)
+    
+    import random
+    import tempfile
+    from batch_inference import run_batch
+    from prediction_cache import PredictionCache
+    from perceptual_index import (HashIndex, SOURCE_DUPLICATE, duplicate_clusters, hamming, phash,
+                                  load_hash_index)
+    
+    class MeanEngine:
+        """Moteur factice: luminosité moyenne, images reçues comptées"""
+        def __init__(self):
+            self.seen = 0
+        def predict_on_batch(self, batch):
+            self.seen += len(batch)
+            return batch.mean(axis=(1, 2, 3)).reshape(-1, 1)
+    
+    try:
+        # Indexation multiple: mêmes résultats qu'une recherche exhaustive
+        rng = random.Random(0)
+        hashes = [rng.getrandbits(64) for _ in range(300)]
+        hashes += [h ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64)) for h in hashes[:100]]
+        index = HashIndex(max_distance=6)
+        for h in hashes:
+            index.add(h)
+        exact = all(
+            sorted(index.search(h)) == sorted((hamming(h, other), j) for j, other in enumerate(hashes)
+                                              if hamming(h, other) <= 6)
+            for h in hashes[::7]
+        )
+        clusters = duplicate_clusters(hashes, 2)
+        print(f"   - Recherche exacte: {exact}, groupes: {len(clusters)}")
+        
+        # Une IRM recadrée et ré-encodée garde une empreinte proche
+        noise = np.random.RandomState(0).rand(256, 256).astype(np.float32)
+        scan = cv2.normalize(cv2.GaussianBlur(noise, (0, 0), 12), None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+        copy = cv2.imdecode(cv2.imencode('.jpg', scan[3:-2, 2:-3], [cv2.IMWRITE_JPEG_QUALITY, 60])[1],
+                            cv2.IMREAD_GRAYSCALE)
+        other = cv2.rotate(scan, cv2.ROTATE_90_CLOCKWISE)
+        reference = phash(cv2.resize(scan, (224, 224)))
+        near = hamming(reference, phash(cv2.resize(copy, (224, 224))))
+        far = hamming(reference, phash(cv2.resize(other, (224, 224))))
+        print(f"   - Distance copie: {near} bits, autre image: {far} bits")
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            model_path = os.path.join(tmp_dir, "modele.keras")
+            with open(model_path, 'wb') as f:
+                f.write(b"poids")
+            original = os.path.join(tmp_dir, "Y2.png")
+            duplicate = os.path.join(tmp_dir, "Y2 copie.jpg")
+            cv2.imwrite(original, scan)
+            cv2.imwrite(duplicate, copy)
+            
+            engine = MeanEngine()
+            cache = PredictionCache(model_path, os.path.join(tmp_dir, "cache.sqlite"))
+            run_batch([original], engine, cache=cache, near_index=load_hash_index(cache))
+            cache.close()
+            
+            # Nouvelle session: l'index est reconstruit depuis le cache
+            cache = PredictionCache(model_path, os.path.join(tmp_dir, "cache.sqlite"))
+            near_index = load_hash_index(cache)
+            results = run_batch([duplicate], engine, cache=cache, near_index=near_index)
+            cache.close()
+        print(f"   - Index: {len(near_index)} image(s), source de la copie: {results[0]['source']}, "
+              f"prédictions du modèle: {engine.seen}")
+        
+        ok = (exact and len(clusters) == 100 and all(len(c) == 2 for c in clusters)
+              and near <= 4 and far > 10 and len(near_index) == 1
+              and results[0]['source'] == SOURCE_DUPLICATE and engine.seen == 1)
+        if ok:
+            print("✅ SUCCÈS: Quasi-doublons reconnus sans nouvelle prédiction")
+        else:
+            print("❌ ÉCHEC: Index des quasi-doublons incorrect")
+        return ok
+    except Exception as e:
+        print(f"❌ ÉCHEC: Erreur de l'index des quasi-doublons")
+        print(f"   Erreur: {str(e)}")
+        return False
+
+def test_model_registry():
+    """Test 26: Vérifier le registre des modèles (rechargement à chaud, ensembles)"""
+    print("\n" + "="*60)
+    print("TEST 26: Registre des modèles")
+    print("="*60)
+    
+    import tempfile
+    import threading
+    import time
+    from inference_server import MicroBatcher
+    from prediction_cache import PredictionCache
+    from model_registry import ModelRegistry, HotSwapEngine, EnsembleEngine, verify_entry
+    
+    class ConstantEngine:
+        """Moteur factice: probabilité constante, attente optionnelle d'un signal"""
+        img_size = 224
+        warmup_time = 0.0
+        def __init__(self, value, gate=None):
+            self.value = value
+            self.gate = gate
+        def predict_on_batch(self, batch):
+            if self.gate is not None:
+                entered.set()
+                self.gate.wait(10)
+            return np.full((len(batch), 1), self.value, dtype=np.float32)
+    
+    entered, gate = threading.Event(), threading.Event()
+    values = {'a': 0.2, 'b': 0.8}
+    
+    def load_fake(entries, warmup_batch_sizes, num_threads):
+        """Chargement factice (empreintes vérifiées comme le vrai chargement)"""
+        engines = {}
+        for name, entry in entries:
+            verify_entry(name, entry)
+            engines[name] = ConstantEngine(values.get(name, 0.5), gate if name == 'a' else None)
+        return engines[name] if len(engines) == 1 else EnsembleEngine(engines)
+    
+    def wait_loaded(engine):
+        deadline = time.monotonic() + 10
+        while engine.loading and time.monotonic() < deadline:
+            time.sleep(0.01)
+    
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = {}
+            for name in ('a', 'b', 'c'):
+                paths[name] = os.path.join(tmp_dir, f"modele_{name}.keras")
+                with open(paths[name], 'wb') as f:
+                    f.write(f"poids {name}".encode())
+            registry_path = os.path.join(tmp_dir, "registre.json")
+            cli = ModelRegistry(registry_path)
+            for name in ('a', 'b', 'c'):
+                cli.register(paths[name], name)
+            cli.activate(['a'])
+            
+            engine = HotSwapEngine(ModelRegistry(registry_path), load_fn=load_fake)
+            inputs = np.zeros((2, 224, 224, 1), dtype=np.float32)
+            
+            # Analyse en cours sur la version a pendant le chargement de b
+            in_flight = {}
+            thread = threading.Thread(target=lambda: in_flight.update(p=engine.predict(inputs)))
+            thread.start()
+            entered.wait(10)
+            cli.activate(['b'])
+            started = engine.check_for_update()
+            wait_loaded(engine)
+            after_swap = engine.predict(inputs)
+            gate.set()
+            thread.join(10)
+            swapped = (started and engine.active.names == ['b'] and np.allclose(after_swap, 0.8)
+                       and np.allclose(in_flight.get('p'), 0.2))
+            print(f"   - Bascule a → b: analyse en cours {in_flight.get('p')}, suivante {after_swap}")
+            
+            # Ensemble: probabilités de chaque modèle et moyenne, dans la réponse du serveur
+            cli.activate(['a', 'b'])
+            engine.check_for_update()
+            wait_loaded(engine)
+            batcher = MicroBatcher(engine, max_batch_size=4, max_wait_ms=10)
+            try:
+                prediction, _, details = batcher.submit(np.zeros((224, 224), dtype=np.uint8),
+                                                        details=True).result(timeout=10)
+            finally:
+                batcher.close()
+            members = {name: round(p, 6) for name, p in details['models'].items()}
+            ensemble = (abs(prediction - 0.5) < 1e-6 and members == {'a': 0.2, 'b': 0.8}
+                        and details['model_version'] == f"{cli.models['a']['version']}+{cli.models['b']['version']}")
+            print(f"   - Ensemble {details['model_version']}: {prediction:.2f} {details['models']}")
+            
+            # Fichier modifié après son enregistrement: refusé, l'ensemble reste actif
+            with open(paths['c'], 'ab') as f:
+                f.write(b" ajout")
+            cli.activate(['c'])
+            engine.check_for_update()
+            wait_loaded(engine)
+            kept = engine.active.names == ['a', 'b'] and engine.last_error is not None
+            print(f"   - Version modifiée refusée: {kept} ({engine.last_error})")
+            
+            # Cache des prédictions: invalidé quand la sélection change
+            cache = PredictionCache(paths['a'], os.path.join(tmp_dir, "cache.sqlite"),
+                                    fingerprint=engine.active.fingerprint)
+            cache.put("irm", 0.5)
+            cache.set_model_fingerprint(engine.active.fingerprint)
+            kept_entry = cache.get("irm") == 0.5
+            cache.set_model_fingerprint(cli.models['b']['fingerprint'])
+            invalidated = cache.get("irm") is None
+            cache.close()
+            print(f"   - Cache: conservé {kept_entry}, invalidé {invalidated}")
+        
+        ok = swapped and ensemble and kept and kept_entry and invalidated and engine.reloads == 2
+        if ok:
+            print("✅ SUCCÈS: Rechargement à chaud et ensembles corrects")
+        else:
+            print("❌ ÉCHEC: Registre des modèles incorrect")
+        return ok
+    except Exception as e:
+        print(f"❌ ÉCHEC: Erreur du registre des modèles")
+        print(f"   Erreur: {str(e)}")
+        return False
+
+def test_evaluation():
+    """Test 27: Vérifier l'évaluation vectorisée, la calibration et le seuil de décision"""
+    print("\n" + "="*60)
+    print("TEST 27: Évaluation et calibration")
+    print("="*60)
+    
+    import tempfile
+    from batch_inference import run_batch
+    from model_metadata import DecisionPolicy, load_policy, save_metadata
+    from cascade import cascade_policy_error
+    from prediction_cache import file_sha256
+    from evaluation import (roc_auc, threshold_for_sensitivity, confusion_at, bootstrap_intervals,
+                            calibration_metrics, isotonic_fit, evaluate, dataset_predictions)
+    
+    class ConstantEngine:
+        """Moteur factice: probabilité brute constante"""
+        def predict_on_batch(self, batch):
+            return np.full((len(batch), 1), 0.3, dtype=np.float32)
+    
+    try:
+        # Scores mal calibrés (trop proches de 0,5) avec ex aequo
+        rng = np.random.RandomState(0)
+        labels = rng.randint(0, 2, 3000)
+        scores = np.round(1 / (1 + np.exp(-(labels * 2 - 1 + rng.randn(3000)) / 4)), 3)
+        
+        # AUC: identique au test de Mann-Whitney (ex aequo comptés pour moitié)
+        positives, negatives = scores[labels == 1], scores[labels == 0]
+        pairs = positives[:, None] - negatives[None, :]
+        mann_whitney = ((pairs > 0).sum() + 0.5 * (pairs == 0).sum()) / pairs.size
+        auc = roc_auc(scores, labels)
+        print(f"   - AUC: {auc:.6f} (Mann-Whitney {mann_whitney:.6f})")
+        
+        # Seuil: sensibilité cible atteinte, et plus atteinte juste au-dessus
+        threshold = threshold_for_sensitivity(scores, labels, 0.9)
+        reached = confusion_at(scores, labels, threshold)['sensitivity']
+        above = confusion_at(scores, labels, threshold + 1e-3)['sensitivity']
+        print(f"   - Seuil {threshold:.4f}: sensibilité {reached:.4f} (au-dessus {above:.4f})")
+        
+        # Régression isotonique vectorisée: croissante, moyenne conservée
+        values = rng.rand(500)
+        fitted = isotonic_fit(np.arange(500), values)
+        isotonic = bool(np.all(np.diff(fitted) >= -1e-12)) and abs(fitted.mean() - values.mean()) < 1e-9
+        
+        # Calibration: l'erreur de calibration diminue, intervalle bootstrap autour de l'AUC
+        results = {}
+        for method in ('platt', 'isotonic'):
+            policy, report = evaluate(scores, labels, method, 0.95, holdout=0.3, replicates=200, seed=0)
+            results[method] = (report['calibration_before']['ece'], report['calibration_after']['ece'],
+                               report['at_threshold']['sensitivity'])
+            print(f"   - {method}: ECE {results[method][0]:.4f} → {results[method][1]:.4f}, "
+                  f"sensibilité {results[method][2]:.4f} ({policy.describe()})")
+        low, high = bootstrap_intervals(scores, labels, threshold, 200, seed=0)['auc_roc']
+        print(f"   - Intervalle bootstrap de l'AUC: [{low:.4f} - {high:.4f}]")
+        calibrated = all(after < before / 2 and sensitivity >= 0.9
+                         for before, after, sensitivity in results.values())
+        
+        # Mesures de calibration: valeurs calculées à la main, puis Brier et ECE avant/après Platt
+        exact = calibration_metrics([0.2, 0.8], [0, 1])
+        exact_ok = abs(exact['brier'] - 0.04) < 1e-12 and abs(exact['ece'] - 0.2) < 1e-12
+        platt_policy, _ = evaluate(scores, labels, 'platt', 0.95, replicates=0)
+        before = calibration_metrics(scores, labels)
+        after = calibration_metrics(platt_policy.calibrate(scores), labels)
+        metrics_ok = exact_ok and after['brier'] < before['brier'] and after['ece'] < before['ece']
+        print(f"   - Brier {before['brier']:.4f} → {after['brier']:.4f}, "
+              f"ECE {before['ece']:.4f} → {after['ece']:.4f} (cas exact: {exact_ok})")
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            model_path = os.path.join(tmp_dir, "modele.keras")
+            with open(model_path, 'wb') as f:
+                f.write(b"poids")
+            fingerprint = file_sha256(model_path)
+            
+            # Métadonnées du modèle: seuil appliqué par le mode batch
+            save_metadata(model_path, DecisionPolicy(0.25), fingerprint, {'auc_roc': auc})
+            policy = load_policy(model_path)
+            image_path = os.path.join(tmp_dir, "irm.png")
+            cv2.imwrite(image_path, np.zeros((64, 64), dtype=np.uint8))
+            rows = run_batch([image_path], ConstantEngine(), policy=policy)
+            default_rows = run_batch([image_path], ConstantEngine())
+            print(f"   - Seuil {policy.threshold}: {rows[0]['result']} (seuil 0,5: {default_rows[0]['result']})")
+            
+            # Cascade: bande du modèle de tri calibrée pour le seuil 0,5 seulement
+            cascade_refused = cascade_policy_error(model_path) is not None
+            
+            # Modèle modifié: métadonnées ignorées
+            with open(model_path, 'ab') as f:
+                f.write(b" ajout")
+            stale = load_policy(model_path).is_default
+            cascade_allowed = cascade_policy_error(model_path) is None
+            print(f"   - Cascade refusée avec un seuil calibré: {cascade_refused}, acceptée sinon: {cascade_allowed}")
+            
+            # Probabilités enregistrées: réutilisées sans recharger le modèle
+            paths = [os.path.join(tmp_dir, name) for name in ("a.png", "b.png")]
+            np.savez(os.path.join(tmp_dir, "predictions.npz"), paths=np.array(paths),
+                     labels=np.array([0, 1]), probabilities=np.array([0.1, 0.9]), fingerprint=np.asarray("fp"))
+            _, _, reused, _ = dataset_predictions(paths[::-1], [1, 0], "absent.keras", "fp",
+                                                  os.path.join(tmp_dir, "predictions.npz"))
+            print(f"   - Métadonnées périmées ignorées: {stale}, probabilités reprises: {reused.tolist()}")
+        
+        ok = (abs(auc - mann_whitney) < 1e-9 and reached >= 0.9 and above < 0.9 and isotonic and calibrated
+              and low < auc < high and rows[0]['result'] == 'TUMEUR DÉTECTÉE'
+              and default_rows[0]['result'] != rows[0]['result'] and stale and reused.tolist() == [0.9, 0.1]
+              and cascade_refused and cascade_allowed and metrics_ok)
+        if ok:
+            print("✅ SUCCÈS: Évaluation, calibration et seuil corrects")
+        else:
+            print("❌ ÉCHEC: Évaluation ou calibration incorrecte")
+        return ok
+    except Exception as e:
+        print(f"❌ ÉCHEC: Erreur de l'évaluation")
+        print(f"   Erreur: {str(e)}")
+        return False
+
+def test_study_gallery():
+    """Test 28: Vérifier la galerie d'une étude (cache des miniatures, liste virtualisée)"""
+    print("\n" + "="*60)
+    print("TEST 28: Galerie d'une étude")
+    print("="*60)
+    
+    import tempfile
+    import time
+    from PIL import Image
+    from study_gallery import ThumbnailCache, ThumbnailLoader, visible_range, make_thumbnail
+    
+    try:
+        # Cache LRU borné en nombre puis en octets
+        cache = ThumbnailCache(max_entries=3, max_bytes=1000)
+        for key in "abc":
+            cache.put(key, key.upper(), 100)
+        cache.get("a")
+        cache.put("d", "D", 100)
+        by_count = sorted(cache._items) == ["a", "c", "d"]
+        cache.put("e", "E", 950)
+        by_bytes = len(cache) == 1 and "e" in cache and cache.nbytes == 950
+        print(f"   - Cache: éviction par nombre {by_count}, par taille {by_bytes} ({cache.evictions} évictions)")
+        
+        # Lignes visibles: indépendantes du nombre total d'images
+        rows = visible_range(720, 500, 72, 100000)
+        edges = visible_range(-10, 100, 72, 3) == range(0, 2) and visible_range(0, 500, 72, 0) == range(0)
+        print(f"   - Lignes visibles: {rows.start}-{rows.stop - 1} sur 100000")
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = []
+            for i in range(6):
+                path = os.path.join(tmp_dir, f"scan_{i}.png")
+                Image.fromarray(np.full((400, 300), i * 40, dtype=np.uint8)).save(path)
+                paths.append(path)
+            thumbnail = make_thumbnail(paths[0], 64)
+            
+            # Seules les miniatures de la dernière demande sont fabriquées
+            loader = ThumbnailLoader(size=64, workers=1)
+            try:
+                loader.request(paths[:4])
+                loader.request(paths[4:] + [os.path.join(tmp_dir, "absent.png")])
+                done = {}
+                deadline = time.time() + 10
+                while len(done) < 3 and time.time() < deadline:
+                    for path, thumb, error in loader.poll():
+                        done[path] = (thumb, error)
+                    time.sleep(0.01)
+            finally:
+                loader.close()
+            stale = [p for p in paths[2:4] if p in done]
+            decoded = all(done.get(p, (None, "absent"))[0] is not None for p in paths[4:])
+            failed = done.get(os.path.join(tmp_dir, "absent.png"), (None, None))[1] is not None
+            print(f"   - Miniatures: {len(done)} terminées, {len(stale)} demandes périmées traitées")
+        
+        ok = (by_count and by_bytes and rows == range(10, 17) and edges and thumbnail.shape == (64, 48)
+              and len(stale) == 0 and decoded and failed)
+        if ok:
+            print("✅ SUCCÈS: Miniatures et lignes visibles correctes")
+        else:
+            print("❌ ÉCHEC: Galerie incorrecte")
+        return ok
+    except Exception as e:
+        print(f"❌ ÉCHEC: Erreur de la galerie")
+        print(f"   Erreur: {str(e)}")
+        return False
+
+def test_sharded_batch():
+    """Test 29: Vérifier l'analyse répartie en tranches (reprise, verrous, fusion)"""
+    print("\n" + "="*60)
+    print("TEST 29: Analyse répartie en tranches")
+    print("="*60)
+    
+    import csv
+    import json
+    import tempfile
+    from PIL import Image
+    from sharded_batch import (HOST, plan_run, load_manifest, shard_images, shard_file, split_cpus, claim_shard,
+                               release_shard, read_checkpoint, process_shard, merge_shards, run_status)
+    
+    class ConstantEngine:
+        """Moteur factice: probabilité constante, nombre d'images analysées"""
+        def __init__(self):
+            self.images = 0
+        def predict_on_batch(self, batch):
+            self.images += len(batch)
+            return np.full((len(batch), 1), 0.8, dtype=np.float32)
+    
+    try:
+        groups = split_cpus(list(range(8)), 3)
+        shared = split_cpus([0, 1], 3)
+        print(f"   - Cœurs: 8 pour 3 processus {groups}, 2 pour 3 processus {shared}")
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = []
+            for i in range(10):
+                path = os.path.join(tmp_dir, f"scan_{i:02d}.png")
+                Image.fromarray(np.full((64, 64), i * 20, dtype=np.uint8)).save(path)
+                paths.append(path)
+            model_path = os.path.join(tmp_dir, "model.keras")
+            with open(model_path, 'wb') as f:
+                f.write(b"modele")
+            
+            # Découpage déterministe: même liste (dans n'importe quel ordre) → mêmes tranches
+            run_dir = os.path.join(tmp_dir, "run")
+            manifest = plan_run(run_dir, paths[::-1], model_path, shard_size=4)
+            _, planned = load_manifest(run_dir)
+            deterministic = planned == sorted(paths) and manifest['shards'] == 3
+            
+            # Verrous: exclusifs, un verrou d'un processus arrêté est repris
+            claimed = claim_shard(run_dir, 0)
+            exclusive = not claim_shard(run_dir, 0)
+            release_shard(run_dir, 0)
+            with open(shard_file(run_dir, 1, ".lock"), 'w') as f:
+                json.dump({'host': HOST, 'pid': 999999999}, f)
+            reclaimed = claim_shard(run_dir, 1)
+            with open(shard_file(run_dir, 2, ".lock"), 'w') as f:
+                json.dump({'host': "autre-machine", 'pid': 1}, f)
+            foreign = not claim_shard(run_dir, 2)
+            os.remove(shard_file(run_dir, 2, ".lock"))
+            print(f"   - Verrous: exclusif {exclusive}, repris {reclaimed}, autre machine respectée {foreign}")
+            
+            # Course: un autre processus reprend le verrou abandonné entre le constat et le renommage
+            import sharded_batch
+            lock_path = shard_file(run_dir, 2, ".lock")
+            with open(lock_path, 'w') as f:
+                json.dump({'host': HOST, 'pid': 999999999}, f)
+            fresh = json.dumps({'host': "autre-machine", 'pid': 1, 'token': "a"})
+            judge = sharded_batch._lock_is_stale
+            def judge_then_taken_over(*args):
+                stale = judge(*args)
+                with open(lock_path, 'w') as f:
+                    f.write(fresh)
+                return stale
+            sharded_batch._lock_is_stale = judge_then_taken_over
+            try:
+                lost_race = not claim_shard(run_dir, 2)
+            finally:
+                sharded_batch._lock_is_stale = judge
+            with open(lock_path) as f:
+                kept = f.read() == fresh
+            os.remove(lock_path)
+            print(f"   - Reprise concurrente: réservation refusée {lost_race}, verrou du gagnant gardé {kept}")
+            
+            # Tranche interrompue: 2 lignes complètes puis une ligne tronquée
+            engine = ConstantEngine()
+            for index in range(manifest['shards']):
+                process_shard(run_dir, index, shard_images(planned, 4, index), engine, batch_size=2)
+            with open(shard_file(run_dir, 1, ".csv"), 'rb') as f:
+                lines = f.read().splitlines(keepends=True)
+            with open(shard_file(run_dir, 1, ".csv"), 'wb') as f:
+                f.write(b"".join(lines[:3]) + lines[3][:10])
+            os.remove(shard_file(run_dir, 1, ".done"))
+            truncated = read_checkpoint(shard_file(run_dir, 1, ".csv")) == planned[4:6]
+            
+            engine = ConstantEngine()
+            stats = process_shard(run_dir, 1, shard_images(planned, 4, 1), engine, batch_size=2)
+            print(f"   - Reprise: {stats['resumed']} images gardées, {engine.images} analysées de nouveau")
+            
+            status = run_status(run_dir)
+            counts = merge_shards(run_dir, os.path.join(tmp_dir, "merged.csv"))
+            with open(os.path.join(tmp_dir, "merged.csv"), newline='', encoding='utf-8') as f:
+                merged = [row['image'] for row in csv.DictReader(f)]
+            print(f"   - Fusion: {counts['images']} résultats, {counts['positives']} positifs")
+        
+        ok = (groups == [[0, 1], [2, 3, 4], [5, 6, 7]] and shared == [[0], [1], [0]] and deterministic
+              and claimed and exclusive and reclaimed and foreign and lost_race and kept and truncated
+              and stats['resumed'] == 2 and engine.images == 2 and status['done'] == 3
+              and merged == planned and counts['positives'] == 10)
+        if ok:
+            print("✅ SUCCÈS: Tranches, reprise et fusion correctes")
+        else:
+            print("❌ ÉCHEC: Analyse répartie incorrecte")
+        return ok
+    except Exception as e:
+        print(f"❌ ÉCHEC: Erreur de l'analyse répartie")
+        print(f"   Erreur: {str(e)}")
+        return False
+
 def run_all_tests():
     """Exécuter tous les tests"""
     print("\n" + "="*60)
@@ -180,7 +1723,76 @@ def run_all_tests():
     # Test 2: Structure des fichiers
     results.append(("Structure des fichiers", test_file_structure()))
     
-    # Test 3: Chargement du modèle
+    # Test 3: Analyse par lots (modèle factice)
+    results.append(("Analyse par lots", test_batch_inference()))
+    
+    # Test 4: Analyses en arrière-plan
+    results.append(("Analyses en arrière-plan", test_analysis_worker()))
+    
+    # Test 5: Moteur d'inférence compilé
+    results.append(("Moteur d'inférence compilé", test_inference_engine()))
+    
+    # Test 6: Export TFLite
+    results.append(("Export TFLite", test_tflite_export()))
+    
+    # Test 7: Décodage unique
+    results.append(("Décodage unique", test_single_decode()))
+    
+    # Test 8: Cache des prédictions
+    results.append(("Cache des prédictions", test_prediction_cache()))
+    
+    # Test 9: Historique des analyses
+    results.append(("Historique des analyses", test_results_store()))
+    
+    # Test 10: Serveur d'inférence HTTP
+    results.append(("Serveur d'inférence HTTP", test_inference_server()))
+    
+    # Test 11: Surveillance de dossiers
+    results.append(("Surveillance de dossiers", test_watch_folder()))
+    
+    # Test 12: Banc de mesure
+    results.append(("Banc de mesure", test_benchmark_compare()))
+    
+    # Test 13: Temps par étape et ressources
+    results.append(("Temps par étape", test_instrumentation()))
+    
+    # Test 14: Cache du dataset d'entraînement
+    results.append(("Cache du dataset", test_dataset_cache()))
+    
+    # Test 15: Pipeline d'entraînement tf.data
+    results.append(("Pipeline d'entraînement", test_training_pipeline()))
+    
+    # Test 16: Augmentation au moment de l'analyse (TTA)
+    results.append(("Analyse renforcée (TTA)", test_tta()))
+    
+    # Test 17: Cartes de saillance Grad-CAM
+    results.append(("Cartes Grad-CAM", test_gradcam()))
+    
+    # Test 18: Analyse en cascade
+    results.append(("Analyse en cascade", test_cascade()))
+    
+    # Test 19: Modèle compact
+    results.append(("Modèle compact", test_compact_model()))
+    
+    # Test 20: Grandes images et fichiers multi-coupes
+    results.append(("Grandes images multi-coupes", test_image_ingest()))
+    
+    # Test 21: Quasi-doublons
+    results.append(("Quasi-doublons", test_near_duplicates()))
+    
+    # Test 22: Registre des modèles
+    results.append(("Registre des modèles", test_model_registry()))
+    
+    # Test 23: Évaluation et calibration
+    results.append(("Évaluation et calibration", test_evaluation()))
+    
+    # Test 24: Galerie d'une étude
+    results.append(("Galerie d'une étude", test_study_gallery()))
+    
+    # Test 25: Analyse répartie en tranches
+    results.append(("Analyse répartie", test_sharded_batch()))
+    
+    # Test 26: Chargement du modèle
     success, model = test_model_loading()
     results.append(("Chargement du modèle", success))
     
@@ -189,10 +1801,10 @@ def run_all_tests():
         print_summary(results)
         return
     
-    # Test 4: Architecture
+    # Test 27: Architecture
     results.append(("Architecture du modèle", test_model_architecture(model)))
     
-    # Test 5: Prétraitement
+    # Test 28: Prétraitement
     success, img = test_image_preprocessing()
     results.append(("Prétraitement d'image", success))
     
@@ -201,7 +1813,7 @@ def run_all_tests():
         print_summary(results)
         return
     
-    # Test 6: Prédiction
+    # Test 29: Prédiction
     results.append(("Prédiction du modèle", test_model_prediction(model, img)))
     
     # Résumé
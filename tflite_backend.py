@@ -0,0 +1,345 @@
+"""
+Brain Tumor Detection - Export TFLite quantifié et moteur CPU
+==============================================================
+Conversion du CNN entraîné (best_brain_tumor_model.keras) en TFLite avec
+quantification post-entraînement, et moteur d'inférence basé sur
+l'interpréteur TFLite multi-threads.
+
+- float16 : poids en float16, modèle ~2× plus petit, précision quasi identique
+- int8    : poids et activations en int8, calibrés sur des IRM prétraitées
+            exactement comme pour l'analyse (niveaux de gris, 224×224, 0-1) ;
+            modèle ~4× plus petit et nettement plus rapide sur CPU
+
+Les entrées/sorties restent en float32 : le moteur TFLite est donc
+interchangeable avec le moteur Keras (même prétraitement, mêmes probabilités).
+
+Usage:
+    # Export float16 + int8, calibration sur le dataset d'entraînement,
+    # puis rapport de concordance sur un jeu de test (sous-dossiers yes/ et no/)
+    python tflite_backend.py export --calibration-dir brain_tumor_dataset --eval-dir test_set
+
+    # Rapport de concordance d'un modèle déjà exporté
+    python tflite_backend.py compare best_brain_tumor_model_int8.tflite --eval-dir test_set
+
+    # Utilisation dans l'application ou le mode batch
+    python brain_tumor_detector_app.py --model best_brain_tumor_model_int8.tflite --threads 4
+    python brain_tumor_detector_app.py batch dossier/ -m best_brain_tumor_model_int8.tflite --threads 4
+"""
+
+import argparse
+import os
+import random
+import sys
+
+import numpy as np
+
+from detector_core import (
+    MODEL_PATH, IMG_SIZE, THRESHOLD,
+    load_detector_model, preprocess_image, to_model_input, collect_labeled_images,
+)
+from inference_engine import (
+    BaseEngine, InferenceEngine, DEFAULT_WARMUP_BATCH_SIZES, measure_latency,
+)
+from decode_pipeline import iter_decoded_batches
+
+QUANTIZATIONS = ('float32', 'float16', 'int8')
+DEFAULT_CALIBRATION_SIZE = 200
+
+
+def get_interpreter_class():
+    """Interpréteur TFLite: LiteRT (ai_edge_litert) si installé, sinon tf.lite"""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+def calibration_dataset(image_paths, calibration_size=DEFAULT_CALIBRATION_SIZE, img_size=IMG_SIZE, seed=42):
+    """
+    Jeu de calibration pour la quantification int8
+
+    Les images passent par le même prétraitement que l'analyse
+    (detector_core.preprocess_image, donc image_ingest.decode_reduced pour
+    les grandes images et les fichiers multi-coupes).
+
+    Args:
+        image_paths: images candidates (typiquement le dataset d'entraînement)
+        calibration_size: nombre d'images tirées au hasard
+        img_size: taille d'entrée du modèle
+        seed: graine du tirage (reproductibilité)
+
+    Returns:
+        fonction génératrice attendue par TFLiteConverter.representative_dataset
+    """
+    paths = list(image_paths)
+    random.Random(seed).shuffle(paths)
+    paths = paths[:calibration_size]
+
+    def representative_dataset():
+        for path in paths:
+            try:
+                yield [preprocess_image(path, img_size)]
+            except ValueError:
+                continue
+
+    return representative_dataset
+
+
+def convert_model(model, quantization='int8', calibration_paths=None,
+                  calibration_size=DEFAULT_CALIBRATION_SIZE):
+    """
+    Convertit un modèle Keras en TFLite
+
+    Args:
+        model: modèle Keras chargé
+        quantization: 'float32' (sans quantification), 'float16' ou 'int8'
+        calibration_paths: images de calibration (obligatoire pour int8)
+        calibration_size: nombre d'images de calibration
+
+    Returns:
+        contenu du fichier .tflite (bytes)
+    """
+    import tensorflow as tf
+
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Quantification inconnue: {quantization} (choix: {', '.join(QUANTIZATIONS)})")
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+
+    if quantization == 'float16':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == 'int8':
+        if not calibration_paths:
+            raise ValueError("La quantification int8 nécessite des images de calibration")
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = calibration_dataset(calibration_paths, calibration_size)
+
+    return converter.convert()
+
+
+def export_tflite(model, output_path, quantization='int8', calibration_paths=None,
+                  calibration_size=DEFAULT_CALIBRATION_SIZE):
+    """
+    Convertit un modèle Keras et écrit le fichier .tflite
+
+    Returns:
+        taille du fichier en octets
+    """
+    tflite_model = convert_model(model, quantization, calibration_paths, calibration_size)
+    with open(output_path, 'wb') as f:
+        f.write(tflite_model)
+    return len(tflite_model)
+
+
+class TFLiteEngine(BaseEngine):
+    """
+    Moteur d'inférence TFLite (même interface que InferenceEngine)
+
+    Args:
+        tflite_path: fichier .tflite
+        num_threads: threads de l'interpréteur (None = nombre de cœurs)
+        img_size: taille d'entrée du modèle
+        warmup_batch_sizes: tailles de lot préchauffées dès la création
+    """
+
+    def __init__(self, tflite_path, num_threads=None, img_size=IMG_SIZE,
+                 warmup_batch_sizes=DEFAULT_WARMUP_BATCH_SIZES):
+        if not os.path.exists(tflite_path):
+            raise FileNotFoundError(f"Le fichier modèle '{tflite_path}' n'a pas été trouvé.")
+
+        self.model_path = tflite_path
+        self.img_size = img_size
+        self.num_threads = num_threads or os.cpu_count() or 1
+
+        Interpreter = get_interpreter_class()
+        self.interpreter = Interpreter(model_path=tflite_path, num_threads=self.num_threads)
+        self._input_index = self.interpreter.get_input_details()[0]['index']
+        self._output_index = self.interpreter.get_output_details()[0]['index']
+        self._batch_size = None
+
+        self.warmup_time = self.warmup(warmup_batch_sizes)
+
+    def predict_on_batch(self, images):
+        """
+        Prédit un lot avec l'interpréteur TFLite
+
+        Args:
+            images: tableau float32 (N, img_size, img_size, 1)
+
+        Returns:
+            tableau (N, 1) des probabilités
+        """
+        images = np.ascontiguousarray(images, dtype=np.float32)
+
+        # Redimensionner l'entrée uniquement si la taille du lot change
+        if len(images) != self._batch_size:
+            self.interpreter.resize_tensor_input(self._input_index, list(images.shape))
+            self.interpreter.allocate_tensors()
+            self._batch_size = len(images)
+
+        self.interpreter.set_tensor(self._input_index, images)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self._output_index).copy()
+
+
+def predict_dataset(engine, image_paths, batch_size=32):
+    """Probabilités d'un moteur pour une liste d'images (NaN si illisible)"""
+    probabilities = np.full(len(image_paths), np.nan, dtype=np.float64)
+    offset = 0
+
+    for batch in iter_decoded_batches(image_paths, batch_size):
+        if batch.valid:
+            predictions = engine.predict(to_model_input(batch.valid_images()))
+            probabilities[[offset + i for i in batch.valid]] = predictions
+        offset += len(batch.paths)
+
+    return probabilities
+
+
+def agreement_report(reference, candidates, image_paths, labels=None, batch_size=32, latency_runs=50):
+    """
+    Compare des moteurs TFLite au modèle Keras de référence
+
+    Args:
+        reference: moteur de référence (InferenceEngine)
+        candidates: dictionnaire {nom: moteur} à comparer
+        image_paths: images du jeu de test
+        labels: étiquettes (0/1) optionnelles pour l'accuracy et le recall
+        batch_size: taille des lots de prédiction
+        latency_runs: nombre de mesures de latence (lot de 1)
+
+    Returns:
+        dictionnaire {nom: métriques}
+    """
+    engines = {'keras': reference, **candidates}
+    predictions = {name: predict_dataset(engine, image_paths, batch_size) for name, engine in engines.items()}
+    valid = ~np.isnan(predictions['keras'])
+    reference_decision = predictions['keras'][valid] > THRESHOLD
+    sample = np.random.rand(1, IMG_SIZE, IMG_SIZE, 1).astype(np.float32)
+
+    report = {}
+    for name, engine in engines.items():
+        probabilities = predictions[name][valid]
+        decision = probabilities > THRESHOLD
+        metrics = {
+            'max_abs_diff': float(np.abs(probabilities - predictions['keras'][valid]).max(initial=0.0)),
+            'mean_abs_diff': float(np.abs(probabilities - predictions['keras'][valid]).mean()) if valid.any() else 0.0,
+            'agreement': float((decision == reference_decision).mean()) if valid.any() else 1.0,
+            'latency_p50_ms': measure_latency(engine.predict_on_batch, sample, latency_runs)['p50'],
+        }
+        if labels is not None:
+            y_true = np.asarray(labels)[valid] == 1
+            metrics['accuracy'] = float((decision == y_true).mean()) if valid.any() else 0.0
+            metrics['recall'] = float(decision[y_true].mean()) if y_true.any() else 0.0
+        report[name] = metrics
+
+    return report
+
+
+def print_report(report, sizes=None):
+    """Affiche le rapport de concordance sous forme de tableau"""
+    sizes = sizes or {}
+    has_labels = any('accuracy' in metrics for metrics in report.values())
+
+    header = f"   {'Modèle':10} {'Taille':>9} {'p50 (1)':>9} {'Écart max':>10} {'Écart moy':>10} {'Accord':>8}"
+    if has_labels:
+        header += f" {'Accuracy':>9} {'Recall':>8}"
+    print("\n📊 CONCORDANCE AVEC LE MODÈLE KERAS")
+    print(header)
+
+    for name, metrics in report.items():
+        size = f"{sizes[name] / (1024 * 1024):.1f} MB" if name in sizes else "-"
+        line = (f"   {name:10} {size:>9} {metrics['latency_p50_ms']:>7.1f}ms"
+                f" {metrics['max_abs_diff']:>10.4f} {metrics['mean_abs_diff']:>10.4f}"
+                f" {metrics['agreement'] * 100:>7.1f}%")
+        if has_labels:
+            line += f" {metrics['accuracy'] * 100:>8.1f}% {metrics['recall'] * 100:>7.1f}%"
+        print(line)
+
+
+def load_eval_set(eval_dir):
+    """Jeu de test: dossier yes/no étiqueté, ou dossier d'images sans étiquettes"""
+    paths, labels = collect_labeled_images(eval_dir)
+    if paths:
+        return paths, labels
+
+    from batch_inference import collect_image_paths
+    return collect_image_paths([eval_dir], recursive=True), None
+
+
+def export_main(args):
+    """Sous-commande export"""
+    model = load_detector_model(args.model)
+    calibration_paths = None
+    if 'int8' in args.quantization:
+        if not args.calibration_dir:
+            print("❌ --calibration-dir est obligatoire pour la quantification int8")
+            return 1
+        from batch_inference import collect_image_paths
+        calibration_paths = collect_image_paths([args.calibration_dir], recursive=True)
+
+    base_name = os.path.splitext(os.path.basename(args.model))[0]
+    exported = {}
+    sizes = {'keras': os.path.getsize(args.model)}
+
+    for quantization in args.quantization:
+        output_path = os.path.join(args.output_dir, f"{base_name}_{quantization}.tflite")
+        sizes[quantization] = export_tflite(model, output_path, quantization, calibration_paths,
+                                            args.calibration_size)
+        exported[quantization] = output_path
+        print(f"✓ {quantization:8} → {output_path} ({sizes[quantization] / (1024 * 1024):.1f} MB)")
+
+    if args.eval_dir:
+        image_paths, labels = load_eval_set(args.eval_dir)
+        reference = InferenceEngine(model)
+        candidates = {q: TFLiteEngine(path, num_threads=args.threads) for q, path in exported.items()}
+        print_report(agreement_report(reference, candidates, image_paths, labels), sizes)
+
+    return 0
+
+
+def compare_main(args):
+    """Sous-commande compare"""
+    image_paths, labels = load_eval_set(args.eval_dir)
+    reference = InferenceEngine(load_detector_model(args.model))
+    candidates = {os.path.basename(path): TFLiteEngine(path, num_threads=args.threads) for path in args.tflite}
+    sizes = {'keras': os.path.getsize(args.model)}
+    sizes.update({os.path.basename(path): os.path.getsize(path) for path in args.tflite})
+    print_report(agreement_report(reference, candidates, image_paths, labels), sizes)
+    return 0
+
+
+def main(argv=None):
+    """Point d'entrée: export et rapport de concordance TFLite"""
+    parser = argparse.ArgumentParser(description="Export TFLite quantifié du détecteur de tumeurs")
+    parser.add_argument('-m', '--model', default=MODEL_PATH, help=f"Modèle Keras (défaut: {MODEL_PATH})")
+    parser.add_argument('-t', '--threads', type=int, default=None,
+                        help="Threads de l'interpréteur TFLite (défaut: nombre de cœurs)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help="Convertir le modèle Keras en TFLite")
+    export_parser.add_argument('-q', '--quantization', nargs='+', choices=QUANTIZATIONS,
+                               default=['float16', 'int8'], help="Quantifications (défaut: float16 int8)")
+    export_parser.add_argument('-c', '--calibration-dir',
+                               help="Images de calibration int8 (ex: brain_tumor_dataset)")
+    export_parser.add_argument('--calibration-size', type=int, default=DEFAULT_CALIBRATION_SIZE,
+                               help=f"Nombre d'images de calibration (défaut: {DEFAULT_CALIBRATION_SIZE})")
+    export_parser.add_argument('-o', '--output-dir', default='.', help="Dossier de sortie (défaut: .)")
+    export_parser.add_argument('-e', '--eval-dir', help="Jeu de test pour le rapport de concordance")
+
+    compare_parser = subparsers.add_parser('compare', help="Comparer des modèles TFLite au modèle Keras")
+    compare_parser.add_argument('tflite', nargs='+', help="Fichiers .tflite à comparer")
+    compare_parser.add_argument('-e', '--eval-dir', required=True,
+                                help="Jeu de test (sous-dossiers yes/ et no/ pour l'accuracy)")
+
+    args = parser.parse_args(argv)
+    if args.command == 'export':
+        return export_main(args)
+    return compare_main(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+"""
+Brain Tumor Detection - Pipeline d'entraînement tf.data
+========================================================
+Remplace `ImageDataGenerator(...).flow(X_train, y_train)` du notebook par
+un flux `tf.data` :
+
+- lecture depuis le cache pré-décodé (dataset_cache.py, memory-mapping) ou
+  directement depuis les fichiers (décodage OpenCV, comme l'application) ;
+- augmentation par lots dans le graphe TensorFlow, en parallèle
+  (num_parallel_calls) : rotation, décalage, cisaillement, zoom et
+  retournement horizontal, avec la même sémantique que ImageDataGenerator
+  (mêmes tirages aléatoires, même transformation affine centrée,
+  interpolation bilinéaire, remplissage 'nearest') ;
+- préchargement des lots suivants pendant l'entraînement (prefetch) et
+  cache optionnel des images décodées (en mémoire ou sur disque) ;
+- les images restent en uint8 jusqu'au lot : seul le lot courant existe en
+  float32, le dataset peut donc dépasser la mémoire disponible.
+
+Usage (notebook):
+    from dataset_cache import DatasetCache
+    from training_pipeline import dataset_from_cache
+
+    cache = DatasetCache()
+    cache.update('brain_tumor_dataset')
+    splits = cache.split(test_split=0.1, validation_split=0.2)
+    train_ds = dataset_from_cache(cache, splits['train'], batch_size=16, training=True)
+    val_ds = dataset_from_cache(cache, splits['val'], batch_size=16)
+    model.fit(train_ds, validation_data=val_ds, epochs=50)
+"""
+
+import math
+
+import numpy as np
+import tensorflow as tf
+
+from detector_core import IMG_SIZE, load_grayscale, resize_for_model
+
+DEFAULT_BATCH_SIZE = 16
+
+# Augmentation du notebook (mêmes noms et valeurs que ImageDataGenerator)
+NOTEBOOK_AUGMENTATION = {
+    'rotation_range': 15,           # Rotation aléatoire jusqu'à 15°
+    'width_shift_range': 0.1,       # Décalage horizontal (fraction de la largeur)
+    'height_shift_range': 0.1,      # Décalage vertical (fraction de la hauteur)
+    'shear_range': 0.1,             # Cisaillement (en degrés, comme Keras)
+    'zoom_range': 0.1,              # Zoom aléatoire [0.9, 1.1] indépendant par axe
+    'horizontal_flip': True,        # Retournement horizontal
+}
+
+
+def affine_transforms(rotation, shift_rows, shift_cols, shear, zoom_rows, zoom_cols, img_size=IMG_SIZE):
+    """
+    Transformations affines centrées, au format de ImageProjectiveTransformV3
+
+    Même composition que `apply_affine_transform` de Keras :
+    rotation · décalage · cisaillement · zoom, autour du centre de l'image,
+    exprimée de l'image produite vers l'image source.
+
+    Args:
+        rotation, shear: angles en degrés, tenseurs (N,)
+        shift_rows, shift_cols: décalages en pixels, tenseurs (N,)
+        zoom_rows, zoom_cols: facteurs de zoom, tenseurs (N,)
+        img_size: taille des images (carrées)
+
+    Returns:
+        tenseur float32 (N, 8)
+    """
+    theta = rotation * (math.pi / 180)
+    shear = shear * (math.pi / 180)
+    cos, sin = tf.cos(theta), tf.sin(theta)
+    shear_sin, shear_cos = tf.sin(shear), tf.cos(shear)
+
+    # Matrice (ligne, colonne) = R · [I | t] · Cisaillement · Zoom
+    t00 = cos * zoom_rows
+    t01 = (-cos * shear_sin - sin * shear_cos) * zoom_cols
+    t10 = sin * zoom_rows
+    t11 = (-sin * shear_sin + cos * shear_cos) * zoom_cols
+    t02 = cos * shift_rows - sin * shift_cols
+    t12 = sin * shift_rows + cos * shift_cols
+
+    # Centrage (centre des pixels aux coordonnées entières)
+    center = (img_size - 1) / 2
+    t02 = t02 + center - t00 * center - t01 * center
+    t12 = t12 + center - t10 * center - t11 * center
+
+    # ImageProjectiveTransformV3 travaille en (x = colonne, y = ligne)
+    zeros = tf.zeros_like(t00)
+    return tf.stack([t11, t10, t12, t01, t00, t02, zeros, zeros], axis=1)
+
+
+def random_parameters(batch, augmentation=NOTEBOOK_AUGMENTATION, img_size=IMG_SIZE, seed=None):
+    """
+    Tire les paramètres de l'augmentation de chaque image d'un lot
+
+    Chaque paramètre a sa propre graine : avec une graine commune, les
+    tirages seraient identiques (rotation, décalages, cisaillement, zoom et
+    retournement parfaitement corrélés), alors qu'ImageDataGenerator tire
+    chaque paramètre indépendamment. Les tirages restent différents d'un
+    lot à l'autre (opérations aléatoires avec état).
+
+    Args:
+        batch: nombre d'images (entier ou tenseur scalaire)
+        augmentation: paramètres au format ImageDataGenerator
+        img_size: taille des images (décalages en pixels)
+        seed: graine des tirages (None: aléatoire)
+
+    Returns:
+        dictionnaire de tenseurs (N,): rotation, shift_rows, shift_cols,
+        shear, zoom_rows, zoom_cols (arguments de affine_transforms) et flip (booléens)
+    """
+    def uniform(low, high, k):
+        return tf.random.uniform([batch], low, high, seed=None if seed is None else seed * 8 + k)
+
+    rotation = augmentation.get('rotation_range', 0)
+    height_shift = augmentation.get('height_shift_range', 0) * img_size
+    width_shift = augmentation.get('width_shift_range', 0) * img_size
+    shear = augmentation.get('shear_range', 0)
+    zoom = augmentation.get('zoom_range', 0)
+
+    return {
+        'rotation': uniform(-rotation, rotation, 0) if rotation else tf.zeros([batch]),
+        'shift_rows': uniform(-height_shift, height_shift, 1) if height_shift else tf.zeros([batch]),
+        'shift_cols': uniform(-width_shift, width_shift, 2) if width_shift else tf.zeros([batch]),
+        'shear': uniform(-shear, shear, 3) if shear else tf.zeros([batch]),
+        'zoom_rows': uniform(1 - zoom, 1 + zoom, 4) if zoom else tf.ones([batch]),
+        'zoom_cols': uniform(1 - zoom, 1 + zoom, 5) if zoom else tf.ones([batch]),
+        'flip': (uniform(0, 1, 6) < 0.5) if augmentation.get('horizontal_flip') else tf.zeros([batch], tf.bool),
+    }
+
+
+def random_augmentation(images, augmentation=NOTEBOOK_AUGMENTATION, seed=None):
+    """
+    Applique une augmentation aléatoire indépendante à chaque image d'un lot
+
+    Args:
+        images: tenseur float32 (N, img_size, img_size, 1)
+        augmentation: paramètres au format ImageDataGenerator
+        seed: graine des tirages (None: aléatoire)
+
+    Returns:
+        tenseur float32 (N, img_size, img_size, 1)
+    """
+    img_size = images.shape[1] or IMG_SIZE
+    params = random_parameters(tf.shape(images)[0], augmentation, img_size, seed)
+
+    transforms = affine_transforms(
+        params['rotation'], params['shift_rows'], params['shift_cols'], params['shear'],
+        params['zoom_rows'], params['zoom_cols'], img_size,
+    )
+    images = tf.raw_ops.ImageProjectiveTransformV3(
+        images=images, transforms=transforms, output_shape=tf.shape(images)[1:3],
+        fill_value=0.0, interpolation='BILINEAR', fill_mode='NEAREST',
+    )
+
+    if augmentation.get('horizontal_flip'):
+        images = tf.where(params['flip'][:, None, None, None], tf.reverse(images, axis=[2]), images)
+    return images
+
+
+def _to_model_batch(images, labels, img_size):
+    """Lot uint8 (N, img_size, img_size) → float32 (N, img_size, img_size, 1) entre 0 et 1"""
+    images = tf.reshape(tf.cast(images, tf.float32) / 255.0, [-1, img_size, img_size, 1])
+    return images, tf.reshape(tf.cast(labels, tf.float32), [-1])
+
+
+def _finish(dataset, training, augmentation, img_size, seed):
+    """Normalisation, augmentation (entraînement) et préchargement des lots"""
+    dataset = dataset.map(lambda images, labels: _to_model_batch(images, labels, img_size),
+                          num_parallel_calls=tf.data.AUTOTUNE)
+    if training and augmentation:
+        dataset = dataset.map(lambda images, labels: (random_augmentation(images, augmentation, seed), labels),
+                              num_parallel_calls=tf.data.AUTOTUNE)
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def dataset_from_cache(cache, indices=None, batch_size=DEFAULT_BATCH_SIZE, training=False,
+                       augmentation=NOTEBOOK_AUGMENTATION, seed=None):
+    """
+    Flux de lots lus dans le cache pré-décodé (DatasetCache)
+
+    Les lots sont extraits du fichier memory-mappé au moment de leur
+    utilisation : seuls les lots en cours de préparation sont en mémoire.
+
+    Args:
+        cache: DatasetCache à jour
+        indices: indices des images (défaut: toutes), par ex. cache.split()['train']
+        batch_size: images par lot
+        training: mélanger à chaque epoch et appliquer l'augmentation
+        augmentation: paramètres au format ImageDataGenerator (None: aucune)
+        seed: graine du mélange et de l'augmentation (None: aléatoire)
+
+    Returns:
+        tf.data.Dataset de (images float32 (N, s, s, 1), étiquettes float32 (N,))
+    """
+    images, labels = cache.load()
+    if indices is None:
+        indices = np.arange(len(labels))
+    img_size = cache.img_size
+
+    def gather(batch_indices):
+        # Lecture dans l'ordre du fichier (l'ordre à l'intérieur d'un lot est sans importance)
+        batch_indices = np.sort(batch_indices)
+        return images[batch_indices], labels[batch_indices]
+
+    dataset = tf.data.Dataset.from_tensor_slices(np.asarray(indices, dtype=np.int64))
+    if training:
+        dataset = dataset.shuffle(len(indices), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size)
+    dataset = dataset.map(
+        lambda batch_indices: tf.numpy_function(gather, [batch_indices], [tf.uint8, tf.int64]),
+        num_parallel_calls=tf.data.AUTOTUNE,
+    )
+    return _finish(dataset, training, augmentation, img_size, seed)
+
+
+def dataset_from_files(image_paths, labels, batch_size=DEFAULT_BATCH_SIZE, training=False,
+                       augmentation=NOTEBOOK_AUGMENTATION, cache=None, shuffle_buffer=1024,
+                       img_size=IMG_SIZE, seed=None):
+    """
+    Flux de lots décodés depuis les fichiers images
+
+    Le décodage (OpenCV, niveaux de gris, redimensionnement) est identique à
+    celui de l'application et se fait en parallèle.
+
+    Args:
+        image_paths: chemins des images
+        labels: étiquettes (1 = tumeur)
+        batch_size: images par lot
+        training: mélanger à chaque epoch et appliquer l'augmentation
+        augmentation: paramètres au format ImageDataGenerator (None: aucune)
+        cache: None (pas de cache), "" (images décodées gardées en mémoire)
+               ou chemin d'un fichier de cache tf.data sur disque
+        shuffle_buffer: taille du tampon de mélange lorsque le cache est utilisé
+        img_size: taille d'entrée du modèle
+        seed: graine du mélange et de l'augmentation (None: aléatoire)
+
+    Returns:
+        tf.data.Dataset de (images float32 (N, s, s, 1), étiquettes float32 (N,))
+    """
+    def decode(path):
+        return resize_for_model(load_grayscale(path.decode()), img_size)
+
+    def decode_element(path, label):
+        image = tf.numpy_function(decode, [path], tf.uint8)
+        return tf.ensure_shape(image, [img_size, img_size]), label
+
+    dataset = tf.data.Dataset.from_tensor_slices((list(image_paths), np.asarray(labels, dtype=np.int64)))
+    if cache is None:
+        # Mélange des chemins (peu coûteux) avant décodage: aucune image en attente en mémoire
+        if training:
+            dataset = dataset.shuffle(len(image_paths), seed=seed, reshuffle_each_iteration=True)
+        dataset = dataset.map(decode_element, num_parallel_calls=tf.data.AUTOTUNE)
+    else:
+        dataset = dataset.map(decode_element, num_parallel_calls=tf.data.AUTOTUNE).cache(cache)
+        if training:
+            dataset = dataset.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+
+    return _finish(dataset.batch(batch_size), training, augmentation, img_size, seed)
@@ -0,0 +1,106 @@
+"""
+Brain Tumor Detection - Augmentation au moment de l'analyse (TTA)
+==================================================================
+Analyse chaque IRM sous plusieurs vues légèrement transformées (retournement,
+petites rotations et translations, dans les plages de l'augmentation
+d'entraînement du notebook) et renvoie la probabilité moyenne et sa variance.
+
+- Les vues d'une image (et de tout un lot d'images) sont empilées en un seul
+  lot : un seul appel au modèle au lieu de N, le surcoût reste donc bien
+  inférieur à N analyses successives ;
+- les vues sont déterministes : une même image donne toujours le même
+  résultat ;
+- une variance élevée signale une prédiction instable (typiquement proche
+  du seuil de 50 %), à confirmer par un spécialiste.
+
+Usage:
+    python brain_tumor_detector_app.py --tta 8
+    python brain_tumor_detector_app.py batch dossier_irm/ --tta 8
+"""
+
+import cv2
+import numpy as np
+
+from detector_core import to_model_input
+
+DEFAULT_TTA_VIEWS = 8
+
+# Origine d'un résultat moyenné sur plusieurs vues (CSV, historique, interface)
+SOURCE_TTA = "tta"
+
+# Vues (retournement horizontal, rotation en degrés, décalage vertical et
+# horizontal en fraction de la taille), dans les plages de l'entraînement
+# (rotation ±15°, décalages ±10 %). La première vue est l'image d'origine.
+TTA_VIEWS = [
+    (False, 0, 0.0, 0.0),
+    (True, 0, 0.0, 0.0),
+    (False, 8, 0.0, 0.0),
+    (False, -8, 0.0, 0.0),
+    (True, 8, 0.0, 0.0),
+    (True, -8, 0.0, 0.0),
+    (False, 0, 0.05, 0.05),
+    (False, 0, -0.05, -0.05),
+    (True, 0, 0.05, -0.05),
+    (True, 0, -0.05, 0.05),
+    (False, 12, -0.03, 0.03),
+    (True, -12, 0.03, -0.03),
+]
+MAX_TTA_VIEWS = len(TTA_VIEWS)
+
+
+def augmented_views(image, n_views=DEFAULT_TTA_VIEWS):
+    """
+    Vues transformées d'une image prétraitée
+
+    Args:
+        image: image uint8 (img_size, img_size) déjà redimensionnée
+        n_views: nombre de vues (1 à MAX_TTA_VIEWS)
+
+    Returns:
+        tableau uint8 (n_views, img_size, img_size)
+    """
+    height, width = image.shape[:2]
+    center = ((width - 1) / 2, (height - 1) / 2)
+    views = np.empty((n_views, height, width), dtype=np.uint8)
+
+    for i, (flip, angle, shift_rows, shift_cols) in enumerate(TTA_VIEWS[:n_views]):
+        view = image[:, ::-1] if flip else image
+        if angle or shift_rows or shift_cols:
+            matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
+            matrix[0, 2] += shift_cols * width
+            matrix[1, 2] += shift_rows * height
+            # Remplissage des bords par le pixel le plus proche (fill_mode='nearest')
+            view = cv2.warpAffine(np.ascontiguousarray(view), matrix, (width, height),
+                                  flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+        views[i] = view
+    return views
+
+
+def predict_tta(model, images, n_views=DEFAULT_TTA_VIEWS, max_batch_size=None):
+    """
+    Prédit des images en moyennant les prédictions de leurs vues
+
+    Args:
+        model: moteur d'inférence (predict_on_batch)
+        images: images uint8 (N, img_size, img_size) déjà redimensionnées
+        n_views: nombre de vues par image
+        max_batch_size: nombre maximal de vues par appel au modèle
+            (None = toutes les vues de toutes les images en un seul appel)
+
+    Returns:
+        (probabilités moyennes (N,), variances (N,))
+    """
+    if not 1 <= n_views <= MAX_TTA_VIEWS:
+        raise ValueError(f"Nombre de vues TTA invalide: {n_views} (1 à {MAX_TTA_VIEWS})")
+
+    images = np.asarray(images)
+    views = np.concatenate([augmented_views(image, n_views) for image in images])
+    inputs = to_model_input(views)
+
+    step = max_batch_size or len(inputs)
+    predictions = np.concatenate([
+        np.asarray(model.predict_on_batch(inputs[start:start + step])).reshape(-1)
+        for start in range(0, len(inputs), step)
+    ]).reshape(len(images), n_views)
+
+    return predictions.mean(axis=1), predictions.var(axis=1)
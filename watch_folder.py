@@ -0,0 +1,392 @@
+"""
+Brain Tumor Detection - Surveillance de dossiers (mode continu)
+================================================================
+Surveille un ou plusieurs dossiers (exports du scanner) et analyse
+automatiquement les nouvelles IRM, sans passer par le dialogue d'ouverture.
+
+- Scrutation périodique légère (os.scandir) des extensions acceptées par
+  l'application (.png, .jpg, .jpeg, .bmp, .tif, .tiff) ;
+- un fichier n'est analysé qu'une fois complètement écrit : même taille et
+  même date de modification sur deux scrutations, et aucune modification
+  depuis `settle` secondes ;
+- les fichiers prêts sont analysés par lots (pipeline de analyse par lots,
+  cache des prédictions et historique compris) et les résultats sont ajoutés
+  au CSV au fur et à mesure ;
+- un point de reprise (SQLite) mémorise les fichiers traités : après un
+  redémarrage, seuls les nouveaux fichiers (ou les fichiers remplacés) sont
+  analysés ;
+- avec --registry, le modèle suit la sélection active du registre
+  (model_registry.py) : la nouvelle version est chargée en arrière-plan
+  pendant l'analyse, puis remplace l'ancienne entre deux lots.
+
+Usage:
+    python brain_tumor_detector_app.py watch /partage/scanner -o watch_results.csv
+    python brain_tumor_detector_app.py watch dossier1/ dossier2/ -r --interval 5
+    python brain_tumor_detector_app.py watch /partage/scanner --registry model_registry.json
+"""
+
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+import time
+
+from detector_core import MODEL_PATH, IMAGE_EXTENSIONS
+from inference_engine import load_engine
+from batch_inference import DEFAULT_BATCH_SIZE, RESULT_FIELDS, run_batch
+from tta_inference import MAX_TTA_VIEWS
+from cascade import cascade_policy_error, load_cascade_engine
+from prediction_cache import PredictionCache, DEFAULT_CACHE_PATH
+from perceptual_index import DEFAULT_MAX_DISTANCE, load_hash_index
+from model_registry import HotSwapEngine, ModelRegistry
+from model_metadata import load_policy
+from results_store import ResultsStore, DEFAULT_RESULTS_DB, model_version
+from instrumentation import TRACER, print_summary
+
+DEFAULT_WATCH_OUTPUT = "watch_results.csv"
+DEFAULT_CHECKPOINT = "watch_checkpoint.sqlite"
+DEFAULT_INTERVAL = 2.0
+DEFAULT_SETTLE = 2.0
+
+
+def scan_images(directories, recursive=False):
+    """
+    Liste les images présentes dans les dossiers surveillés
+
+    Returns:
+        dictionnaire {chemin: (taille, date de modification en ns)}
+    """
+    found = {}
+    pending_dirs = list(directories)
+
+    while pending_dirs:
+        directory = pending_dirs.pop()
+        try:
+            entries = os.scandir(directory)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            pending_dirs.append(entry.path)
+                    elif entry.name.lower().endswith(IMAGE_EXTENSIONS) and entry.is_file():
+                        stat = entry.stat()
+                        found[entry.path] = (stat.st_size, stat.st_mtime_ns)
+                except OSError:
+                    # Fichier supprimé ou déplacé pendant la scrutation
+                    continue
+
+    return found
+
+
+class WatchCheckpoint:
+    """
+    Point de reprise: fichiers déjà traités (chemin, taille, date de modification)
+
+    Args:
+        checkpoint_path: fichier SQLite
+    """
+
+    def __init__(self, checkpoint_path=DEFAULT_CHECKPOINT):
+        self._conn = sqlite3.connect(checkpoint_path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS processed ("
+            " path TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " processed_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._processed = {
+            path: (size, mtime_ns)
+            for path, size, mtime_ns in self._conn.execute("SELECT path, size, mtime_ns FROM processed")
+        }
+
+    def is_processed(self, path, signature):
+        """Vrai si ce fichier (dans cette version) a déjà été traité"""
+        return self._processed.get(path) == signature
+
+    def mark_processed(self, items):
+        """
+        Enregistre des fichiers traités (une transaction)
+
+        Args:
+            items: dictionnaire {chemin: (taille, date de modification en ns)}
+        """
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO processed (path, size, mtime_ns, processed_at) VALUES (?, ?, ?, ?)",
+                [(path, size, mtime_ns, now) for path, (size, mtime_ns) in items.items()],
+            )
+        self._processed.update(items)
+
+    def __len__(self):
+        return len(self._processed)
+
+    def close(self):
+        self._conn.close()
+
+
+class FolderWatcher:
+    """
+    Détecte les nouvelles images complètement écrites dans des dossiers
+
+    Args:
+        directories: dossiers surveillés
+        checkpoint: WatchCheckpoint des fichiers déjà traités
+        recursive: surveiller aussi les sous-dossiers
+        settle: délai (s) sans modification avant qu'un fichier soit considéré complet
+    """
+
+    def __init__(self, directories, checkpoint, recursive=False, settle=DEFAULT_SETTLE):
+        self.directories = directories
+        self.checkpoint = checkpoint
+        self.recursive = recursive
+        self.settle = settle
+        self._previous = {}
+
+    def poll(self):
+        """
+        Scrute les dossiers une fois
+
+        Returns:
+            dictionnaire {chemin: signature} des fichiers prêts à analyser, triés par chemin
+        """
+        current = scan_images(self.directories, self.recursive)
+        now_ns = time.time_ns()
+        settle_ns = int(self.settle * 1e9)
+
+        ready = {}
+        for path in sorted(current):
+            signature = current[path]
+            if self.checkpoint.is_processed(path, signature):
+                continue
+            # Fichier stable entre deux scrutations et plus modifié depuis `settle`
+            if self._previous.get(path) == signature and now_ns - signature[1] >= settle_ns:
+                ready[path] = signature
+
+        self._previous = current
+        return ready
+
+
+def append_results(output_path, results):
+    """Ajoute des lignes au CSV de résultats (en-tête écrit à la création)"""
+    new_file = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+    with open(output_path, 'a', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        if new_file:
+            writer.writeheader()
+        writer.writerows(results)
+
+
+def process_ready(ready, model, checkpoint, output_path, batch_size=DEFAULT_BATCH_SIZE,
+                  cache=None, store=None, version=None, tta_views=0, near_index=None, policy=None):
+    """
+    Analyse les fichiers prêts, écrit les résultats puis met à jour le point de reprise
+
+    policy: DecisionPolicy du modèle (seuil et calibration, model_metadata)
+
+    Les résultats sont écrits avant le point de reprise : un arrêt brutal
+    entre les deux fait ré-analyser le lot au redémarrage (jamais de perte).
+
+    Returns:
+        liste des résultats
+    """
+    paths = list(ready)
+    all_results = []
+
+    for start in range(0, len(paths), batch_size):
+        chunk = paths[start:start + batch_size]
+        results = run_batch(chunk, model, batch_size, cache=cache, store=store, model_version=version,
+                            tta_views=tta_views, near_index=near_index, policy=policy)
+        if store is not None:
+            store.flush()
+        append_results(output_path, results)
+        checkpoint.mark_processed({path: ready[path] for path in chunk})
+        all_results.extend(results)
+
+    return all_results
+
+
+def parse_args(argv=None):
+    """Arguments de la ligne de commande du mode surveillance"""
+    parser = argparse.ArgumentParser(
+        prog="brain_tumor_detector_app.py watch",
+        description="Analyse en continu des nouvelles IRM déposées dans des dossiers"
+    )
+    parser.add_argument('directories', nargs='+', help="Dossiers à surveiller")
+    parser.add_argument('-o', '--output', default=DEFAULT_WATCH_OUTPUT,
+                        help=f"Fichier CSV de résultats, complété au fil de l'eau (défaut: {DEFAULT_WATCH_OUTPUT})")
+    parser.add_argument('-c', '--checkpoint', default=DEFAULT_CHECKPOINT,
+                        help=f"Point de reprise des fichiers traités (défaut: {DEFAULT_CHECKPOINT})")
+    parser.add_argument('-m', '--model', default=MODEL_PATH,
+                        help=f"Chemin du modèle .keras ou .tflite (défaut: {MODEL_PATH})")
+    parser.add_argument('--registry', default=None, metavar='REGISTRE',
+                        help="Suivre la sélection active du registre des modèles (model_registry.py) "
+                             "à la place de --model : nouvelle version chargée sans interruption")
+    parser.add_argument('-t', '--threads', type=int, default=None,
+                        help="Threads de l'interpréteur TFLite (défaut: nombre de cœurs)")
+    parser.add_argument('-b', '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Nombre d'images par lot (défaut: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument('-r', '--recursive', action='store_true', help="Surveiller aussi les sous-dossiers")
+    parser.add_argument('-i', '--interval', type=float, default=DEFAULT_INTERVAL,
+                        help=f"Intervalle de scrutation en secondes (défaut: {DEFAULT_INTERVAL})")
+    parser.add_argument('-s', '--settle', type=float, default=DEFAULT_SETTLE,
+                        help=f"Délai sans modification avant analyse d'un fichier (défaut: {DEFAULT_SETTLE}s)")
+    parser.add_argument('--tta', type=int, default=0, metavar='N',
+                        help=f"Moyenner N vues augmentées par image, 2 à {MAX_TTA_VIEWS} (sans cache)")
+    parser.add_argument('--cascade', default=None, metavar='MODELE_DE_TRI',
+                        help="Trier d'abord avec un modèle basse résolution (cascade.py), "
+                             "le modèle complet n'analyse que les cas incertains")
+    parser.add_argument('--near-duplicates', type=int, default=None, metavar='BITS',
+                        help="Reprendre le résultat des quasi-doublons d'images déjà analysées: empreintes "
+                             f"perceptuelles à au plus BITS bits sur 64 (valeur conseillée: {DEFAULT_MAX_DISTANCE})")
+    parser.add_argument('--trace', default=None,
+                        help="Enregistrer le temps de chaque étape des lots (fichier JSONL)")
+    parser.add_argument('--metrics-file', default=None,
+                        help="Réécrire régulièrement les métriques (format Prometheus) dans ce fichier")
+    parser.add_argument('--metrics-interval', type=float, default=30.0,
+                        help="Intervalle d'écriture des métriques en secondes (défaut: 30)")
+    parser.add_argument('--once', action='store_true',
+                        help="Analyser les fichiers présents puis s'arrêter")
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH,
+                        help=f"Cache des prédictions (défaut: {DEFAULT_CACHE_PATH})")
+    parser.add_argument('--no-cache', action='store_true', help="Ne pas utiliser le cache des prédictions")
+    parser.add_argument('--history', default=DEFAULT_RESULTS_DB,
+                        help=f"Historique des analyses (défaut: {DEFAULT_RESULTS_DB})")
+    parser.add_argument('--no-history', action='store_true',
+                        help="Ne pas enregistrer les résultats dans l'historique")
+    args = parser.parse_args(argv)
+
+    if args.batch_size < 1:
+        parser.error("--batch-size doit être supérieur ou égal à 1")
+    if args.tta and not 2 <= args.tta <= MAX_TTA_VIEWS:
+        parser.error(f"--tta doit être compris entre 2 et {MAX_TTA_VIEWS}")
+    if args.tta and args.cascade:
+        parser.error("--cascade et --tta ne peuvent pas être combinés")
+    if args.registry and args.cascade:
+        parser.error("--registry et --cascade ne peuvent pas être combinés")
+    if args.near_duplicates is not None:
+        if not 0 <= args.near_duplicates < 64:
+            parser.error("--near-duplicates doit être compris entre 0 et 63")
+        if args.no_cache or args.tta:
+            parser.error("--near-duplicates nécessite le cache des prédictions "
+                         "(incompatible avec --no-cache et --tta)")
+    for directory in args.directories:
+        if not os.path.isdir(directory):
+            parser.error(f"Dossier introuvable: {directory}")
+
+    return args
+
+
+def watch_main(argv=None):
+    """Point d'entrée du mode surveillance"""
+    args = parse_args(argv)
+
+    if args.cascade:
+        error = cascade_policy_error(args.model)
+        if error:
+            print(f"❌ {error}")
+            return 1
+
+    try:
+        if args.registry:
+            # Bascule explicite entre deux lots (swap_pending): un lot n'est analysé que par une version
+            model = HotSwapEngine(ModelRegistry(args.registry), (1, args.batch_size), args.threads,
+                                  auto_swap=False)
+        elif args.cascade:
+            model = load_cascade_engine(args.model, args.cascade, (1, args.batch_size), args.threads)
+        else:
+            model = load_engine(args.model, warmup_batch_sizes=(1, args.batch_size), num_threads=args.threads)
+    except Exception as e:
+        print(f"❌ Erreur lors du chargement du modèle: {e}")
+        return 1
+    if args.registry:
+        print(f"✓ Modèle {model.active.version} chargé depuis le registre {args.registry}")
+    else:
+        print(f"✓ Modèle chargé avec succès depuis {args.model}")
+    if args.cascade:
+        print(f"✓ Modèle de tri {args.cascade}: bande d'incertitude ]{model.low:.4f}, {model.high:.4f}[")
+
+    if args.trace:
+        TRACER.set_record_file(args.trace)
+    if args.metrics_file:
+        TRACER.start_periodic_dump(args.metrics_file, args.metrics_interval)
+
+    checkpoint = WatchCheckpoint(args.checkpoint)
+    fingerprint = model.active.fingerprint if args.registry else None
+    cache = None if args.no_cache or args.tta else PredictionCache(args.model, args.cache, fingerprint=fingerprint)
+    store = None if args.no_history else ResultsStore(args.history)
+    if args.registry:
+        version = model.active.version
+    else:
+        version = model_version(args.model, cache.model_fingerprint if cache else None) if store else None
+    policy = model.active.policy if args.registry \
+        else load_policy(args.model, cache.model_fingerprint if cache else None)
+    if not policy.is_default:
+        print(f"✓ Politique de décision: {policy.describe()}")
+    near_index = None
+    if args.near_duplicates is not None:
+        near_index = load_hash_index(cache, args.near_duplicates)
+        print(f"✓ Index des quasi-doublons: {len(near_index)} images (distance max {args.near_duplicates} bits)")
+
+    # En mode --once, les fichiers existants sont analysés sans attendre de seconde scrutation
+    watcher = FolderWatcher(args.directories, checkpoint, args.recursive, 0 if args.once else args.settle)
+    print(f"👁️  Surveillance de {', '.join(args.directories)} "
+          f"({len(checkpoint)} fichiers déjà traités, Ctrl+C pour arrêter)")
+
+    total = 0
+    try:
+        if args.once:
+            watcher.poll()
+        while True:
+            if args.registry:
+                model.check_for_update()
+                active = model.swap_pending()
+                if active is not None:
+                    # Nouvelle version: cache et index des quasi-doublons de l'ancienne invalidés
+                    version = active.version
+                    policy = active.policy
+                    if cache is not None:
+                        cache.set_model_fingerprint(active.fingerprint)
+                    if near_index is not None:
+                        near_index = load_hash_index(cache, args.near_duplicates)
+            ready = watcher.poll()
+            if ready:
+                start = time.perf_counter()
+                results = process_ready(ready, model, checkpoint, args.output, args.batch_size,
+                                        cache, store, version, args.tta, near_index, policy)
+                total += len(results)
+                for result in results:
+                    status = result['error'] or f"{result['result']} ({float(result['probability']) * 100:.2f}%)"
+                    print(f"   {os.path.basename(result['image'])}: {status}")
+                print(f"✓ {len(results)} images analysées en {time.perf_counter() - start:.1f}s")
+            if args.once:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("\nArrêt de la surveillance...")
+    finally:
+        checkpoint.close()
+        if cache is not None:
+            cache.close()
+        if store is not None:
+            store.close()
+        TRACER.stop_periodic_dump()
+
+    print(f"✓ {total} images analysées, résultats dans {args.output}")
+    if args.cascade and model.images:
+        print(f"   - Envoyées au modèle complet: {model.escalated}/{model.images} "
+              f"(escalade {model.escalation_rate * 100:.1f}%)")
+    if total:
+        print_summary(TRACER.summary(), TRACER.runtime_info())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(watch_main())